@@ -0,0 +1,208 @@
+"""Reproducible synthetic markdown corpora for benchmarking."""
+
+import json
+import math
+import os
+import random
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+MANIFEST_NAME = ".corpus.json"
+
+WORDS = (
+    "model token context prompt embedding layer vector weight gradient inference training dataset "
+    "attention transformer latency throughput budget evaluation retrieval agent tool memory"
+).split()
+
+
+class CorpusSpec(NamedTuple):
+    """Shape of a synthetic corpus.
+
+    Attributes:
+        files: Number of markdown files.
+        links_per_file: Relative links in each file.
+        heading_depth: Heading levels below the H1, from 0 to 5.
+        fences_per_file: Fenced code blocks in each file.
+        mean_size: Mean file size in bytes.
+        size_sigma: Spread of the log-normal file size distribution; 0 makes
+            every file the same size.
+        broken_fraction: Fraction of links pointing at missing files or
+            anchors.
+        files_per_dir: Files in each directory.
+        seed: Random seed; the same spec always produces the same bytes.
+    """
+
+    files: int = 1000
+    links_per_file: int = 5
+    heading_depth: int = 3
+    fences_per_file: int = 2
+    mean_size: int = 2048
+    size_sigma: float = 0.5
+    broken_fraction: float = 0.01
+    files_per_dir: int = 100
+    seed: int = 0
+
+
+class CorpusStats(NamedTuple):
+    """What a generated corpus contains."""
+
+    files: int
+    bytes: int
+    broken_links: int
+
+
+def file_path(spec: CorpusSpec, index: int) -> str:
+    """Return the path of a corpus file relative to the corpus root.
+
+    Args:
+        spec: Corpus shape.
+        index: File number.
+
+    Returns:
+        POSIX relative path.
+    """
+    return f"d{index // spec.files_per_dir:04d}/f{index:07d}.md"
+
+
+def generate_corpus(root_path: Path, spec: CorpusSpec) -> CorpusStats:
+    """Write a corpus, or reuse one already generated from the same spec.
+
+    Args:
+        root_path: Directory to write the corpus into.
+        spec: Corpus shape.
+
+    Returns:
+        Totals for the corpus.
+    """
+    root_path = Path(root_path)
+    manifest = root_path / MANIFEST_NAME
+    existing = _read_manifest(manifest)
+    if existing is not None and existing.get("spec") == spec._asdict():
+        return CorpusStats(**existing["stats"])
+
+    rng = random.Random(spec.seed)
+    total_bytes = 0
+    broken = 0
+    for index in range(spec.files):
+        path = root_path / file_path(spec, index)
+        if index % spec.files_per_dir == 0:
+            path.parent.mkdir(parents=True, exist_ok=True)
+        content, file_broken = render_file(spec, index, rng)
+        data = content.encode("utf-8")
+        path.write_bytes(data)
+        total_bytes += len(data)
+        broken += file_broken
+
+    stats = CorpusStats(spec.files, total_bytes, broken)
+    manifest.write_text(json.dumps({"spec": spec._asdict(), "stats": stats._asdict()}), encoding="utf-8")
+    return stats
+
+
+def _read_manifest(manifest: Path) -> Optional[Dict[str, Any]]:
+    """Read the manifest of an earlier generation.
+
+    Args:
+        manifest: Manifest file.
+
+    Returns:
+        Manifest contents, or None if missing or unreadable.
+    """
+    try:
+        return json.loads(manifest.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+def render_file(spec: CorpusSpec, index: int, rng: random.Random) -> Tuple[str, int]:
+    """Render one corpus file.
+
+    Every file has the same heading titles, so links to ``#section-1`` in any
+    other file are valid anchors when headings are enabled.
+
+    Args:
+        spec: Corpus shape.
+        index: File number.
+        rng: Random source, advanced by the call.
+
+    Returns:
+        File content and the number of broken links in it.
+    """
+    depth = max(0, min(spec.heading_depth, 5))
+    sections = max(1, depth)
+    target_size = _target_size(spec, rng)
+
+    links, broken = _links(spec, index, rng, anchors=depth > 0)
+    fences = [f"```python\nvalue_{n} = {index}\nprint(value_{n})\n```\n" for n in range(spec.fences_per_file)]
+
+    lines: List[str] = [f"# Document {index}\n", "\n"]
+    for section in range(sections):
+        if depth:
+            lines.append(f"{'#' * (2 + section)} Section {section + 1}\n\n")
+        lines.append(_paragraph(rng, 20) + "\n\n")
+        lines.extend(link + "\n\n" for link in links[section::sections])
+        lines.extend(fence + "\n" for fence in fences[section::sections])
+
+    size = sum(len(line) for line in lines)
+    while size < target_size:
+        paragraph = _paragraph(rng, 40) + "\n\n"
+        lines.append(paragraph)
+        size += len(paragraph)
+    return "".join(lines), broken
+
+
+def _target_size(spec: CorpusSpec, rng: random.Random) -> int:
+    """Draw a file size from a log-normal distribution with the spec's mean.
+
+    Args:
+        spec: Corpus shape.
+        rng: Random source.
+
+    Returns:
+        Target size in bytes.
+    """
+    if spec.size_sigma <= 0:
+        return spec.mean_size
+    mu = math.log(max(spec.mean_size, 1)) - spec.size_sigma**2 / 2
+    return int(rng.lognormvariate(mu, spec.size_sigma))
+
+
+def _links(spec: CorpusSpec, index: int, rng: random.Random, anchors: bool) -> Tuple[List[str], int]:
+    """Create a file's links to other files in the corpus.
+
+    Args:
+        spec: Corpus shape.
+        index: Number of the linking file.
+        rng: Random source.
+        anchors: Whether every other link should carry a heading anchor.
+
+    Returns:
+        Markdown links and how many of them are broken.
+    """
+    source_dir = os.path.dirname(file_path(spec, index))
+    links = []
+    broken = 0
+    for n in range(spec.links_per_file):
+        target = file_path(spec, rng.randrange(spec.files))
+        anchor = "#section-1" if anchors and n % 2 else ""
+        if rng.random() < spec.broken_fraction:
+            broken += 1
+            if anchor:
+                anchor = "#no-such-section"
+            else:
+                target = target.replace(".md", "-missing.md")
+        relative = os.path.relpath(target, source_dir).replace(os.sep, "/")
+        links.append(f"See [link {n}]({relative}{anchor}) for details.")
+    return links, broken
+
+
+def _paragraph(rng: random.Random, words: int) -> str:
+    """Create a paragraph of filler words.
+
+    Args:
+        rng: Random source.
+        words: Number of words.
+
+    Returns:
+        Paragraph text.
+    """
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
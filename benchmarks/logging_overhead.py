@@ -0,0 +1,137 @@
+"""Time what one log call costs at each level, written directly or through the queue.
+
+Run with ``python -m benchmarks.logging_overhead``. Records go to a stream
+that waits a while on every write, like a stderr pipe nobody is reading
+fast enough; calls below the configured level are never formatted.
+"""
+
+import argparse
+import contextlib
+import io
+import logging
+import sys
+import time
+from typing import Dict, Optional, Sequence
+
+from src.logging_config import configure_logging, stop_logging
+
+LEVELS = ("DEBUG", "INFO", "WARNING", "ERROR")
+
+# Mode name: (JSON format, queued).
+MODES = {
+    "text": (False, False),
+    "json": (True, False),
+    "queued text": (False, True),
+    "queued json": (True, True),
+}
+
+Results = Dict[str, Dict[str, float]]
+
+
+class SlowStream(io.TextIOBase):
+    """Text stream that discards what is written after a fixed delay."""
+
+    def __init__(self, latency: float):
+        """Initialize stream.
+
+        Args:
+            latency: Seconds each write takes.
+        """
+        self.latency = latency
+
+    def write(self, text: str) -> int:
+        """Wait, then discard the text.
+
+        Args:
+            text: Text written.
+
+        Returns:
+            Number of characters written.
+        """
+        if self.latency:
+            time.sleep(self.latency)
+        return len(text)
+
+
+def measure(mode: str, threshold: str, level: str, records: int, latency: float) -> float:
+    """Time log calls at one level.
+
+    Args:
+        mode: Key of ``MODES``.
+        threshold: Level logging is configured with.
+        level: Level the records are logged at.
+        records: Number of log calls.
+        latency: Seconds each write to stderr takes.
+
+    Returns:
+        Mean nanoseconds per call, not counting the writes a queue still
+        had pending afterwards.
+    """
+    json_format, use_queue = MODES[mode]
+    with contextlib.redirect_stderr(SlowStream(latency)):
+        configure_logging(threshold, json_format=json_format, use_queue=use_queue)
+    logger = logging.getLogger("src.benchmark")
+    number = logging.getLevelName(level)
+    extra = {"file": "docs/index.md", "duration": 0.0015}
+    try:
+        start = time.perf_counter_ns()
+        for _ in range(records):
+            logger.log(number, "Validated %s in %.1f ms", "docs/index.md", 1.5, extra=extra)
+        return (time.perf_counter_ns() - start) / records
+    finally:
+        stop_logging()
+
+
+def run(records: int = 2000, latency: float = 0.0001, threshold: str = "INFO") -> Results:
+    """Time log calls at every level in every mode.
+
+    Args:
+        records: Log calls per measurement.
+        latency: Seconds each write to stderr takes.
+        threshold: Level logging is configured with.
+
+    Returns:
+        Nanoseconds per call by level, then by mode.
+    """
+    return {level: {mode: measure(mode, threshold, level, records, latency) for mode in MODES} for level in LEVELS}
+
+
+def format_results(results: Results, threshold: str) -> str:
+    """Render results as a table.
+
+    Args:
+        results: Nanoseconds per call by level and mode.
+        threshold: Level logging was configured with.
+
+    Returns:
+        Table text.
+    """
+    lines = [f"{'level':<10}{'emitted':>9}" + "".join(f"{mode + ' ns':>16}" for mode in MODES)]
+    for level, timings in results.items():
+        emitted = "yes" if logging.getLevelName(level) >= logging.getLevelName(threshold) else "no"
+        lines.append(f"{level:<10}{emitted:>9}" + "".join(f"{timings[mode]:>16.0f}" for mode in MODES))
+    return "\n".join(lines)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """Run the benchmark and print the table.
+
+    Args:
+        argv: Command-line arguments; defaults to ``sys.argv[1:]``.
+
+    Returns:
+        Exit code.
+    """
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.logging_overhead", description=__doc__)
+    parser.add_argument("--records", type=int, default=2000, help="Log calls per measurement")
+    parser.add_argument("--latency", type=float, default=0.0001, help="Seconds each write to stderr takes")
+    parser.add_argument("--threshold", choices=LEVELS, default="INFO", help="Level logging is configured with")
+    args = parser.parse_args(argv)
+
+    results = run(args.records, args.latency, args.threshold)
+    print(format_results(results, args.threshold))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,332 @@
+"""Time the validators on a synthetic corpus and gate on regressions."""
+
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from benchmarks.corpus import CorpusSpec, generate_corpus
+from src.search import IndexWriter
+from src.tokens import TokenCounter, Tokenizer
+from src.utils import LinkChecker, MarkdownValidator
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - not available on Windows
+    resource = None  # type: ignore[assignment]
+
+BENCHMARKS = ("validate_file", "scan_repository", "check_all_links", "count_tokens", "build_search_index")
+DEFAULT_THRESHOLD = 0.2
+DEFAULT_WORK_DIR = Path(".benchmarks")
+
+Results = Dict[str, Any]
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Return the peak resident set size of this process.
+
+    Returns:
+        Peak RSS in MiB, or None where the platform cannot report it.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes.
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def run_benchmark(name: str, root_path: str, jobs: int, repeat: int, sample: int) -> Dict[str, Any]:
+    """Run one benchmark and measure it.
+
+    Args:
+        name: One of ``BENCHMARKS``.
+        root_path: Corpus directory.
+        jobs: Worker processes for ``check_all_links`` and ``count_tokens``.
+        repeat: Number of runs; the fastest is reported.
+        sample: Files validated by the ``validate_file`` benchmark.
+
+    Returns:
+        Seconds, files, bytes, throughput and peak RSS.
+    """
+    root = Path(root_path)
+    files = sorted(root.rglob("*.md"))
+    if name == "validate_file":
+        files = files[:sample]
+    # Scanning only lists the tree, so no file content counts towards throughput.
+    data_bytes = 0 if name == "scan_repository" else sum(file_path.stat().st_size for file_path in files)
+
+    task = _task(name, root, files, jobs)
+    seconds = min(_time(task) for _ in range(repeat))
+    return {
+        "seconds": seconds,
+        "files": len(files),
+        "bytes": data_bytes,
+        "files_per_sec": len(files) / seconds if seconds else None,
+        "mb_per_sec": data_bytes / (1024 * 1024) / seconds if seconds and data_bytes else None,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def _task(name: str, root: Path, files: List[Path], jobs: int) -> Callable[[], Any]:
+    """Build the function a benchmark times.
+
+    Args:
+        name: One of ``BENCHMARKS``.
+        root: Corpus directory.
+        files: Markdown files the benchmark works on.
+        jobs: Worker processes for ``check_all_links`` and ``count_tokens``.
+
+    Returns:
+        Function running the benchmark once.
+
+    Raises:
+        ValueError: If the benchmark is unknown.
+    """
+    if name == "validate_file":
+        validator = MarkdownValidator(root)
+        return lambda: [validator.validate_file(file_path) for file_path in files]
+    if name == "scan_repository":
+        return lambda: LinkChecker(root).scan_repository()
+    if name == "check_all_links":
+        return lambda: LinkChecker(root).check_all_links(jobs=jobs)
+    if name == "count_tokens":
+        return lambda: TokenCounter(Tokenizer.load()).count_files(files, jobs)
+    if name == "build_search_index":
+        return lambda: _build_search_index(root, files)
+    raise ValueError(f"Unknown benchmark: {name}")
+
+
+def _build_search_index(root: Path, files: List[Path]) -> Any:
+    """Build a search index of the corpus from scratch in a temporary directory.
+
+    Args:
+        root: Corpus directory.
+        files: Markdown files to index.
+
+    Returns:
+        Statistics of the update.
+    """
+    with tempfile.TemporaryDirectory() as index_dir:
+        return IndexWriter(root, Path(index_dir) / "search.idx").update(files, rebuild=True)
+
+
+def _time(task: Callable[[], Any]) -> float:
+    """Time one call.
+
+    Args:
+        task: Function to call.
+
+    Returns:
+        Elapsed wall-clock seconds.
+    """
+    start = time.perf_counter()
+    task()
+    return time.perf_counter() - start
+
+
+def run_benchmarks(
+    root_path: Path,
+    spec: CorpusSpec,
+    jobs: int = 1,
+    repeat: int = 1,
+    sample: int = 1000,
+    isolate: bool = True,
+    names: Sequence[str] = BENCHMARKS,
+) -> Results:
+    """Generate a corpus if needed and run the benchmarks on it.
+
+    Args:
+        root_path: Corpus directory.
+        spec: Corpus shape.
+        jobs: Worker processes for ``check_all_links`` and ``count_tokens``.
+        repeat: Runs per benchmark; the fastest is reported.
+        sample: Files validated by the ``validate_file`` benchmark.
+        isolate: Run each benchmark in a fresh process, so its peak RSS is
+            its own and earlier benchmarks leave no warm state behind.
+        names: Benchmarks to run.
+
+    Returns:
+        JSON-serializable results.
+    """
+    stats = generate_corpus(root_path, spec)
+    measurements = {}
+    for name in names:
+        args = (name, str(root_path), jobs, repeat, sample)
+        if isolate:
+            with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as executor:
+                measurements[name] = executor.submit(run_benchmark, *args).result()
+        else:
+            measurements[name] = run_benchmark(*args)
+
+    return {
+        "spec": spec._asdict(),
+        "corpus": stats._asdict(),
+        "jobs": jobs,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "benchmarks": measurements,
+    }
+
+
+def compare(results: Results, baseline: Results, threshold: float = DEFAULT_THRESHOLD) -> List[str]:
+    """Find benchmarks whose throughput fell too far below a baseline.
+
+    Args:
+        results: Results of this run.
+        baseline: Saved results to compare against.
+        threshold: Allowed fractional drop in files per second.
+
+    Returns:
+        Descriptions of regressions; empty if there are none.
+    """
+    if baseline.get("spec") != results.get("spec") or baseline.get("jobs") != results.get("jobs"):
+        return ["baseline was recorded for a different corpus or job count; record a new one"]
+
+    regressions = []
+    for name, before in baseline.get("benchmarks", {}).items():
+        after = results["benchmarks"].get(name)
+        if after is None or not before.get("files_per_sec") or not after.get("files_per_sec"):
+            continue
+        change = after["files_per_sec"] / before["files_per_sec"] - 1
+        if change < -threshold:
+            regressions.append(
+                f"{name}: {after['files_per_sec']:.0f} files/s vs baseline "
+                f"{before['files_per_sec']:.0f} ({change:+.0%}, limit -{threshold:.0%})"
+            )
+    return regressions
+
+
+def format_results(results: Results) -> str:
+    """Render results as a table.
+
+    Args:
+        results: Benchmark results.
+
+    Returns:
+        Table text.
+    """
+    corpus = results["corpus"]
+    lines = [
+        f"Corpus: {corpus['files']} files, {corpus['bytes'] / (1024 * 1024):.1f} MiB, "
+        f"{corpus['broken_links']} broken links; jobs={results['jobs']}",
+        f"{'benchmark':<18}{'seconds':>10}{'files/s':>12}{'MB/s':>10}{'peak RSS MB':>14}",
+    ]
+    for name, measured in results["benchmarks"].items():
+        lines.append(
+            f"{name:<18}{measured['seconds']:>10.3f}{_number(measured['files_per_sec'], 0):>12}"
+            f"{_number(measured['mb_per_sec'], 1):>10}{_number(measured['peak_rss_mb'], 1):>14}"
+        )
+    return "\n".join(lines)
+
+
+def _number(value: Optional[float], digits: int) -> str:
+    """Format an optional number for the table.
+
+    Args:
+        value: Number, or None if not applicable.
+        digits: Digits after the decimal point.
+
+    Returns:
+        Formatted number, or a dash.
+    """
+    return "-" if value is None else f"{value:.{digits}f}"
+
+
+def corpus_dir(work_dir: Path, spec: CorpusSpec) -> Path:
+    """Choose the directory holding the corpus for a spec.
+
+    Args:
+        work_dir: Directory for benchmark data.
+        spec: Corpus shape.
+
+    Returns:
+        Directory named after the spec, so corpora are reused across runs.
+    """
+    digest = hashlib.sha1(json.dumps(spec._asdict(), sort_keys=True).encode("utf-8")).hexdigest()[:10]
+    return work_dir / "corpus" / f"{spec.files}-{digest}"
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Create the benchmark argument parser.
+
+    Returns:
+        Argument parser.
+    """
+    defaults = CorpusSpec()
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description=__doc__)
+    parser.add_argument("--files", type=int, default=defaults.files, help="Markdown files in the corpus")
+    parser.add_argument("--links", type=int, default=defaults.links_per_file, help="Links per file")
+    parser.add_argument("--heading-depth", type=int, default=defaults.heading_depth, help="Heading levels below H1")
+    parser.add_argument("--fences", type=int, default=defaults.fences_per_file, help="Code fences per file")
+    parser.add_argument("--mean-size", type=int, default=defaults.mean_size, help="Mean file size in bytes")
+    parser.add_argument("--size-sigma", type=float, default=defaults.size_sigma, help="Log-normal size spread")
+    parser.add_argument("--broken", type=float, default=defaults.broken_fraction, help="Fraction of broken links")
+    parser.add_argument("--seed", type=int, default=defaults.seed, help="Random seed")
+    parser.add_argument("--work-dir", type=Path, default=DEFAULT_WORK_DIR, help="Directory for generated corpora")
+    parser.add_argument(
+        "-j", "--jobs", type=int, default=1, help="Worker processes for check_all_links and count_tokens"
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per benchmark; the fastest counts")
+    parser.add_argument("--sample", type=int, default=1000, help="Files timed by the validate_file benchmark")
+    parser.add_argument("--in-process", action="store_true", help="Run benchmarks in this process")
+    parser.add_argument("--output", type=Path, help="Write results as JSON to this file")
+    parser.add_argument("--baseline", type=Path, help="Fail if throughput regressed against these results")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help=f"Allowed drop in files/s against the baseline (default: {DEFAULT_THRESHOLD:g})",
+    )
+    return parser
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """Run the benchmarks from the command line.
+
+    Args:
+        argv: Arguments; defaults to ``sys.argv``.
+
+    Returns:
+        Exit code (0 for success, 1 for regressions).
+    """
+    args = build_parser().parse_args(argv)
+    spec = CorpusSpec(
+        files=args.files,
+        links_per_file=args.links,
+        heading_depth=args.heading_depth,
+        fences_per_file=args.fences,
+        mean_size=args.mean_size,
+        size_sigma=args.size_sigma,
+        broken_fraction=args.broken,
+        seed=args.seed,
+    )
+    root_path = corpus_dir(args.work_dir, spec)
+    root_path.mkdir(parents=True, exist_ok=True)
+    results = run_benchmarks(
+        root_path, spec, jobs=args.jobs, repeat=args.repeat, sample=args.sample, isolate=not args.in_process
+    )
+    print(format_results(results))
+
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(results, indent=2) + "\n", encoding="utf-8")
+
+    if not args.baseline:
+        return 0
+    if not args.baseline.exists():
+        print(f"No baseline at {args.baseline}; run 'make bench-baseline' to record one")
+        return 0
+
+    regressions = compare(results, json.loads(args.baseline.read_text(encoding="utf-8")), args.threshold)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    return 1 if regressions else 0
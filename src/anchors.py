@@ -0,0 +1,210 @@
+"""GitHub-compatible heading anchors and a per-run slug index."""
+
+import re
+import unicodedata
+from typing import Callable, Dict, FrozenSet, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import unquote
+
+from src.scanner import Header, MarkdownScanner
+from src.streaming import read_chunks
+
+INLINE_LINK_PATTERN = re.compile(r"(!?)\[([^\]]*)\]\([^)]*\)")
+HTML_TAG_PATTERN = re.compile(r"<[^>]+>")
+
+AnchorLoader = Callable[[str], Optional[List[str]]]
+
+
+def github_slug(text: str) -> str:
+    """Convert heading text to the anchor GitHub generates for it.
+
+    Markup is reduced to its rendered text, the result is lowercased, every
+    character other than letters, digits, marks, spaces, hyphens and
+    underscores is dropped, and spaces become hyphens.
+
+    Args:
+        text: Heading text as written in markdown.
+
+    Returns:
+        Anchor slug without duplicate suffix.
+    """
+    text = INLINE_LINK_PATTERN.sub(lambda match: "" if match.group(1) else match.group(2), text)
+    text = HTML_TAG_PATTERN.sub("", text).lower()
+    kept = [char for char in text if char in " -_" or char.isalnum() or unicodedata.category(char)[0] == "M"]
+    return "".join(kept).replace(" ", "-")
+
+
+class AnchorCounter:
+    """Computes a document's heading anchors one heading at a time.
+
+    Repeated slugs get ``-1``, ``-2`` and so on, exactly like GitHub. Only
+    the anchors themselves are kept, so a document streamed in chunks can be
+    checked against the anchors defined so far.
+    """
+
+    __slots__ = ("_occurrences",)
+
+    def __init__(self) -> None:
+        """Initialize counter for a document with no headings yet."""
+        # Every anchor handed out, in order, mapped to how often its slug repeated.
+        self._occurrences: Dict[str, int] = {}
+
+    def add(self, title: str) -> str:
+        """Compute the anchor of the next heading.
+
+        Args:
+            title: Heading text.
+
+        Returns:
+            Anchor for the heading.
+        """
+        occurrences = self._occurrences
+        base = slug = github_slug(title)
+        while slug in occurrences:
+            occurrences[base] += 1
+            slug = f"{base}-{occurrences[base]}"
+        occurrences[slug] = 0
+        return slug
+
+    def __contains__(self, anchor: object) -> bool:
+        """Check whether a heading so far defines an anchor."""
+        return anchor in self._occurrences
+
+    def __iter__(self) -> Iterator[str]:
+        """Iterate over the anchors in document order."""
+        return iter(self._occurrences)
+
+    def __len__(self) -> int:
+        """Return the number of anchors."""
+        return len(self._occurrences)
+
+
+def heading_anchors(titles: Iterable[str]) -> List[str]:
+    """Compute the anchors for a document's headings in order.
+
+    Args:
+        titles: Heading texts in document order.
+
+    Returns:
+        Anchors in document order.
+    """
+    counter = AnchorCounter()
+    for title in titles:
+        counter.add(title)
+    return list(counter)
+
+
+def normalize_fragment(fragment: str) -> str:
+    """Normalize a link fragment for comparison with anchors.
+
+    Args:
+        fragment: Fragment without the leading ``#``.
+
+    Returns:
+        Percent-decoded, lowercased fragment.
+    """
+    return unquote(fragment).lower()
+
+
+def load_anchors(path: str) -> Optional[List[str]]:
+    """Read a markdown file and compute its heading anchors.
+
+    Args:
+        path: Path to the markdown file.
+
+    Returns:
+        Anchors, or None if the file cannot be read as UTF-8.
+    """
+    try:
+        return chunk_anchors(read_chunks(path))
+    except (OSError, UnicodeDecodeError):
+        return None
+
+
+def chunk_anchors(chunks: Iterable[Tuple[int, bytes]]) -> List[str]:
+    """Compute the heading anchors of a file read in line-aligned chunks.
+
+    Args:
+        chunks: Byte offset and bytes of each chunk.
+
+    Returns:
+        Anchors in document order.
+
+    Raises:
+        UnicodeDecodeError: If a chunk is not valid UTF-8.
+    """
+    scanner = MarkdownScanner()
+    titles: List[str] = []
+    for _, data in chunks:
+        titles.extend(event.text for event in scanner.feed(data.decode("utf-8")) if isinstance(event, Header))
+    return heading_anchors(titles)
+
+
+class SlugIndex:
+    """Maps markdown files to the set of anchors their headings define.
+
+    The index is filled once per run from the files being validated, so each
+    ``#fragment`` is checked with a dictionary lookup. Files that were not
+    indexed are read on first use through the loader.
+    """
+
+    def __init__(self, loader: Optional[AnchorLoader] = load_anchors):
+        """Initialize an empty index.
+
+        Args:
+            loader: Computes anchors for files missing from the index, or None
+                to treat them as having no anchors.
+        """
+        self.loader = loader
+        self._anchors: Dict[str, FrozenSet[str]] = {}
+
+    def __len__(self) -> int:
+        """Return the number of indexed files."""
+        return len(self._anchors)
+
+    def __contains__(self, path: object) -> bool:
+        """Check whether a file is indexed."""
+        return path in self._anchors
+
+    def add(self, path: str, anchors: Iterable[str]) -> None:
+        """Record the anchors of a file.
+
+        Args:
+            path: Resolved path of the file.
+            anchors: Anchors defined by the file's headings.
+        """
+        self._anchors[path] = frozenset(anchors)
+
+    def discard(self, path: str) -> None:
+        """Forget a file, e.g. because it was deleted.
+
+        Args:
+            path: Resolved path of the file.
+        """
+        self._anchors.pop(path, None)
+
+    def get(self, path: str) -> FrozenSet[str]:
+        """Return the anchors of a file, loading it if necessary.
+
+        Args:
+            path: Resolved path of the file.
+
+        Returns:
+            Anchors defined by the file.
+        """
+        anchors = self._anchors.get(path)
+        if anchors is None:
+            loaded = self.loader(path) if self.loader is not None else None
+            anchors = self._anchors[path] = frozenset(loaded or ())
+        return anchors
+
+    def has_anchor(self, path: str, fragment: str) -> bool:
+        """Check whether a file defines an anchor.
+
+        Args:
+            path: Resolved path of the file.
+            fragment: Link fragment without the leading ``#``.
+
+        Returns:
+            True if the fragment names one of the file's anchors.
+        """
+        return normalize_fragment(fragment) in self.get(path)
@@ -0,0 +1,528 @@
+"""Validation of markdown inside tar and zip archives without extracting them."""
+
+import logging
+import os
+import stat
+import tarfile
+import zipfile
+import zlib
+from pathlib import Path
+from typing import (
+    IO,
+    Any,
+    BinaryIO,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    cast,
+)
+
+from src.anchors import SlugIndex, chunk_anchors
+from src.path_index import PathIndex
+from src.profiling import Profiler, phase
+from src.streaming import STREAM_THRESHOLD, iter_stream_chunks
+from src.utils import FileContent, LinkChecker
+from src.walker import GITIGNORE_NAME, Rules, Walker, compile_pattern
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_SUFFIXES = (".zip", ".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tbz2", ".tar.xz", ".txz")
+
+# Member kinds; hard links are indexed like files and have the content of the member they link to.
+FILE, DIRECTORY, SYMLINK, HARDLINK = "file", "dir", "symlink", "hardlink"
+
+
+class ArchiveError(Exception):
+    """Raised when an archive cannot be read."""
+
+
+class ArchiveMember(NamedTuple):
+    """One entry of an archive, named relative to the archive's root."""
+
+    name: str
+    kind: str
+    size: int = 0
+    target: str = ""
+
+
+def is_archive(path: Path) -> bool:
+    """Check whether a path is an archive that can be validated.
+
+    Args:
+        path: Path to check.
+
+    Returns:
+        True for existing ``.zip`` files and tar files, compressed or not.
+    """
+    return path.name.lower().endswith(ARCHIVE_SUFFIXES) and path.is_file()
+
+
+def member_name(name: str) -> Optional[str]:
+    """Normalize a member name to the POSIX path it would be extracted to.
+
+    Args:
+        name: Name as stored in the archive.
+
+    Returns:
+        Path relative to the root, or None for names that would leave it.
+    """
+    parts = [part for part in name.replace("\\", "/").split("/") if part not in ("", ".")]
+    if not parts or ".." in parts:
+        return None
+    return "/".join(parts)
+
+
+def iter_members(
+    archive_path: Path, wanted: Callable[[str], bool]
+) -> Iterator[Tuple[ArchiveMember, Optional[IO[bytes]]]]:
+    """Read an archive's entries front to back without extracting them.
+
+    Tar archives, compressed or not, are read as a stream and zip archives
+    through their central directory, so memory does not grow with the
+    archive's size. Entries whose names would leave the root are skipped.
+
+    Args:
+        archive_path: Archive to read.
+        wanted: Whether the content of a regular file, given its normalized
+            name, should be opened.
+
+    Yields:
+        Each entry with an open handle for wanted regular files and None
+        otherwise. A handle is only valid until the next entry is requested.
+
+    Raises:
+        ArchiveError: If the archive cannot be read or is corrupt.
+    """
+    try:
+        if zipfile.is_zipfile(archive_path):
+            yield from _iter_zip(archive_path, wanted)
+        else:
+            yield from _iter_tar(archive_path, wanted)
+    except (OSError, EOFError, zlib.error, tarfile.TarError, zipfile.BadZipFile) as e:
+        raise ArchiveError(f"Cannot read archive {archive_path}: {e}") from e
+
+
+def _iter_tar(archive_path: Path, wanted: Callable[[str], bool]) -> Iterator[Tuple[ArchiveMember, Optional[IO[bytes]]]]:
+    """Read the entries of a tar archive as a stream.
+
+    Args:
+        archive_path: Tar archive, compressed or not.
+        wanted: Whether a regular file's content should be opened.
+
+    Yields:
+        Entries and handles as described for ``iter_members``.
+    """
+    # Only forward seeks happen while iterating, so this reads the file once, front to back;
+    # unlike "r|*" it decompresses through a buffered reader instead of re-slicing small blocks.
+    with tarfile.open(archive_path, "r:*") as tar:
+        # TarFile keeps every header it has read in its undocumented members list, which the
+        # type stubs leave out; only the current header is needed.
+        members: List[tarfile.TarInfo] = vars(tar)["members"]
+        for info in tar:
+            members.clear()
+            name = member_name(info.name)
+            if name is None:
+                logger.warning("Skipping archive member outside the root: %s", info.name)
+                continue
+            if info.isdir():
+                yield ArchiveMember(name, DIRECTORY), None
+            elif info.issym():
+                yield ArchiveMember(name, SYMLINK, target=info.linkname), None
+            elif info.islnk():
+                yield ArchiveMember(name, HARDLINK, target=member_name(info.linkname) or ""), None
+            elif info.isfile():
+                yield ArchiveMember(name, FILE, info.size), tar.extractfile(info) if wanted(name) else None
+
+
+def _iter_zip(archive_path: Path, wanted: Callable[[str], bool]) -> Iterator[Tuple[ArchiveMember, Optional[IO[bytes]]]]:
+    """Read the entries of a zip archive in the order they are stored.
+
+    Args:
+        archive_path: Zip archive.
+        wanted: Whether a regular file's content should be opened.
+
+    Yields:
+        Entries and handles as described for ``iter_members``.
+    """
+    with zipfile.ZipFile(archive_path) as archive:
+        for info in archive.infolist():
+            name = member_name(info.filename)
+            if name is None:
+                logger.warning("Skipping archive member outside the root: %s", info.filename)
+                continue
+            if info.is_dir():
+                yield ArchiveMember(name, DIRECTORY), None
+            elif stat.S_ISLNK(info.external_attr >> 16):
+                yield ArchiveMember(name, SYMLINK, target=archive.read(info).decode("utf-8", "replace")), None
+            elif not wanted(name):
+                yield ArchiveMember(name, FILE, info.file_size), None
+            else:
+                with archive.open(info) as handle:
+                    yield ArchiveMember(name, FILE, info.file_size), handle
+
+
+class ArchiveWalker(Walker):
+    """Walker whose ``.gitignore`` files are read from an archive.
+
+    ``ignore_files`` maps each directory to the text of its ignore file and
+    is filled while the archive is listed, before any path is checked.
+    """
+
+    def __init__(self, root_path: Path, exclude: Iterable[str] = (), gitignore: bool = True):
+        """Initialize walker.
+
+        Args:
+            root_path: Archive standing in for the root directory.
+            exclude: Extra ``.gitignore``-style patterns relative to the root.
+            gitignore: Whether to honor ``.gitignore`` files in the archive.
+        """
+        super().__init__(root_path, exclude=exclude, gitignore=gitignore)
+        self.ignore_files: Dict[str, str] = {}
+
+    def _rules_for(self, rel_dir: str, entries: Optional[List[os.DirEntry]] = None) -> Rules:
+        """Collect the ignore rules that apply inside a directory.
+
+        Args:
+            rel_dir: Directory relative to the root.
+            entries: Unused; archives are never listed from disk.
+
+        Returns:
+            Rules from the root down to and including the directory's own
+            ignore file.
+        """
+        rules = self._dir_rules.get(rel_dir)
+        if rules is not None:
+            return rules
+
+        rules = self._rules_for(rel_dir.rpartition("/")[0]) if rel_dir else ()
+        text = self.ignore_files.get(rel_dir) if self.gitignore else None
+        if text is not None:
+            compiled = (compile_pattern(line, rel_dir) for line in text.splitlines())
+            rules += tuple(rule for rule in compiled if rule is not None)
+        self._dir_rules[rel_dir] = rules
+        return rules
+
+    def in_scope(self, rel_path: str) -> bool:
+        """Check whether a file would be validated if the archive were extracted.
+
+        Args:
+            rel_path: File relative to the root.
+
+        Returns:
+            False if the file or a directory above it is excluded.
+        """
+        parts = rel_path.split("/")
+        for depth in range(1, len(parts)):
+            if self.is_excluded("/".join(parts[:depth]), True):
+                return False
+        return not self.is_excluded(rel_path, False)
+
+
+class ArchiveIndex(PathIndex):
+    """Snapshot of an archive's members, resolved as if it were extracted.
+
+    The archive's own path stands in for the root directory, so member
+    ``guide/intro.md`` of ``docs.tar.gz`` is ``docs.tar.gz/guide/intro.md``.
+    Links are resolved against the member names only: paths that leave the
+    archive do not exist, and the filesystem is never consulted. Members of
+    excluded directories are indexed so links to them resolve, as they would
+    on disk, but are not validated.
+    """
+
+    def __init__(self, root_path: Path, walker: Optional[ArchiveWalker] = None):
+        """Initialize an empty index.
+
+        Args:
+            root_path: Archive the index covers.
+            walker: Walker deciding which markdown members are in scope.
+        """
+        self.archive_walker = walker or ArchiveWalker(root_path)
+        super().__init__(root_path, self.archive_walker)
+        self.sizes: Dict[str, int] = {}
+        self.hardlinks: Dict[str, str] = {}
+        self.repeated: Dict[str, int] = {}
+        self.links_to: Dict[str, List[str]] = {}
+
+    @classmethod
+    def from_archive(cls, archive_path: Path, exclude: Iterable[str] = (), gitignore: bool = True) -> "ArchiveIndex":
+        """List an archive's members and index them.
+
+        Args:
+            archive_path: Archive to index.
+            exclude: Extra ``.gitignore``-style patterns relative to the root.
+            gitignore: Whether to honor ``.gitignore`` files in the archive.
+
+        Returns:
+            Populated index.
+
+        Raises:
+            ArchiveError: If the archive cannot be read.
+        """
+        index = cls(archive_path, ArchiveWalker(archive_path, exclude=exclude, gitignore=gitignore))
+        ignore_files = index.archive_walker.ignore_files
+        for member, handle in iter_members(archive_path, lambda name: name.rpartition("/")[2] == GITIGNORE_NAME):
+            index._add(member)
+            if handle is not None:
+                ignore_files[member.name.rpartition("/")[0]] = handle.read().decode("utf-8", "replace")
+        index._select_markdown()
+        return index
+
+    def _add(self, member: ArchiveMember) -> None:
+        """Record one member and the directories above it.
+
+        A name stored more than once ends up as its last entry, which is what
+        extraction would leave behind.
+
+        Args:
+            member: Member to record.
+        """
+        name = member.name
+        parts = name.split("/")
+        self.dirs.update("/".join(parts[:depth]) for depth in range(1, len(parts)))
+        if name in self.sizes:
+            self.repeated[name] = self.repeated.get(name, 1) + 1
+        self.files.discard(name)
+        self.symlinks.pop(name, None)
+        self.hardlinks.pop(name, None)
+        self.sizes.pop(name, None)
+
+        if member.kind == DIRECTORY:
+            self.dirs.add(name)
+        elif member.kind == SYMLINK:
+            self.symlinks[name] = os.path.normpath(os.path.join(self.real_root, os.path.dirname(name), member.target))
+        else:
+            self.files.add(name)
+            self.sizes[name] = member.size
+            if member.kind == HARDLINK:
+                self.hardlinks[name] = member.target
+
+    def _select_markdown(self) -> None:
+        """Decide which markdown members are validated, once every member is known.
+
+        Hard links and symlinks are validated with the content of the member
+        they lead to, unless it is too large to hold. Hard links that lead to
+        no regular file would fail to extract, so they are left out with a
+        warning.
+        """
+        for name in self.files:
+            if not name.endswith(".md") or not self.archive_walker.in_scope(name):
+                continue
+            if name not in self.hardlinks:
+                self.markdown.add(name)
+                continue
+            target = self._content_member(name)
+            if target is None:
+                logger.warning("Skipping hard link to a missing archive member: %s", name)
+            elif self.sizes[target] <= STREAM_THRESHOLD:
+                self.links_to.setdefault(target, []).append(name)
+                self.markdown.add(name)
+
+        for name in self.symlinks:
+            if not name.endswith(".md") or not self.archive_walker.in_scope(name):
+                continue
+            resolved, exists = self.lookup(os.path.join(self.real_root, name))
+            relative = self._relative(resolved) if exists else None
+            target = self._content_member(relative) if relative is not None else None
+            if target is not None and self.sizes[target] <= STREAM_THRESHOLD:
+                self.links_to.setdefault(target, []).append(name)
+                self.markdown.add(name)
+
+    def _content_member(self, name: str) -> Optional[str]:
+        """Follow hard links to the member whose content a file has.
+
+        Args:
+            name: Member name.
+
+        Returns:
+            Name of the regular file member holding the content, or None if
+            there is none.
+        """
+        seen = set()
+        while name in self.hardlinks and name not in seen:
+            seen.add(name)
+            name = self.hardlinks[name]
+        return name if name in self.sizes and name not in self.hardlinks else None
+
+    def _fallback(self, path: str) -> Tuple[str, bool]:
+        """Resolve a path outside the archive, which never exists.
+
+        Args:
+            path: Absolute path.
+
+        Returns:
+            Normalized path and False.
+        """
+        self.fallbacks += 1
+        return os.path.normpath(path), False
+
+
+class ArchiveReader:
+    """Reads an archive's markdown members for ``LinkChecker`` in one pass.
+
+    It takes the place of a ``Prefetcher``: members are handed over in the
+    order they are stored, which need not be sorted, one at a time. Members
+    above the streaming threshold are handed over as line-aligned chunks,
+    so memory stays bounded however large the archive or its members are.
+    Markdown members that are not validated are still read for their
+    headings, so links into them can be checked.
+    """
+
+    def __init__(self, index: ArchiveIndex, stream_threshold: int = STREAM_THRESHOLD):
+        """Initialize reader.
+
+        Args:
+            index: Index of the archive to read.
+            stream_threshold: Size in bytes above which members are handed
+                over in chunks.
+        """
+        self.index = index
+        self.stream_threshold = stream_threshold
+        self.anchors: Dict[str, List[str]] = {}
+        self.members = 0
+        self.bytes = 0
+
+    def read(
+        self, files: Iterable[Path], profiler: Optional[Profiler] = None
+    ) -> Iterator[Tuple[Path, Optional[FileContent]]]:
+        """Read the archive and hand over the requested members.
+
+        Each chunk iterator must be consumed before the next item is
+        requested.
+
+        Args:
+            files: Members to hand over, as paths under the archive.
+            profiler: Optional profiler; reading whole members is timed as the
+                ``archive_read`` phase.
+
+        Yields:
+            ``(file_path, content)`` for every requested member; content is
+            None for members that could not be found, which the usual checks
+            then report as missing.
+        """
+        index = self.index
+        requested = {file_path.relative_to(index.root_path).as_posix() for file_path in files}
+        remaining = dict(index.repeated)
+        self.members = self.bytes = 0
+        for member, handle in iter_members(index.root_path, lambda name: self._wanted(name, requested)):
+            if member.kind in (FILE, HARDLINK) and member.name in remaining:
+                remaining[member.name] -= 1
+                if remaining[member.name]:
+                    # Extraction would overwrite this entry with a later one of the same name.
+                    continue
+            if handle is None:
+                continue
+
+            names = [name for name in (member.name, *index.links_to.get(member.name, ())) if name in requested]
+            requested.difference_update(names)
+            self.members += 1
+            self.bytes += member.size
+            if member.size > self.stream_threshold:
+                yield from self._stream(member.name, handle, names)
+                continue
+            with phase(profiler, "archive_read"):
+                data = handle.read()
+            for name in names:
+                yield index.root_path / name, data
+            if member.name not in names:
+                self._remember_anchors(member.name, [(0, data)])
+
+        logger.info("Read %s markdown members (%.1f MiB) from the archive", self.members, self.bytes / 1024 / 1024)
+        for name in sorted(requested):
+            yield index.root_path / name, None
+
+    def load_anchors(self, path: str) -> Optional[List[str]]:
+        """Return the anchors of a markdown member that was read but not validated.
+
+        Args:
+            path: Resolved path of the member.
+
+        Returns:
+            Anchors, or None if the member was not read or is not UTF-8.
+        """
+        return self.anchors.get(path)
+
+    def _wanted(self, name: str, requested: Set[str]) -> bool:
+        """Check whether a member's content is needed.
+
+        Args:
+            name: Member name.
+            requested: Members still to be handed over.
+
+        Returns:
+            True for requested members, targets of requested links and
+            markdown members whose headings may be linked to.
+        """
+        return name in requested or name.endswith(".md") or name in self.index.links_to
+
+    def _stream(self, name: str, handle: IO[bytes], names: List[str]) -> Iterator[Tuple[Path, Optional[FileContent]]]:
+        """Hand over a large member in chunks, or read its headings.
+
+        Args:
+            name: Member name.
+            handle: Open member.
+            names: Requested names for the member; at most the member itself,
+                since links to large members are not validated.
+
+        Yields:
+            The member and its chunks if it was requested.
+        """
+        # Members are binary file objects; the archive modules only promise IO[bytes].
+        chunks = iter_stream_chunks(cast(BinaryIO, handle))
+        if names:
+            yield self.index.root_path / name, chunks
+        else:
+            self._remember_anchors(name, chunks)
+
+    def _remember_anchors(self, name: str, chunks: Iterable[Tuple[int, bytes]]) -> None:
+        """Compute the anchors of a markdown member that is not validated.
+
+        Args:
+            name: Member name.
+            chunks: The member's content in line-aligned chunks.
+        """
+        if not name.endswith(".md"):
+            return
+        try:
+            anchors = chunk_anchors(chunks)
+        except UnicodeDecodeError:
+            return
+        self.anchors[os.path.join(self.index.real_root, name)] = anchors
+
+
+def archive_checker(archive_path: Path, exclude: Sequence[str] = (), **options: Any) -> LinkChecker:
+    """Create a link checker for the markdown inside an archive.
+
+    The archive is listed once here; ``iter_results`` then reads it once
+    more, validating members as they are decompressed. Diagnostics name
+    members as paths under the archive and match those found in the
+    extracted tree.
+
+    Args:
+        archive_path: Archive to validate.
+        exclude: Extra ``.gitignore``-style patterns for members to leave out.
+        **options: Further ``LinkChecker`` arguments other than ``cache`` and
+            ``prefetcher``.
+
+    Returns:
+        Checker whose tree is already scanned.
+
+    Raises:
+        ArchiveError: If the archive cannot be listed.
+    """
+    profiler = options.get("profiler")
+    with phase(profiler, "walk"):
+        index = ArchiveIndex.from_archive(archive_path, exclude=exclude)
+    reader = ArchiveReader(index)
+    checker = LinkChecker(archive_path, exclude=exclude, prefetcher=reader, **options)
+    checker.path_index = index
+    checker.all_files = set(index.markdown_files())
+    checker.slug_index = SlugIndex(loader=reader.load_anchors)
+    logger.info("Found %s markdown files in %s", len(checker.all_files), archive_path.name)
+    return checker
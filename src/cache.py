@@ -0,0 +1,282 @@
+"""On-disk cache of markdown validation results."""
+
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+from src import __version__
+from src.diagnostics import Diagnostic
+from src.rules import RuleSet
+from src.utils import FileResult, file_digest
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR_NAME = ".ai-fundamentals-cache"
+CACHE_FILE_NAME = "validation.json"
+
+# Bump whenever the shape of cached entries or the built-in rules change.
+# Rule selection and options are covered by the rule set's fingerprint.
+CACHE_FORMAT = 6
+
+
+def ensure_cache_dir(cache_dir: Path) -> None:
+    """Create the cache directory and keep it out of version control.
+
+    Args:
+        cache_dir: Directory holding cache files.
+    """
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    ignore_file = cache_dir / ".gitignore"
+    if not ignore_file.exists():
+        ignore_file.write_text("# Created by ai-fundamentals\n*\n", encoding="utf-8")
+
+
+class ValidationCache:
+    """Stores per-file validation results between runs.
+
+    Entries are keyed by the file's path relative to the repository root and
+    are reused while the file's mtime and size match. If only the mtime moved,
+    the content digest decides. An entry is also discarded when any of the
+    relative link targets it depends on was created or deleted since.
+    Heading anchors and cross-file fragments are cached as well, so a warm
+    run can fill the slug index without reading any file. The whole cache is
+    discarded when the rules it was written with differ from the current ones.
+    """
+
+    def __init__(self, root_path: Path, cache_dir: Optional[Path] = None, rules: Optional[RuleSet] = None):
+        """Initialize cache and load any existing entries.
+
+        Args:
+            root_path: Root directory of the repository.
+            cache_dir: Directory holding cache files. Defaults to
+                ``.ai-fundamentals-cache`` under the root.
+            rules: Rules the cached results are computed with. Defaults to
+                the rules enabled by default.
+        """
+        self.root_path = Path(root_path)
+        self.rules_fingerprint = (rules if rules is not None else RuleSet.default()).fingerprint
+        self.cache_dir = Path(cache_dir) if cache_dir else self.root_path / CACHE_DIR_NAME
+        self.cache_file = self.cache_dir / CACHE_FILE_NAME
+        self._root_prefix = os.path.join(str(self.root_path), "")
+        self.hits = 0
+        self.misses = 0
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._dirty = False
+        self._load()
+
+    def _load(self) -> None:
+        """Read cache entries from disk, ignoring missing or stale files."""
+        try:
+            with open(self.cache_file, encoding="utf-8") as handle:
+                data = json.load(handle)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.warning("Ignoring unreadable cache %s: %s", self.cache_file, e)
+            return
+
+        if data.get("format") != CACHE_FORMAT or data.get("version") != __version__:
+            logger.debug("Discarding cache written by a different version")
+            return
+        if data.get("rules") != self.rules_fingerprint:
+            logger.debug("Discarding cache written with different rules")
+            return
+
+        self._entries = data.get("entries", {})
+
+    def lookup(
+        self, file_path: Path, stat: os.stat_result, exists: Callable[[str], bool] = os.path.exists
+    ) -> Optional[FileResult]:
+        """Return the cached result for a file if it is still valid.
+
+        Args:
+            file_path: File to look up.
+            stat: Current stat of the file.
+            exists: Checks whether a recorded link target exists.
+
+        Returns:
+            Cached result, or None if the file must be validated again.
+        """
+        entry = self._entries.get(self.encode(file_path))
+        if entry is None or entry["size"] != stat.st_size or not self._content_matches(file_path, stat, entry):
+            self.misses += 1
+            return None
+
+        if not self._dependencies_unchanged(entry["dependencies"], exists):
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        dependencies = {self.decode(target): exists for target, exists in entry["dependencies"].items()}
+        anchor_refs = [
+            (self.decode(target), fragment, url, line, column)
+            for target, fragment, url, line, column in entry["anchor_refs"]
+        ]
+        errors = [Diagnostic(file_path, rule, message, line, column) for line, column, rule, message in entry["errors"]]
+        external_links = [(url, line, column) for url, line, column in entry["external_links"]]
+        return FileResult(errors, dependencies, entry["digest"], list(entry["anchors"]), anchor_refs, external_links)
+
+    def links(self, file_path: Union[str, Path], stat: os.stat_result) -> Optional[Tuple[List[str], List[str]]]:
+        """Return the link targets recorded for a file whose content is unchanged.
+
+        Unlike ``lookup`` this does not check whether the targets still exist,
+        so it answers which paths a file links to even after some were deleted.
+
+        Args:
+            file_path: File to look up.
+            stat: Current stat of the file.
+
+        Returns:
+            Relative link targets and targets of links with a fragment, as
+            cache keys, or None if the file has no current entry.
+        """
+        entry = self._entries.get(self.encode(file_path))
+        if entry is None or entry["size"] != stat.st_size or not self._content_matches(file_path, stat, entry):
+            return None
+        return list(entry["dependencies"]), [ref[0] for ref in entry["anchor_refs"]]
+
+    def _content_matches(self, file_path: Union[str, Path], stat: os.stat_result, entry: Dict[str, Any]) -> bool:
+        """Check whether a file still has the content recorded in its entry.
+
+        Args:
+            file_path: File to check.
+            stat: Current stat of the file.
+            entry: Cache entry for the file.
+
+        Returns:
+            True if the content is unchanged.
+        """
+        if entry["mtime_ns"] == stat.st_mtime_ns:
+            return True
+
+        try:
+            digest = file_digest(file_path)
+        except OSError:
+            return False
+        if digest != entry["digest"]:
+            return False
+
+        # Touched but not edited: remember the new mtime to skip hashing next time.
+        entry["mtime_ns"] = stat.st_mtime_ns
+        self._dirty = True
+        return True
+
+    def _dependencies_unchanged(self, dependencies: Dict[str, bool], exists: Callable[[str], bool]) -> bool:
+        """Check that no link target was created or deleted.
+
+        Args:
+            dependencies: Encoded link targets mapped to their recorded existence.
+            exists: Checks whether a link target exists.
+
+        Returns:
+            True if every target still has its recorded existence.
+        """
+        return all(exists(self.decode(target)) == existed for target, existed in dependencies.items())
+
+    def store(self, file_path: Path, stat: os.stat_result, result: FileResult) -> None:
+        """Record a freshly computed result.
+
+        Args:
+            file_path: File the result belongs to.
+            stat: Stat of the file taken before it was validated.
+            result: Validation result to cache.
+        """
+        if result.digest is None:
+            return
+
+        self._entries[self.encode(file_path)] = {
+            "mtime_ns": stat.st_mtime_ns,
+            "size": stat.st_size,
+            "digest": result.digest,
+            "errors": [[error.line, error.column, error.rule, error.message] for error in result.errors],
+            "dependencies": {self.encode(target): exists for target, exists in result.dependencies.items()},
+            "anchors": result.anchors,
+            "anchor_refs": [
+                [self.encode(target), fragment, url, line, column]
+                for target, fragment, url, line, column in result.anchor_refs
+            ],
+            "external_links": result.external_links,
+        }
+        self._dirty = True
+
+    def digests(self) -> Dict[str, str]:
+        """Return the content digest recorded for each cached file.
+
+        Files moved or deleted since the last run are included until this
+        run prunes them, so where they went can be found by content.
+
+        Returns:
+            Digest per absolute path.
+        """
+        return {self.decode(key): entry["digest"] for key, entry in self._entries.items()}
+
+    def prune(self, files: Iterable[Path]) -> None:
+        """Drop entries for files that are no longer part of the repository.
+
+        Args:
+            files: Every file that is still present.
+        """
+        keep = {self.encode(file_path) for file_path in files}
+        stale = [key for key in self._entries if key not in keep]
+        for key in stale:
+            del self._entries[key]
+        self._dirty = self._dirty or bool(stale)
+
+    def save(self) -> None:
+        """Write entries to disk atomically if anything changed."""
+        if not self._dirty:
+            return
+
+        ensure_cache_dir(self.cache_dir)
+        data = {
+            "format": CACHE_FORMAT,
+            "version": __version__,
+            "rules": self.rules_fingerprint,
+            "entries": self._entries,
+        }
+        tmp_file = self.cache_file.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_file, "w", encoding="utf-8") as handle:
+            json.dump(data, handle, separators=(",", ":"))
+        os.replace(tmp_file, self.cache_file)
+        self._dirty = False
+        logger.debug("Saved %s cache entries to %s", len(self._entries), self.cache_file)
+
+    def clear(self) -> None:
+        """Delete every cached entry, on disk and in memory.
+
+        Other caches sharing the directory, such as external link results,
+        are kept.
+        """
+        self.cache_file.unlink(missing_ok=True)
+        self._entries = {}
+        self._dirty = False
+
+    def encode(self, path: Union[str, "os.PathLike[str]"]) -> str:
+        """Convert a path to its cache key.
+
+        Plain string operations are used because this runs for every file and
+        link target on every run.
+
+        Args:
+            path: Absolute path.
+
+        Returns:
+            POSIX path relative to the root, or the absolute path if outside it.
+        """
+        text = os.fspath(path)
+        if text.startswith(self._root_prefix):
+            return text[len(self._root_prefix) :].replace(os.sep, "/")
+        return text
+
+    def decode(self, key: str) -> str:
+        """Convert a cache key back to an absolute path.
+
+        Args:
+            key: Cache key produced by ``encode``.
+
+        Returns:
+            Absolute path.
+        """
+        return key if os.path.isabs(key) else os.path.join(self._root_prefix, key)
@@ -0,0 +1,216 @@
+"""Selection of the markdown files affected by a git diff."""
+
+import logging
+import os
+import subprocess
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set
+from urllib.parse import quote
+
+from src.cache import ValidationCache
+from src.streaming import read_chunks
+from src.walker import Walker
+
+logger = logging.getLogger(__name__)
+
+
+class GitError(Exception):
+    """Raised when git cannot report the changed paths."""
+
+
+class ChangeSet(NamedTuple):
+    """Paths touched by a diff, as absolute paths under the root."""
+
+    modified: List[Path]
+    deleted: List[Path]
+
+
+def run_git(root_path: Path, *args: str) -> str:
+    """Run a git command in a directory.
+
+    Args:
+        root_path: Directory to run git in.
+        *args: Arguments after ``git``.
+
+    Returns:
+        Standard output of the command.
+
+    Raises:
+        GitError: If git is not installed or the command fails.
+    """
+    try:
+        completed = subprocess.run(
+            ["git", *args], cwd=root_path, capture_output=True, text=True, encoding="utf-8", check=False
+        )
+    except OSError as e:
+        raise GitError(f"Cannot run git: {e}") from e
+    if completed.returncode != 0:
+        raise GitError(completed.stderr.strip() or f"git {args[0]} exited with status {completed.returncode}")
+    return completed.stdout
+
+
+def git_changes(root_path: Path, since: Optional[str] = None, staged: bool = False) -> ChangeSet:
+    """Ask git which paths under a directory a change touches.
+
+    Renames are reported as a deletion plus an addition, so links to the old
+    name are found like links to any deleted path.
+
+    Args:
+        root_path: Directory to report on; paths outside it are left out.
+        since: Compare the working tree, including untracked files, with the
+            merge base of this ref and ``HEAD``.
+        staged: Compare the index with ``HEAD`` instead.
+
+    Returns:
+        Added or modified paths and deleted paths.
+
+    Raises:
+        GitError: If git fails, e.g. because the ref does not exist.
+    """
+    root_path = Path(root_path)
+    if staged:
+        output = run_git(root_path, "diff", "--cached", "--name-status", "--no-renames", "--relative", "-z")
+        untracked = ""
+    else:
+        base = run_git(root_path, "merge-base", since or "HEAD", "HEAD").strip()
+        output = run_git(root_path, "diff", base, "--name-status", "--no-renames", "--relative", "-z")
+        untracked = run_git(root_path, "ls-files", "--others", "--exclude-standard", "-z")
+
+    modified: List[Path] = [root_path / name for name in untracked.split("\0") if name]
+    deleted: List[Path] = []
+    fields = output.split("\0")
+    for status, name in zip(fields[::2], fields[1::2]):
+        (deleted if status == "D" else modified).append(root_path / name)
+    return ChangeSet(sorted(modified), sorted(deleted))
+
+
+class ReverseLinkIndex:
+    """Finds the files that link to given paths without validating the tree.
+
+    Link targets are taken from the validation cache for files whose content
+    matches their entry. Files without a current entry are only read and
+    searched for the target's file name, which over-approximates their links
+    but costs far less than parsing them.
+    """
+
+    def __init__(self, cache: Optional[ValidationCache] = None):
+        """Initialize empty index.
+
+        Args:
+            cache: Validation cache holding the link targets of earlier runs.
+        """
+        self.cache = cache
+        # Keyed by cache key, so recorded targets never need decoding.
+        self.linked: Dict[str, Set[str]] = {}
+        self.anchor_linked: Dict[str, Set[str]] = {}
+        self.unindexed: List[str] = []
+
+    def build(self, files: Iterable[str]) -> "ReverseLinkIndex":
+        """Record the link targets of markdown files.
+
+        Plain string paths are used because this runs for every file in the
+        tree.
+
+        Args:
+            files: Absolute paths of the markdown files to index.
+
+        Returns:
+            The index itself.
+        """
+        for file_path in files:
+            links = None
+            if self.cache is not None:
+                try:
+                    links = self.cache.links(file_path, os.stat(file_path))
+                except OSError:
+                    continue
+            if links is None:
+                self.unindexed.append(file_path)
+                continue
+            targets, anchor_targets = links
+            for target in targets:
+                self.linked.setdefault(target, set()).add(file_path)
+            for target in anchor_targets:
+                self.anchor_linked.setdefault(target, set()).add(file_path)
+        return self
+
+    def dependents(self, targets: Iterable[str], anchor_targets: Iterable[str] = ()) -> Set[str]:
+        """Find files that may link to paths or to their anchors.
+
+        Args:
+            targets: Resolved paths whose existence changed.
+            anchor_targets: Resolved markdown files whose anchors may have
+                changed.
+
+        Returns:
+            Files with a link to one of the targets.
+        """
+        targets = set(targets)
+        anchor_targets = set(anchor_targets)
+        found: Set[str] = set()
+        if self.cache is not None:
+            for target in targets:
+                found.update(self.linked.get(self.cache.encode(target), ()))
+            for target in anchor_targets:
+                found.update(self.anchor_linked.get(self.cache.encode(target), ()))
+
+        needles = set()
+        for target in targets | anchor_targets:
+            name = os.path.basename(target)
+            needles.update({name.encode("utf-8"), quote(name).encode("utf-8")})
+        if needles:
+            found.update(file_path for file_path in self.unindexed if _mentions(file_path, needles))
+        return found
+
+
+def _mentions(file_path: str, needles: Set[bytes]) -> bool:
+    """Check whether a file contains any of several byte strings.
+
+    Args:
+        file_path: File to search.
+        needles: Byte strings to look for.
+
+    Returns:
+        True if the file contains one of them; False if it cannot be read.
+    """
+    try:
+        # Needles never contain a newline, so none can straddle two chunks.
+        return any(needle in data for _, data in read_chunks(file_path) for needle in needles)
+    except OSError:
+        return False
+
+
+def affected_files(
+    root_path: Path, changes: ChangeSet, walker: Optional[Walker] = None, cache: Optional[ValidationCache] = None
+) -> List[Path]:
+    """Select the markdown files whose results a change can affect.
+
+    These are the changed markdown files themselves, files linking to a
+    deleted path or to a directory that disappeared with it, and files
+    linking to anchors in a changed markdown file.
+
+    Args:
+        root_path: Root directory of the repository.
+        changes: Paths touched by the change.
+        walker: Walker deciding which markdown files are in scope.
+        cache: Validation cache used to look up existing links.
+
+    Returns:
+        Markdown files to validate, sorted.
+    """
+    walker = walker or Walker(root_path)
+    markdown = {os.path.join(root_path, rel_path) for rel_path in walker.walk().markdown}
+    selected = {str(file_path) for file_path in changes.modified if str(file_path) in markdown}
+
+    targets: Set[str] = set()
+    for path in changes.deleted:
+        while path != root_path and not path.exists():
+            targets.add(os.path.realpath(path))
+            path = path.parent
+    anchor_targets = {os.path.realpath(file_path) for file_path in selected}
+
+    if targets or anchor_targets:
+        index = ReverseLinkIndex(cache).build(markdown - selected)
+        selected |= index.dependents(targets, anchor_targets)
+    logger.info("%s of %s markdown files affected by the change", len(selected), len(markdown))
+    return sorted(Path(file_path) for file_path in selected)
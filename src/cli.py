@@ -2,91 +2,1650 @@
 
 import argparse
 import logging
+import os
 import sys
+import time
 from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List, Optional, Tuple
 
-from src.utils import LinkChecker, MarkdownValidator
+# Each command imports what it needs when it runs, so that starting any one
+# of them does not pay for the modules of the others.
+if TYPE_CHECKING:
+    from src.cache import ValidationCache
+    from src.diagnostics import Diagnostic
+    from src.external import ExternalLinkChecker
+    from src.prefetch import Prefetcher
+    from src.profiling import Profiler
+    from src.rules import RuleSet
+    from src.shards import ShardResult
+    from src.utils import LinkChecker
 
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    datefmt="%Y-%m-%d %H:%M:%S",
-)
+logger = logging.getLogger(__name__)
+
+
+def validate_command(args: argparse.Namespace) -> int:
+    """Run validation on markdown files, profiling the run if requested.
+
+    Args:
+        args: Command-line arguments.
+
+    Returns:
+        Exit code (0 for success, 1 for errors found).
+    """
+    try:
+        paths = input_paths(args)
+    except OSError as e:
+        logger.error("Cannot read the list of paths: %s", e)
+        return 1
+    root_path = common_root(paths)
+
+    if getattr(args, "list_rules", False):
+        try:
+            rules = load_rules(args, root_path)
+        except ValueError as e:
+            logger.error("%s", e)
+            return 1
+        print(format_rules(rules))
+        return 0
+
+    profile_json = getattr(args, "profile_json", None)
+    if not getattr(args, "profile", False) and not profile_json:
+        return run_validation(args, paths=paths)
+
+    from src.profiling import Profiler
+
+    jobs = getattr(args, "jobs", None) or 1
+    if jobs > 1:
+        # Instrumented validators cannot be sent to worker processes.
+        logger.warning("--profile validates files in this process; ignoring --jobs %s", jobs)
+    profiler = Profiler()
+    with profiler.phase("total"):
+        exit_code = run_validation(args, profiler, paths)
+    print(profiler.format_table(root_path=root_path), file=sys.stderr)
+    if profile_json:
+        profiler.write_json(profile_json)
+        logger.info("Wrote profile to %s", profile_json)
+    return exit_code
+
+
+def run_validation(
+    args: argparse.Namespace, profiler: Optional["Profiler"] = None, paths: Optional[List[str]] = None
+) -> int:
+    """Validate a markdown file, a directory tree or a batch of paths.
+
+    Args:
+        args: Command-line arguments.
+        profiler: Optional profiler recording where the time goes.
+        paths: Paths to validate. Defaults to those named by ``args``.
+
+    Returns:
+        Exit code (0 for success, 1 for errors found).
+    """
+    if paths is None:
+        paths = input_paths(args)
+    if len(paths) != 1 or getattr(args, "files_from", None) is not None:
+        return validate_paths(paths, args, profiler)
+
+    root_path = Path(paths[0]).resolve()
+    if not root_path.exists():
+        logger.error("Path does not exist: %s", root_path)
+        return 1
+
+    conflict = option_conflict(args, root_path)
+    if conflict:
+        logger.error("%s", conflict)
+        return 1
+
+    try:
+        rules = load_rules(args, root_path)
+    except ValueError as e:
+        logger.error("%s", e)
+        return 1
+
+    if root_path.is_file():
+        return validate_file(root_path, args, profiler, rules)
+    return validate_directory(root_path, args, profiler, rules)
+
+
+def option_conflict(args: argparse.Namespace, root_path: Path) -> Optional[str]:
+    """Check that the options given can be used together on a path.
+
+    Args:
+        args: Command-line arguments.
+        root_path: Existing file or directory to validate.
+
+    Returns:
+        Message explaining why the options cannot be used, or None if they can.
+    """
+    is_file = root_path.is_file()
+    text = getattr(args, "format", "text") == "text"
+    watch, since, staged, shard, fix = (
+        getattr(args, name, None) for name in ("watch", "since", "staged", "shard", "fix")
+    )
+
+    if watch and (is_file or not text):
+        return "--watch requires a directory and text output"
+    if (since or staged) and (is_file or watch):
+        return "--since and --staged require a directory and cannot be combined with --watch"
+    if shard and (is_file or watch or since or staged):
+        return "--shard requires a directory and cannot be combined with --since, --staged or --watch"
+    if fix and (is_file or not text or watch or shard):
+        return "--fix requires a directory and text output and cannot be combined with --watch or --shard"
+    if getattr(args, "dry_run", False) and not fix:
+        return "--dry-run requires --fix"
+    return None
+
+
+def validate_file(
+    file_path: Path,
+    args: argparse.Namespace,
+    profiler: Optional["Profiler"] = None,
+    rules: Optional["RuleSet"] = None,
+) -> int:
+    """Validate one markdown file, or the markdown files inside an archive.
+
+    Args:
+        file_path: Markdown file or tar or zip archive to validate.
+        args: Command-line arguments.
+        profiler: Optional profiler recording where the time goes.
+        rules: Rules to run. Defaults to the rules enabled by default.
+
+    Returns:
+        Exit code (0 for success, 1 for errors found).
+    """
+    if file_path.suffix != ".md":
+        # Archive support imports tarfile and zipfile, which plain markdown files do without.
+        from src.archive import is_archive
+
+        if is_archive(file_path):
+            return validate_archive(file_path, args, profiler, rules)
+
+    errors = diagnose_single_file(file_path, args, profiler, rules)
+    output_format = getattr(args, "format", "text")
+    if output_format != "text":
+        return stream_diagnostics(errors, output_format, file_path.parent, profiler)
+
+    if errors:
+        logger.error("Found %s error(s):", len(errors))
+        for error in errors:
+            print(f"  {error}")
+        return 1
+
+    logger.info("Validation passed")
+    return 0
+
+
+def validate_paths(paths: List[str], args: argparse.Namespace, profiler: Optional["Profiler"] = None) -> int:
+    """Validate a batch of files and directories in one run.
+
+    Every file shares one validator, so the headings of a link target are
+    read once however many of the files link to it. Paths that are not
+    markdown files are skipped, which lets callers pass every changed file.
+
+    Args:
+        paths: Files and directories to validate.
+        args: Command-line arguments.
+        profiler: Optional profiler recording where the time goes.
+
+    Returns:
+        Exit code (0 for success, 1 for errors found).
+    """
+    if any(getattr(args, name, None) for name in ("watch", "since", "staged", "shard", "fix")):
+        logger.error("--watch, --since, --staged, --shard and --fix require a single directory")
+        return 1
+
+    missing = [path for path in paths if not os.path.exists(path)]
+    if missing:
+        for path in missing:
+            logger.error("Path does not exist: %s", Path(path).resolve())
+        return 1
+
+    files = markdown_files(paths, args)
+    if not files:
+        logger.info("No markdown files to validate")
+        return 0
+
+    root_path = common_root([str(file_path) for file_path in files])
+    try:
+        rules = load_rules(args, root_path)
+    except ValueError as e:
+        logger.error("%s", e)
+        return 1
+
+    diagnostics = diagnose_files(files, root_path, args, profiler, rules)
+    output_format = getattr(args, "format", "text")
+    if output_format != "text":
+        return stream_diagnostics(diagnostics, output_format, root_path, profiler)
+    return 1 if report_results(diagnostics, root_path, profiler) else 0
+
+
+def input_paths(args: argparse.Namespace) -> List[str]:
+    """Collect the paths named on the command line and by ``--files-from``.
+
+    Args:
+        args: Command-line arguments.
+
+    Returns:
+        Paths in the order given; the current directory if none were given.
+
+    Raises:
+        OSError: If the ``--files-from`` list cannot be read.
+    """
+    paths = list(getattr(args, "paths", None) or ())
+    files_from = getattr(args, "files_from", None)
+    if files_from is not None:
+        paths.extend(read_path_list(files_from))
+    elif not paths:
+        paths.append(getattr(args, "path", "."))
+    return paths
+
+
+def read_path_list(source: str) -> List[str]:
+    """Read a list of paths, one per line or NUL-separated.
+
+    Args:
+        source: File to read, or ``-`` for standard input.
+
+    Returns:
+        Non-empty paths. NUL separators are used if the input contains any,
+        so paths from ``git diff -z`` may contain newlines.
+
+    Raises:
+        OSError: If the file cannot be read.
+    """
+    if source == "-":
+        data = sys.stdin.buffer.read()
+    else:
+        with open(source, "rb") as handle:
+            data = handle.read()
+    entries = data.split(b"\0") if b"\0" in data else data.splitlines()
+    return [os.fsdecode(entry) for entry in entries if entry]
+
+
+def markdown_files(paths: Iterable[str], args: argparse.Namespace) -> List[Path]:
+    """Expand files and directories into the markdown files to validate.
+
+    Args:
+        paths: Existing files and directories.
+        args: Command-line arguments; ``--exclude`` applies inside directories.
+
+    Returns:
+        Resolved markdown files without duplicates, in the order given.
+    """
+    from src.path_index import PathIndex
+    from src.walker import Walker
+
+    files: Dict[Path, None] = {}
+    for path in map(Path, paths):
+        path = path.resolve()
+        if path.is_dir():
+            walker = Walker(path, exclude=getattr(args, "exclude", None) or (), jobs=getattr(args, "jobs", None) or 1)
+            files.update(dict.fromkeys(PathIndex.build(path, walker).markdown_files()))
+        elif path.suffix == ".md":
+            files[path] = None
+    return list(files)
+
+
+def common_root(paths: Iterable[str]) -> Path:
+    """Find the directory that a set of paths is reported relative to.
+
+    Args:
+        paths: Files and directories.
+
+    Returns:
+        Deepest directory containing every path, or the current directory if
+        there are none.
+    """
+    absolute = [os.path.abspath(path) for path in paths]
+    if not absolute:
+        return Path.cwd()
+    root = Path(os.path.commonpath(absolute))
+    return root.parent if root.is_file() else root
+
+
+def load_rules(args: argparse.Namespace, start: Path) -> "RuleSet":
+    """Build the rule set from ``pyproject.toml`` and the command line.
+
+    Args:
+        args: Command-line arguments.
+        start: File or directory whose nearest ``pyproject.toml`` applies.
+
+    Returns:
+        Compiled rule set.
+
+    Raises:
+        ValueError: If the configuration is invalid or names an unknown rule.
+    """
+    from src.rules import load_config, rules_from_config
+
+    config = load_config(start)
+    enable = getattr(args, "enable", None) or ()
+    disable = getattr(args, "disable", None) or ()
+    return rules_from_config(config, enable=enable, disable=disable)
+
+
+def format_rules(rules: "RuleSet") -> str:
+    """List every registered rule and whether it is enabled.
+
+    Args:
+        rules: Rule set that would be used.
+
+    Returns:
+        One line per rule followed by its diagnostic ids.
+    """
+    from src.rules import REGISTRY
+
+    enabled = {code for rule in rules.rules for code in rule.enabled_codes}
+    lines = []
+    for name, rule_class in REGISTRY.items():
+        state = "on" if enabled.intersection(rule_class.codes) else "off"
+        lines.append(f"{name:<20}{state:<5}{rule_class.__doc__ or ''}")
+        for code, description in rule_class.codes.items():
+            lines.append(f"  {code:<18}{'on' if code in enabled else 'off':<5}{description}")
+    return "\n".join(lines)
+
+
+def validate_directory(
+    root_path: Path,
+    args: argparse.Namespace,
+    profiler: Optional["Profiler"] = None,
+    rules: Optional["RuleSet"] = None,
+) -> int:
+    """Validate the markdown files in a directory tree.
+
+    Args:
+        root_path: Directory to validate.
+        args: Command-line arguments.
+        profiler: Optional profiler recording where the time goes.
+        rules: Rules to run. Defaults to the rules enabled by default.
+
+    Returns:
+        Exit code (0 for success, 1 for errors found).
+    """
+    from src.changes import GitError
+
+    checker = make_link_checker(root_path, args, profiler, rules)
+    jobs = getattr(args, "jobs", None) or 1
+    shard = None
+    try:
+        selection = select_changed_files(root_path, args, checker.cache)
+        if getattr(args, "shard", None):
+            shard, selection = plan_shard(checker, args, jobs)
+    except GitError as e:
+        logger.error("Cannot determine changed files: %s", e)
+        return 1
+    except (OSError, ValueError) as e:
+        logger.error("Cannot read shard timings: %s", e)
+        return 1
+
+    if getattr(args, "fix", False):
+        return fix_directory(checker, args, jobs, selection)
+
+    diagnostics = checker.iter_results(jobs=jobs, selection=selection)
+    if shard is None:
+        return report_directory(checker, diagnostics, args)
+
+    exit_code = report_directory(checker, shard.collect(diagnostics), args)
+    write_shard(shard, checker, args)
+    return exit_code
+
+
+def make_link_checker(
+    root_path: Path,
+    args: argparse.Namespace,
+    profiler: Optional["Profiler"] = None,
+    rules: Optional["RuleSet"] = None,
+) -> "LinkChecker":
+    """Create the checker for a directory tree with the cache and readers requested on the command line.
+
+    Args:
+        root_path: Directory to validate.
+        args: Command-line arguments.
+        profiler: Optional profiler recording where the time goes.
+        rules: Rules to run. Defaults to the rules enabled by default.
+
+    Returns:
+        Link checker for the tree.
+    """
+    from src.cache import ValidationCache
+    from src.utils import LinkChecker
+
+    cache: Optional[ValidationCache] = None
+    if not getattr(args, "no_cache", False):
+        cache = ValidationCache(root_path, rules=rules)
+        if getattr(args, "clear_cache", False):
+            cache.clear()
+            logger.info("Cleared validation cache %s", cache.cache_file)
+
+    return LinkChecker(
+        root_path,
+        cache=cache,
+        external_checker=make_external_checker(args, cache),
+        exclude=getattr(args, "exclude", None) or (),
+        profiler=profiler,
+        rules=rules,
+        prefetcher=make_prefetcher(args),
+    )
+
+
+def report_directory(checker: "LinkChecker", diagnostics: Iterable["Diagnostic"], args: argparse.Namespace) -> int:
+    """Report the diagnostics of a tree in the requested format, then watch it if requested.
+
+    Args:
+        checker: Link checker producing the diagnostics.
+        diagnostics: Diagnostics, possibly still being computed.
+        args: Command-line arguments.
+
+    Returns:
+        Exit code (0 for success, 1 for errors found).
+    """
+    output_format = getattr(args, "format", "text")
+    if output_format != "text":
+        return stream_diagnostics(diagnostics, output_format, checker.root_path, checker.profiler)
+    results = report_results(diagnostics, checker.root_path, checker.profiler)
+    if getattr(args, "watch", False):
+        return watch_command(checker, checker.root_path)
+    return 1 if results else 0
+
+
+def validate_archive(
+    archive_path: Path,
+    args: argparse.Namespace,
+    profiler: Optional["Profiler"] = None,
+    rules: Optional["RuleSet"] = None,
+) -> int:
+    """Validate the markdown files inside a tar or zip archive without extracting it.
+
+    Diagnostics name members as paths under the archive, so they are shown
+    relative to it as if it were the extracted directory.
+
+    Args:
+        archive_path: Archive to validate.
+        args: Command-line arguments.
+        profiler: Optional profiler recording where the time goes.
+        rules: Rules to run. Defaults to the rules enabled by default.
+
+    Returns:
+        Exit code (0 for success, 1 for errors found or an unreadable archive).
+    """
+    from src.archive import ArchiveError, archive_checker
+
+    output_format = getattr(args, "format", "text")
+    try:
+        checker = archive_checker(
+            archive_path,
+            exclude=getattr(args, "exclude", None) or (),
+            external_checker=make_external_checker(args, None),
+            profiler=profiler,
+            rules=rules,
+        )
+        diagnostics = checker.iter_results()
+        if output_format != "text":
+            return stream_diagnostics(diagnostics, output_format, archive_path, profiler)
+        return 1 if report_results(diagnostics, archive_path, profiler) else 0
+    except ArchiveError as e:
+        logger.error("%s", e)
+        return 1
+
+
+def fix_directory(
+    checker: "LinkChecker", args: argparse.Namespace, jobs: int, selection: Optional[List[Path]] = None
+) -> int:
+    """Validate a tree once, fix what can be fixed and report what is left.
+
+    Broken links are pointed at the unique file with the same content, as
+    last recorded in the cache, or the same name; skipped heading levels
+    are renumbered and unclosed fences closed. With ``--dry-run`` the fixes
+    are printed as a unified diff instead of written, and every diagnostic
+    is reported as a plain validation would.
+
+    Args:
+        checker: Checker for the tree.
+        args: Command-line arguments.
+        jobs: Number of worker processes validating and threads writing.
+        selection: Validate and fix only these files.
+
+    Returns:
+        Exit code (0 if nothing is left to fix, 1 otherwise).
+    """
+    from src.fixes import FileLocator, Fixer
+    from src.path_index import PathIndex
+    from src.profiling import phase
+    from src.walker import Walker
+
+    root_path = checker.root_path
+    dry_run = getattr(args, "dry_run", False)
+    # Read before the run prunes the entries of files that moved away.
+    previous = checker.cache.digests() if checker.cache is not None else {}
+    results: Dict[Path, List["Diagnostic"]] = {}
+    for diagnostic in checker.iter_results(jobs=jobs, selection=selection):
+        results.setdefault(diagnostic.path, []).append(diagnostic)
+
+    index = checker.path_index
+    if index is None:
+        index = PathIndex.build(root_path, Walker(root_path, exclude=checker.exclude, jobs=jobs))
+    fixer = Fixer(root_path, FileLocator.from_index(index, checker.outcomes, previous), dry_run=dry_run, jobs=jobs)
+    with phase(checker.profiler, "fix"):
+        fixes = fixer.fix(results, checker.outcomes)
+
+    for fix in fixes:
+        sys.stdout.write(fix.diff)
+        if not dry_run:
+            fixed = set(map(id, fix.fixed))
+            results[fix.path] = [diagnostic for diagnostic in results[fix.path] if id(diagnostic) not in fixed]
+    total = sum(len(fix.fixed) for fix in fixes)
+    logger.info("%s %s error(s) in %s file(s)", "Would fix" if dry_run else "Fixed", total, len(fixes))
+
+    remaining = {file_path: errors for file_path, errors in results.items() if errors}
+    return 1 if report_results((error for errors in remaining.values() for error in errors), root_path) else 0
+
+
+def plan_shard(checker: "LinkChecker", args: argparse.Namespace, jobs: int) -> Tuple["ShardResult", List[Path]]:
+    """Scan the whole tree and pick the files of the shard ``--shard`` names.
+
+    Every path is indexed, not just the shard's files, so links into files
+    of other shards are still resolved and their anchors read on demand.
+
+    Args:
+        checker: Link checker for the tree.
+        args: Command-line arguments.
+        jobs: Number of threads walking the tree.
+
+    Returns:
+        The empty result of the shard and the files it validates.
+
+    Raises:
+        ValueError: If a ``--shard-timings`` file is not a shard result.
+        OSError: If a ``--shard-timings`` file cannot be read.
+    """
+    from src.shards import ShardPlan, ShardResult, load_timings
+
+    index, count = args.shard
+    timings = load_timings(args.shard_timings or ())
+    checker.scan_repository(jobs)
+    plan = ShardPlan(checker.root_path, checker.all_files, count, timings)
+    files = plan.files(index)
+    logger.info("Shard %s of %s: %s of %s files", index, count, len(files), len(checker.all_files))
+    return ShardResult(index, count, checker.rules.fingerprint, plan.digest), files
+
+
+def write_shard(shard: "ShardResult", checker: "LinkChecker", args: argparse.Namespace) -> None:
+    """Write the result of a shard for ``merge``.
+
+    Args:
+        shard: Result holding the shard's diagnostics.
+        checker: Link checker that validated the shard.
+        args: Command-line arguments.
+    """
+    from src.shards import DEFAULT_OUTPUT, relative_name
+
+    output = args.shard_output or DEFAULT_OUTPUT.format(index=shard.index, count=shard.count)
+    shard.timings = {
+        relative_name(file_path, checker.root_path): seconds for file_path, seconds in checker.timings.items()
+    }
+    shard.write(Path(output), checker.root_path)
+    logger.info("Wrote shard result to %s", output)
+
+
+def select_changed_files(
+    root_path: Path, args: argparse.Namespace, cache: Optional["ValidationCache"]
+) -> Optional[List[Path]]:
+    """Find the files that ``--since`` or ``--staged`` limit validation to.
+
+    Args:
+        root_path: Directory being validated.
+        args: Command-line arguments.
+        cache: Validation cache used to look up which files link where.
+
+    Returns:
+        Markdown files affected by the change, or None to validate everything.
+
+    Raises:
+        GitError: If git cannot report the changed paths.
+    """
+    since = getattr(args, "since", None)
+    staged = getattr(args, "staged", False)
+    if since is None and not staged:
+        return None
+    from src.changes import affected_files, git_changes
+    from src.walker import Walker
+
+    changes = git_changes(root_path, since=since, staged=staged)
+    walker = Walker(root_path, exclude=getattr(args, "exclude", None) or (), jobs=getattr(args, "jobs", None) or 1)
+    return affected_files(root_path, changes, walker, cache)
+
+
+def diagnose_single_file(
+    file_path: Path,
+    args: argparse.Namespace,
+    profiler: Optional["Profiler"] = None,
+    rules: Optional["RuleSet"] = None,
+) -> List["Diagnostic"]:
+    """Validate one file, including its external links if requested.
+
+    Args:
+        file_path: Markdown file to validate.
+        args: Command-line arguments.
+        profiler: Optional profiler recording where the time goes.
+        rules: Rules to run. Defaults to the rules enabled by default.
+
+    Returns:
+        Diagnostics for the file.
+    """
+    return list(diagnose_files([file_path], file_path.parent, args, profiler, rules))
+
+
+def diagnose_files(
+    files: List[Path],
+    root_path: Path,
+    args: argparse.Namespace,
+    profiler: Optional["Profiler"] = None,
+    rules: Optional["RuleSet"] = None,
+) -> Iterator["Diagnostic"]:
+    """Validate files without indexing a whole tree, including external links if requested.
+
+    Args:
+        files: Markdown files to validate.
+        root_path: Directory containing the files.
+        args: Command-line arguments.
+        profiler: Optional profiler recording where the time goes.
+        rules: Rules to run. Defaults to the rules enabled by default.
+
+    Yields:
+        Diagnostics of each file in turn, then those of external links,
+        which are checked together once every file has been read.
+    """
+    from src.external import external_link_errors
+    from src.utils import MarkdownValidator
+
+    validator = MarkdownValidator(root_path, profiler=profiler, rules=rules)
+    external_checker = make_external_checker(args, None)
+    external_links = []
+    for file_path in files:
+        result = validator.check_file(file_path)
+        yield from result.errors
+        yield from validator.check_anchor_refs(file_path, result.anchor_refs)
+        if external_checker is not None and result.external_links:
+            external_links.append((file_path, result.external_links))
+
+    if external_checker is not None and external_links:
+        statuses = external_checker.check(url for _, links in external_links for url, _, _ in links)
+        for file_path, links in external_links:
+            yield from external_link_errors(file_path, links, statuses)
+
+
+def stream_diagnostics(
+    diagnostics: Iterable["Diagnostic"], output_format: str, root_path: Path, profiler: Optional["Profiler"] = None
+) -> int:
+    """Write diagnostics to standard output as they are produced.
+
+    Args:
+        diagnostics: Diagnostics, possibly still being computed.
+        output_format: Key of ``WRITERS``.
+        root_path: Directory that paths are written relative to.
+        profiler: Optional profiler; only time spent writing counts as output.
+
+    Returns:
+        Exit code (0 if there were no diagnostics, 1 otherwise).
+    """
+    from src.reporters import WRITERS
+
+    writer = WRITERS[output_format](sys.stdout, root_path)
+    write = profiler.timed("output", writer.write) if profiler is not None else writer.write
+    writer.start()
+    for diagnostic in diagnostics:
+        write(diagnostic)
+    writer.finish()
+
+    if writer.count:
+        logger.error("Found %s error(s)", writer.count)
+        return 1
+    logger.info("All validations passed")
+    return 0
+
+
+def report_results(
+    diagnostics: Iterable["Diagnostic"], root_path: Path, profiler: Optional["Profiler"] = None
+) -> Dict[Path, List["Diagnostic"]]:
+    """Collect diagnostics, then log a summary and print them grouped by file.
+
+    Args:
+        diagnostics: Diagnostics, possibly still being computed.
+        root_path: Directory that file names are shown relative to.
+        profiler: Optional profiler; only time spent printing counts as output.
+
+    Returns:
+        Diagnostics per file with errors.
+    """
+    from src.profiling import phase
+
+    results: Dict[Path, List["Diagnostic"]] = {}
+    for diagnostic in diagnostics:
+        results.setdefault(diagnostic.path, []).append(diagnostic)
+
+    if results:
+        total_errors = sum(len(errors) for errors in results.values())
+        logger.error("Found %s error(s) in %s file(s):", total_errors, len(results))
+        with phase(profiler, "output"):
+            print_results(results, root_path)
+    else:
+        logger.info("All validations passed")
+    return results
+
+
+def print_results(results: Dict[Path, List["Diagnostic"]], root_path: Path) -> None:
+    """Print diagnostics grouped by file.
+
+    Args:
+        results: Diagnostics per file. Files with an empty list are reported
+            as passing.
+        root_path: Directory that file names are shown relative to.
+    """
+    for file_path, errors in sorted(results.items()):
+        print(f"\n{file_path.relative_to(root_path)}:")
+        for error in errors:
+            print(f"  {error}")
+        if not errors:
+            print("  OK")
+
+
+def watch_command(checker: "LinkChecker", root_path: Path) -> int:
+    """Revalidate changed files until interrupted.
+
+    Args:
+        checker: Link checker that has already checked the whole tree.
+        root_path: Root directory being watched.
+
+    Returns:
+        Exit code for the state of the tree when watching stopped.
+    """
+    from src.watch import create_watcher, watch
+
+    def report(changes: Dict[Path, List["Diagnostic"]], elapsed: float) -> None:
+        print_results(changes, root_path)
+        total_errors = sum(len(errors) for errors in checker.results.values())
+        logger.info(
+            "Rechecked in %.1f ms: %s error(s) in %s file(s)", elapsed * 1000, total_errors, len(checker.results)
+        )
+
+    watcher = create_watcher(root_path)
+    logger.info("Watching %s for changes (Ctrl+C to stop)", root_path)
+    try:
+        watch(checker, watcher, report)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
+        if checker.cache is not None:
+            checker.cache.save()
+
+    return 1 if checker.results else 0
+
+
+def serve_command(args: argparse.Namespace) -> int:
+    """Run the language server on standard input and output.
+
+    Args:
+        args: Command-line arguments.
+
+    Returns:
+        Exit code (0 if the client shut the server down cleanly).
+    """
+    from src.cache import ValidationCache
+    from src.server import Connection, LanguageServer
+    from src.utils import LinkChecker
+
+    def make_checker(root_path: Path) -> "LinkChecker":
+        rules = load_rules(args, root_path)
+        cache = None if args.no_cache else ValidationCache(root_path, rules=rules)
+        return LinkChecker(root_path, cache=cache, exclude=args.exclude or (), rules=rules)
+
+    logger.info("Serving diagnostics on stdio")
+    connection = Connection(sys.stdin.buffer, sys.stdout.buffer)
+    return LanguageServer(connection, Path(args.path).resolve(), make_checker).serve()
+
+
+def graph_command(args: argparse.Namespace) -> int:
+    """Build the link graph of a directory tree and report on its structure.
+
+    Args:
+        args: Command-line arguments.
 
-logger = logging.getLogger(__name__)
+    Returns:
+        Exit code (0 unless the graph could not be built).
+    """
+    from src.cache import ValidationCache
+    from src.graph import INDEX_FILE_NAME, GraphReport, LinkGraph
+    from src.rules import load_config, rules_from_config
+    from src.utils import LinkChecker
 
+    root_path = Path(args.path).resolve()
+    if not root_path.is_dir():
+        logger.error("Not a directory: %s", root_path)
+        return 1
+    try:
+        config = load_config(root_path)
+        # The graph is made of the link targets the links rule records.
+        rules = rules_from_config(config, enable=["links"])
+    except ValueError as e:
+        logger.error("%s", e)
+        return 1
 
-def validate_command(args: argparse.Namespace) -> int:
-    """Run validation on markdown files.
+    cache = None if args.no_cache else ValidationCache(root_path, rules=rules)
+    checker = LinkChecker(root_path, cache=cache, exclude=args.exclude or (), rules=rules)
+    checker.check_all_links(jobs=args.jobs)
+    graph = LinkGraph.build(checker)
+
+    configured = config.get("graph", {}).get("roots", [INDEX_FILE_NAME])
+    root_files = [Path(path) for path in args.root] if args.root else [root_path / path for path in configured]
+    roots = []
+    for file_path in root_files:
+        node = graph.node(file_path)
+        if node is None:
+            logger.warning("Root is not a markdown file in the tree: %s", file_path)
+        else:
+            roots.append(node)
+
+    report = GraphReport(graph, roots, top=args.top)
+    {"text": report.write_text, "json": report.write_json, "dot": report.write_dot}[args.format](sys.stdout)
+    return 0
+
+
+def duplicates_command(args: argparse.Namespace) -> int:
+    """Report near-duplicate sections across the markdown files of a tree.
 
     Args:
         args: Command-line arguments.
 
     Returns:
-        Exit code (0 for success, 1 for errors found).
+        Exit code (0 unless the tree could not be scanned).
     """
+    from src.cache import CACHE_DIR_NAME
+    from src.duplicates import SIGNATURE_CACHE_FILE_NAME, DuplicateFinder, SignatureCache, write_json, write_text
+    from src.utils import LinkChecker
+
     root_path = Path(args.path).resolve()
+    if not root_path.is_dir():
+        logger.error("Not a directory: %s", root_path)
+        return 1
 
-    if not root_path.exists():
-        logger.error(f"Path does not exist: {root_path}")
+    checker = LinkChecker(root_path, exclude=args.exclude or ())
+    checker.scan_repository(args.jobs)
+    files = sorted(checker.all_files)
+
+    finder = DuplicateFinder(threshold=args.threshold, min_words=args.min_words)
+    if not args.no_cache:
+        cache_file = root_path / CACHE_DIR_NAME / SIGNATURE_CACHE_FILE_NAME
+        finder.cache = SignatureCache(cache_file, root_path, finder.parameters)
+    for file_path in files:
+        finder.add_file(file_path)
+    if finder.cache is not None:
+        logger.info("Signature cache hits: %s, misses: %s", finder.cache.hits, finder.cache.misses)
+        finder.cache.prune(files)
+        finder.cache.save()
+
+    pairs = finder.find()
+    logger.info("Compared %s sections in %s files", len(finder.sections), len(files))
+    (write_json if args.format == "json" else write_text)(pairs, root_path, sys.stdout)
+    return 0
+
+
+def tokens_command(args: argparse.Namespace) -> int:
+    """Report the tokens and context cost of the markdown files of a tree.
+
+    Prices and the section budget come from the ``tokens`` table of
+    ``[tool.ai-fundamentals]``; options override them.
+
+    Args:
+        args: Command-line arguments.
+
+    Returns:
+        Exit code (0 unless the tree or the merge table could not be read).
+    """
+    from src.cache import CACHE_DIR_NAME
+    from src.rules import load_config
+    from src.tokens import (
+        DEFAULT_BUDGET,
+        TOKEN_CACHE_FILE_NAME,
+        TokenCache,
+        TokenCounter,
+        Tokenizer,
+        write_json,
+        write_text,
+    )
+    from src.utils import LinkChecker
+
+    root_path = Path(args.path).resolve()
+    if not root_path.is_dir():
+        logger.error("Not a directory: %s", root_path)
+        return 1
+    try:
+        config = load_config(root_path).get("tokens", {})
+    except ValueError as e:
+        logger.error("%s", e)
+        return 1
+    prices = {**config.get("prices", {}), **dict(args.price or [])}
+    budget = args.budget or config.get("budget", DEFAULT_BUDGET)
+    merges = args.merges or config.get("merges")
+    try:
+        tokenizer = Tokenizer.load(root_path / merges if merges else None)
+    except (OSError, ValueError) as e:
+        logger.error("Cannot read merge table: %s", e)
         return 1
 
-    if root_path.is_file():
-        validator = MarkdownValidator(root_path.parent)
-        errors = validator.validate_file(root_path)
+    checker = LinkChecker(root_path, exclude=args.exclude or ())
+    checker.scan_repository(args.jobs)
+    files = sorted(checker.all_files)
 
-        if errors:
-            logger.error(f"Found {len(errors)} error(s):")
-            for error in errors:
-                print(f"  {error}")
-            return 1
+    counter = TokenCounter(tokenizer)
+    if not args.no_cache:
+        counter.cache = TokenCache(root_path / CACHE_DIR_NAME / TOKEN_CACHE_FILE_NAME, {"merges": tokenizer.digest})
+    start = time.perf_counter()
+    results = counter.count_files(files, args.jobs)
+    seconds = time.perf_counter() - start
+    if counter.cache is not None:
+        logger.info("Token cache hits: %s, misses: %s", counter.cache.hits, counter.cache.misses)
+        counter.cache.prune(counter.digests)
+        counter.cache.save()
+    megabytes = counter.bytes_counted / (1024 * 1024)
+    logger.info(
+        "Counted tokens of %s files in %.2f s, tokenizing %.1f MB at %.1f MB/s",
+        len(results),
+        seconds,
+        megabytes,
+        megabytes / seconds if seconds else 0.0,
+    )
 
-        logger.info("Validation passed")
-        return 0
+    if args.format == "json":
+        write_json(results, root_path, sys.stdout, prices, budget)
+    else:
+        write_text(results, root_path, sys.stdout, prices, budget, sections=args.sections)
+    return 0
 
-    # Directory validation
-    checker = LinkChecker(root_path)
-    results = checker.check_all_links()
 
-    if results:
-        total_errors = sum(len(errors) for errors in results.values())
-        logger.error(f"Found {total_errors} error(s) in {len(results)} file(s):")
+def index_command(args: argparse.Namespace) -> int:
+    """Build or update the search index of the markdown files of a tree.
+
+    Args:
+        args: Command-line arguments.
 
-        for file_path, errors in sorted(results.items()):
-            print(f"\n{file_path.relative_to(root_path)}:")
-            for error in errors:
-                print(f"  {error}")
+    Returns:
+        Exit code (0 unless the tree could not be scanned or the index written).
+    """
+    from src.cache import CACHE_DIR_NAME
+    from src.search import SEARCH_INDEX_FILE_NAME, IndexWriter
+    from src.utils import LinkChecker
 
+    root_path = Path(args.path).resolve()
+    if not root_path.is_dir():
+        logger.error("Not a directory: %s", root_path)
         return 1
 
-    logger.info("All validations passed")
+    checker = LinkChecker(root_path, exclude=args.exclude or ())
+    checker.scan_repository(args.jobs)
+    files = sorted(checker.all_files)
+
+    writer = IndexWriter(root_path, root_path / CACHE_DIR_NAME / SEARCH_INDEX_FILE_NAME)
+    start = time.perf_counter()
+    try:
+        stats = writer.update(files, rebuild=args.rebuild)
+    except OSError as e:
+        logger.error("Cannot write search index: %s", e)
+        return 1
+    logger.info(
+        "Indexed %s sections of %s files in %.2f s: %s added, %s changed, %s removed%s",
+        stats.sections,
+        len(files),
+        time.perf_counter() - start,
+        stats.added,
+        stats.changed,
+        stats.removed,
+        "" if stats.written else " (index up to date)",
+    )
     return 0
 
 
+def search_command(args: argparse.Namespace) -> int:
+    """Search the sections of the markdown files of a tree.
+
+    Args:
+        args: Command-line arguments.
+
+    Returns:
+        Exit code (0 for hits, 1 for none or no usable index).
+    """
+    from src.cache import CACHE_DIR_NAME
+    from src.search import SEARCH_INDEX_FILE_NAME, SearchIndex, write_json, write_text
+
+    index_path = Path(args.root).resolve() / CACHE_DIR_NAME / SEARCH_INDEX_FILE_NAME
+    try:
+        index = SearchIndex(index_path)
+    except FileNotFoundError:
+        logger.error("No search index at %s; run the index command first", index_path)
+        return 1
+    except (OSError, ValueError) as e:
+        logger.error("Cannot read search index: %s", e)
+        return 1
+
+    with index:
+        start = time.perf_counter()
+        hits = index.search(args.query, args.limit)
+        logger.info("Searched %s sections in %.1f ms", index.header.live, (time.perf_counter() - start) * 1000)
+    (write_json if args.format == "json" else write_text)(hits, sys.stdout)
+    return 0 if hits else 1
+
+
+def merge_command(args: argparse.Namespace) -> int:
+    """Combine the results of every shard of a run into one report.
+
+    Args:
+        args: Command-line arguments.
+
+    Returns:
+        Exit code (0 for success, 1 for errors found or unusable results).
+    """
+    from src.shards import ShardResult, merge_results
+
+    root_path = Path(args.root).resolve()
+    try:
+        diagnostics = merge_results([ShardResult.read(Path(path), root_path) for path in args.results])
+    except (OSError, ValueError) as e:
+        logger.error("Cannot merge shard results: %s", e)
+        return 1
+
+    if args.format != "text":
+        return stream_diagnostics(diagnostics, args.format, root_path)
+    return 1 if report_results(diagnostics, root_path) else 0
+
+
+def make_prefetcher(args: argparse.Namespace) -> Optional["Prefetcher"]:
+    """Create the read-ahead pipeline requested on the command line.
+
+    Args:
+        args: Command-line arguments.
+
+    Returns:
+        Prefetcher, or None if files are read as they are validated.
+    """
+    depth = getattr(args, "prefetch", None)
+    if not depth:
+        return None
+    from src.prefetch import Prefetcher
+
+    return Prefetcher(depth, max_bytes=args.prefetch_budget * 1024 * 1024)
+
+
+def make_external_checker(
+    args: argparse.Namespace, cache: Optional["ValidationCache"]
+) -> Optional["ExternalLinkChecker"]:
+    """Create the external link checker requested on the command line.
+
+    Args:
+        args: Command-line arguments.
+        cache: Validation cache whose directory also holds external results,
+            or None to check every URL afresh.
+
+    Returns:
+        Checker, or None if external links are not checked.
+    """
+    if not getattr(args, "check_external", False):
+        return None
+    from src.external import (
+        DEFAULT_TIMEOUT,
+        DEFAULT_TTL,
+        EXTERNAL_CACHE_FILE_NAME,
+        ExternalLinkCache,
+        ExternalLinkChecker,
+    )
+
+    external_cache = None
+    if cache is not None:
+        ttl = getattr(args, "external_ttl", DEFAULT_TTL)
+        external_cache = ExternalLinkCache(cache.cache_dir / EXTERNAL_CACHE_FILE_NAME, ttl=ttl)
+    return ExternalLinkChecker(cache=external_cache, timeout=getattr(args, "external_timeout", DEFAULT_TIMEOUT))
+
+
+def name_list(value: str) -> List[str]:
+    """Parse a comma-separated list of names.
+
+    Args:
+        value: Raw argument value.
+
+    Returns:
+        Non-empty names with surrounding whitespace removed.
+    """
+    return [name.strip() for name in value.split(",") if name.strip()]
+
+
+def positive_int(value: str) -> int:
+    """Parse a strictly positive integer argument.
+
+    Args:
+        value: Raw argument value.
+
+    Returns:
+        Parsed integer.
+
+    Raises:
+        argparse.ArgumentTypeError: If the value is not a positive integer.
+    """
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid positive integer: {value!r}") from None
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1: {value!r}")
+    return number
+
+
+def fraction(value: str) -> float:
+    """Parse a number greater than 0 and at most 1.
+
+    Args:
+        value: Raw argument value.
+
+    Returns:
+        Parsed number.
+
+    Raises:
+        argparse.ArgumentTypeError: If the value is not in (0, 1].
+    """
+    try:
+        number = float(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid number: {value!r}") from None
+    if not 0 < number <= 1:
+        raise argparse.ArgumentTypeError(f"must be greater than 0 and at most 1: {value!r}")
+    return number
+
+
+def price_spec(value: str) -> Tuple[str, float]:
+    """Parse a ``--price`` argument of the form ``NAME=DOLLARS``.
+
+    Args:
+        value: Raw argument value.
+
+    Returns:
+        Price name and US dollars per million tokens.
+
+    Raises:
+        argparse.ArgumentTypeError: If the value is malformed or negative.
+    """
+    name, _, dollars = value.partition("=")
+    try:
+        price = float(dollars)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected NAME=DOLLARS: {value!r}") from None
+    if not name or price < 0:
+        raise argparse.ArgumentTypeError(f"expected NAME=DOLLARS with a price of at least 0: {value!r}")
+    return name, price
+
+
+def shard_spec(value: str) -> Tuple[int, int]:
+    """Parse a ``--shard`` argument of the form ``I/N``.
+
+    Args:
+        value: Raw argument value.
+
+    Returns:
+        1-based shard number and number of shards.
+
+    Raises:
+        argparse.ArgumentTypeError: If the value is not ``I/N`` with 1 <= I <= N.
+    """
+    index, _, count = value.partition("/")
+    try:
+        shard = int(index), int(count)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected I/N: {value!r}") from None
+    if not 1 <= shard[0] <= shard[1]:
+        raise argparse.ArgumentTypeError(f"shard must be between 1 and the number of shards: {value!r}")
+    return shard
+
+
 def main() -> int:
     """Run the CLI application.
 
     Returns:
         Exit code.
     """
+    from src.external import DEFAULT_TIMEOUT, DEFAULT_TTL
+    from src.logging_config import configure_logging
+    from src.reporters import WRITERS
+
     parser = argparse.ArgumentParser(
         description="Validate markdown documentation",
         formatter_class=argparse.RawDescriptionHelpFormatter,
     )
+    parser.add_argument(
+        "--log-level",
+        choices=["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"],
+        default="INFO",
+        help="Lowest level of log messages written to stderr (default: INFO)",
+    )
+    parser.add_argument(
+        "--log-format",
+        choices=["text", "json"],
+        default="text",
+        help="Write log messages as text or as one JSON object per line",
+    )
+    parser.add_argument(
+        "--log-queue",
+        action="store_true",
+        help="Write log messages from a background thread so slow stderr pipes never stall validation",
+    )
 
     subparsers = parser.add_subparsers(dest="command", help="Command to run")
 
     # Validate command
     validate_parser = subparsers.add_parser("validate", help="Validate markdown files")
     validate_parser.add_argument(
+        "paths",
+        nargs="*",
+        metavar="path",
+        help="Files, directories or .tar(.gz)/.zip archives to validate (default: current directory)",
+    )
+    validate_parser.add_argument(
+        "--files-from",
+        metavar="FILE",
+        help="Also validate the paths listed in FILE, one per line or NUL-separated; '-' reads standard input",
+    )
+    validate_parser.add_argument(
+        "-j",
+        "--jobs",
+        type=positive_int,
+        default=os.cpu_count() or 1,
+        help="Number of worker processes for directory validation (default: CPU count)",
+    )
+    validate_parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Validate every file instead of reusing cached results",
+    )
+    validate_parser.add_argument(
+        "--clear-cache",
+        action="store_true",
+        help="Delete the validation cache before running",
+    )
+    validate_parser.add_argument(
+        "--prefetch",
+        type=positive_int,
+        metavar="DEPTH",
+        help="Read up to DEPTH files ahead on as many threads while this process validates, "
+        "for high-latency filesystems; replaces worker processes",
+    )
+    validate_parser.add_argument(
+        "--prefetch-budget",
+        type=positive_int,
+        default=64,
+        metavar="MIB",
+        help="Pause reading ahead while this many MiB wait to be validated (default: 64)",
+    )
+    changes_group = validate_parser.add_mutually_exclusive_group()
+    changes_group.add_argument(
+        "--since",
+        metavar="REF",
+        help="Only validate files changed since the merge base with REF, and files linking to deleted paths",
+    )
+    changes_group.add_argument(
+        "--staged",
+        action="store_true",
+        help="Only validate files changed in the git index, and files linking to deleted paths",
+    )
+    validate_parser.add_argument(
+        "--exclude",
+        action="append",
+        metavar="GLOB",
+        help="Skip paths matching a .gitignore-style pattern; may be repeated",
+    )
+
+    validate_parser.add_argument(
+        "--enable",
+        action="extend",
+        type=name_list,
+        metavar="RULE",
+        help="Enable rules or diagnostic ids, comma-separated; overrides pyproject.toml",
+    )
+    validate_parser.add_argument(
+        "--disable",
+        action="extend",
+        type=name_list,
+        metavar="RULE",
+        help="Disable rules or diagnostic ids, comma-separated; overrides pyproject.toml",
+    )
+    validate_parser.add_argument(
+        "--list-rules",
+        action="store_true",
+        help="List the available rules and whether they are enabled, then exit",
+    )
+
+    validate_parser.add_argument(
+        "--check-external",
+        action="store_true",
+        help="Also check that http(s) links respond (requires network access)",
+    )
+    validate_parser.add_argument(
+        "--external-timeout",
+        type=float,
+        default=DEFAULT_TIMEOUT,
+        help=f"Seconds to wait for each external request (default: {DEFAULT_TIMEOUT:g})",
+    )
+    validate_parser.add_argument(
+        "--external-ttl",
+        type=positive_int,
+        default=DEFAULT_TTL,
+        help=f"Seconds to reuse cached external link results (default: {DEFAULT_TTL})",
+    )
+
+    validate_parser.add_argument(
+        "--format",
+        choices=["text", *WRITERS],
+        default="text",
+        help="Output format; ndjson, sarif and junit are streamed to stdout as files are checked",
+    )
+    validate_parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Print time per phase, counters and the slowest files to stderr",
+    )
+    validate_parser.add_argument(
+        "--profile-json",
+        metavar="FILE",
+        help="Also write the profile as JSON to FILE (implies --profile)",
+    )
+    validate_parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Keep running and revalidate files as they change",
+    )
+
+    validate_parser.add_argument(
+        "--fix",
+        action="store_true",
+        help="Point broken links at moved files, renumber skipped heading levels and close unclosed fences",
+    )
+    validate_parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="With --fix, print the fixes as a unified diff instead of writing them",
+    )
+    validate_parser.add_argument(
+        "--shard",
+        type=shard_spec,
+        metavar="I/N",
+        help="Validate only the I-th of N deterministic slices of the tree and write a shard result for 'merge'",
+    )
+    validate_parser.add_argument(
+        "--shard-output",
+        metavar="FILE",
+        help="Where to write the shard result (default: ai-fundamentals-shard-I-of-N.json)",
+    )
+    validate_parser.add_argument(
+        "--shard-timings",
+        action="append",
+        metavar="FILE",
+        help="Balance shards by the file timings in a previous run's shard results; may be repeated. "
+        "Every shard must be given the same files",
+    )
+
+    # Serve command
+    serve_parser = subparsers.add_parser(
+        "serve", help="Run a language server that validates documents as they are edited"
+    )
+    serve_parser.add_argument(
+        "path",
+        nargs="?",
+        default=".",
+        help="Repository root if the client does not send one (default: current directory)",
+    )
+    serve_parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Validate every file at startup instead of reusing cached results",
+    )
+    serve_parser.add_argument(
+        "--exclude",
+        action="append",
+        metavar="GLOB",
+        help="Skip paths matching a .gitignore-style pattern; may be repeated",
+    )
+    serve_parser.add_argument(
+        "--enable",
+        action="extend",
+        type=name_list,
+        metavar="RULE",
+        help="Enable rules or diagnostic ids, comma-separated; overrides pyproject.toml",
+    )
+    serve_parser.add_argument(
+        "--disable",
+        action="extend",
+        type=name_list,
+        metavar="RULE",
+        help="Disable rules or diagnostic ids, comma-separated; overrides pyproject.toml",
+    )
+
+    # Graph command
+    graph_parser = subparsers.add_parser(
+        "graph", help="Report orphan pages, dead ends, cycles and the most linked pages"
+    )
+    graph_parser.add_argument(
+        "path",
+        nargs="?",
+        default=".",
+        help="Directory to analyse (default: current directory)",
+    )
+    graph_parser.add_argument(
+        "--root",
+        action="append",
+        metavar="FILE",
+        help="Entry page that other pages should be reachable from; may be repeated "
+        "(default: README.md, or [tool.ai-fundamentals.graph] roots in pyproject.toml)",
+    )
+    graph_parser.add_argument(
+        "--format",
+        choices=["text", "json", "dot"],
+        default="text",
+        help="Output format; json and dot include the whole graph",
+    )
+    graph_parser.add_argument(
+        "--top",
+        type=positive_int,
+        default=10,
+        help="Number of most linked pages to list (default: 10)",
+    )
+    graph_parser.add_argument(
+        "-j",
+        "--jobs",
+        type=positive_int,
+        default=os.cpu_count() or 1,
+        help="Number of worker processes for validation (default: CPU count)",
+    )
+    graph_parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Read every file instead of reusing cached results",
+    )
+    graph_parser.add_argument(
+        "--exclude",
+        action="append",
+        metavar="GLOB",
+        help="Skip paths matching a .gitignore-style pattern; may be repeated",
+    )
+
+    # Duplicates command
+    duplicates_parser = subparsers.add_parser("duplicates", help="Report near-duplicate sections across markdown files")
+    duplicates_parser.add_argument(
+        "path",
+        nargs="?",
+        default=".",
+        help="Directory to analyse (default: current directory)",
+    )
+    duplicates_parser.add_argument(
+        "--threshold",
+        type=fraction,
+        default=0.8,
+        help="Estimated similarity from which sections are reported, between 0 and 1 (default: 0.8)",
+    )
+    duplicates_parser.add_argument(
+        "--min-words",
+        type=positive_int,
+        default=20,
+        help="Ignore sections with fewer words (default: 20)",
+    )
+    duplicates_parser.add_argument(
+        "--format",
+        choices=["text", "json"],
+        default="text",
+        help="Output format",
+    )
+    duplicates_parser.add_argument(
+        "-j",
+        "--jobs",
+        type=positive_int,
+        default=os.cpu_count() or 1,
+        help="Number of threads walking the tree (default: CPU count)",
+    )
+    duplicates_parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Hash every file instead of reusing cached signatures",
+    )
+    duplicates_parser.add_argument(
+        "--exclude",
+        action="append",
+        metavar="GLOB",
+        help="Skip paths matching a .gitignore-style pattern; may be repeated",
+    )
+
+    # Tokens command
+    tokens_parser = subparsers.add_parser("tokens", help="Report the tokens and context cost of markdown files")
+    tokens_parser.add_argument(
+        "path",
+        nargs="?",
+        default=".",
+        help="Directory to analyse (default: current directory)",
+    )
+    tokens_parser.add_argument(
+        "--price",
+        action="append",
+        type=price_spec,
+        metavar="NAME=DOLLARS",
+        help="Estimate cost at this many US dollars per million tokens; may be repeated",
+    )
+    tokens_parser.add_argument(
+        "--budget",
+        type=positive_int,
+        help="Report sections with more tokens than this (default: 4096)",
+    )
+    tokens_parser.add_argument(
+        "--merges",
+        help="BPE merge table in merges.txt format (default: the bundled table)",
+    )
+    tokens_parser.add_argument(
+        "--sections",
+        action="store_true",
+        help="List the tokens of every section in text output",
+    )
+    tokens_parser.add_argument(
+        "--format",
+        choices=["text", "json"],
+        default="text",
+        help="Output format",
+    )
+    tokens_parser.add_argument(
+        "-j",
+        "--jobs",
+        type=positive_int,
+        default=os.cpu_count() or 1,
+        help="Number of worker processes counting tokens (default: CPU count)",
+    )
+    tokens_parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Count every file instead of reusing cached counts",
+    )
+    tokens_parser.add_argument(
+        "--exclude",
+        action="append",
+        metavar="GLOB",
+        help="Skip paths matching a .gitignore-style pattern; may be repeated",
+    )
+
+    # Index command
+    index_parser = subparsers.add_parser("index", help="Build or update the search index of markdown files")
+    index_parser.add_argument(
         "path",
         nargs="?",
         default=".",
-        help="Path to file or directory (default: current directory)",
+        help="Directory to index (default: current directory)",
+    )
+    index_parser.add_argument(
+        "--rebuild",
+        action="store_true",
+        help="Index every file instead of updating the existing index",
+    )
+    index_parser.add_argument(
+        "-j",
+        "--jobs",
+        type=positive_int,
+        default=os.cpu_count() or 1,
+        help="Number of threads walking the tree (default: CPU count)",
+    )
+    index_parser.add_argument(
+        "--exclude",
+        action="append",
+        metavar="GLOB",
+        help="Skip paths matching a .gitignore-style pattern; may be repeated",
+    )
+
+    # Search command
+    search_parser = subparsers.add_parser("search", help="Search the sections of indexed markdown files")
+    search_parser.add_argument(
+        "query",
+        help='Words to rank sections by; "quoted phrases" must appear as written',
+    )
+    search_parser.add_argument(
+        "--root",
+        default=".",
+        help="Directory that was indexed (default: current directory)",
+    )
+    search_parser.add_argument(
+        "--limit",
+        type=positive_int,
+        default=10,
+        help="Most sections to list (default: 10)",
+    )
+    search_parser.add_argument(
+        "--format",
+        choices=["text", "json"],
+        default="text",
+        help="Output format",
+    )
+
+    # Merge command
+    merge_parser = subparsers.add_parser("merge", help="Combine the results of 'validate --shard' runs")
+    merge_parser.add_argument(
+        "results",
+        nargs="+",
+        metavar="FILE",
+        help="Shard result of each shard of the run",
+    )
+    merge_parser.add_argument(
+        "--root",
+        default=".",
+        help="Repository root that reported paths are relative to (default: current directory)",
+    )
+    merge_parser.add_argument(
+        "--format",
+        choices=["text", *WRITERS],
+        default="text",
+        help="Output format",
     )
 
     args = parser.parse_args()
 
+    configure_logging(args.log_level, json_format=args.log_format == "json", use_queue=args.log_queue)
+
     if not args.command:
         parser.print_help()
         return 1
@@ -94,6 +1653,27 @@ def main() -> int:
     if args.command == "validate":
         return validate_command(args)
 
+    if args.command == "serve":
+        return serve_command(args)
+
+    if args.command == "graph":
+        return graph_command(args)
+
+    if args.command == "merge":
+        return merge_command(args)
+
+    if args.command == "duplicates":
+        return duplicates_command(args)
+
+    if args.command == "tokens":
+        return tokens_command(args)
+
+    if args.command == "index":
+        return index_command(args)
+
+    if args.command == "search":
+        return search_command(args)
+
     return 1
 
 
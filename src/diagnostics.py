@@ -0,0 +1,79 @@
+"""Structured validation diagnostics."""
+
+from pathlib import Path
+from typing import Dict, Tuple
+
+MISSING_FILE = "missing-file"
+ENCODING = "encoding"
+MISSING_H1 = "missing-h1"
+MULTIPLE_H1 = "multiple-h1"
+HEADING_INCREMENT = "heading-increment"
+BROKEN_LINK = "broken-link"
+BROKEN_ANCHOR = "broken-anchor"
+BROKEN_EXTERNAL_LINK = "broken-external-link"
+UNCLOSED_FENCE = "unclosed-fence"
+
+# Rule id -> one-line description, used by machine-readable output formats.
+RULES: Dict[str, str] = {
+    MISSING_FILE: "File to validate does not exist",
+    ENCODING: "File is not valid UTF-8",
+    MISSING_H1: "Document has no H1 title",
+    MULTIPLE_H1: "Document has more than one H1 header",
+    HEADING_INCREMENT: "Header levels increase by more than one",
+    BROKEN_LINK: "Relative link points to a missing file",
+    BROKEN_ANCHOR: "Link fragment matches no heading in the target document",
+    BROKEN_EXTERNAL_LINK: "External link does not respond successfully",
+    UNCLOSED_FENCE: "Code fence is never closed",
+}
+
+
+class Diagnostic:
+    """A single problem found in a file.
+
+    Line and column are 1-based; 0 means the problem concerns the whole file
+    or the position is unknown.
+    """
+
+    __slots__ = ("path", "line", "column", "rule", "message")
+
+    def __init__(self, path: Path, rule: str, message: str, line: int = 0, column: int = 0):
+        """Initialize diagnostic.
+
+        Args:
+            path: File the problem was found in.
+            rule: Rule id, one of the keys of ``RULES``.
+            message: Human-readable description without location.
+            line: 1-based line number, or 0.
+            column: 1-based column number, or 0.
+        """
+        self.path = path
+        self.rule = rule
+        self.message = message
+        self.line = line
+        self.column = column
+
+    def __str__(self) -> str:
+        """Format as ``path:line: message``, omitting an unknown line."""
+        if self.line:
+            return f"{self.path}:{self.line}: {self.message}"
+        return f"{self.path}: {self.message}"
+
+    def __repr__(self) -> str:
+        """Return a debugging representation."""
+        return (
+            f"Diagnostic({str(self.path)!r}, {self.rule!r}, {self.message!r}, line={self.line}, column={self.column})"
+        )
+
+    def __eq__(self, other: object) -> bool:
+        """Compare all fields."""
+        if not isinstance(other, Diagnostic):
+            return NotImplemented
+        return self._key() == other._key()
+
+    def __hash__(self) -> int:
+        """Hash all fields."""
+        return hash(self._key())
+
+    def _key(self) -> Tuple[Path, int, int, str, str]:
+        """Return the fields as a tuple."""
+        return self.path, self.line, self.column, self.rule, self.message
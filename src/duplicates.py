@@ -0,0 +1,520 @@
+"""Near-duplicate section detection with MinHash and locality-sensitive hashing."""
+
+import base64
+import hashlib
+import json
+import logging
+import os
+import re
+import sys
+from array import array
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Set, TextIO, Tuple
+
+from src import __version__
+from src.cache import ensure_cache_dir
+from src.scanner import Header, scan_markdown
+from src.utils import content_digest, file_digest
+
+logger = logging.getLogger(__name__)
+
+SIGNATURE_CACHE_FILE_NAME = "signatures.json"
+
+SHINGLE_SIZE = 5
+NUM_PERM = 128
+MIN_WORDS = 20
+DEFAULT_THRESHOLD = 0.8
+
+SEED = 1
+
+# Marks a signature bin that no shingle hashed into.
+EMPTY = 2**64 - 1
+
+WORD_PATTERN = re.compile(r"\w+")
+
+
+class Section(NamedTuple):
+    """A heading-delimited part of a markdown file and its MinHash signature."""
+
+    path: Path
+    line: int
+    title: str
+    signature: array
+
+
+class DuplicatePair(NamedTuple):
+    """Two sections whose estimated Jaccard similarity reaches the threshold."""
+
+    first: Section
+    second: Section
+    similarity: float
+
+
+def split_sections(content: str) -> List[Tuple[int, str, str]]:
+    """Split a document at every heading outside code fences.
+
+    Args:
+        content: Document text.
+
+    Returns:
+        ``(line, title, body)`` of each section, where ``line`` is that of the
+        heading. Text before the first heading is a section at line 1 with an
+        empty title. Bodies leave out the heading itself.
+    """
+    lines = content.split("\n")
+    headers = [event for event in scan_markdown(content) if isinstance(event, Header)]
+    starts = [(1, "", 0)] + [(header.line, header.text, header.line) for header in headers]
+    sections = []
+    for index, (line, title, start) in enumerate(starts):
+        end = starts[index + 1][0] - 1 if index + 1 < len(starts) else len(lines)
+        sections.append((line, title, "\n".join(lines[start:end])))
+    return sections
+
+
+def split_words(text: str) -> List[str]:
+    """Split text into lowercase words, ignoring punctuation.
+
+    Args:
+        text: Text to split.
+
+    Returns:
+        Words in order.
+    """
+    return WORD_PATTERN.findall(text.lower())
+
+
+def shingles(words: List[str], size: int = SHINGLE_SIZE) -> Set[str]:
+    """Collect every run of consecutive words.
+
+    Args:
+        words: Words of a text in order.
+        size: Number of words per shingle.
+
+    Returns:
+        Distinct shingles, with words separated by single spaces.
+    """
+    return {" ".join(words[i : i + size]) for i in range(len(words) - size + 1)}
+
+
+def lsh_bands(threshold: float, num_perm: int = NUM_PERM) -> int:
+    """Choose how many bands to split signatures into.
+
+    Two sections share a bucket with probability ``1 - (1 - s**r)**b`` for
+    similarity ``s``, ``b`` bands and ``r`` rows per band, which rises
+    steeply around ``(1 / b) ** (1 / r)``. The band count whose rise lies
+    closest below the threshold keeps false candidates few while rarely
+    missing a similar pair.
+
+    Args:
+        threshold: Similarity from which pairs are reported.
+        num_perm: Signature length.
+
+    Returns:
+        Number of bands, a divisor of ``num_perm``.
+    """
+    divisors = [bands for bands in range(1, num_perm + 1) if num_perm % bands == 0]
+    below = [bands for bands in divisors if (1 / bands) ** (bands / num_perm) < threshold]
+    return min(below) if below else num_perm
+
+
+class MinHasher:
+    """Computes MinHash signatures of shingle sets by one-permutation hashing.
+
+    Each shingle is hashed once to 64 bits: the hash picks one of
+    ``num_perm`` bins and the bin keeps the smallest remaining value. Bins
+    no shingle fell into borrow the value of another bin, probed in an order
+    fixed per bin, so two sets still agree on a bin with probability equal
+    to their Jaccard similarity. Signing a section thus costs one hash per
+    shingle rather than one per shingle and bin. numpy bins the hashes when
+    it is installed; the signatures are the same without it.
+    """
+
+    def __init__(self, num_perm: int = NUM_PERM, seed: int = SEED):
+        """Initialize hasher.
+
+        Args:
+            num_perm: Number of bins, which is the signature length.
+            seed: Seed mixed into every hash, fixed so signatures can be cached.
+        """
+        self.num_perm = num_perm
+        self.seed = seed
+        self._prefix = f"{seed}:".encode()
+        self._probes: List[List[int]] = [[] for _ in range(num_perm)]
+        self._numpy = _load_numpy()
+
+    def signature(self, shingle_set: Iterable[str]) -> array:
+        """Compute the signature of a set of shingles.
+
+        Args:
+            shingle_set: Distinct shingles; must not be empty.
+
+        Returns:
+            Smallest value in each bin, after filling empty bins.
+        """
+        prefix = self._prefix
+        blake2b = hashlib.blake2b
+        data = b"".join([blake2b(prefix + shingle.encode("utf-8"), digest_size=8).digest() for shingle in shingle_set])
+        count = self.num_perm
+
+        if self._numpy is not None:
+            np = self._numpy
+            hashes = np.frombuffer(data, dtype="<u8")
+            bins = np.full(count, EMPTY, dtype=np.uint64)
+            np.minimum.at(bins, (hashes % count).astype(np.intp), hashes // count)
+            values = bins.tolist()
+        else:
+            hashes = array("Q", data)
+            if sys.byteorder == "big":
+                hashes.byteswap()
+            values = [EMPTY] * count
+            for hashed in hashes:
+                index, value = hashed % count, hashed // count
+                if value < values[index]:
+                    values[index] = value
+        return array("Q", self._densify(values))
+
+    def _densify(self, values: List[int]) -> List[int]:
+        """Fill every empty bin with the value of a probed non-empty bin.
+
+        Args:
+            values: Smallest value per bin, ``EMPTY`` for bins without one.
+
+        Returns:
+            Values with no empty bins.
+        """
+        dense = list(values)
+        for index in range(len(values)):
+            attempt = 0
+            while dense[index] == EMPTY:
+                dense[index] = values[self._probe(index, attempt)]
+                attempt += 1
+        return dense
+
+    def _probe(self, index: int, attempt: int) -> int:
+        """Return the bin an empty bin borrows from on a given attempt.
+
+        Args:
+            index: Empty bin.
+            attempt: 0-based number of bins already probed.
+
+        Returns:
+            Bin to probe, the same for every set.
+        """
+        sequence = self._probes[index]
+        while len(sequence) <= attempt:
+            digest = hashlib.blake2b(f"{self.seed}:{index}:{len(sequence)}".encode(), digest_size=8).digest()
+            sequence.append(int.from_bytes(digest, "little") % self.num_perm)
+        return sequence[attempt]
+
+
+def _load_numpy() -> Any:
+    """Import numpy if it is installed.
+
+    Returns:
+        The numpy module, or None.
+    """
+    try:
+        import numpy
+    except ImportError:
+        logger.debug("numpy is not installed; computing signatures in pure Python")
+        return None
+    return numpy
+
+
+class SignatureCache:
+    """Persistent store of section signatures, reused while a file is unchanged.
+
+    Entries are keyed by the file's path relative to the root and are reused
+    while its size and mtime match, or its content digest if only the mtime
+    moved. The whole cache is discarded when the shingling parameters differ.
+    """
+
+    def __init__(self, path: Path, root_path: Path, parameters: Dict[str, Any]):
+        """Initialize cache and load any existing entries.
+
+        Args:
+            path: JSON file holding the entries.
+            root_path: Directory that entry keys are relative to.
+            parameters: Settings the signatures depend on.
+        """
+        self.path = Path(path)
+        self.root_path = Path(root_path)
+        self.parameters = parameters
+        self.hits = 0
+        self.misses = 0
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._dirty = False
+        self._load()
+
+    def _load(self) -> None:
+        """Read entries from disk, ignoring missing, unreadable or stale files."""
+        try:
+            with open(self.path, encoding="utf-8") as handle:
+                data = json.load(handle)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.warning("Ignoring unreadable signature cache %s: %s", self.path, e)
+            return
+        if data.get("version") == __version__ and data.get("parameters") == self.parameters:
+            self._entries = data.get("entries", {})
+
+    def lookup(self, file_path: Path, stat: os.stat_result) -> Optional[List[Section]]:
+        """Return the cached sections of a file if it is unchanged.
+
+        Args:
+            file_path: File to look up.
+            stat: Current stat of the file.
+
+        Returns:
+            Cached sections, or None if the file must be hashed again.
+        """
+        entry = self._entries.get(self._key(file_path))
+        if entry is None or entry["size"] != stat.st_size or not self._content_matches(file_path, stat, entry):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return [Section(file_path, line, title, _decode(signature)) for line, title, signature in entry["sections"]]
+
+    def _content_matches(self, file_path: Path, stat: os.stat_result, entry: Dict[str, Any]) -> bool:
+        """Check whether a file still has the content an entry was made from.
+
+        Args:
+            file_path: File to check.
+            stat: Current stat of the file.
+            entry: Cache entry of the file.
+
+        Returns:
+            True if the mtime or, failing that, the content digest matches.
+        """
+        if entry["mtime_ns"] == stat.st_mtime_ns:
+            return True
+        if file_digest(file_path) != entry["digest"]:
+            return False
+        entry["mtime_ns"] = stat.st_mtime_ns
+        self._dirty = True
+        return True
+
+    def store(self, file_path: Path, stat: os.stat_result, digest: str, sections: List[Section]) -> None:
+        """Record the sections of a file.
+
+        Args:
+            file_path: File the sections come from.
+            stat: Stat taken before the file was read.
+            digest: Content digest of the file.
+            sections: Sections of the file.
+        """
+        self._entries[self._key(file_path)] = {
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "digest": digest,
+            "sections": [[section.line, section.title, _encode(section.signature)] for section in sections],
+        }
+        self._dirty = True
+
+    def prune(self, files: Iterable[Path]) -> None:
+        """Drop entries of files that are no longer in the tree.
+
+        Args:
+            files: Every file in the tree.
+        """
+        keep = {self._key(file_path) for file_path in files}
+        stale = [key for key in self._entries if key not in keep]
+        for key in stale:
+            del self._entries[key]
+        self._dirty = self._dirty or bool(stale)
+
+    def save(self) -> None:
+        """Write entries to disk atomically if anything changed."""
+        if not self._dirty:
+            return
+        ensure_cache_dir(self.path.parent)
+        data = {"version": __version__, "parameters": self.parameters, "entries": self._entries}
+        tmp_path = self.path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as handle:
+            json.dump(data, handle, separators=(",", ":"))
+        os.replace(tmp_path, self.path)
+        self._dirty = False
+
+    def _key(self, file_path: Path) -> str:
+        """Return the cache key of a file."""
+        return Path(os.path.relpath(file_path, self.root_path)).as_posix()
+
+
+def _encode(signature: array) -> str:
+    """Encode a signature as base64 of little-endian 64-bit values."""
+    if sys.byteorder == "big":
+        signature = array("Q", signature)
+        signature.byteswap()
+    return base64.b64encode(signature.tobytes()).decode("ascii")
+
+
+def _decode(text: str) -> array:
+    """Decode a signature written by ``_encode``."""
+    signature = array("Q", base64.b64decode(text))
+    if sys.byteorder == "big":
+        signature.byteswap()
+    return signature
+
+
+class DuplicateFinder:
+    """Finds near-duplicate sections across markdown files.
+
+    Each section with enough words is reduced to a MinHash signature. The
+    signatures are cut into bands and sections sharing any band are
+    candidates; only candidates have their similarity estimated, so the work
+    grows with the number of sections rather than the number of pairs.
+    """
+
+    def __init__(
+        self,
+        threshold: float = DEFAULT_THRESHOLD,
+        min_words: int = MIN_WORDS,
+        hasher: Optional[MinHasher] = None,
+        cache: Optional[SignatureCache] = None,
+    ):
+        """Initialize finder.
+
+        Args:
+            threshold: Estimated Jaccard similarity from which sections are
+                reported, between 0 and 1.
+            min_words: Sections with fewer words are ignored.
+            hasher: MinHash hasher. Defaults to ``NUM_PERM`` permutations.
+            cache: Optional store of signatures from earlier runs.
+        """
+        self.threshold = threshold
+        self.min_words = min_words
+        self.hasher = hasher if hasher is not None else MinHasher()
+        self.cache = cache
+        self.sections: List[Section] = []
+
+    @property
+    def parameters(self) -> Dict[str, Any]:
+        """Settings that signatures depend on, for keying a cache."""
+        return {
+            "shingle_size": SHINGLE_SIZE,
+            "num_perm": self.hasher.num_perm,
+            "seed": self.hasher.seed,
+            "min_words": self.min_words,
+        }
+
+    def add_file(self, file_path: Path) -> List[Section]:
+        """Compute or look up the signatures of a file's sections.
+
+        Args:
+            file_path: Markdown file.
+
+        Returns:
+            Sections long enough to compare. Unreadable files have none.
+        """
+        try:
+            stat = os.stat(file_path)
+            sections = self.cache.lookup(file_path, stat) if self.cache is not None else None
+            if sections is None:
+                with open(file_path, "rb") as handle:
+                    data = handle.read()
+                sections = self._sections(file_path, data.decode("utf-8", errors="replace"))
+                if self.cache is not None:
+                    self.cache.store(file_path, stat, content_digest(data), sections)
+        except OSError as e:
+            logger.warning("Cannot read %s: %s", file_path, e)
+            return []
+        self.sections.extend(sections)
+        return sections
+
+    def _sections(self, file_path: Path, content: str) -> List[Section]:
+        """Shingle and sign every long enough section of a document.
+
+        Args:
+            file_path: File the content belongs to.
+            content: Document text.
+
+        Returns:
+            Signed sections.
+        """
+        sections = []
+        for line, title, body in split_sections(content):
+            body_words = split_words(body)
+            if len(body_words) < self.min_words:
+                continue
+            shingle_set = shingles(body_words)
+            if shingle_set:
+                sections.append(Section(file_path, line, title, self.hasher.signature(shingle_set)))
+        return sections
+
+    def find(self) -> List[DuplicatePair]:
+        """Report similar pairs among every section added so far.
+
+        Returns:
+            Pairs at or above the threshold, most similar first.
+        """
+        num_perm = self.hasher.num_perm
+        bands = lsh_bands(self.threshold, num_perm)
+        rows = num_perm // bands
+        buckets: Dict[Tuple[int, bytes], List[int]] = defaultdict(list)
+        for index, section in enumerate(self.sections):
+            signature = section.signature
+            for band in range(bands):
+                buckets[band, signature[band * rows : (band + 1) * rows].tobytes()].append(index)
+
+        candidates: Set[Tuple[int, int]] = set()
+        for members in buckets.values():
+            for position, first in enumerate(members):
+                candidates.update((first, second) for second in members[position + 1 :])
+        logger.debug("%s candidate pairs from %s sections in %s bands", len(candidates), len(self.sections), bands)
+
+        pairs = []
+        for first, second in candidates:
+            similarity = _similarity(self.sections[first].signature, self.sections[second].signature)
+            if similarity >= self.threshold:
+                pairs.append(DuplicatePair(self.sections[first], self.sections[second], similarity))
+        return sorted(pairs, key=lambda pair: (-pair.similarity, pair.first[:2], pair.second[:2]))
+
+
+def _similarity(first: array, second: array) -> float:
+    """Estimate the Jaccard similarity of two sections from their signatures."""
+    return sum(1 for x, y in zip(first, second) if x == y) / len(first)
+
+
+def write_text(pairs: List[DuplicatePair], root_path: Path, stream: TextIO) -> None:
+    """Write duplicate pairs for people to read.
+
+    Args:
+        pairs: Pairs to report.
+        root_path: Directory that paths are shown relative to.
+        stream: Output stream.
+    """
+    if not pairs:
+        stream.write("No near-duplicate sections found\n")
+        return
+    stream.write(f"{len(pairs)} near-duplicate section pair(s):\n")
+    for pair in pairs:
+        stream.write(f"\n  {pair.similarity:.0%} similar\n")
+        for section in (pair.first, pair.second):
+            title = f" ({section.title})" if section.title else ""
+            stream.write(f"    {os.path.relpath(section.path, root_path)}:{section.line}{title}\n")
+
+
+def write_json(pairs: List[DuplicatePair], root_path: Path, stream: TextIO) -> None:
+    """Write duplicate pairs as JSON.
+
+    Args:
+        pairs: Pairs to report.
+        root_path: Directory that paths are written relative to.
+        stream: Output stream.
+    """
+
+    def describe(section: Section) -> Dict[str, Any]:
+        return {
+            "path": Path(os.path.relpath(section.path, root_path)).as_posix(),
+            "line": section.line,
+            "title": section.title,
+        }
+
+    data = [
+        {"similarity": round(pair.similarity, 4), "sections": [describe(pair.first), describe(pair.second)]}
+        for pair in pairs
+    ]
+    json.dump({"pairs": data}, stream, indent=2)
+    stream.write("\n")
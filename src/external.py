@@ -0,0 +1,508 @@
+"""Concurrent checker for external http(s) links."""
+
+import json
+import logging
+import os
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+from urllib.parse import quote, urldefrag, urljoin, urlsplit
+
+from src import __version__
+from src.diagnostics import BROKEN_EXTERNAL_LINK, Diagnostic
+
+if TYPE_CHECKING:
+    # Imported where used: they are slow to import and only needed when links are fetched.
+    import asyncio
+    import ssl
+
+logger = logging.getLogger(__name__)
+
+EXTERNAL_CACHE_FILE_NAME = "external.json"
+
+DEFAULT_TIMEOUT = 10.0
+DEFAULT_TTL = 24 * 60 * 60
+DEFAULT_PER_HOST = 4
+DEFAULT_MAX_CONNECTIONS = 64
+MAX_REDIRECTS = 5
+MAX_HEADER_BYTES = 64 * 1024
+
+REDIRECT_STATUSES = frozenset({301, 302, 303, 307, 308})
+# Rate limiting says nothing about whether the page exists.
+RETRY_LATER_STATUS = 429
+# Characters left as they are when the path and query are percent-encoded.
+SAFE_URL_CHARS = "/%:@!$&'()*+,;=?~-._"
+
+Origin = Tuple[str, str, int]
+
+
+class LinkStatus(NamedTuple):
+    """Outcome of checking one external URL."""
+
+    url: str
+    ok: bool
+    status: int
+    reason: str
+
+
+def normalize_url(url: str) -> str:
+    """Reduce a link destination to the URL that is actually fetched.
+
+    Args:
+        url: Raw destination, possibly with a title or fragment.
+
+    Returns:
+        URL without title or fragment.
+    """
+    url = url.strip()
+    if url.startswith("<") and ">" in url:
+        url = url[1 : url.index(">")]
+    elif url:
+        url = url.split(None, 1)[0]
+    return urldefrag(url)[0]
+
+
+def external_link_errors(
+    file_path: Path, links: Iterable[Tuple[str, int, int]], statuses: Dict[str, LinkStatus]
+) -> List[Diagnostic]:
+    """Turn check results into diagnostics for one file.
+
+    Args:
+        file_path: File containing the links.
+        links: External link destinations as written in the file, with
+            their line and column.
+        statuses: Results keyed by normalized URL.
+
+    Returns:
+        List of broken external link diagnostics.
+    """
+    errors = []
+    for url, line, column in links:
+        status = statuses.get(normalize_url(url))
+        if status is not None and not status.ok:
+            message = f"Broken external link to {url} ({status.reason})"
+            errors.append(Diagnostic(file_path, BROKEN_EXTERNAL_LINK, message, line, column))
+    return errors
+
+
+class ExternalLinkCache:
+    """Persistent store of external link results with a time-to-live."""
+
+    def __init__(self, path: Path, ttl: float = DEFAULT_TTL, clock: Callable[[], float] = time.time):
+        """Initialize cache and load unexpired entries.
+
+        Args:
+            path: JSON file holding the entries.
+            ttl: Seconds a result stays valid.
+            clock: Returns the current time in seconds.
+        """
+        self.path = Path(path)
+        self.ttl = ttl
+        self.clock = clock
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._dirty = False
+        self._load()
+
+    def _load(self) -> None:
+        """Read entries from disk, ignoring missing or unreadable files."""
+        try:
+            with open(self.path, encoding="utf-8") as handle:
+                data = json.load(handle)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.warning("Ignoring unreadable external link cache %s: %s", self.path, e)
+            return
+        if data.get("version") == __version__:
+            self._entries = data.get("entries", {})
+
+    def get(self, url: str) -> Optional[LinkStatus]:
+        """Return a cached result if it has not expired.
+
+        Args:
+            url: Normalized URL.
+
+        Returns:
+            Cached status, or None.
+        """
+        entry = self._entries.get(url)
+        if entry is None or self.clock() - entry["checked_at"] >= self.ttl:
+            return None
+        return LinkStatus(url, entry["ok"], entry["status"], entry["reason"])
+
+    def put(self, status: LinkStatus) -> None:
+        """Record a fresh result.
+
+        Args:
+            status: Result to store.
+        """
+        if status.status == RETRY_LATER_STATUS:
+            return
+        self._entries[status.url] = {
+            "ok": status.ok,
+            "status": status.status,
+            "reason": status.reason,
+            "checked_at": self.clock(),
+        }
+        self._dirty = True
+
+    def save(self) -> None:
+        """Write entries to disk atomically, dropping expired ones."""
+        if not self._dirty:
+            return
+        now = self.clock()
+        entries = {url: entry for url, entry in self._entries.items() if now - entry["checked_at"] < self.ttl}
+        # Imported here because src.cache depends on src.utils, which imports this module.
+        from src.cache import ensure_cache_dir
+
+        ensure_cache_dir(self.path.parent)
+        tmp_path = self.path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as handle:
+            json.dump({"version": __version__, "entries": entries}, handle, separators=(",", ":"))
+        os.replace(tmp_path, self.path)
+        self._dirty = False
+
+
+class _Connection:
+    """A lazily opened HTTP/1.1 connection that is kept alive between requests."""
+
+    def __init__(self, origin: Origin, timeout: float, ssl_context: Optional["ssl.SSLContext"]):
+        """Initialize connection.
+
+        Args:
+            origin: ``(scheme, host, port)`` to connect to.
+            timeout: Seconds allowed for each request.
+            ssl_context: TLS context for https origins.
+        """
+        self.origin = origin
+        self.timeout = timeout
+        self.ssl_context = ssl_context
+        self.reader: Optional[asyncio.StreamReader] = None
+        self.writer: Optional[asyncio.StreamWriter] = None
+        self.connects = 0
+
+    async def request(self, method: str, url: str) -> Tuple[int, Dict[str, str]]:
+        """Send a request and read the response head.
+
+        A reused connection that the server already closed is reopened once.
+
+        Args:
+            method: ``HEAD`` or ``GET``.
+            url: Absolute URL on this connection's origin.
+
+        Returns:
+            Status code and lowercased response headers.
+        """
+        import asyncio
+
+        reused = self.writer is not None
+        try:
+            return await asyncio.wait_for(self._request(method, url), self.timeout)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            self.close()
+            if not reused:
+                raise
+        return await asyncio.wait_for(self._request(method, url), self.timeout)
+
+    async def _request(self, method: str, url: str) -> Tuple[int, Dict[str, str]]:
+        """Perform one request on an open or newly opened connection.
+
+        Args:
+            method: ``HEAD`` or ``GET``.
+            url: Absolute URL on this connection's origin.
+
+        Returns:
+            Status code and lowercased response headers.
+        """
+        if self.writer is None:
+            await self._open()
+        assert self.reader is not None and self.writer is not None
+
+        target, host = _request_target(url)
+        self.writer.write(
+            (
+                f"{method} {target} HTTP/1.1\r\n"
+                f"Host: {host}\r\n"
+                f"User-Agent: ai-fundamentals-link-checker/{__version__}\r\n"
+                "Accept: */*\r\n"
+                "Connection: keep-alive\r\n\r\n"
+            ).encode("latin-1")
+        )
+        await self.writer.drain()
+
+        head = await self.reader.readuntil(b"\r\n\r\n")
+        status, headers, keep_alive = _parse_head(head)
+        # Bodies are never read, so only bodiless HEAD responses leave the connection reusable.
+        if method != "HEAD" or not keep_alive:
+            self.close()
+        return status, headers
+
+    async def _open(self) -> None:
+        """Open the TCP (and TLS) connection."""
+        import asyncio
+
+        scheme, host, port = self.origin
+        self.reader, self.writer = await asyncio.open_connection(
+            host,
+            port,
+            ssl=self.ssl_context if scheme == "https" else None,
+            limit=MAX_HEADER_BYTES,
+        )
+        self.connects += 1
+
+    def close(self) -> None:
+        """Close the connection if it is open."""
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+
+def _parse_head(head: bytes) -> Tuple[int, Dict[str, str], bool]:
+    """Parse a response status line and headers.
+
+    Args:
+        head: Raw response head including the terminating blank line.
+
+    Returns:
+        Status code, lowercased headers and whether the connection may be reused.
+
+    Raises:
+        ConnectionError: If the status line is malformed.
+    """
+    lines = head.decode("latin-1").split("\r\n")
+    status_line = lines[0].split(None, 2)
+    if len(status_line) < 2 or not status_line[0].startswith("HTTP/") or not status_line[1].isdigit():
+        raise ConnectionError(f"malformed status line: {lines[0]!r}")
+
+    headers = {}
+    for line in lines[1:]:
+        name, sep, value = line.partition(":")
+        if sep:
+            headers[name.strip().lower()] = value.strip()
+
+    connection = headers.get("connection", "").lower()
+    keep_alive = status_line[0] == "HTTP/1.1" and connection != "close"
+    return int(status_line[1]), headers, keep_alive
+
+
+def _request_target(url: str) -> Tuple[str, str]:
+    """Encode the request target and ``Host`` header of a URL as ASCII.
+
+    Non-ASCII characters in the path and query are percent-encoded as UTF-8,
+    the host name is IDNA-encoded and any ``user:password@`` is left out.
+
+    Args:
+        url: Absolute http(s) URL.
+
+    Returns:
+        Request target and ``Host`` header value.
+
+    Raises:
+        ValueError: If the host name or port cannot be encoded.
+    """
+    parts = urlsplit(url)
+    target = quote(parts.path or "/", safe=SAFE_URL_CHARS)
+    if parts.query:
+        target += "?" + quote(parts.query, safe=SAFE_URL_CHARS)
+    hostname = parts.hostname or ""
+    host = f"[{hostname}]" if ":" in hostname else hostname.encode("idna").decode("ascii")
+    if parts.port is not None:
+        host += f":{parts.port}"
+    return target, host
+
+
+def _origin(url: str) -> Optional[Origin]:
+    """Extract the origin of an http(s) URL.
+
+    Args:
+        url: Absolute URL.
+
+    Returns:
+        ``(scheme, host, port)``, or None if the URL is not http(s).
+    """
+    parts = urlsplit(url)
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        return None
+    try:
+        port = parts.port or (443 if parts.scheme == "https" else 80)
+    except ValueError:
+        return None
+    return parts.scheme, parts.hostname, port
+
+
+class ExternalLinkChecker:
+    """Checks external URLs concurrently over pooled keep-alive connections.
+
+    URLs are grouped by origin. Every origin is checked at the same time,
+    each through at most ``per_host`` connections that are reused for all of
+    its URLs, so wall time grows with the number of hosts rather than the
+    number of links. HEAD is tried first and GET is used when HEAD fails.
+    """
+
+    def __init__(
+        self,
+        cache: Optional[ExternalLinkCache] = None,
+        timeout: float = DEFAULT_TIMEOUT,
+        per_host: int = DEFAULT_PER_HOST,
+        max_connections: int = DEFAULT_MAX_CONNECTIONS,
+    ):
+        """Initialize checker.
+
+        Args:
+            cache: Optional persistent result cache.
+            timeout: Seconds allowed for each request.
+            per_host: Maximum concurrent connections to one origin.
+            max_connections: Maximum concurrent connections overall.
+        """
+        self.cache = cache
+        self.timeout = timeout
+        self.per_host = per_host
+        self.max_connections = max_connections
+        self.connections_opened = 0
+        self._ssl_context: Optional["ssl.SSLContext"] = None
+
+    def check(self, urls: Iterable[str]) -> Dict[str, LinkStatus]:
+        """Check URLs, consulting the cache first.
+
+        Args:
+            urls: URLs to check; duplicates are checked once.
+
+        Returns:
+            Results keyed by normalized URL.
+        """
+        unique = sorted({normalize_url(url) for url in urls})
+        results: Dict[str, LinkStatus] = {}
+        pending = []
+        for url in unique:
+            cached = self.cache.get(url) if self.cache is not None else None
+            if cached is None:
+                pending.append(url)
+            else:
+                results[url] = cached
+
+        if pending:
+            import asyncio
+
+            fresh = asyncio.run(self.check_async(pending))
+            results.update(fresh)
+            if self.cache is not None:
+                for status in fresh.values():
+                    self.cache.put(status)
+                self.cache.save()
+
+        logger.info("Checked %s external links (%s cached)", len(unique), len(unique) - len(pending))
+        return results
+
+    async def check_async(self, urls: Iterable[str]) -> Dict[str, LinkStatus]:
+        """Check URLs without consulting the cache.
+
+        Args:
+            urls: Normalized URLs to check.
+
+        Returns:
+            Results keyed by URL.
+        """
+        import asyncio
+
+        results: Dict[str, LinkStatus] = {}
+        by_origin: Dict[Origin, List[str]] = defaultdict(list)
+        for url in urls:
+            origin = _origin(url)
+            if origin is None:
+                results[url] = LinkStatus(url, False, 0, "unsupported URL")
+            else:
+                by_origin[origin].append(url)
+
+        limit = asyncio.Semaphore(self.max_connections)
+        workers = []
+        for origin, origin_urls in by_origin.items():
+            queue = list(reversed(origin_urls))
+            for _ in range(min(self.per_host, len(origin_urls))):
+                workers.append(self._origin_worker(origin, queue, results, limit))
+        await asyncio.gather(*workers)
+        return results
+
+    async def _origin_worker(
+        self, origin: Origin, queue: List[str], results: Dict[str, LinkStatus], limit: "asyncio.Semaphore"
+    ) -> None:
+        """Check URLs from an origin's queue over one kept-alive connection.
+
+        Args:
+            origin: Origin shared by every URL in the queue.
+            queue: URLs still to check; shared with the origin's other workers.
+            results: Receives each result.
+            limit: Caps concurrent connections overall.
+        """
+        async with limit:
+            connection = _Connection(origin, self.timeout, self._tls_context())
+            try:
+                while queue:
+                    url = queue.pop()
+                    results[url] = await self._check_url(connection, url)
+            finally:
+                connection.close()
+                self.connections_opened += connection.connects
+
+    async def _check_url(self, connection: _Connection, url: str) -> LinkStatus:
+        """Check one URL, following redirects.
+
+        Args:
+            connection: Kept-alive connection to the URL's origin.
+            url: URL to check.
+
+        Returns:
+            Result for the URL.
+        """
+        import asyncio
+        import ssl
+
+        current = url
+        try:
+            for _ in range(MAX_REDIRECTS + 1):
+                status, location = await self._fetch(connection, current)
+                if status not in REDIRECT_STATUSES or not location:
+                    ok = status < 400 or status == RETRY_LATER_STATUS
+                    return LinkStatus(url, ok, status, f"HTTP {status}")
+                current = urljoin(current, location)
+            return LinkStatus(url, False, 0, "too many redirects")
+        except asyncio.TimeoutError:
+            return LinkStatus(url, False, 0, "timed out")
+        except (OSError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ssl.SSLError) as e:
+            return LinkStatus(url, False, 0, str(e) or type(e).__name__)
+        except ValueError as e:
+            # Includes UnicodeError from host names that cannot be IDNA-encoded.
+            return LinkStatus(url, False, 0, f"invalid URL: {e}")
+
+    async def _fetch(self, connection: _Connection, url: str) -> Tuple[int, str]:
+        """Request a URL with HEAD, falling back to GET.
+
+        Args:
+            connection: Kept-alive connection, used if the URL is on its origin.
+            url: URL to request.
+
+        Returns:
+            Status code and the ``Location`` header, if any.
+        """
+        origin = _origin(url)
+        if origin is None:
+            raise ConnectionError(f"unsupported redirect target {url}")
+
+        own = connection if origin == connection.origin else _Connection(origin, self.timeout, self._tls_context())
+        try:
+            status, headers = await own.request("HEAD", url)
+            if status >= 400 and status != RETRY_LATER_STATUS:
+                status, headers = await own.request("GET", url)
+            return status, headers.get("location", "")
+        finally:
+            if own is not connection:
+                own.close()
+                self.connections_opened += own.connects
+
+    def _tls_context(self) -> "ssl.SSLContext":
+        """Return the shared TLS context, creating it on first use."""
+        if self._ssl_context is None:
+            import ssl
+
+            self._ssl_context = ssl.create_default_context()
+        return self._ssl_context
@@ -0,0 +1,385 @@
+"""Automatic repair of broken links, skipped heading levels and unclosed fences."""
+
+import difflib
+import logging
+import os
+import posixpath
+import re
+import shutil
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+from urllib.parse import quote
+
+from src.diagnostics import BROKEN_LINK, HEADING_INCREMENT, UNCLOSED_FENCE, Diagnostic
+from src.path_index import PathIndex
+from src.rules import split_link_target
+from src.scanner import LINK_BODY, Header, MarkdownScanner
+from src.utils import FileResult, content_digest
+
+logger = logging.getLogger(__name__)
+
+FIXABLE = frozenset({BROKEN_LINK, HEADING_INCREMENT, UNCLOSED_FENCE})
+
+# Files handed to a writer thread at a time.
+BATCH_SIZE = 64
+
+LINK_PATTERN = re.compile(LINK_BODY)
+LINE_PATTERN = re.compile(r"[^\n]*\n|[^\n]+\Z")
+
+# Path part of a link destination; angle-bracketed destinations are left alone.
+DESTINATION_PATH_PATTERN = re.compile(r"\s*([^<#?\s][^#?\s]*)")
+
+
+class FileFix(NamedTuple):
+    """What was fixed in one file."""
+
+    path: Path
+    fixed: List[Diagnostic]
+    diff: str = ""
+
+
+class FileLocator:
+    """Finds where the target of a broken link went.
+
+    A missing target is looked up first by the content digest the
+    validation cache recorded for it before it moved, then by its file name.
+    Only a match that is unique across the tree is used.
+    """
+
+    def __init__(self, files: Iterable[str], digests: Dict[str, str], previous: Dict[str, str]):
+        """Index the tree.
+
+        Args:
+            files: Every file in the tree, relative to the root in POSIX form.
+            digests: Current content digest of files, by relative path.
+            previous: Content digest of files as of the last cached run, by
+                relative path; may name files that no longer exist.
+        """
+        self.by_name: Dict[str, List[str]] = defaultdict(list)
+        for rel_path in files:
+            self.by_name[posixpath.basename(rel_path)].append(rel_path)
+        self.by_digest: Dict[str, List[str]] = defaultdict(list)
+        for rel_path, digest in digests.items():
+            self.by_digest[digest].append(rel_path)
+        self.previous = previous
+
+    @classmethod
+    def from_index(cls, index: PathIndex, outcomes: Dict[Path, FileResult], previous: Dict[str, str]) -> "FileLocator":
+        """Build a locator from a scanned tree and a run's results.
+
+        Args:
+            index: Index of every path in the tree.
+            outcomes: Validation results, whose digests identify files by
+                content.
+            previous: Cached content digest by absolute path.
+
+        Returns:
+            Locator over the tree.
+        """
+        root = str(index.root_path)
+        digests = {
+            Path(file_path).relative_to(root).as_posix(): result.digest
+            for file_path, result in outcomes.items()
+            if result.digest is not None
+        }
+        old = {}
+        for path, digest in previous.items():
+            rel_path = os.path.relpath(path, root).replace(os.sep, "/")
+            if not rel_path.startswith("../"):
+                old[rel_path] = digest
+        return cls(index.files, digests, old)
+
+    def locate(self, rel_path: str) -> Optional[str]:
+        """Find the file a missing path most likely became.
+
+        Args:
+            rel_path: Missing path relative to the root.
+
+        Returns:
+            Relative path of the unique match, or None.
+        """
+        digest = self.previous.get(rel_path)
+        if digest is not None:
+            matches = self.by_digest.get(digest, [])
+            if len(matches) == 1:
+                return matches[0]
+        matches = self.by_name.get(posixpath.basename(rel_path), [])
+        return matches[0] if len(matches) == 1 else None
+
+
+def fix_text(
+    content: str, rel_path: str, diagnostics: Sequence[Diagnostic], locator: FileLocator
+) -> Tuple[str, List[Diagnostic]]:
+    """Fix what can be fixed in a document.
+
+    Broken links whose target can be located are rewritten, heading levels
+    are renumbered so none is skipped, and a fence left open at the end is
+    closed. Line endings are kept.
+
+    Args:
+        content: Document text.
+        rel_path: Document path relative to the root in POSIX form.
+        diagnostics: The document's diagnostics.
+        locator: Finds moved link targets.
+
+    Returns:
+        Fixed text and the diagnostics it resolves.
+    """
+    lines = content.split("\n")
+    links = [diagnostic for diagnostic in diagnostics if diagnostic.rule == BROKEN_LINK]
+    fixed = _fix_links(lines, posixpath.dirname(rel_path), links, locator)
+
+    increments = [diagnostic for diagnostic in diagnostics if diagnostic.rule == HEADING_INCREMENT]
+    if increments:
+        _normalize_headings(content, lines)
+        fixed += increments
+
+    text = "\n".join(lines)
+    fences = [diagnostic for diagnostic in diagnostics if diagnostic.rule == UNCLOSED_FENCE]
+    if fences:
+        text = _close_fence(text)
+        fixed += fences
+    return text, fixed
+
+
+def _fix_links(
+    lines: List[str], directory: str, diagnostics: List[Diagnostic], locator: FileLocator
+) -> List[Diagnostic]:
+    """Point broken links at where their targets went.
+
+    Args:
+        lines: Document lines; fixed in place.
+        directory: Document directory relative to the root.
+        diagnostics: Broken link diagnostics.
+        locator: Finds moved link targets.
+
+    Returns:
+        Diagnostics whose links were rewritten.
+    """
+    fixed = []
+    # Right to left, so the columns of earlier links on the same line stay valid.
+    for diagnostic in sorted(diagnostics, key=lambda item: (item.line, item.column), reverse=True):
+        if not 0 < diagnostic.line <= len(lines):
+            continue
+        text = lines[diagnostic.line - 1]
+        match = LINK_PATTERN.match(text, diagnostic.column - 1)
+        if match is None:
+            continue
+        replacement = _relocate(match.group("url"), directory, locator)
+        if replacement is None:
+            continue
+        start, end = match.span("url")
+        lines[diagnostic.line - 1] = text[:start] + replacement + text[end:]
+        fixed.append(diagnostic)
+    return fixed[::-1]
+
+
+def _relocate(url: str, directory: str, locator: FileLocator) -> Optional[str]:
+    """Rewrite a link destination to the located target.
+
+    Args:
+        url: Raw link destination.
+        directory: Directory of the linking document relative to the root.
+        locator: Finds moved link targets.
+
+    Returns:
+        New destination with the fragment, query and title kept, or None if
+        the target cannot be located.
+    """
+    path = split_link_target(url)[0]
+    raw_path = DESTINATION_PATH_PATTERN.match(url)
+    if raw_path is None or not path or path.startswith("/"):
+        return None
+    found = locator.locate(posixpath.normpath(posixpath.join(directory, path)))
+    if found is None:
+        return None
+    start, end = raw_path.span(1)
+    return url[:start] + quote(posixpath.relpath(found, directory or ".")) + url[end:]
+
+
+def _normalize_headings(content: str, lines: List[str]) -> None:
+    """Renumber headings so each is at most one level below its parent.
+
+    A heading's parent is the nearest earlier heading that was written with
+    a lower level, so siblings stay siblings. Only the first heading without
+    a parent becomes the title; later ones become H2 unless written as H1,
+    so no second H1 is added. Documents without skipped levels are left
+    unchanged.
+
+    Args:
+        content: Document text, for finding headings outside code fences.
+        lines: Document lines; fixed in place.
+    """
+    stack: List[Tuple[int, int]] = []
+    first = True
+    for event in MarkdownScanner().feed(content):
+        if not isinstance(event, Header):
+            continue
+        while stack and stack[-1][0] >= event.level:
+            stack.pop()
+        if stack:
+            level = stack[-1][1] + 1
+        else:
+            level = 1 if event.level == 1 or first else 2
+        first = False
+        stack.append((event.level, level))
+        if level != event.level:
+            lines[event.line - 1] = "#" * level + lines[event.line - 1][event.level :]
+
+
+def _close_fence(text: str) -> str:
+    """Close a code fence left open at the end of a document.
+
+    Args:
+        text: Document text.
+
+    Returns:
+        Text with a closing fence appended if one was missing.
+    """
+    scanner = MarkdownScanner()
+    for _ in scanner.feed(text):
+        pass
+    if scanner.fence is None:
+        return text
+    newline = "\r\n" if "\r\n" in text else "\n"
+    if text and not text.endswith("\n"):
+        text += newline
+    return text + scanner.fence + newline
+
+
+def unified_diff(before: str, after: str, rel_path: str) -> str:
+    """Describe a change to a file as a unified diff that ``git apply`` accepts.
+
+    Args:
+        before: Original text.
+        after: Fixed text.
+        rel_path: File path relative to the root in POSIX form.
+
+    Returns:
+        Diff text.
+    """
+    lines = difflib.unified_diff(
+        LINE_PATTERN.findall(before), LINE_PATTERN.findall(after), f"a/{rel_path}", f"b/{rel_path}"
+    )
+    return "".join(line if line.endswith("\n") else line + "\n\\ No newline at end of file\n" for line in lines)
+
+
+def write_atomic(file_path: Path, data: bytes) -> None:
+    """Replace a file's content so readers see either the old or the new file.
+
+    The data is written to a temporary file next to the target, which is
+    then renamed over it. Symlinks are followed, and permissions are kept.
+
+    Args:
+        file_path: File to replace.
+        data: New content.
+
+    Raises:
+        OSError: If the file cannot be written.
+    """
+    target = Path(os.path.realpath(file_path))
+    tmp_file = target.with_name(f".{target.name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp_file, "wb") as handle:
+            handle.write(data)
+        shutil.copymode(target, tmp_file)
+        os.replace(tmp_file, target)
+    except BaseException:
+        tmp_file.unlink(missing_ok=True)
+        raise
+
+
+class Fixer:
+    """Fixes the diagnostics of a whole run in parallel batches.
+
+    Files are read once, fixed in memory and written atomically. A file
+    whose content no longer has the digest it was validated with has been
+    edited since and is left alone.
+    """
+
+    def __init__(self, root_path: Path, locator: FileLocator, dry_run: bool = False, jobs: int = 1):
+        """Initialize fixer.
+
+        Args:
+            root_path: Root directory of the tree.
+            locator: Finds moved link targets.
+            dry_run: Compute diffs instead of writing files.
+            jobs: Number of threads fixing batches of files.
+        """
+        self.root_path = Path(root_path)
+        self.locator = locator
+        self.dry_run = dry_run
+        self.jobs = jobs
+
+    def fix(self, results: Dict[Path, List[Diagnostic]], outcomes: Dict[Path, FileResult]) -> List[FileFix]:
+        """Fix every file with fixable diagnostics.
+
+        Args:
+            results: Diagnostics per file from a validation run.
+            outcomes: Validation results per file, for their digests.
+
+        Returns:
+            Files that were changed, or would be on a dry run, in sorted order.
+        """
+        work = []
+        for file_path, diagnostics in sorted(results.items()):
+            fixable = [diagnostic for diagnostic in diagnostics if diagnostic.rule in FIXABLE]
+            if fixable:
+                outcome = outcomes.get(file_path)
+                work.append((file_path, fixable, outcome.digest if outcome is not None else None))
+        batches = [work[start : start + BATCH_SIZE] for start in range(0, len(work), BATCH_SIZE)]
+        logger.debug("Fixing %s files in %s batches on %s threads", len(work), len(batches), self.jobs)
+
+        with ThreadPoolExecutor(max_workers=max(self.jobs, 1)) as executor:
+            return [fix for fixes in executor.map(self._fix_batch, batches) for fix in fixes]
+
+    def _fix_batch(self, batch: List[Tuple[Path, List[Diagnostic], Optional[str]]]) -> List[FileFix]:
+        """Fix a batch of files.
+
+        Args:
+            batch: Files with their fixable diagnostics and validated digest.
+
+        Returns:
+            Files that changed.
+        """
+        fixes = (self._fix_file(*item) for item in batch)
+        return [fix for fix in fixes if fix is not None]
+
+    def _fix_file(self, file_path: Path, diagnostics: List[Diagnostic], digest: Optional[str]) -> Optional[FileFix]:
+        """Fix one file.
+
+        Args:
+            file_path: File to fix.
+            diagnostics: Its fixable diagnostics.
+            digest: Digest of the content it was validated with.
+
+        Returns:
+            What was fixed, or None if nothing changed.
+        """
+        try:
+            data = file_path.read_bytes()
+        except OSError as e:
+            logger.warning("Cannot read %s: %s", file_path, e)
+            return None
+        if digest is not None and content_digest(data) != digest:
+            logger.warning("Not fixing %s: it changed after it was validated", file_path)
+            return None
+
+        rel_path = file_path.relative_to(self.root_path).as_posix()
+        content = data.decode("utf-8")
+        text, fixed = fix_text(content, rel_path, diagnostics, self.locator)
+        if text == content:
+            return None
+        if self.dry_run:
+            return FileFix(file_path, fixed, unified_diff(content, text, rel_path))
+        try:
+            write_atomic(file_path, text.encode("utf-8"))
+        except OSError as e:
+            logger.error("Cannot write %s: %s", file_path, e)
+            return None
+        for diagnostic in fixed:
+            extra = {"file": rel_path, "rule": diagnostic.rule}
+            logger.debug("Fixed %s at %s:%s", diagnostic.rule, rel_path, diagnostic.line, extra=extra)
+        return FileFix(file_path, fixed)
@@ -0,0 +1,488 @@
+"""Link graph of a documentation tree and its structural analysis."""
+
+import json
+import os
+from array import array
+from collections import deque
+from pathlib import Path
+from typing import Any, Deque, Dict, Iterable, List, Optional, Set, TextIO
+
+from src.utils import LinkChecker
+
+INDEX_FILE_NAME = "README.md"
+
+
+class LinkGraph:
+    """Markdown files as numbered nodes and the links between them.
+
+    Each node's outgoing links are stored as an array of target node ids, and
+    in-degrees as one array over all nodes, so large sites stay compact.
+    Links to a directory count as links to its ``README.md``. Links from a
+    file to itself are left out. Ids of removed files are reused.
+    """
+
+    def __init__(self, root_path: Path):
+        """Create an empty graph.
+
+        Args:
+            root_path: Directory that node paths are shown relative to.
+        """
+        self.root_path = Path(root_path)
+        self.paths: List[Optional[Path]] = []
+        self.ids: Dict[str, int] = {}
+        self.keys: List[Optional[str]] = []
+        self.names: List[Optional[str]] = []
+        self.targets: List[array] = []
+        self.in_degree = array("l")
+        self._free: List[int] = []
+
+    @classmethod
+    def build(cls, checker: LinkChecker) -> "LinkGraph":
+        """Build the graph of every file a link checker has validated.
+
+        Args:
+            checker: Checker that has run ``check_all_links`` or ``iter_results``.
+
+        Returns:
+            Link graph.
+        """
+        graph = cls(checker.root_path)
+        files = sorted(checker.outcomes)
+        for file_path in files:
+            graph._add_node(_key(checker, file_path), file_path)
+        for file_path in files:
+            graph._set_links(graph.ids[_key(checker, file_path)], checker.outcomes[file_path].dependencies)
+        return graph
+
+    def update(self, checker: LinkChecker, files: Iterable[Path]) -> None:
+        """Bring the graph up to date after files were revalidated.
+
+        Files linking to a created or deleted file have their links
+        recomputed too, using the link targets the checker tracks.
+
+        Args:
+            checker: Checker whose results for ``files`` changed, for example
+                through ``refresh``.
+            files: Markdown files that were modified, created or deleted.
+        """
+        relink: Set[Path] = set()
+        for file_path in files:
+            key = _key(checker, file_path)
+            node = self.ids.get(key)
+            if file_path in checker.outcomes:
+                if node is None:
+                    self._add_node(key, file_path)
+                    relink.update(_linking_to(checker, key))
+                relink.add(file_path)
+            elif node is not None:
+                self._remove_node(node)
+                relink.update(_linking_to(checker, key))
+
+        for file_path in relink:
+            node = self.ids.get(_key(checker, file_path))
+            if node is not None and file_path in checker.outcomes:
+                self._set_links(node, checker.outcomes[file_path].dependencies)
+
+    def nodes(self) -> List[int]:
+        """Return the ids of the files in the graph."""
+        return [node for node, path in enumerate(self.paths) if path is not None]
+
+    def edge_count(self) -> int:
+        """Return the number of links between distinct files."""
+        return sum(len(targets) for targets in self.targets)
+
+    def node(self, path: Path) -> Optional[int]:
+        """Look up the node of a file.
+
+        Args:
+            path: File path.
+
+        Returns:
+            Node id, or None if the file is not in the graph.
+        """
+        return self.ids.get(os.path.realpath(path))
+
+    def relative(self, node: int) -> str:
+        """Return a node's path relative to the root, with forward slashes."""
+        name = self.names[node]
+        assert name is not None
+        return name
+
+    def reachable(self, roots: Iterable[int]) -> bytearray:
+        """Find the files that can be reached by following links.
+
+        Args:
+            roots: Nodes to start from.
+
+        Returns:
+            One flag per node id, set for the roots and every node reachable
+            from them.
+        """
+        seen = bytearray(len(self.paths))
+        queue: Deque[int] = deque()
+        for root in roots:
+            if not seen[root]:
+                seen[root] = 1
+                queue.append(root)
+        while queue:
+            for target in self.targets[queue.popleft()]:
+                if not seen[target]:
+                    seen[target] = 1
+                    queue.append(target)
+        return seen
+
+    def orphans(self, roots: Iterable[int]) -> List[int]:
+        """Find files that cannot be reached from the roots.
+
+        Args:
+            roots: Entry points such as the top-level README.
+
+        Returns:
+            Unreachable nodes in path order.
+        """
+        seen = self.reachable(roots)
+        return self._sorted(node for node in self.nodes() if not seen[node])
+
+    def unlinked(self) -> List[int]:
+        """Find files that no other file links to.
+
+        Returns:
+            Nodes without incoming links, in path order.
+        """
+        return self._sorted(node for node in self.nodes() if not self.in_degree[node])
+
+    def dead_ends(self) -> List[int]:
+        """Find files that link to no other file.
+
+        Returns:
+            Nodes without outgoing links, in path order.
+        """
+        return self._sorted(node for node in self.nodes() if not self.targets[node])
+
+    def cycles(self) -> List[List[int]]:
+        """Find the strongly connected components with more than one file.
+
+        Every file in such a component can reach every other one, so each is
+        a set of pages linking around in a loop.
+
+        Returns:
+            Components, each in path order, largest first.
+        """
+        components = [self._sorted(component) for component in self._components() if len(component) > 1]
+        return sorted(components, key=lambda component: (-len(component), self.relative(component[0])))
+
+    def most_linked(self, limit: int) -> List[int]:
+        """Rank files by how many other files link to them.
+
+        Args:
+            limit: Maximum number of files to return.
+
+        Returns:
+            Nodes with the highest in-degree first, ties in path order.
+        """
+        ranked = sorted(self.nodes(), key=lambda node: (-self.in_degree[node], self.relative(node)))
+        return ranked[:limit]
+
+    def _components(self) -> List[List[int]]:
+        """Compute strongly connected components.
+
+        Returns:
+            Every component, including single nodes.
+        """
+        tarjan = _Tarjan(self.targets)
+        for node in self.nodes():
+            if tarjan.index[node] == -1:
+                tarjan.visit(node)
+        return tarjan.components
+
+    def _sorted(self, nodes: Iterable[int]) -> List[int]:
+        """Sort nodes by relative path."""
+        return sorted(nodes, key=self.relative)
+
+    def _add_node(self, key: str, path: Path) -> int:
+        """Add a file without links.
+
+        Args:
+            key: Resolved path, as link targets are recorded.
+            path: Path of the file as the checker knows it.
+
+        Returns:
+            New node id.
+        """
+        name = os.path.relpath(path, self.root_path).replace(os.sep, "/")
+        if self._free:
+            node = self._free.pop()
+            self.paths[node] = path
+            self.keys[node] = key
+            self.names[node] = name
+        else:
+            node = len(self.paths)
+            self.paths.append(path)
+            self.keys.append(key)
+            self.names.append(name)
+            self.targets.append(array("l"))
+            self.in_degree.append(0)
+        self.ids[key] = node
+        return node
+
+    def _remove_node(self, node: int) -> None:
+        """Remove a file and its outgoing links.
+
+        Links into the file must be removed by updating the files that link to it.
+
+        Args:
+            node: Node to remove.
+        """
+        self._set_targets(node, array("l"))
+        key = self.keys[node]
+        assert key is not None
+        del self.ids[key]
+        self.paths[node] = None
+        self.keys[node] = None
+        self.names[node] = None
+        self._free.append(node)
+
+    def _set_links(self, node: int, dependencies: Dict[str, bool]) -> None:
+        """Replace a file's outgoing links from its recorded link targets.
+
+        Args:
+            node: File's node.
+            dependencies: Resolved link targets, as recorded by the links rule.
+        """
+        targets: Dict[int, None] = {}
+        for target_key in dependencies:
+            target = self.ids.get(target_key)
+            if target is None:
+                target = self.ids.get(os.path.join(target_key, INDEX_FILE_NAME))
+            if target is not None and target != node:
+                targets[target] = None
+        self._set_targets(node, array("l", sorted(targets)))
+
+    def _set_targets(self, node: int, targets: array) -> None:
+        """Replace a node's outgoing links, keeping in-degrees current.
+
+        Args:
+            node: Node whose links change.
+            targets: New distinct target ids.
+        """
+        for target in self.targets[node]:
+            self.in_degree[target] -= 1
+        for target in targets:
+            self.in_degree[target] += 1
+        self.targets[node] = targets
+
+
+class _Tarjan:
+    """Tarjan's strongly connected components algorithm.
+
+    The depth-first search keeps its own stack, so long chains of links do
+    not hit the recursion limit.
+    """
+
+    def __init__(self, targets: List[array]):
+        """Prepare a search.
+
+        Args:
+            targets: Outgoing links of each node id.
+        """
+        self.targets = targets
+        self.index = array("l", [-1]) * len(targets)
+        self.low = array("l", [0]) * len(targets)
+        self.on_stack = bytearray(len(targets))
+        self.stack: List[int] = []
+        self.components: List[List[int]] = []
+        self.counter = 0
+
+    def visit(self, start: int) -> None:
+        """Search from a node not visited yet, collecting completed components.
+
+        Args:
+            start: Node to start from.
+        """
+        index, low, on_stack = self.index, self.low, self.on_stack
+        work = [(start, 0)]
+        while work:
+            node, position = work.pop()
+            if position == 0:
+                index[node] = low[node] = self.counter
+                self.counter += 1
+                self.stack.append(node)
+                on_stack[node] = 1
+            targets = self.targets[node]
+            while position < len(targets):
+                target = targets[position]
+                position += 1
+                if index[target] == -1:
+                    work.append((node, position))
+                    work.append((target, 0))
+                    break
+                if on_stack[target] and index[target] < low[node]:
+                    low[node] = index[target]
+            else:
+                self._finish(node, work[-1][0] if work else None)
+
+    def _finish(self, node: int, parent: Optional[int]) -> None:
+        """Close a node whose links have all been followed.
+
+        Args:
+            node: Finished node.
+            parent: Node the search reached it from, if any.
+        """
+        if self.low[node] == self.index[node]:
+            component = []
+            while True:
+                member = self.stack.pop()
+                self.on_stack[member] = 0
+                component.append(member)
+                if member == node:
+                    break
+            self.components.append(component)
+        if parent is not None and self.low[node] < self.low[parent]:
+            self.low[parent] = self.low[node]
+
+
+def _key(checker: LinkChecker, file_path: Path) -> str:
+    """Resolve a file path the way link targets are resolved.
+
+    Args:
+        checker: Checker that indexed the tree.
+        file_path: Markdown file.
+
+    Returns:
+        Resolved path.
+    """
+    if checker.path_index is not None:
+        return checker.path_index.lookup(str(file_path))[0]
+    return os.path.realpath(file_path)
+
+
+def _linking_to(checker: LinkChecker, key: str) -> Set[Path]:
+    """Find the files with a link to a file or to its directory as an index page.
+
+    Args:
+        checker: Checker tracking link targets.
+        key: Resolved path of a markdown file.
+
+    Returns:
+        Files whose links may point at the file.
+    """
+    files = set(checker.dependents.get(key, ()))
+    if os.path.basename(key) == INDEX_FILE_NAME:
+        files.update(checker.dependents.get(os.path.dirname(key), ()))
+    return files
+
+
+class GraphReport:
+    """Orphans, dead ends, cycles and link counts of a link graph."""
+
+    def __init__(self, graph: LinkGraph, roots: List[int], top: int = 10):
+        """Analyse a graph.
+
+        Args:
+            graph: Link graph.
+            roots: Entry points. Without any, files no other file links to
+                are reported as orphans.
+            top: Number of most-linked files to list.
+        """
+        self.graph = graph
+        self.roots = roots
+        self.orphans = graph.orphans(roots) if roots else graph.unlinked()
+        self.dead_ends = graph.dead_ends()
+        self.cycles = graph.cycles()
+        self.most_linked = graph.most_linked(top)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the report and the graph as JSON-compatible data.
+
+        Returns:
+            Nodes with their degrees, edges as pairs of node ids, and the
+            analysis results as lists of relative paths.
+        """
+        graph = self.graph
+        nodes = graph.nodes()
+        return {
+            "nodes": [
+                {
+                    "id": node,
+                    "path": graph.relative(node),
+                    "in_degree": graph.in_degree[node],
+                    "out_degree": len(graph.targets[node]),
+                }
+                for node in nodes
+            ],
+            "edges": [[node, target] for node in nodes for target in graph.targets[node]],
+            "roots": [graph.relative(node) for node in self.roots],
+            "orphans": [graph.relative(node) for node in self.orphans],
+            "dead_ends": [graph.relative(node) for node in self.dead_ends],
+            "cycles": [[graph.relative(node) for node in component] for component in self.cycles],
+            "most_linked": [
+                {"path": graph.relative(node), "in_degree": graph.in_degree[node]} for node in self.most_linked
+            ],
+        }
+
+    def write_json(self, stream: TextIO) -> None:
+        """Write the report as JSON.
+
+        The output is not indented: indenting switches ``json`` to its much
+        slower pure-Python encoder, which matters for graphs with millions of
+        links.
+
+        Args:
+            stream: Text stream to write to.
+        """
+        json.dump(self.to_dict(), stream, separators=(",", ":"))
+        stream.write("\n")
+
+    def write_dot(self, stream: TextIO) -> None:
+        """Write the graph in Graphviz DOT format.
+
+        Roots are drawn as boxes, orphans are filled grey and files in cycles
+        are outlined in red.
+
+        Args:
+            stream: Text stream to write to.
+        """
+        graph = self.graph
+        roots = set(self.roots)
+        orphans = set(self.orphans)
+        in_cycle = {node for component in self.cycles for node in component}
+        stream.write("digraph docs {\n  node [shape=ellipse];\n")
+        for node in graph.nodes():
+            attributes = [f"label={json.dumps(graph.relative(node))}"]
+            if node in roots:
+                attributes.append("shape=box")
+            if node in orphans:
+                attributes.append('style=filled, fillcolor="#dddddd"')
+            if node in in_cycle:
+                attributes.append("color=red")
+            stream.write(f"  n{node} [{', '.join(attributes)}];\n")
+        for node in graph.nodes():
+            for target in graph.targets[node]:
+                stream.write(f"  n{node} -> n{target};\n")
+        stream.write("}\n")
+
+    def write_text(self, stream: TextIO) -> None:
+        """Write a readable summary.
+
+        Args:
+            stream: Text stream to write to.
+        """
+        graph = self.graph
+        nodes = graph.nodes()
+        stream.write(f"{len(nodes)} files, {graph.edge_count()} links\n")
+        roots = ", ".join(graph.relative(node) for node in self.roots) or "none; files without incoming links"
+        stream.write(f"Roots: {roots}\n")
+        sections = [
+            ("Orphans (not reachable from the roots)", self.orphans),
+            ("Dead ends (no links to other files)", self.dead_ends),
+        ]
+        for title, found in sections:
+            stream.write(f"\n{title}: {len(found)}\n")
+            for node in found:
+                stream.write(f"  {graph.relative(node)}\n")
+        stream.write(f"\nCycles: {len(self.cycles)}\n")
+        for component in self.cycles:
+            stream.write(f"  {len(component)} files: {', '.join(graph.relative(node) for node in component)}\n")
+        stream.write("\nMost linked:\n")
+        for node in self.most_linked:
+            stream.write(f"  {graph.in_degree[node]:>6}  {graph.relative(node)}\n")
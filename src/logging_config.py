@@ -1,18 +1,93 @@
 """Logging configuration for AI Fundamentals project."""
 
+import atexit
+import json
 import logging
 import logging.config
-from typing import Optional
+import logging.handlers
+import queue
+from typing import Any, Dict, List, Optional
 
+# Record attributes passed through ``extra`` that JSON output carries as fields.
+STRUCTURED_FIELDS = ("file", "rule", "duration")
 
-def configure_logging(level: Optional[str] = None) -> None:
+# The package's loggers, and the CLI's when it runs as ``python -m src.cli``.
+LOGGERS = ("src", "__main__")
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats each record as a JSON object on one line.
+
+    Besides the time, level, logger and message, a record carries the
+    structured fields it was logged with, such as
+    ``logger.debug("Validated %s", path, extra={"file": path, "duration": seconds})``.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        """Format a record.
+
+        Args:
+            record: Log record.
+
+        Returns:
+            JSON text without a trailing newline.
+        """
+        data: Dict[str, Any] = {
+            "time": self.formatTime(record, self.datefmt),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for field in STRUCTURED_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                data[field] = value
+        if record.exc_info:
+            data["exception"] = self.formatException(record.exc_info)
+        return json.dumps(data, default=str)
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """Queues records without formatting them.
+
+    The standard handler merges the message arguments before queueing so
+    records survive pickling; a listener in the same process can leave all
+    formatting to its own thread. Arguments must therefore not be mutated
+    after they are logged.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """Return the record unchanged.
+
+        Args:
+            record: Log record.
+
+        Returns:
+            The same record.
+        """
+        return record
+
+
+def configure_logging(level: Optional[str] = None, json_format: bool = False, use_queue: bool = False) -> None:
     """Configure structured logging.
 
+    Records of the ``LOGGERS`` are written to stderr and still propagate,
+    so handlers an embedding application put on the root logger see them
+    too.
+
     Args:
         level: Logging level (DEBUG, INFO, WARNING, ERROR, CRITICAL).
                Defaults to INFO.
+        json_format: Write one JSON object per record instead of text.
+        use_queue: Hand records to a background thread that formats and
+            writes them, so logging never waits for a slow stderr. Queued
+            records are flushed when the process exits or
+            ``stop_logging`` is called.
     """
     log_level = level or "INFO"
+    stop_logging()
 
     config = {
         "version": 1,
@@ -28,26 +103,53 @@ def configure_logging(level: Optional[str] = None) -> None:
                 ),
                 "datefmt": "%Y-%m-%d %H:%M:%S",
             },
+            "json": {
+                "()": JsonFormatter,
+                "datefmt": "%Y-%m-%dT%H:%M:%S%z",
+            },
         },
         "handlers": {
             "console": {
                 "class": "logging.StreamHandler",
                 "level": log_level,
-                "formatter": "standard",
+                "formatter": "json" if json_format else "standard",
                 "stream": "ext://sys.stderr",
             },
         },
-        "loggers": {
-            "src": {
-                "level": log_level,
-                "handlers": ["console"],
-                "propagate": False,
-            },
-        },
-        "root": {
-            "level": log_level,
-            "handlers": ["console"],
-        },
+        "loggers": {name: {"level": log_level, "handlers": ["console"]} for name in LOGGERS},
     }
 
     logging.config.dictConfig(config)
+    if use_queue:
+        _start_queue([logging.getLogger(name) for name in LOGGERS])
+
+
+def _start_queue(loggers: List[logging.Logger]) -> None:
+    """Move the handlers of loggers behind a queue served by a listener thread.
+
+    Args:
+        loggers: Loggers whose handlers are moved.
+    """
+    global _listener
+    records: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    handler = DeferredQueueHandler(records)
+    handlers: List[logging.Handler] = []
+    for logger in loggers:
+        for moved in list(logger.handlers):
+            logger.removeHandler(moved)
+            if moved not in handlers:
+                handlers.append(moved)
+        logger.addHandler(handler)
+    _listener = logging.handlers.QueueListener(records, *handlers, respect_handler_level=True)
+    _listener.start()
+
+
+def stop_logging() -> None:
+    """Write out queued records and stop the listener thread, if one runs."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(stop_logging)
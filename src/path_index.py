@@ -0,0 +1,249 @@
+"""In-memory index of repository paths for fast link resolution."""
+
+import os
+import stat
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+from src.walker import Walker
+
+
+class PathIndex:
+    """Snapshot of the files, directories and symlinks under a root.
+
+    Link targets are resolved against the snapshot with the same semantics as
+    ``Path.resolve()`` followed by ``exists()``, but without touching the
+    filesystem. Paths that leave the indexed root, or that lie inside a
+    directory the walker pruned, fall back to real syscalls.
+    """
+
+    def __init__(self, root_path: Path, walker: Optional[Walker] = None):
+        """Initialize an empty index.
+
+        Args:
+            root_path: Root directory the index covers.
+            walker: Walker deciding what is indexed; defaults to one with the
+                standard excludes.
+        """
+        self.root_path = Path(root_path)
+        self.real_root = os.path.realpath(self.root_path)
+        self.walker = walker or Walker(self.root_path)
+        self.files: Set[str] = set()
+        self.dirs: Set[str] = set()
+        self.symlinks: Dict[str, str] = {}
+        self.pruned: Set[str] = set()
+        self.markdown: Set[str] = set()
+        self.fallbacks = 0
+        self._abs_root = os.path.abspath(self.root_path)
+        self._prefixes = (os.path.join(self._abs_root, ""), os.path.join(self.real_root, ""))
+
+    @classmethod
+    def build(cls, root_path: Path, walker: Optional[Walker] = None) -> "PathIndex":
+        """Walk a directory tree and index everything in scope.
+
+        Symlinked directories are recorded but not descended into, matching
+        ``Path.rglob``. Excluded directories are recorded as pruned and not
+        descended into either.
+
+        Args:
+            root_path: Root directory to walk.
+            walker: Walker deciding what is indexed.
+
+        Returns:
+            Populated index.
+        """
+        index = cls(root_path, walker)
+        index._scan("")
+        return index
+
+    def _scan(self, rel_dir: str) -> None:
+        """Index everything below a directory.
+
+        Args:
+            rel_dir: Directory relative to the root; empty for the root itself.
+        """
+        result = self.walker.walk(rel_dir)
+        self.files.update(result.files)
+        self.dirs.update(result.dirs)
+        self.symlinks.update(result.symlinks)
+        self.pruned.update(result.pruned)
+        self.markdown.update(result.markdown)
+
+    def update(self, path: Path) -> bool:
+        """Bring one path, and everything below it, in line with the filesystem.
+
+        Args:
+            path: Path under the root that may have been created, modified or
+                deleted.
+
+        Returns:
+            True if the path was created or deleted.
+        """
+        rel_path = self._relative(os.path.abspath(path))
+        if not rel_path or self._in_pruned(rel_path):
+            return False
+
+        existed = any(rel_path in keys for keys in (self.files, self.dirs, self.symlinks, self.pruned))
+        self._forget(rel_path)
+        try:
+            mode = os.lstat(path).st_mode
+        except OSError:
+            return existed
+
+        if stat.S_ISDIR(mode):
+            if self.walker.is_excluded(rel_path, True):
+                self.pruned.add(rel_path)
+            else:
+                self.dirs.add(rel_path)
+                self._scan(rel_path)
+            return not existed
+
+        if stat.S_ISLNK(mode):
+            self.symlinks[rel_path] = os.path.realpath(path)
+        else:
+            self.files.add(rel_path)
+        if rel_path.endswith(".md") and not self.walker.is_excluded(rel_path, False):
+            self.markdown.add(rel_path)
+        return not existed
+
+    def _forget(self, rel_path: str) -> None:
+        """Remove a path and, if it is a directory, its contents from the index.
+
+        Args:
+            rel_path: Path relative to the root.
+        """
+        self.files.discard(rel_path)
+        self.symlinks.pop(rel_path, None)
+        self.markdown.discard(rel_path)
+        self.pruned.discard(rel_path)
+        if rel_path not in self.dirs:
+            return
+        self.dirs.discard(rel_path)
+        prefix = rel_path + "/"
+        for keys in (self.files, self.dirs, self.pruned, self.markdown):
+            keys.difference_update([key for key in keys if key.startswith(prefix)])
+        for key in [key for key in self.symlinks if key.startswith(prefix)]:
+            del self.symlinks[key]
+
+    def markdown_files(self) -> List[Path]:
+        """List markdown files in scope, including symlinks named ``*.md``.
+
+        Returns:
+            Paths under the root as given to the index.
+        """
+        return [self.root_path / rel_path for rel_path in self.markdown]
+
+    def is_markdown(self, path: Path) -> bool:
+        """Check whether a path is a markdown file in scope.
+
+        Args:
+            path: Path under the root.
+
+        Returns:
+            True if the path would be listed by ``markdown_files``.
+        """
+        rel_path = self._relative(os.path.abspath(path))
+        return rel_path is not None and rel_path in self.markdown
+
+    def exists(self, path: str) -> bool:
+        """Check whether a path exists.
+
+        Args:
+            path: Path, possibly containing ``..`` or symlinks.
+
+        Returns:
+            True if the resolved path exists.
+        """
+        return self.lookup(path)[1]
+
+    def lookup(self, path: str) -> Tuple[str, bool]:
+        """Resolve a path and check whether it exists.
+
+        Args:
+            path: Path, possibly containing ``..`` or symlinks. Relative paths
+                are taken relative to the current directory.
+
+        Returns:
+            Resolved absolute path and whether it exists.
+        """
+        if not os.path.isabs(path):
+            # Join rather than abspath(): normalizing ".." lexically would
+            # bypass symlinks that resolve() follows.
+            path = os.path.join(os.getcwd(), path)
+        rel_path = self._relative(path)
+        if rel_path is None:
+            return self._fallback(path)
+
+        parts: List[str] = []
+        components = rel_path.split("/")
+        for position, component in enumerate(components):
+            if component in ("", "."):
+                continue
+            if component == "..":
+                if not parts:
+                    return self._fallback(os.path.join(self.real_root, *components[position:]))
+                parts.pop()
+                continue
+
+            parts.append(component)
+            key = "/".join(parts)
+            if key in self.pruned:
+                return self._fallback(os.path.join(self.real_root, key, *components[position + 1 :]))
+            target = self.symlinks.get(key)
+            if target is None:
+                continue
+            target_rel = self._relative(target)
+            if target_rel is None:
+                return self._fallback(os.path.join(target, *components[position + 1 :]))
+            parts = target_rel.split("/") if target_rel else []
+
+        key = "/".join(parts)
+        exists = not key or key in self.files or key in self.dirs
+        return os.path.join(self.real_root, key) if key else self.real_root, exists
+
+    def _in_pruned(self, rel_path: str) -> bool:
+        """Check whether a path lies inside a pruned directory.
+
+        Args:
+            rel_path: Path relative to the root.
+
+        Returns:
+            True if an ancestor of the path was pruned.
+        """
+        if not self.pruned:
+            return False
+        parent = rel_path.rpartition("/")[0]
+        while parent:
+            if parent in self.pruned:
+                return True
+            parent = parent.rpartition("/")[0]
+        return False
+
+    def _relative(self, path: str) -> Optional[str]:
+        """Express a path relative to the indexed root.
+
+        Args:
+            path: Absolute path.
+
+        Returns:
+            POSIX-style relative path, or None if the path is outside the root.
+        """
+        for prefix in self._prefixes:
+            if path.startswith(prefix):
+                return path[len(prefix) :].replace(os.sep, "/")
+        if path in (self._abs_root, self.real_root):
+            return ""
+        return None
+
+    def _fallback(self, path: str) -> Tuple[str, bool]:
+        """Resolve a path outside the index using the filesystem.
+
+        Args:
+            path: Absolute path.
+
+        Returns:
+            Resolved absolute path and whether it exists.
+        """
+        self.fallbacks += 1
+        resolved = os.path.realpath(path)
+        return resolved, os.path.exists(resolved)
@@ -0,0 +1,178 @@
+"""Read-ahead of markdown files on a thread pool, overlapping I/O with checks."""
+
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Deque, Iterable, Iterator, Optional, Tuple
+
+from src.profiling import Profiler, phase
+from src.streaming import STREAM_THRESHOLD
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUDGET = 64 * 1024 * 1024
+
+
+class PrefetchStats:
+    """Where the time of a prefetched run went."""
+
+    __slots__ = ("files", "bytes", "read", "wait", "compute", "peak")
+
+    def __init__(self) -> None:
+        """Initialize empty totals."""
+        self.files = 0
+        self.bytes = 0
+        self.read = 0.0
+        self.wait = 0.0
+        self.compute = 0.0
+        self.peak = 0
+
+    def __str__(self) -> str:
+        """Summarize the totals in one line."""
+        return (
+            f"Prefetched {self.files} files ({self.bytes / 1024 / 1024:.1f} MiB): "
+            f"{self.read * 1000:.1f} ms reading on threads, {self.wait * 1000:.1f} ms waiting for reads, "
+            f"{self.compute * 1000:.1f} ms checking, peak {self.peak / 1024 / 1024:.1f} MiB buffered"
+        )
+
+
+class Prefetcher:
+    """Reads files ahead of the code that checks them.
+
+    Up to ``depth`` files are read at once on as many threads, in the order
+    they will be consumed, while the consumer checks files already read.
+    No new reads start while the bytes read but not yet consumed exceed
+    ``max_bytes``, so memory stays below the budget plus ``depth`` files.
+    Files above the streaming threshold are not read ahead; the consumer
+    streams them itself.
+
+    When the consumer rarely waits, reads are fully overlapped and a lower
+    depth would do; when it waits for much of the run, a higher depth (or
+    budget) lets more reads be in flight on a high-latency filesystem.
+    """
+
+    def __init__(self, depth: int, max_bytes: int = DEFAULT_BUDGET, stream_threshold: int = STREAM_THRESHOLD):
+        """Initialize prefetcher.
+
+        Args:
+            depth: Maximum number of reads in flight, and of reader threads.
+            max_bytes: Bytes that may wait in memory for the consumer before
+                reading pauses.
+            stream_threshold: Size in bytes above which files are left for
+                the consumer to stream.
+        """
+        self.depth = depth
+        self.max_bytes = max_bytes
+        self.stream_threshold = stream_threshold
+        self.stats = PrefetchStats()
+        self._buffered = 0
+        self._lock = threading.Lock()
+
+    def read(
+        self, files: Iterable[Path], profiler: Optional[Profiler] = None
+    ) -> Iterator[Tuple[Path, Optional[bytes]]]:
+        """Read files ahead and hand them over in order.
+
+        Time the consumer spends between items counts as compute time.
+
+        Args:
+            files: Files to read.
+            profiler: Optional profiler; waiting for reads is timed as the
+                ``prefetch_wait`` phase.
+
+        Yields:
+            ``(file_path, data)`` in input order. ``data`` is None for files
+            that are too large to read whole or could not be read, which the
+            consumer should handle with its usual checks.
+        """
+        self.stats = PrefetchStats()
+        # A run that was closed early, or whose consumer raised, may have left bytes counted.
+        with self._lock:
+            self._buffered = 0
+        pending: Deque[Tuple[Path, "Future[Optional[bytes]]"]] = deque()
+        remaining = iter(files)
+        with ThreadPoolExecutor(max_workers=self.depth, thread_name_prefix="prefetch") as pool:
+            try:
+                self._fill(pool, pending, remaining)
+                while pending:
+                    file_path, future = pending.popleft()
+                    start = time.perf_counter()
+                    with phase(profiler, "prefetch_wait"):
+                        data = future.result()
+                    self.stats.wait += time.perf_counter() - start
+                    self._fill(pool, pending, remaining)
+
+                    start = time.perf_counter()
+                    try:
+                        yield file_path, data
+                    finally:
+                        if data is not None:
+                            self._release(len(data))
+                    self.stats.compute += time.perf_counter() - start
+            finally:
+                # Reads that have not started are not needed if the consumer stopped early.
+                for _, future in pending:
+                    future.cancel()
+
+        logger.info("%s", self.stats)
+        if profiler is not None:
+            profiler.count("prefetch_bytes", self.stats.bytes)
+            profiler.count("prefetch_peak_bytes", self.stats.peak)
+
+    def _fill(
+        self, pool: ThreadPoolExecutor, pending: Deque[Tuple[Path, "Future[Optional[bytes]]"]], files: Iterator[Path]
+    ) -> None:
+        """Start reads until the depth or the byte budget is reached.
+
+        Args:
+            pool: Reader threads.
+            pending: Reads in consumption order; receives the new ones.
+            files: Files not yet submitted.
+        """
+        while len(pending) < self.depth and self._buffered < self.max_bytes:
+            file_path = next(files, None)
+            if file_path is None:
+                return
+            pending.append((file_path, pool.submit(self._read, file_path)))
+
+    def _read(self, file_path: Path) -> Optional[bytes]:
+        """Read one file on a reader thread.
+
+        Args:
+            file_path: File to read.
+
+        Returns:
+            File content, or None if it is too large or cannot be read.
+        """
+        start = time.perf_counter()
+        try:
+            if os.stat(file_path).st_size > self.stream_threshold:
+                return None
+            with open(file_path, "rb") as handle:
+                data = handle.read()
+        except OSError:
+            return None
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.stats.read += elapsed
+
+        with self._lock:
+            self._buffered += len(data)
+            self.stats.files += 1
+            self.stats.bytes += len(data)
+            self.stats.peak = max(self.stats.peak, self._buffered)
+        return data
+
+    def _release(self, size: int) -> None:
+        """Return the budget held by a consumed file.
+
+        Args:
+            size: Bytes of the file.
+        """
+        with self._lock:
+            self._buffered -= size
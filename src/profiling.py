@@ -0,0 +1,302 @@
+"""Opt-in timing and counters for validation runs."""
+
+import functools
+import json
+import time
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from typing import Any, Callable, ContextManager, Dict, Iterator, List, Optional, Tuple
+
+from src.scanner import Link
+
+DEFAULT_TOP = 10
+
+StatsHook = Callable[[Dict[str, float]], None]
+
+# Validator methods timed as phases, by phase name.
+VALIDATOR_PHASES = {
+    "read": "_read",
+    "decode": "_decode",
+    "scan": "_scan",
+}
+
+
+class PhaseStats:
+    """Accumulated wall-clock and CPU time of one phase."""
+
+    __slots__ = ("calls", "wall", "cpu")
+
+    def __init__(self) -> None:
+        """Initialize empty totals."""
+        self.calls = 0
+        self.wall = 0.0
+        self.cpu = 0.0
+
+
+class Profiler:
+    """Records where a validation run spends its time.
+
+    Phases are timed with wall-clock and process CPU time; a phase may be
+    entered many times and its totals add up. Per-file times and counters are
+    kept alongside. Nothing is instrumented unless a profiler is passed in,
+    so runs without one pay no cost beyond a few ``None`` checks.
+
+    Hooks receive a flat mapping of metric names to values whenever
+    ``flush`` is called, which ``LinkChecker`` does at the end of each run.
+    """
+
+    def __init__(self) -> None:
+        """Initialize empty profile."""
+        self.phases: Dict[str, PhaseStats] = defaultdict(PhaseStats)
+        self.counters: Dict[str, int] = defaultdict(int)
+        self.files: Dict[str, Tuple[float, float]] = {}
+        self._hooks: List[StatsHook] = []
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Time a block of code as part of a phase.
+
+        Args:
+            name: Phase name.
+
+        Yields:
+            Nothing; the block runs inside the phase.
+        """
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            self._add(name, time.perf_counter() - wall, time.process_time() - cpu)
+
+    def timed(self, name: str, func: Callable[..., Any]) -> Callable[..., Any]:
+        """Wrap a function so every call is timed as part of a phase.
+
+        Args:
+            name: Phase name.
+            func: Function to wrap.
+
+        Returns:
+            Wrapped function.
+        """
+
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            wall, cpu = time.perf_counter(), time.process_time()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self._add(name, time.perf_counter() - wall, time.process_time() - cpu)
+
+        return wrapper
+
+    def _add(self, name: str, wall: float, cpu: float) -> None:
+        """Add one timed interval to a phase.
+
+        Args:
+            name: Phase name.
+            wall: Wall-clock seconds.
+            cpu: CPU seconds.
+        """
+        stats = self.phases[name]
+        stats.calls += 1
+        stats.wall += wall
+        stats.cpu += cpu
+
+    def count(self, name: str, amount: int = 1) -> None:
+        """Increase a counter.
+
+        Args:
+            name: Counter name.
+            amount: Amount to add.
+        """
+        self.counters[name] += amount
+
+    def record_file(self, file_path: Path, wall: float, cpu: float) -> None:
+        """Record the time spent validating one file.
+
+        Args:
+            file_path: File that was validated.
+            wall: Wall-clock seconds.
+            cpu: CPU seconds.
+        """
+        self.files[str(file_path)] = (wall, cpu)
+
+    def instrument(self, validator: Any) -> None:
+        """Time a validator's steps and count what they process.
+
+        The validator's methods are replaced on the instance, so the class and
+        other instances are unaffected. An instrumented validator cannot be
+        sent to worker processes.
+
+        Args:
+            validator: ``MarkdownValidator`` to instrument.
+        """
+        for name, method in VALIDATOR_PHASES.items():
+            setattr(validator, method, self.timed(name, getattr(validator, method)))
+
+        read = validator._read
+        scan = validator._scan
+        resolve_link = validator._resolve_link
+        check_file = validator.check_file
+        check_chunks = validator.check_chunks
+
+        def counted_read(file_path: Path) -> bytes:
+            data: bytes = read(file_path)
+            self.count("bytes_read", len(data))
+            return data
+
+        def counted_scan(content: str, *args: Any) -> Dict[type, List[Any]]:
+            events: Dict[type, List[Any]] = scan(content, *args)
+            self.count("links_checked", len(events.get(Link, ())))
+            return events
+
+        def counted_resolve_link(*args: Any) -> Any:
+            if validator.path_index is None:
+                self.count("stat_calls")
+            return resolve_link(*args)
+
+        def timed_check_file(file_path: Path, data: Optional[bytes] = None) -> Any:
+            if data is None:
+                self.count("stat_calls")
+            return self._time_check(check_file, file_path, data)
+
+        # Archive members and other streamed files bypass check_file.
+        def timed_check_chunks(file_path: Path, chunks: Any) -> Any:
+            return self._time_check(check_chunks, file_path, chunks)
+
+        validator._read = counted_read
+        validator._scan = counted_scan
+        validator._resolve_link = counted_resolve_link
+        validator.check_file = timed_check_file
+        validator.check_chunks = timed_check_chunks
+
+    def _time_check(self, check: Callable[..., Any], file_path: Path, *args: Any) -> Any:
+        """Validate one file and record the time it took.
+
+        Args:
+            check: Validator method to call.
+            file_path: File to validate.
+            *args: Further arguments of ``check``.
+
+        Returns:
+            What ``check`` returns.
+        """
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            return check(file_path, *args)
+        finally:
+            wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+            self._add("check_file", wall, cpu)
+            self.record_file(file_path, wall, cpu)
+            self.count("files_validated")
+
+    def slowest_files(self, top: int = DEFAULT_TOP) -> List[Tuple[str, float, float]]:
+        """List the files that took longest to validate.
+
+        Args:
+            top: Number of files to list.
+
+        Returns:
+            ``(path, wall, cpu)`` tuples, slowest first.
+        """
+        ranked = sorted(self.files.items(), key=lambda item: item[1][0], reverse=True)
+        return [(path, wall, cpu) for path, (wall, cpu) in ranked[:top]]
+
+    def report(self, top: int = DEFAULT_TOP) -> Dict[str, Any]:
+        """Build a JSON-serializable report.
+
+        Args:
+            top: Number of slowest files to include.
+
+        Returns:
+            Phase totals, counters and the slowest files.
+        """
+        return {
+            "phases": {
+                name: {"calls": stats.calls, "wall_seconds": stats.wall, "cpu_seconds": stats.cpu}
+                for name, stats in self.phases.items()
+            },
+            "counters": dict(self.counters),
+            "files": len(self.files),
+            "slowest_files": [
+                {"path": path, "wall_seconds": wall, "cpu_seconds": cpu} for path, wall, cpu in self.slowest_files(top)
+            ],
+        }
+
+    def write_json(self, path: Path, top: int = DEFAULT_TOP) -> None:
+        """Write the report to a file.
+
+        Args:
+            path: Output file.
+            top: Number of slowest files to include.
+        """
+        Path(path).write_text(json.dumps(self.report(top), indent=2) + "\n", encoding="utf-8")
+
+    def format_table(self, top: int = DEFAULT_TOP, root_path: Optional[Path] = None) -> str:
+        """Render phase totals, counters and the slowest files as text.
+
+        Args:
+            top: Number of slowest files to list.
+            root_path: Directory that file names are shown relative to.
+
+        Returns:
+            Table text.
+        """
+        lines = [f"{'phase':<20}{'calls':>10}{'wall ms':>12}{'cpu ms':>12}"]
+        for name, stats in sorted(self.phases.items(), key=lambda item: item[1].wall, reverse=True):
+            lines.append(f"{name:<20}{stats.calls:>10}{stats.wall * 1000:>12.1f}{stats.cpu * 1000:>12.1f}")
+        if self.counters:
+            lines.append("")
+            lines.extend(f"{name:<20}{value:>10}" for name, value in sorted(self.counters.items()))
+        slowest = self.slowest_files(top)
+        if slowest:
+            lines.extend(["", f"Slowest {len(slowest)} file(s):"])
+            for path, wall, cpu in slowest:
+                if root_path is not None and Path(path).is_relative_to(root_path):
+                    path = str(Path(path).relative_to(root_path))
+                lines.append(f"{wall * 1000:>10.2f} ms wall {cpu * 1000:>10.2f} ms cpu  {path}")
+        return "\n".join(lines)
+
+    def metrics(self) -> Dict[str, float]:
+        """Flatten phase totals and counters into named metrics.
+
+        Returns:
+            Mapping such as ``{"phase.read.wall_seconds": 0.2, "counter.bytes_read": 1024}``.
+        """
+        metrics: Dict[str, float] = {}
+        for name, stats in self.phases.items():
+            metrics[f"phase.{name}.calls"] = stats.calls
+            metrics[f"phase.{name}.wall_seconds"] = stats.wall
+            metrics[f"phase.{name}.cpu_seconds"] = stats.cpu
+        metrics.update((f"counter.{name}", value) for name, value in self.counters.items())
+        return metrics
+
+    def add_hook(self, hook: StatsHook) -> None:
+        """Register a callback that receives metrics on each flush.
+
+        Args:
+            hook: Called with the output of ``metrics``.
+        """
+        self._hooks.append(hook)
+
+    def flush(self) -> None:
+        """Send the current metrics to every hook."""
+        if not self._hooks:
+            return
+        metrics = self.metrics()
+        for hook in self._hooks:
+            hook(metrics)
+
+
+def phase(profiler: Optional[Profiler], name: str) -> ContextManager[None]:
+    """Time a block if profiling is enabled.
+
+    Args:
+        profiler: Profiler, or None when profiling is off.
+        name: Phase name.
+
+    Returns:
+        Context manager timing the block, or one that does nothing.
+    """
+    return profiler.phase(name) if profiler is not None else nullcontext()
@@ -0,0 +1,194 @@
+"""Streaming machine-readable output for diagnostics."""
+
+import json
+from pathlib import Path
+from typing import Any, Dict, TextIO, Type
+
+from src import __version__
+from src.diagnostics import RULES, Diagnostic
+
+TOOL_NAME = "ai-fundamentals"
+SARIF_SCHEMA = "https://json.schemastore.org/sarif-2.1.0.json"
+
+
+class DiagnosticWriter:
+    """Writes diagnostics to a stream one at a time.
+
+    Each diagnostic is written and flushed as soon as it is passed in, so
+    consumers can read results while validation is still running and nothing
+    is buffered in memory. Paths are written relative to the root.
+    """
+
+    def __init__(self, stream: TextIO, root_path: Path):
+        """Initialize writer.
+
+        Args:
+            stream: Text stream to write to.
+            root_path: Directory that paths are made relative to.
+        """
+        self.stream = stream
+        self.root_path = Path(root_path)
+        self.count = 0
+
+    def start(self) -> None:
+        """Write anything that precedes the first diagnostic."""
+
+    def write(self, diagnostic: Diagnostic) -> None:
+        """Write one diagnostic.
+
+        Args:
+            diagnostic: Diagnostic to write.
+        """
+        self._write(diagnostic)
+        self.count += 1
+        self.stream.flush()
+
+    def finish(self) -> None:
+        """Write anything that follows the last diagnostic."""
+        self.stream.flush()
+
+    def _write(self, diagnostic: Diagnostic) -> None:
+        """Format one diagnostic onto the stream.
+
+        Args:
+            diagnostic: Diagnostic to write.
+        """
+        raise NotImplementedError
+
+    def relative(self, path: Path) -> str:
+        """Express a path relative to the root in POSIX form.
+
+        Args:
+            path: Path of a diagnostic.
+
+        Returns:
+            Relative path, or the path unchanged if it is outside the root.
+        """
+        try:
+            return Path(path).relative_to(self.root_path).as_posix()
+        except ValueError:
+            return Path(path).as_posix()
+
+
+class NdjsonWriter(DiagnosticWriter):
+    """Writes one JSON object per line."""
+
+    def _write(self, diagnostic: Diagnostic) -> None:
+        """Format one diagnostic as a JSON line.
+
+        Args:
+            diagnostic: Diagnostic to write.
+        """
+        record = {
+            "path": self.relative(diagnostic.path),
+            "line": diagnostic.line,
+            "column": diagnostic.column,
+            "rule": diagnostic.rule,
+            "message": diagnostic.message,
+        }
+        self.stream.write(json.dumps(record) + "\n")
+
+
+class SarifWriter(DiagnosticWriter):
+    """Writes a SARIF 2.1.0 log for code scanning tools.
+
+    The rule table is static, so the log header is complete before the first
+    result and results can be appended as they arrive.
+    """
+
+    def start(self) -> None:
+        """Write the log header and rule table."""
+        driver = {
+            "name": TOOL_NAME,
+            "version": __version__,
+            "rules": [{"id": rule, "shortDescription": {"text": text}} for rule, text in RULES.items()],
+        }
+        header = json.dumps({"version": "2.1.0", "$schema": SARIF_SCHEMA, "runs": [{"tool": {"driver": driver}}]})
+        # Reopen the run object so results can be streamed into it.
+        self.stream.write(header[: -len("}]}")] + ', "results": [\n')
+        self.stream.flush()
+
+    def _write(self, diagnostic: Diagnostic) -> None:
+        """Format one diagnostic as a SARIF result.
+
+        Args:
+            diagnostic: Diagnostic to write.
+        """
+        location: Dict[str, Any] = {"artifactLocation": {"uri": self.relative(diagnostic.path)}}
+        if diagnostic.line:
+            region = {"startLine": diagnostic.line}
+            if diagnostic.column:
+                region["startColumn"] = diagnostic.column
+            location["region"] = region
+        result = {
+            "ruleId": diagnostic.rule,
+            "level": "error",
+            "message": {"text": diagnostic.message},
+            "locations": [{"physicalLocation": location}],
+        }
+        self.stream.write((",\n" if self.count else "") + json.dumps(result))
+
+    def finish(self) -> None:
+        """Close the results array and the log."""
+        self.stream.write("\n]}]}\n")
+        super().finish()
+
+
+class JUnitWriter(DiagnosticWriter):
+    """Writes a JUnit XML report with one failed test case per diagnostic.
+
+    Totals would have to precede the test cases, so they are left out; CI
+    systems count the test cases themselves. A clean run is reported as a
+    single passing test case.
+    """
+
+    def start(self) -> None:
+        """Write the XML declaration and open the test suite."""
+        self.stream.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        self.stream.write(f"<testsuites>\n  <testsuite name={_quoteattr(TOOL_NAME)}>\n")
+        self.stream.flush()
+
+    def _write(self, diagnostic: Diagnostic) -> None:
+        """Format one diagnostic as a failed test case.
+
+        Args:
+            diagnostic: Diagnostic to write.
+        """
+        path = self.relative(diagnostic.path)
+        location = f"{path}:{diagnostic.line}" if diagnostic.line else path
+        self.stream.write(
+            f"    <testcase classname={_quoteattr(path)} name={_quoteattr(f'{diagnostic.rule} ({location})')}>\n"
+            f"      <failure type={_quoteattr(diagnostic.rule)} message={_quoteattr(diagnostic.message)}/>\n"
+            "    </testcase>\n"
+        )
+
+    def finish(self) -> None:
+        """Close the test suite."""
+        if not self.count:
+            self.stream.write(f'    <testcase classname={_quoteattr(TOOL_NAME)} name="validate"/>\n')
+        self.stream.write("  </testsuite>\n</testsuites>\n")
+        super().finish()
+
+
+def _quoteattr(value: str) -> str:
+    """Quote an XML attribute value.
+
+    The XML helpers are imported on first use; importing them pulls in most
+    of ``urllib`` and would slow down every start of the command.
+
+    Args:
+        value: Attribute value.
+
+    Returns:
+        Escaped value in quotes.
+    """
+    from xml.sax.saxutils import quoteattr
+
+    return quoteattr(value)
+
+
+WRITERS: Dict[str, Type[DiagnosticWriter]] = {
+    "ndjson": NdjsonWriter,
+    "sarif": SarifWriter,
+    "junit": JUnitWriter,
+}
@@ -0,0 +1,952 @@
+"""Pluggable validation rules and their configuration."""
+
+import hashlib
+import importlib
+import json
+import logging
+import re
+from itertools import chain
+from operator import attrgetter
+from pathlib import Path
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Container,
+    Dict,
+    FrozenSet,
+    Iterable,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+    TypeVar,
+)
+from urllib.parse import unquote
+
+from src.anchors import normalize_fragment
+from src.diagnostics import (
+    BROKEN_ANCHOR,
+    BROKEN_EXTERNAL_LINK,
+    BROKEN_LINK,
+    HEADING_INCREMENT,
+    MISSING_H1,
+    MULTIPLE_H1,
+    RULES,
+    UNCLOSED_FENCE,
+    Diagnostic,
+)
+from src.profiling import Profiler, phase
+from src.scanner import Fence, Header, Link
+
+if TYPE_CHECKING:
+    from src.utils import FileResult
+
+logger = logging.getLogger(__name__)
+
+CONFIG_FILE_NAME = "pyproject.toml"
+CONFIG_SECTION = "ai-fundamentals"
+
+LINE_LENGTH = "line-length"
+IMAGE_ALT = "image-alt"
+FORBIDDEN_PHRASE = "forbidden-phrase"
+
+EXTERNAL_SCHEMES = ("http://", "https://", "mailto:")
+HTTP_SCHEMES = ("http://", "https://")
+
+
+class Line(NamedTuple):
+    """A physical line of the document, fenced code included."""
+
+    line: int
+    text: str
+
+
+Resolver = Callable[[Path, str], Tuple[str, bool]]
+
+
+def split_link_target(url: str) -> Tuple[str, str]:
+    """Split a link destination into its path and fragment.
+
+    Angle brackets and an optional link title are removed, the query string
+    is dropped and percent-escapes in the path are decoded.
+
+    Args:
+        url: Raw destination from ``[text](url)``.
+
+    Returns:
+        Path (empty for same-document links) and fragment without ``#``.
+    """
+    url = url.strip()
+    if url.startswith("<") and ">" in url:
+        url = url[1 : url.index(">")]
+    else:
+        url = url.split(None, 1)[0] if url else url
+    path, _, fragment = url.partition("#")
+    return unquote(path.partition("?")[0]), fragment
+
+
+class RuleContext:
+    """What a rule may look at besides its events."""
+
+    __slots__ = ("path", "content", "result", "resolve_link", "anchors")
+
+    def __init__(self, path: Path, content: str, result: "FileResult", resolve_link: Resolver, anchors: Container[str]):
+        """Initialize context.
+
+        Args:
+            path: File being validated.
+            content: Decoded file content. For files validated in chunks,
+                the current chunk.
+            result: Result being built. Rules may record link dependencies,
+                cross-file fragments and external links on it.
+            resolve_link: Resolves a relative link target from a file to
+                ``(resolved path, exists)``.
+            anchors: Anchors of the document's headings. For files validated
+                in chunks, those seen so far; all of them once ``end`` runs.
+        """
+        self.path = path
+        self.content = content
+        self.result = result
+        self.resolve_link = resolve_link
+        self.anchors = anchors
+
+
+class Rule:
+    """Base class for validation rules.
+
+    A rule names the event types it consumes; the validator scans each
+    document once and hands every rule the events it asked for, in document
+    order. Rules are instantiated once per run, so anything expensive to set
+    up (compiled patterns, option parsing) belongs in ``__init__``. Instances
+    are sent to worker processes, so subclasses must be defined at module
+    level.
+
+    Attributes:
+        name: Rule name used on the command line and in configuration.
+        codes: Diagnostic ids the rule reports, mapped to descriptions.
+        events: Event types passed to ``check``: ``Header``, ``Link``,
+            ``Fence`` or ``Line``.
+        default_enabled: Whether the rule runs without being enabled.
+        defaults: Options the rule accepts and their default values.
+    """
+
+    name = ""
+    codes: Dict[str, str] = {}
+    events: Tuple[type, ...] = ()
+    default_enabled = True
+    defaults: Dict[str, Any] = {}
+
+    def __init__(self, **options: Any):
+        """Initialize rule.
+
+        Args:
+            **options: Values overriding ``defaults``.
+
+        Raises:
+            ValueError: If an option is not one of ``defaults``.
+        """
+        unknown = sorted(set(options) - set(self.defaults))
+        if unknown:
+            raise ValueError(f"Unknown option(s) for rule {self.name}: {', '.join(unknown)}")
+        self.options = {**self.defaults, **options}
+        self.enabled_codes: FrozenSet[str] = frozenset(self.codes)
+
+    def check(self, context: RuleContext, events: Sequence[Any]) -> List[Diagnostic]:
+        """Check one document.
+
+        Args:
+            context: File being validated.
+            events: Consumed events in document order.
+
+        Returns:
+            Diagnostics found.
+        """
+        raise NotImplementedError
+
+    def begin(self, context: RuleContext) -> Any:
+        """Start checking a document that arrives in chunks.
+
+        Rules that only implement ``check`` collect every event and check them
+        at the end, so their memory grows with the document.
+
+        Args:
+            context: File being validated.
+
+        Returns:
+            Per-document state passed to ``feed`` and ``end``.
+        """
+        return []
+
+    def feed(self, context: RuleContext, state: Any, events: Sequence[Any]) -> List[Diagnostic]:
+        """Check the events of one chunk.
+
+        Args:
+            context: File being validated.
+            state: State returned by ``begin``.
+            events: Consumed events of the chunk in document order.
+
+        Returns:
+            Diagnostics that can already be reported.
+        """
+        state.extend(events)
+        return []
+
+    def end(self, context: RuleContext, state: Any) -> List[Diagnostic]:
+        """Finish checking a document that arrived in chunks.
+
+        Args:
+            context: File being validated, with its heading anchors set.
+            state: State returned by ``begin``.
+
+        Returns:
+            Remaining diagnostics.
+        """
+        return self.check(context, state)
+
+
+class StreamingRule(Rule):
+    """A rule whose memory use does not grow with the document.
+
+    Subclasses implement ``begin``, ``feed`` and ``end``, keeping only what
+    they must remember between chunks; ``check`` runs them over a whole
+    document at once.
+    """
+
+    def check(self, context: RuleContext, events: Sequence[Any]) -> List[Diagnostic]:
+        """Check one document.
+
+        Args:
+            context: File being validated.
+            events: Consumed events in document order.
+
+        Returns:
+            Diagnostics found.
+        """
+        state = self.begin(context)
+        return self.feed(context, state, events) + self.end(context, state)
+
+    def begin(self, context: RuleContext) -> Any:
+        """Start checking a document.
+
+        Args:
+            context: File being validated.
+
+        Returns:
+            Per-document state; None by default.
+        """
+        return None
+
+    def feed(self, context: RuleContext, state: Any, events: Sequence[Any]) -> List[Diagnostic]:
+        """Check the events of one chunk.
+
+        Args:
+            context: File being validated.
+            state: State returned by ``begin``.
+            events: Consumed events of the chunk in document order.
+
+        Returns:
+            Diagnostics that can already be reported.
+        """
+        raise NotImplementedError
+
+    def end(self, context: RuleContext, state: Any) -> List[Diagnostic]:
+        """Finish checking a document.
+
+        Args:
+            context: File being validated, with its heading anchors set.
+            state: State returned by ``begin``.
+
+        Returns:
+            Remaining diagnostics; none by default.
+        """
+        return []
+
+
+RuleType = TypeVar("RuleType", bound=Type[Rule])
+
+# Rule name -> rule class, in registration order.
+REGISTRY: Dict[str, Type[Rule]] = {}
+
+
+def register_rule(rule_class: RuleType) -> RuleType:
+    """Add a rule class to the registry.
+
+    Usable as a class decorator. The rule's diagnostic ids are added to
+    ``RULES`` so machine-readable output can describe them.
+
+    Args:
+        rule_class: Rule to register.
+
+    Returns:
+        The rule class, unchanged.
+
+    Raises:
+        ValueError: If the name or one of the codes is already taken by
+            another rule.
+    """
+    name = rule_class.name
+    if not name or name in REGISTRY and REGISTRY[name] is not rule_class:
+        raise ValueError(f"Rule name {name!r} is empty or already registered")
+    for code in rule_class.codes:
+        owner = _code_owner(code)
+        if owner is not None and owner is not rule_class:
+            raise ValueError(f"Diagnostic id {code!r} is already reported by rule {owner.name}")
+    REGISTRY[name] = rule_class
+    RULES.update(rule_class.codes)
+    return rule_class
+
+
+def _code_owner(code: str) -> Optional[Type[Rule]]:
+    """Find the registered rule reporting a diagnostic id.
+
+    Args:
+        code: Diagnostic id.
+
+    Returns:
+        Rule class, or None if no rule reports it.
+    """
+    return next((rule_class for rule_class in REGISTRY.values() if code in rule_class.codes), None)
+
+
+@register_rule
+class HeadingsRule(StreamingRule):
+    """Documents have a single H1 and header levels never skip."""
+
+    name = "headings"
+    codes = {
+        MISSING_H1: RULES[MISSING_H1],
+        MULTIPLE_H1: RULES[MULTIPLE_H1],
+        HEADING_INCREMENT: RULES[HEADING_INCREMENT],
+    }
+    events = (Header,)
+
+    def begin(self, context: RuleContext) -> Dict[str, Any]:
+        """Start with no headings seen.
+
+        Args:
+            context: File being validated.
+
+        Returns:
+            Lines of the first two H1s, the previous level and skipped levels.
+        """
+        return {"h1_lines": [], "prev_level": 0, "skips": []}
+
+    def feed(self, context: RuleContext, state: Dict[str, Any], events: Sequence[Header]) -> List[Diagnostic]:
+        """Check header hierarchy and note H1s.
+
+        Args:
+            context: File being validated.
+            state: State returned by ``begin``.
+            events: Headings found outside code fences.
+
+        Returns:
+            Nothing; title problems are reported first, so every diagnostic
+            waits for ``end``.
+        """
+        h1_lines, skips = state["h1_lines"], state["skips"]
+        prev_level = state["prev_level"]
+        for header in events:
+            if header.level == 1 and len(h1_lines) < 2:
+                h1_lines.append(header.line)
+            if header.level > prev_level + 1:
+                msg = f"Header level skipped (from H{prev_level} to H{header.level})"
+                skips.append(Diagnostic(context.path, HEADING_INCREMENT, msg, header.line, 1))
+            prev_level = header.level
+        state["prev_level"] = prev_level
+        return []
+
+    def end(self, context: RuleContext, state: Dict[str, Any]) -> List[Diagnostic]:
+        """Check for a single title (H1).
+
+        Args:
+            context: File being validated.
+            state: State returned by ``begin``.
+
+        Returns:
+            List of header-related diagnostics.
+        """
+        errors = []
+        h1_lines = state["h1_lines"]
+        if not h1_lines:
+            errors.append(Diagnostic(context.path, MISSING_H1, "Missing H1 title"))
+        elif len(h1_lines) > 1:
+            errors.append(Diagnostic(context.path, MULTIPLE_H1, "Multiple H1 headers found", h1_lines[1], 1))
+        skips: List[Diagnostic] = state["skips"]
+        return errors + skips
+
+
+@register_rule
+class LinksRule(StreamingRule):
+    """Relative links and their fragments point at something that exists."""
+
+    name = "links"
+    codes = {
+        BROKEN_LINK: RULES[BROKEN_LINK],
+        BROKEN_ANCHOR: RULES[BROKEN_ANCHOR],
+        BROKEN_EXTERNAL_LINK: RULES[BROKEN_EXTERNAL_LINK],
+    }
+    events = (Link,)
+
+    def begin(self, context: RuleContext) -> List[Any]:
+        """Start with no findings.
+
+        Args:
+            context: File being validated.
+
+        Returns:
+            Findings in document order: diagnostics, and
+            ``(fragment, url, line, column)`` for links to anchors of this
+            document that no heading defined yet.
+        """
+        return []
+
+    def feed(self, context: RuleContext, state: List[Any], events: Sequence[Link]) -> List[Diagnostic]:
+        """Check markdown links.
+
+        Link targets are recorded on the result even when ``broken-link`` is
+        disabled, since cache entries depend on them. Cross-file fragments
+        and external links are only recorded while their diagnostic ids are
+        enabled.
+
+        Args:
+            context: File being validated.
+            state: Findings so far.
+            events: Links found outside code fences and code spans.
+
+        Returns:
+            Nothing; findings are reported in order by ``end``.
+        """
+        file_path, result = context.path, context.result
+        check_anchors = BROKEN_ANCHOR in self.enabled_codes
+        check_external = BROKEN_EXTERNAL_LINK in self.enabled_codes
+
+        for link in events:
+            url = link.url
+
+            # External URLs are only recorded; checking them needs the network
+            if url.startswith(EXTERNAL_SCHEMES):
+                if check_external and url.startswith(HTTP_SCHEMES):
+                    result.external_links.append((url, link.line, link.column))
+                continue
+
+            path, fragment = split_link_target(url)
+
+            # Same-document anchors
+            if not path:
+                if fragment:
+                    fragment = normalize_fragment(fragment)
+                    if fragment not in context.anchors:
+                        state.append((fragment, url, link.line, link.column))
+                continue
+
+            # Check relative file paths
+            target, exists = context.resolve_link(file_path, path)
+            result.dependencies[target] = exists
+            if not exists:
+                state.append(Diagnostic(file_path, BROKEN_LINK, f"Broken link to {url}", link.line, link.column))
+            elif check_anchors and fragment and target.endswith(".md"):
+                result.anchor_refs.append((target, fragment, url, link.line, link.column))
+
+        return []
+
+    def end(self, context: RuleContext, state: List[Any]) -> List[Diagnostic]:
+        """Check links to this document's anchors.
+
+        Args:
+            context: File being validated, with its heading anchors set.
+            state: Findings in document order.
+
+        Returns:
+            List of link-related diagnostics.
+        """
+        errors = []
+        for finding in state:
+            if isinstance(finding, Diagnostic):
+                errors.append(finding)
+                continue
+            fragment, url, line, column = finding
+            if fragment not in context.anchors:
+                errors.append(Diagnostic(context.path, BROKEN_ANCHOR, f"Broken anchor in link to {url}", line, column))
+        return errors
+
+
+@register_rule
+class CodeBlocksRule(StreamingRule):
+    """Every code fence is closed."""
+
+    name = "code-blocks"
+    codes = {UNCLOSED_FENCE: RULES[UNCLOSED_FENCE]}
+    events = (Fence,)
+
+    def begin(self, context: RuleContext) -> List[Optional[Fence]]:
+        """Start with no fence seen.
+
+        Args:
+            context: File being validated.
+
+        Returns:
+            One-element list holding the last fence seen.
+        """
+        return [None]
+
+    def feed(self, context: RuleContext, state: List[Optional[Fence]], events: Sequence[Fence]) -> List[Diagnostic]:
+        """Remember the last fence.
+
+        Args:
+            context: File being validated.
+            state: Last fence seen so far.
+            events: Opening and closing fences in document order.
+
+        Returns:
+            Nothing; whether a fence stays open is known only at the end.
+        """
+        if events:
+            state[0] = events[-1]
+        return []
+
+    def end(self, context: RuleContext, state: List[Optional[Fence]]) -> List[Diagnostic]:
+        """Check code block formatting.
+
+        Args:
+            context: File being validated.
+            state: Last fence in the document.
+
+        Returns:
+            List of code block diagnostics.
+        """
+        last = state[0]
+        if last is not None and last.opening:
+            return [Diagnostic(context.path, UNCLOSED_FENCE, "Unclosed code fence", last.line)]
+        return []
+
+
+@register_rule
+class LineLengthRule(StreamingRule):
+    """Lines stay within a maximum length."""
+
+    name = LINE_LENGTH
+    codes = {LINE_LENGTH: "Line is longer than the configured maximum"}
+    events = (Line,)
+    default_enabled = False
+    defaults = {"max": 120}
+
+    def feed(self, context: RuleContext, state: None, events: Sequence[Line]) -> List[Diagnostic]:
+        """Check line lengths.
+
+        Args:
+            context: File being validated.
+            state: Unused.
+            events: Every line of the document.
+
+        Returns:
+            One diagnostic per overlong line.
+        """
+        limit = self.options["max"]
+        return [
+            Diagnostic(context.path, LINE_LENGTH, f"Line too long ({len(line.text)} > {limit})", line.line, limit + 1)
+            for line in events
+            if len(line.text) > limit
+        ]
+
+
+@register_rule
+class ImageAltRule(StreamingRule):
+    """Images have alternative text."""
+
+    name = IMAGE_ALT
+    codes = {IMAGE_ALT: "Image has no alternative text"}
+    events = (Link,)
+    default_enabled = False
+
+    def feed(self, context: RuleContext, state: None, events: Sequence[Link]) -> List[Diagnostic]:
+        """Check that images describe themselves.
+
+        Args:
+            context: File being validated.
+            state: Unused.
+            events: Links found outside code fences and code spans.
+
+        Returns:
+            One diagnostic per image with empty alternative text.
+        """
+        return [
+            Diagnostic(context.path, IMAGE_ALT, f"Image {link.url} has no alt text", link.line, link.column)
+            for link in events
+            if link.image and not link.text.strip()
+        ]
+
+
+@register_rule
+class ForbiddenPhrasesRule(StreamingRule):
+    """Configured phrases do not appear in the text."""
+
+    name = "forbidden-phrases"
+    codes = {FORBIDDEN_PHRASE: "Text contains a forbidden phrase"}
+    events = (Line,)
+    default_enabled = False
+    defaults: Dict[str, Any] = {"phrases": [], "ignore_case": True}
+
+    def __init__(self, **options: Any):
+        """Initialize rule and compile the phrases into one pattern.
+
+        Args:
+            **options: ``phrases`` to forbid and whether to ``ignore_case``.
+        """
+        super().__init__(**options)
+        phrases = sorted(self.options["phrases"], key=len, reverse=True)
+        flags = re.IGNORECASE if self.options["ignore_case"] else 0
+        alternatives = "|".join(re.escape(phrase) for phrase in phrases)
+        self.pattern = re.compile(rf"(?<!\w)(?:{alternatives})(?!\w)", flags) if phrases else None
+
+    def feed(self, context: RuleContext, state: None, events: Sequence[Line]) -> List[Diagnostic]:
+        """Search every line for forbidden phrases.
+
+        Args:
+            context: File being validated.
+            state: Unused.
+            events: Every line of the document.
+
+        Returns:
+            One diagnostic per occurrence.
+        """
+        pattern = self.pattern
+        if pattern is None:
+            return []
+        errors = []
+        for line in events:
+            for match in pattern.finditer(line.text):
+                message = f"Forbidden phrase: {match.group()!r}"
+                errors.append(Diagnostic(context.path, FORBIDDEN_PHRASE, message, line.line, match.start() + 1))
+        return errors
+
+
+class RuleSet:
+    """Enabled rules compiled into a dispatch plan.
+
+    Only the events some enabled rule consumes are produced, and splitting
+    the document into lines happens at most once no matter how many rules
+    look at lines. A rule whose diagnostic ids are only partly enabled still
+    runs, and its reports for disabled ids are dropped.
+    """
+
+    def __init__(self, rules: Iterable[Rule]):
+        """Initialize rule set.
+
+        Args:
+            rules: Rule instances, in the order their diagnostics are reported.
+                Rules with no enabled diagnostic ids are left out.
+        """
+        self.rules = [rule for rule in rules if rule.enabled_codes]
+        self.events = frozenset(chain.from_iterable(rule.events for rule in self.rules))
+        self._partial = {id(rule) for rule in self.rules if rule.enabled_codes != frozenset(rule.codes)}
+
+    @classmethod
+    def default(cls) -> "RuleSet":
+        """Create the rule set used when nothing is configured.
+
+        Returns:
+            Every registered rule that is enabled by default.
+        """
+        return cls.select()
+
+    @classmethod
+    def select(
+        cls, *layers: Tuple[Sequence[str], Sequence[str]], options: Optional[Dict[str, Dict[str, Any]]] = None
+    ) -> "RuleSet":
+        """Create a rule set from rule names and diagnostic ids.
+
+        Layers apply in order on top of the default-enabled rules, so a later
+        layer such as the command line overrides an earlier one such as the
+        configuration file. A rule name selects all of its diagnostic ids;
+        within a layer, diagnostic ids apply after rule names and disabling
+        applies after enabling.
+
+        Args:
+            *layers: ``(enable, disable)`` pairs of rule names or diagnostic
+                ids to turn on and off.
+            options: Rule options by rule name.
+
+        Returns:
+            Compiled rule set.
+
+        Raises:
+            ValueError: If a name is neither a rule nor a diagnostic id, or
+                options are given for an unknown rule.
+        """
+        options = options or {}
+        unknown = sorted(set(options) - set(REGISTRY))
+        if unknown:
+            raise ValueError(f"Options given for unknown rule(s): {', '.join(unknown)}")
+
+        enabled = {code for rule_class in REGISTRY.values() if rule_class.default_enabled for code in rule_class.codes}
+        for enable, disable in layers:
+            # Rule names first, so a diagnostic id can override its rule within a layer.
+            for by_rule in (True, False):
+                for name in enable:
+                    if (name in REGISTRY) == by_rule:
+                        enabled.update(_codes(name))
+                for name in disable:
+                    if (name in REGISTRY) == by_rule:
+                        enabled.difference_update(_codes(name))
+
+        rules = []
+        for name, rule_class in REGISTRY.items():
+            rule = rule_class(**options.get(name, {}))
+            rule.enabled_codes = frozenset(code for code in rule_class.codes if code in enabled)
+            rules.append(rule)
+        return cls(rules)
+
+    @property
+    def fingerprint(self) -> str:
+        """Identify the configuration, so cached results can be matched to it.
+
+        Returns:
+            Hex digest over each rule's class, options and enabled ids.
+        """
+        config = [
+            [f"{type(rule).__module__}.{type(rule).__qualname__}", rule.options, sorted(rule.enabled_codes)]
+            for rule in self.rules
+        ]
+        encoded = json.dumps(config, sort_keys=True, default=str).encode("utf-8")
+        return hashlib.blake2b(encoded, digest_size=8).hexdigest()
+
+    def run(
+        self, context: RuleContext, events: Dict[type, List[Any]], profiler: Optional[Profiler] = None
+    ) -> List[Diagnostic]:
+        """Run every rule on one scanned document.
+
+        Args:
+            context: File being validated.
+            events: Scanner events of the document by type. Lines are added
+                if a rule consumes them.
+            profiler: Optional profiler timing each rule as ``rule.<name>``.
+
+        Returns:
+            Diagnostics of all rules, rule by rule.
+        """
+        if Line in self.events and Line not in events:
+            events[Line] = _lines(context.content, 1)
+
+        diagnostics: List[Diagnostic] = []
+        for rule in self.rules:
+            consumed = _consumed(rule, events)
+            if profiler is None:
+                found = rule.check(context, consumed)
+            else:
+                with profiler.phase(f"rule.{rule.name}"):
+                    found = rule.check(context, consumed)
+            diagnostics.extend(self.enabled(rule, found))
+        return diagnostics
+
+    def stream(self, context: RuleContext, profiler: Optional[Profiler] = None) -> "RuleRun":
+        """Start running every rule on a document that arrives in chunks.
+
+        Args:
+            context: File being validated.
+            profiler: Optional profiler timing each rule as ``rule.<name>``.
+
+        Returns:
+            Run to feed chunks into.
+        """
+        return RuleRun(self, context, profiler)
+
+    def enabled(self, rule: Rule, found: List[Diagnostic]) -> List[Diagnostic]:
+        """Drop a rule's diagnostics whose ids are disabled.
+
+        Args:
+            rule: Rule that reported the diagnostics.
+            found: Its diagnostics.
+
+        Returns:
+            Diagnostics with enabled ids.
+        """
+        if id(rule) not in self._partial:
+            return found
+        return [diagnostic for diagnostic in found if diagnostic.rule in rule.enabled_codes]
+
+
+class RuleRun:
+    """Every rule of a rule set checking one document chunk by chunk.
+
+    Diagnostics come out in the same order as ``RuleSet.run`` would report
+    them for the whole document.
+    """
+
+    def __init__(self, rules: RuleSet, context: RuleContext, profiler: Optional[Profiler] = None):
+        """Initialize run and begin every rule.
+
+        Args:
+            rules: Rules to run.
+            context: File being validated.
+            profiler: Optional profiler timing each rule as ``rule.<name>``.
+        """
+        self.rules = rules
+        self.context = context
+        self.profiler = profiler
+        self._states = [rule.begin(context) for rule in rules.rules]
+        self._found: List[List[Diagnostic]] = [[] for _ in rules.rules]
+
+    def feed(self, events: Dict[type, List[Any]], text: str, first_line: int) -> None:
+        """Check one chunk.
+
+        Args:
+            events: Scanner events of the chunk by type. Lines are added if a
+                rule consumes them.
+            text: Decoded chunk, ending on a line boundary.
+            first_line: 1-based number of the chunk's first line.
+        """
+        if Line in self.rules.events:
+            events[Line] = _lines(text, first_line)
+        for rule, state, found in zip(self.rules.rules, self._states, self._found):
+            with phase(self.profiler, f"rule.{rule.name}"):
+                found.extend(rule.feed(self.context, state, _consumed(rule, events)))
+
+    def finish(self) -> List[Diagnostic]:
+        """End every rule.
+
+        Returns:
+            Diagnostics of all rules, rule by rule.
+        """
+        diagnostics: List[Diagnostic] = []
+        for rule, state, found in zip(self.rules.rules, self._states, self._found):
+            with phase(self.profiler, f"rule.{rule.name}"):
+                found.extend(rule.end(self.context, state))
+            diagnostics.extend(self.rules.enabled(rule, found))
+        return diagnostics
+
+
+def _lines(text: str, first_line: int) -> List[Line]:
+    """Split text into line events.
+
+    Args:
+        text: Text starting at a line boundary.
+        first_line: 1-based number of its first line.
+
+    Returns:
+        One event per line. As in the scanner, only newlines end a line, so
+        form feeds and Unicode line separators do not shift line numbers.
+    """
+    lines = text.split("\n")
+    if not lines[-1]:
+        lines.pop()
+    return [Line(number, line[:-1] if line.endswith("\r") else line) for number, line in enumerate(lines, first_line)]
+
+
+def _consumed(rule: Rule, events: Dict[type, List[Any]]) -> List[Any]:
+    """Collect the events a rule consumes.
+
+    Args:
+        rule: Rule about to run.
+        events: Document events by type.
+
+    Returns:
+        The shared list for single-type rules, otherwise a merged list in
+        line order.
+    """
+    if len(rule.events) == 1:
+        return events.get(rule.events[0], [])
+    return sorted(chain.from_iterable(events.get(kind, []) for kind in rule.events), key=attrgetter("line"))
+
+
+def _codes(name: str) -> Iterable[str]:
+    """Expand a rule name or diagnostic id to diagnostic ids.
+
+    Args:
+        name: Rule name or diagnostic id.
+
+    Returns:
+        Diagnostic ids it stands for.
+
+    Raises:
+        ValueError: If the name is unknown.
+    """
+    if name in REGISTRY:
+        return REGISTRY[name].codes
+    if _code_owner(name) is not None:
+        return (name,)
+    raise ValueError(f"Unknown rule: {name} (known rules: {', '.join(REGISTRY)})")
+
+
+def find_config(start: Path) -> Optional[Path]:
+    """Find the ``pyproject.toml`` that applies to a path.
+
+    Args:
+        start: File or directory being validated.
+
+    Returns:
+        Nearest ``pyproject.toml`` in the directory or an ancestor, or None.
+    """
+    start = Path(start).resolve()
+    for directory in (start, *start.parents) if start.is_dir() else start.parents:
+        candidate = directory / CONFIG_FILE_NAME
+        if candidate.is_file():
+            return candidate
+    return None
+
+
+def load_config(start: Path) -> Dict[str, Any]:
+    """Read the ``[tool.ai-fundamentals]`` section for a path.
+
+    Args:
+        start: File or directory being validated.
+
+    Returns:
+        Section contents, or an empty mapping if there is none.
+
+    Raises:
+        ValueError: If the configuration file is not valid TOML.
+    """
+    config_file = find_config(start)
+    if config_file is None:
+        return {}
+    with open(config_file, "rb") as handle:
+        raw = handle.read()
+    # Most projects have no section for this tool; skip importing a TOML parser for them.
+    if CONFIG_SECTION.encode() not in raw:
+        return {}
+
+    try:
+        import tomllib
+    except ImportError:  # pragma: no cover - Python < 3.11
+        try:
+            import tomli as tomllib
+        except ImportError:
+            logger.warning("Ignoring %s: reading it needs Python 3.11 or the tomli package", config_file)
+            return {}
+    try:
+        data = tomllib.loads(raw.decode("utf-8"))
+    except (tomllib.TOMLDecodeError, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid {config_file}: {e}") from None
+    section: Dict[str, Any] = data.get("tool", {}).get(CONFIG_SECTION, {})
+    return section
+
+
+def rules_from_config(config: Dict[str, Any], enable: Sequence[str] = (), disable: Sequence[str] = ()) -> RuleSet:
+    """Build the rule set for a configuration section and command-line flags.
+
+    Plugin modules listed under ``plugins`` are imported first so the rules
+    they register can be selected. Command-line selections apply after the
+    configured ones.
+
+    Args:
+        config: ``[tool.ai-fundamentals]`` section.
+        enable: Rule names or diagnostic ids enabled on the command line.
+        disable: Rule names or diagnostic ids disabled on the command line.
+
+    Returns:
+        Compiled rule set.
+
+    Raises:
+        ValueError: If a plugin cannot be imported or a rule is unknown.
+    """
+    for module in config.get("plugins", []):
+        try:
+            importlib.import_module(module)
+        except ImportError as e:
+            raise ValueError(f"Cannot import rule plugin {module}: {e}") from None
+    return RuleSet.select(
+        (config.get("enable", []), config.get("disable", [])), (enable, disable), options=config.get("rules", {})
+    )
@@ -0,0 +1,236 @@
+"""Single-pass, fence-aware markdown scanner."""
+
+import re
+from functools import lru_cache
+from typing import Iterator, NamedTuple, Optional, Pattern, Tuple, Union
+
+BLOCK_BODY = r"(?P<hashes>#{1,6})[ \t]+(?P<title>[^\n]*)|(?P<fence>[ \t]*(?:`{3,}|~{3,}))(?P<info>[^\n]*)"
+LINK_BODY = r"\[(?P<text>[^\]\n]*)\]\((?P<url>[^)\n]+)\)"
+
+# Block-level alternatives are anchored on a literal newline rather than "^" so the
+# regex engine can skip ahead to the next "\n" or "[" without trying every offset.
+EVENT_PATTERN = re.compile(r"\n(?:%s)|%s" % (BLOCK_BODY, LINK_BODY))
+BLOCK_PATTERN = re.compile(r"\n(?:%s)" % BLOCK_BODY)
+FIRST_LINE_PATTERN = re.compile(BLOCK_BODY)
+CODE_SPAN_PATTERN = re.compile(r"(`+)(?!`).+?(?<!`)\1(?!`)")
+CLOSING_SEQUENCE_PATTERN = re.compile(r"(?:^|\s+)#+\s*$")
+
+
+class Header(NamedTuple):
+    """An ATX heading outside code fences."""
+
+    line: int
+    level: int
+    text: str
+
+
+class Link(NamedTuple):
+    """An inline ``[text](url)`` link or ``![alt](src)`` image outside code fences and code spans.
+
+    For images the column is that of the opening bracket.
+    """
+
+    line: int
+    column: int
+    text: str
+    url: str
+    image: bool = False
+
+
+class Fence(NamedTuple):
+    """An opening or closing code fence."""
+
+    line: int
+    marker: str
+    opening: bool
+    info: str
+
+
+Event = Union[Header, Link, Fence]
+
+
+class MarkdownScanner:
+    """Streaming scanner that turns markdown text into structural events.
+
+    Headings, fences and links are found in one left-to-right regex pass, and
+    fenced regions are skipped straight to their closing fence. Text may be
+    fed in several chunks as long as each chunk ends on a line boundary; fence
+    state and line numbers carry over between chunks. Content inside fenced
+    code blocks produces no header or link events, and links inside inline
+    code spans are ignored.
+    """
+
+    def __init__(self, links: bool = True) -> None:
+        """Initialize scanner at the start of a document.
+
+        Args:
+            links: Report links; without them, scanning text with many
+                links is several times faster.
+        """
+        self.line = 1
+        self.fence: Optional[str] = None
+        self._pattern = EVENT_PATTERN if links else BLOCK_PATTERN
+
+    @property
+    def in_fence(self) -> bool:
+        """Whether the text scanned so far ends inside a code fence."""
+        return self.fence is not None
+
+    def feed(self, text: str) -> Iterator[Event]:
+        """Scan a chunk of text.
+
+        Args:
+            text: Markdown text ending on a line boundary.
+
+        Yields:
+            Header, Link and Fence events in document order.
+        """
+        has_code_spans = "`" in text
+        line = self.line
+        counted = pos = 0
+        match = FIRST_LINE_PATTERN.match(text) if self.fence is None else None
+        start = 0
+
+        while True:
+            if self.fence is not None:
+                match, start = _find_closing_fence(text, pos, self.fence)
+                if match is None:
+                    break
+                line += text.count("\n", counted, start)
+                counted = start
+                yield Fence(line, self.fence, False, "")
+                self.fence = None
+                pos = match.end()
+                match = None
+
+            if match is None:
+                match = self._pattern.search(text, pos)
+                if match is None:
+                    break
+                start = match.start() + (text[match.start()] == "\n")
+
+            line += text.count("\n", counted, start)
+            counted = start
+            kind = match.lastgroup
+
+            if kind == "url":
+                pos = match.end()
+                if not (has_code_spans and _in_code_span(text, start)):
+                    column = start - text.rfind("\n", 0, start)
+                    image = start > 0 and text[start - 1] == "!"
+                    yield Link(line, column, match.group("text"), match.group("url"), image)
+            elif kind == "title":
+                yield Header(line, len(match.group("hashes")), _heading_text(match.group("title")))
+                # Continue inside the heading so links in its text are found.
+                pos = match.start("title")
+            else:
+                fence = _opening_fence(match, line)
+                if fence is None:
+                    pos = start
+                else:
+                    self.fence = fence.marker
+                    pos = match.end()
+                    yield fence
+            match = None
+
+        self.line = line + text.count("\n", counted)
+
+
+def scan_markdown(content: str, links: bool = True) -> Iterator[Event]:
+    """Scan a whole markdown document.
+
+    Args:
+        content: Document text.
+        links: Report links as well as headings and fences.
+
+    Yields:
+        Header, Link and Fence events in document order.
+    """
+    return MarkdownScanner(links).feed(content)
+
+
+def _find_closing_fence(text: str, pos: int, marker: str) -> Tuple[Optional["re.Match[str]"], int]:
+    """Find the line that closes a fence.
+
+    Args:
+        text: Text being scanned.
+        pos: Offset to search from; 0 or the end of a previous line.
+        marker: Opening fence marker, e.g. three backticks.
+
+    Returns:
+        The match and the offset where its line starts, or ``(None, -1)``.
+    """
+    first_line, other_lines = _closing_fence_patterns(marker)
+    if pos == 0 and (match := first_line.match(text)):
+        return match, 0
+    match = other_lines.search(text, pos)
+    if match is None:
+        return None, -1
+    return match, match.start() + 1
+
+
+@lru_cache(maxsize=None)
+def _closing_fence_patterns(marker: str) -> Tuple[Pattern[str], Pattern[str]]:
+    """Build the patterns for a line that closes a fence.
+
+    Args:
+        marker: Opening fence marker, e.g. three backticks.
+
+    Returns:
+        Pattern for the first line of a chunk and newline-prefixed pattern for
+        every other line.
+    """
+    body = r"[ \t]*%s{%d,}[ \t]*\r?(?=\n|\Z)" % (re.escape(marker[0]), len(marker))
+    return re.compile(body), re.compile(r"\n" + body)
+
+
+def _opening_fence(match: "re.Match[str]", line: int) -> Optional[Fence]:
+    """Build the event for an opening fence.
+
+    Args:
+        match: Block pattern match for a fence line.
+        line: 1-based line number.
+
+    Returns:
+        Fence event, or None if the line is inline code rather than a fence.
+    """
+    marker = match.group("fence").lstrip(" \t")
+    info = match.group("info").strip()
+    # A backtick fence's info string may not contain backticks; such lines are inline code.
+    if marker[0] == "`" and "`" in info:
+        return None
+    return Fence(line, marker, True, info)
+
+
+def _heading_text(raw: str) -> str:
+    """Strip the optional closing sequence from a heading.
+
+    Args:
+        raw: Heading text after the opening hashes.
+
+    Returns:
+        Heading text.
+    """
+    text = raw.rstrip()
+    if text.endswith("#"):
+        text = CLOSING_SEQUENCE_PATTERN.sub("", text)
+    return text.strip()
+
+
+def _in_code_span(text: str, offset: int) -> bool:
+    """Check whether an offset falls inside an inline code span.
+
+    Args:
+        text: Text being scanned.
+        offset: Offset to test.
+
+    Returns:
+        True if the offset is inside a code span on its line.
+    """
+    line_start = text.rfind("\n", 0, offset) + 1
+    line_end = text.find("\n", offset)
+    if line_end == -1:
+        line_end = len(text)
+    return any(
+        match.start() <= offset < match.end() for match in CODE_SPAN_PATTERN.finditer(text, line_start, line_end)
+    )
@@ -0,0 +1,928 @@
+"""Full-text search over markdown sections with BM25 ranking.
+
+The index is one file, read through a memory map so a query touches only
+the terms it looks up. After a fixed header come these regions:
+
+* postings: per term, the ids of the sections containing it, the term
+  frequency in each, where each section's positions start, and the word
+  positions, all as little-endian 32-bit integers;
+* the term table: fixed-size records sorted by term, found by binary
+  search, and the term text;
+* the section table: file, line and title of every section, and the length
+  of every section in words;
+* the file table: the path of every file;
+* metadata used only when updating: size, mtime, digest and sections of
+  every file, as JSON.
+
+Section ids stay the same across updates. Sections of changed or removed
+files are dropped from the postings and leave an unused id behind, and new
+sections get ids after all existing ones, so postings of terms that did
+not lose a section are copied over without decoding. The index is rebuilt
+from scratch once unused ids outnumber sections.
+"""
+
+import heapq
+import json
+import logging
+import math
+import mmap
+import os
+import re
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+from collections import defaultdict
+from itertools import accumulate
+from pathlib import Path
+from typing import IO, Any, Dict, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+from src.cache import ensure_cache_dir
+from src.duplicates import split_sections, split_words
+from src.utils import content_digest
+
+logger = logging.getLogger(__name__)
+
+SEARCH_INDEX_FILE_NAME = "search.idx"
+
+MAGIC = b"AFSI"
+FORMAT_VERSION = 1
+
+# BM25 term frequency saturation and length normalization.
+K1 = 1.2
+B = 0.75
+
+# File id of a section whose file changed or went away.
+UNUSED = 0xFFFFFFFF
+
+# Quoted phrases, or single words.
+QUERY_PATTERN = re.compile(r'"([^"]*)"|(\S+)')
+
+
+class _Header(NamedTuple):
+    """Counts and region offsets at the start of an index file."""
+
+    magic: bytes
+    version: int
+    terms: int
+    sections: int
+    live: int
+    files: int
+    total_length: int
+    postings: int
+    term_table: int
+    term_text: int
+    section_table: int
+    lengths: int
+    titles: int
+    file_table: int
+    paths: int
+    meta: int
+
+
+HEADER = struct.Struct("<4sIIIIIQ9Q")
+# Text offset, text length, document frequency and postings offset of a term.
+TERM_RECORD = struct.Struct("<QIIQ")
+# File id, line, title offset and title length of a section.
+SECTION_RECORD = struct.Struct("<IIQI")
+# Path offset and path length of a file.
+FILE_RECORD = struct.Struct("<QI")
+U32 = struct.Struct("<I")
+
+
+class Hit(NamedTuple):
+    """A section matching a query."""
+
+    path: str
+    line: int
+    title: str
+    score: float
+
+
+class Postings(NamedTuple):
+    """Where a term occurs."""
+
+    ids: array
+    tfs: array
+    starts: array
+    positions: int
+
+
+class UpdateStats(NamedTuple):
+    """What an index update did."""
+
+    added: int
+    changed: int
+    removed: int
+    unchanged: int
+    sections: int
+    written: bool
+
+
+def _unpack(data: bytes) -> array:
+    """Decode little-endian 32-bit integers.
+
+    Args:
+        data: Encoded integers.
+
+    Returns:
+        The integers.
+    """
+    values = array("I", data)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+
+def _pack(values: Any) -> bytes:
+    """Encode integers as little-endian 32-bit integers.
+
+    Args:
+        values: Integers.
+
+    Returns:
+        Encoded integers.
+    """
+    encoded = array("I", values)
+    if sys.byteorder == "big":
+        encoded.byteswap()
+    return encoded.tobytes()
+
+
+def parse_query(query: str) -> Tuple[List[str], List[List[str]]]:
+    """Split a query into words and quoted phrases.
+
+    Args:
+        query: Query text; phrases are in double quotes.
+
+    Returns:
+        Words outside quotes, and the words of each phrase.
+    """
+    words: List[str] = []
+    phrases: List[List[str]] = []
+    for match in QUERY_PATTERN.finditer(query):
+        if match.group(1) is not None:
+            phrase = split_words(match.group(1))
+            if phrase:
+                phrases.append(phrase)
+        else:
+            words.extend(split_words(match.group(2)))
+    return words, phrases
+
+
+def analyze(content: str) -> Iterator[Tuple[int, str, List[str]]]:
+    """Split a document into the sections that are indexed.
+
+    Args:
+        content: Document text.
+
+    Yields:
+        Line, title and words of each section with any words, the title's
+        words first.
+    """
+    for line, title, body in split_sections(content):
+        words = split_words(title) + split_words(body)
+        if words:
+            yield line, title, words
+
+
+class SearchIndex:
+    """Read-only view of an index file through a memory map."""
+
+    def __init__(self, path: Path):
+        """Open an index.
+
+        Args:
+            path: Index file.
+
+        Raises:
+            OSError: If the file cannot be read.
+            ValueError: If the file is not an index of this format.
+        """
+        self.path = Path(path)
+        with open(self.path, "rb") as handle:
+            try:
+                self._map = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                raise ValueError(f"{self.path} is empty") from None
+        if len(self._map) < HEADER.size:
+            self.close()
+            raise ValueError(f"{self.path} is not a search index")
+        self.header = _Header._make(HEADER.unpack_from(self._map))
+        if self.header.magic != MAGIC or self.header.version != FORMAT_VERSION:
+            self.close()
+            raise ValueError(f"{self.path} is not a search index of format {FORMAT_VERSION}")
+        self._lengths: Optional[array] = None
+
+    def close(self) -> None:
+        """Release the memory map."""
+        self._map.close()
+
+    def __enter__(self) -> "SearchIndex":
+        """Use the index in a ``with`` block."""
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        """Close the index at the end of a ``with`` block."""
+        self.close()
+
+    def search(self, query: str, limit: int = 10) -> List[Hit]:
+        """Rank sections against a query with BM25.
+
+        Every section containing a query word is a candidate; quoted phrases
+        must appear word for word.
+
+        Args:
+            query: Words and quoted phrases.
+            limit: Most hits to return.
+
+        Returns:
+            Best hits first.
+        """
+        words, phrases = parse_query(query)
+        terms = list(dict.fromkeys(words + [word for phrase in phrases for word in phrase]))
+        postings = {term: self.postings(term) for term in terms}
+
+        candidates: Optional[Set[int]] = None
+        for phrase in phrases:
+            if any(postings[word] is None for word in phrase):
+                return []
+            matched = self._phrase_sections([postings[word] for word in phrase])  # type: ignore[misc]
+            candidates = matched if candidates is None else candidates & matched
+
+        scores = self._scores([found for found in postings.values() if found is not None], candidates)
+        best = heapq.nlargest(limit, scores.items(), key=lambda item: (item[1], -item[0]))
+        return [self._hit(section_id, score) for section_id, score in best]
+
+    def _scores(self, found: List[Postings], candidates: Optional[Set[int]]) -> Dict[int, float]:
+        """Add up the BM25 scores of the query terms per section.
+
+        Args:
+            found: Postings of the query terms in the index.
+            candidates: Sections that may match, or None for any.
+
+        Returns:
+            Score by section id.
+        """
+        live = self.header.live
+        lengths = self.section_lengths()
+        # The BM25 denominator is tf + K1 * (1 - B + B * length / average length).
+        constant = K1 * (1 - B)
+        per_word = K1 * B * live / self.header.total_length if self.header.total_length else 0.0
+        scores: Dict[int, float] = {}
+        get = scores.get
+        for postings in found:
+            frequency = len(postings.ids)
+            weight = (K1 + 1) * math.log(1 + (live - frequency + 0.5) / (frequency + 0.5))
+            if candidates is None:
+                pairs: Any = zip(postings.ids, postings.tfs)
+            elif len(candidates) < frequency:
+                pairs = self._restrict(postings, candidates)
+            else:
+                pairs = (pair for pair in zip(postings.ids, postings.tfs) if pair[0] in candidates)
+            for section_id, tf in pairs:
+                norm = constant + per_word * lengths[section_id]
+                scores[section_id] = get(section_id, 0.0) + weight * tf / (tf + norm)
+        return scores
+
+    @staticmethod
+    def _restrict(postings: Postings, sections: Set[int]) -> Iterator[Tuple[int, int]]:
+        """Look up the term frequency of a few sections.
+
+        Args:
+            postings: Postings of a term.
+            sections: Sections to look up.
+
+        Yields:
+            Section id and term frequency of each section the term occurs in.
+        """
+        ids = postings.ids
+        for section_id in sections:
+            index = bisect_left(ids, section_id)
+            if index < len(ids) and ids[index] == section_id:
+                yield section_id, postings.tfs[index]
+
+    def _phrase_sections(self, phrase: List[Postings]) -> Set[int]:
+        """Find the sections containing a phrase.
+
+        Args:
+            phrase: Postings of each word of the phrase, in order.
+
+        Returns:
+            Ids of the sections where the words occur one after another.
+        """
+        rarest = min(phrase, key=lambda postings: len(postings.ids))
+        common = set(rarest.ids)
+        for postings in phrase:
+            if postings is not rarest:
+                common.intersection_update(postings.ids)
+        if len(phrase) == 1:
+            return common
+
+        positions = [_unpack(self.raw_positions(postings)) for postings in phrase]
+        matched = set()
+        for section_id in common:
+            starts: Optional[Set[int]] = None
+            for offset, (postings, found) in enumerate(zip(phrase, positions)):
+                index = bisect_left(postings.ids, section_id)
+                first = postings.starts[index]
+                occurrences = found[first : first + postings.tfs[index]]
+                if starts is None:
+                    starts = set(occurrences)
+                else:
+                    starts.intersection_update(position - offset for position in occurrences)
+                if not starts:
+                    break
+            if starts:
+                matched.add(section_id)
+        return matched
+
+    def find_term(self, term: str) -> Optional[Tuple[int, int]]:
+        """Look a term up in the term table.
+
+        Args:
+            term: Lowercase word.
+
+        Returns:
+            Its document frequency and postings offset, or None if no
+            section contains it.
+        """
+        key = term.encode("utf-8")
+        low, high = 0, self.header.terms
+        while low < high:
+            middle = (low + high) // 2
+            text, frequency, offset = self._term(middle)
+            if text < key:
+                low = middle + 1
+            elif text > key:
+                high = middle
+            else:
+                return frequency, offset
+        return None
+
+    def _term(self, index: int) -> Tuple[bytes, int, int]:
+        """Read a term record.
+
+        Args:
+            index: Position in the term table.
+
+        Returns:
+            Term text, document frequency and postings offset.
+        """
+        text_offset, length, frequency, offset = TERM_RECORD.unpack_from(
+            self._map, self.header.term_table + index * TERM_RECORD.size
+        )
+        start = self.header.term_text + text_offset
+        return self._map[start : start + length], frequency, offset
+
+    def terms(self) -> Iterator[Tuple[bytes, int, int]]:
+        """Iterate over the term table.
+
+        Yields:
+            Term text, document frequency and postings offset, in term order.
+        """
+        for index in range(self.header.terms):
+            yield self._term(index)
+
+    def postings(self, term: str) -> Optional[Postings]:
+        """Read the postings of a term.
+
+        Args:
+            term: Lowercase word.
+
+        Returns:
+            Its postings, or None if no section contains it.
+        """
+        found = self.find_term(term)
+        return None if found is None else self.read_postings(*found)
+
+    def read_postings(self, frequency: int, offset: int) -> Postings:
+        """Read postings at an offset.
+
+        Args:
+            frequency: Number of sections in the postings.
+            offset: Offset in the postings region.
+
+        Returns:
+            Postings, with the positions left in the map.
+        """
+        start = self.header.postings + offset
+        size = 4 * frequency
+        ids = _unpack(self._map[start : start + size])
+        tfs = _unpack(self._map[start + size : start + 2 * size])
+        starts = _unpack(self._map[start + 2 * size : start + 3 * size])
+        return Postings(ids, tfs, starts, start + 3 * size)
+
+    def raw_positions(self, postings: Postings) -> bytes:
+        """Read all positions of postings without decoding them.
+
+        Args:
+            postings: Postings of a term.
+
+        Returns:
+            Encoded positions.
+        """
+        count = postings.starts[-1] + postings.tfs[-1] if len(postings.ids) else 0
+        return self._map[postings.positions : postings.positions + 4 * count]
+
+    def section_lengths(self) -> array:
+        """Return the length in words of every section, unused ids included."""
+        if self._lengths is None:
+            start = self.header.lengths
+            self._lengths = _unpack(self._map[start : start + 4 * self.header.sections])
+        return self._lengths
+
+    def section(self, section_id: int) -> Tuple[int, int, bytes]:
+        """Read a section record.
+
+        Args:
+            section_id: Section id.
+
+        Returns:
+            File id, line and encoded title; the file id is ``UNUSED`` for
+            ids no longer in use.
+        """
+        file_id, line, offset, length = SECTION_RECORD.unpack_from(
+            self._map, self.header.section_table + section_id * SECTION_RECORD.size
+        )
+        start = self.header.titles + offset
+        return file_id, line, self._map[start : start + length]
+
+    def file_path(self, file_id: int) -> str:
+        """Read the path of a file.
+
+        Args:
+            file_id: File id.
+
+        Returns:
+            Path relative to the indexed root in POSIX form.
+        """
+        offset, length = FILE_RECORD.unpack_from(self._map, self.header.file_table + file_id * FILE_RECORD.size)
+        start = self.header.paths + offset
+        return self._map[start : start + length].decode("utf-8")
+
+    def meta(self) -> Dict[str, Any]:
+        """Read the metadata used for updates."""
+        data: Dict[str, Any] = json.loads(self._map[self.header.meta :])
+        return data
+
+    def _hit(self, section_id: int, score: float) -> Hit:
+        """Describe a matching section.
+
+        Args:
+            section_id: Section id.
+            score: BM25 score.
+
+        Returns:
+            Hit for the section.
+        """
+        file_id, line, title = self.section(section_id)
+        return Hit(self.file_path(file_id), line, title.decode("utf-8"), score)
+
+
+class _NewSection(NamedTuple):
+    """A section analyzed during an update."""
+
+    file: str
+    line: int
+    title: str
+    length: int
+
+
+class _NewPostings(NamedTuple):
+    """Where a term occurs in the sections analyzed during an update."""
+
+    ids: array
+    tfs: array
+    positions: array
+
+
+class _Changes:
+    """The files, sections and postings an update keeps, adds, changes and removes."""
+
+    def __init__(self, next_id: int):
+        """Initialize an empty set of changes.
+
+        Args:
+            next_id: Id of the first section added.
+        """
+        self.next_id = next_id
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self.sections: Dict[int, _NewSection] = {}
+        self.postings: Dict[str, _NewPostings] = {}
+        self.deleted: Set[int] = set()
+        self.added = self.changed = self.unchanged = 0
+
+    def keep(self, rel_path: str, entry: Dict[str, Any]) -> None:
+        """Keep the sections of a file that did not change.
+
+        Args:
+            rel_path: File relative to the indexed root.
+            entry: The file's metadata, with its current size and mtime.
+        """
+        self.entries[rel_path] = entry
+        self.unchanged += 1
+
+    def update(self, rel_path: str, entry: Optional[Dict[str, Any]], stat: os.stat_result, data: bytes) -> None:
+        """Record a file that was read because its size or mtime changed.
+
+        Args:
+            rel_path: File relative to the indexed root.
+            entry: The file's metadata in the existing index, or None if it is new.
+            stat: The file's status.
+            data: The file's content.
+        """
+        digest = content_digest(data)
+        if entry is not None and entry["digest"] == digest:
+            self.keep(rel_path, {**entry, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns})
+            return
+        if entry is None:
+            self.added += 1
+        else:
+            self.remove(entry)
+            self.changed += 1
+        ids = self._add_sections(rel_path, data)
+        self.entries[rel_path] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "digest": digest, "sections": ids}
+
+    def remove(self, entry: Dict[str, Any]) -> None:
+        """Drop the sections of a file that changed or went away.
+
+        Args:
+            entry: The file's metadata in the existing index.
+        """
+        self.deleted.update(entry["sections"])
+
+    def _add_sections(self, rel_path: str, data: bytes) -> List[int]:
+        """Analyze the sections of a new or changed file.
+
+        Args:
+            rel_path: File relative to the indexed root.
+            data: The file's content.
+
+        Returns:
+            Ids given to the file's sections.
+        """
+        ids = []
+        for line, title, words in analyze(data.decode("utf-8", errors="replace")):
+            positions: Dict[str, List[int]] = defaultdict(list)
+            for position, word in enumerate(words):
+                positions[word].append(position)
+            for word, occurrences in positions.items():
+                found = self.postings.get(word)
+                if found is None:
+                    found = self.postings[word] = _NewPostings(array("I"), array("I"), array("I"))
+                found.ids.append(self.next_id)
+                found.tfs.append(len(occurrences))
+                found.positions.extend(occurrences)
+            self.sections[self.next_id] = _NewSection(rel_path, line, title, len(words))
+            ids.append(self.next_id)
+            self.next_id += 1
+        return ids
+
+
+class IndexWriter:
+    """Builds an index file, or updates one for the files that changed.
+
+    Files whose size and mtime, or failing that content digest, match the
+    index are not read again.
+    """
+
+    def __init__(self, root_path: Path, index_path: Path):
+        """Initialize writer.
+
+        Args:
+            root_path: Directory whose files are indexed.
+            index_path: Index file.
+        """
+        self.root_path = Path(root_path)
+        self.index_path = Path(index_path)
+
+    def update(self, files: List[Path], rebuild: bool = False) -> UpdateStats:
+        """Bring the index up to date with a tree.
+
+        Args:
+            files: Every markdown file to index.
+            rebuild: Ignore the existing index.
+
+        Returns:
+            What changed.
+
+        Raises:
+            OSError: If the index cannot be written.
+        """
+        old = None if rebuild else self._open()
+        try:
+            stats, compact = self._update(old, files)
+        finally:
+            if old is not None:
+                old.close()
+        if compact:
+            logger.info("Rebuilding search index: most section ids are unused")
+            self.update(files, rebuild=True)
+            return stats._replace(written=True)
+        return stats
+
+    def _open(self) -> Optional[SearchIndex]:
+        """Open the existing index, if there is a usable one."""
+        try:
+            return SearchIndex(self.index_path)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning("Rebuilding search index: %s", e)
+            return None
+
+    def _update(self, old: Optional[SearchIndex], files: List[Path]) -> Tuple[UpdateStats, bool]:
+        """Analyze what changed and write the new index.
+
+        Args:
+            old: Existing index, or None to build from scratch.
+            files: Every markdown file to index.
+
+        Returns:
+            What changed, and whether the index needs compacting instead.
+        """
+        previous: Dict[str, Dict[str, Any]] = {}
+        changes = _Changes(0)
+        unused = 0
+        if old is not None:
+            previous = old.meta()["files"]
+            changes.next_id = old.header.sections
+            unused = old.header.sections - old.header.live
+        touched = False
+
+        for file_path in files:
+            rel_path = Path(os.path.relpath(file_path, self.root_path)).as_posix()
+            entry = previous.pop(rel_path, None)
+            try:
+                stat = os.stat(file_path)
+                if entry is not None and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+                    changes.keep(rel_path, entry)
+                    continue
+                with open(file_path, "rb") as handle:
+                    data = handle.read()
+            except OSError as e:
+                logger.warning("Cannot read %s: %s", file_path, e)
+                if entry is not None:
+                    previous[rel_path] = entry
+                continue
+            touched = True
+            changes.update(rel_path, entry, stat, data)
+
+        for entry in previous.values():
+            changes.remove(entry)
+        live = changes.next_id - unused - len(changes.deleted)
+        stats = UpdateStats(changes.added, changes.changed, len(previous), changes.unchanged, live, False)
+        if old is not None and not touched and not previous:
+            return stats, False
+        if old is not None and unused + len(changes.deleted) > stats.sections:
+            return stats, True
+        self._write(old, changes.entries, changes.sections, changes.postings, changes.deleted, changes.next_id)
+        return stats._replace(written=True), False
+
+    def _write(
+        self,
+        old: Optional[SearchIndex],
+        entries: Dict[str, Dict[str, Any]],
+        sections: Dict[int, "_NewSection"],
+        postings: Dict[str, "_NewPostings"],
+        deleted: Set[int],
+        count: int,
+    ) -> None:
+        """Write the index to a temporary file and move it into place.
+
+        Args:
+            old: Existing index whose postings are carried over, or None.
+            entries: Metadata of every indexed file, by relative path.
+            sections: Sections analyzed in this update, by id.
+            postings: Positions of each word in the new sections.
+            deleted: Ids of existing sections that are no longer in use.
+            count: Number of section ids, used or not.
+        """
+        ensure_cache_dir(self.index_path.parent)
+        tmp_path = self.index_path.with_name(f".{self.index_path.name}.{os.getpid()}.tmp")
+        try:
+            with open(tmp_path, "wb") as handle:
+                handle.write(bytes(HEADER.size))
+                terms = self._write_postings(handle, old, postings, deleted)
+                header = self._write_tables(handle, old, entries, sections, deleted, count, terms)
+                handle.seek(0)
+                handle.write(HEADER.pack(*header))
+            os.replace(tmp_path, self.index_path)
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
+
+    def _write_postings(
+        self,
+        handle: IO[bytes],
+        old: Optional[SearchIndex],
+        postings: Dict[str, "_NewPostings"],
+        deleted: Set[int],
+    ) -> List[Tuple[bytes, int, int]]:
+        """Write the postings region, merging carried-over and new postings term by term.
+
+        Args:
+            handle: Index file positioned after the header.
+            old: Existing index, or None.
+            postings: Positions of each word in the new sections.
+            deleted: Ids of existing sections that are no longer in use.
+
+        Returns:
+            Text, document frequency and postings offset of every term, in
+            term order.
+        """
+        new_terms = sorted((word.encode("utf-8"), word) for word in postings)
+        old_terms = old.terms() if old is not None else iter(())
+        terms: List[Tuple[bytes, int, int]] = []
+        offset = 0
+        current_old = next(old_terms, None)
+        for key, word in new_terms + [(b"", "")]:
+            # The empty sentinel only flushes the remaining existing terms.
+            while current_old is not None and (not word or current_old[0] < key):
+                offset = self._write_term(handle, terms, offset, old, current_old, None, deleted)
+                current_old = next(old_terms, None)
+            if not word:
+                break
+            carried = None
+            if current_old is not None and current_old[0] == key:
+                carried = current_old
+                current_old = next(old_terms, None)
+            offset = self._write_term(handle, terms, offset, old, carried, postings[word], deleted, key)
+        return terms
+
+    @staticmethod
+    def _write_term(
+        handle: IO[bytes],
+        terms: List[Tuple[bytes, int, int]],
+        offset: int,
+        old: Optional[SearchIndex],
+        carried: Optional[Tuple[bytes, int, int]],
+        added: Optional["_NewPostings"],
+        deleted: Set[int],
+        key: bytes = b"",
+    ) -> int:
+        """Write the postings of one term.
+
+        Args:
+            handle: Index file.
+            terms: Term records written so far; extended in place.
+            offset: Offset in the postings region to write at.
+            old: Existing index, or None.
+            carried: Existing term record, or None.
+            added: Postings in the sections analyzed in this update, or None.
+            deleted: Ids of existing sections that are no longer in use.
+            key: Term text, if not carried over.
+
+        Returns:
+            Offset after the written postings.
+        """
+        ids = tfs = starts = positions = b""
+        if carried is not None and old is not None:
+            key = carried[0]
+            kept = old.read_postings(carried[1], carried[2])
+            if deleted and not deleted.isdisjoint(kept.ids):
+                keep = [index for index, section_id in enumerate(kept.ids) if section_id not in deleted]
+                raw = old.raw_positions(kept)
+                ids = _pack(kept.ids[i] for i in keep)
+                tfs = _pack(kept.tfs[i] for i in keep)
+                positions = b"".join(raw[4 * kept.starts[i] : 4 * (kept.starts[i] + kept.tfs[i])] for i in keep)
+                starts = _pack(_starts(array("I", (kept.tfs[i] for i in keep))))
+            else:
+                ids, tfs, starts = _pack(kept.ids), _pack(kept.tfs), _pack(kept.starts)
+                positions = old.raw_positions(kept)
+        if added is not None:
+            starts += _pack(_starts(added.tfs, len(positions) // 4))
+            ids += _pack(added.ids)
+            tfs += _pack(added.tfs)
+            positions += _pack(added.positions)
+        frequency = len(ids) // 4
+        if not frequency:
+            return offset
+        handle.write(ids + tfs + starts + positions)
+        terms.append((key, frequency, offset))
+        return offset + len(ids) + len(tfs) + len(starts) + len(positions)
+
+    def _write_tables(
+        self,
+        handle: IO[bytes],
+        old: Optional[SearchIndex],
+        entries: Dict[str, Dict[str, Any]],
+        sections: Dict[int, "_NewSection"],
+        deleted: Set[int],
+        count: int,
+        terms: List[Tuple[bytes, int, int]],
+    ) -> _Header:
+        """Write every region after the postings.
+
+        Args:
+            handle: Index file positioned after the postings.
+            old: Existing index, or None.
+            entries: Metadata of every indexed file, by relative path.
+            sections: Sections analyzed in this update, by id.
+            deleted: Ids of existing sections that are no longer in use.
+            count: Number of section ids, used or not.
+            terms: Text, document frequency and postings offset of every term.
+
+        Returns:
+            Header describing the file.
+        """
+        offsets = {"postings": HEADER.size}
+
+        offsets["term_table"] = handle.tell()
+        text_offset = 0
+        for key, frequency, offset in terms:
+            handle.write(TERM_RECORD.pack(text_offset, len(key), frequency, offset))
+            text_offset += len(key)
+        offsets["term_text"] = handle.tell()
+        handle.write(b"".join(key for key, _, _ in terms))
+
+        file_ids = {}
+        for file_id, entry in enumerate(entries.values()):
+            for section_id in entry["sections"]:
+                file_ids[section_id] = file_id
+        old_lengths = old.section_lengths() if old is not None else array("I")
+        lengths = []
+        titles = []
+        title_offset = 0
+        offsets["section_table"] = handle.tell()
+        for section_id in range(count):
+            new = sections.get(section_id)
+            if new is not None:
+                line, title, length = new.line, new.title.encode("utf-8"), new.length
+            elif old is not None and section_id not in deleted and section_id in file_ids:
+                _, line, title = old.section(section_id)
+                length = old_lengths[section_id]
+            else:
+                line, title, length = 0, b"", 0
+            handle.write(SECTION_RECORD.pack(file_ids.get(section_id, UNUSED), line, title_offset, len(title)))
+            titles.append(title)
+            lengths.append(length if section_id in file_ids else 0)
+            title_offset += len(title)
+        offsets["lengths"] = handle.tell()
+        handle.write(_pack(lengths))
+        offsets["titles"] = handle.tell()
+        handle.write(b"".join(titles))
+
+        offsets["file_table"] = handle.tell()
+        paths = [rel_path.encode("utf-8") for rel_path in entries]
+        path_offset = 0
+        for path in paths:
+            handle.write(FILE_RECORD.pack(path_offset, len(path)))
+            path_offset += len(path)
+        offsets["paths"] = handle.tell()
+        handle.write(b"".join(paths))
+
+        offsets["meta"] = handle.tell()
+        handle.write(json.dumps({"files": entries}, separators=(",", ":")).encode("utf-8"))
+
+        return _Header(
+            MAGIC,
+            FORMAT_VERSION,
+            len(terms),
+            count,
+            len(file_ids),
+            len(entries),
+            sum(lengths),
+            **offsets,
+        )
+
+
+def _starts(tfs: array, base: int = 0) -> Iterator[int]:
+    """Compute where the positions of each section begin.
+
+    Args:
+        tfs: Term frequency in each section, in postings order.
+        base: Where the positions of the first section begin.
+
+    Returns:
+        Offset of each section's positions.
+    """
+    return accumulate(tfs[:-1], initial=base) if tfs else iter(())
+
+
+def write_text(hits: List[Hit], stream: IO[str]) -> None:
+    """Write hits for people to read.
+
+    Args:
+        hits: Hits, best first.
+        stream: Output stream.
+    """
+    if not hits:
+        stream.write("No matching sections\n")
+        return
+    for hit in hits:
+        title = f" ({hit.title})" if hit.title else ""
+        stream.write(f"{hit.score:8.2f}  {hit.path}:{hit.line}{title}\n")
+
+
+def write_json(hits: List[Hit], stream: IO[str]) -> None:
+    """Write hits as JSON.
+
+    Args:
+        hits: Hits, best first.
+        stream: Output stream.
+    """
+    data = [{**hit._asdict(), "score": round(hit.score, 4)} for hit in hits]
+    json.dump({"hits": data}, stream, indent=2)
+    stream.write("\n")
@@ -0,0 +1,492 @@
+"""Language server that keeps the repository index warm between edits."""
+
+import json
+import logging
+import time
+from pathlib import Path
+from typing import Any, BinaryIO, Callable, Dict, List, Optional
+from urllib.parse import urlparse
+from urllib.request import url2pathname
+
+from src.diagnostics import Diagnostic
+from src.utils import LinkChecker
+
+logger = logging.getLogger(__name__)
+
+SOURCE = "ai-fundamentals"
+
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INTERNAL_ERROR = -32603
+SERVER_NOT_INITIALIZED = -32002
+
+TEXT_DOCUMENT_SYNC_FULL = 1
+SEVERITY_ERROR = 1
+
+Message = Dict[str, Any]
+
+
+class Connection:
+    """Reads and writes JSON-RPC messages with LSP ``Content-Length`` framing."""
+
+    def __init__(self, reader: BinaryIO, writer: BinaryIO):
+        """Wrap a pair of byte streams.
+
+        Args:
+            reader: Stream the client writes to, usually standard input.
+            writer: Stream the client reads from, usually standard output.
+        """
+        self.reader = reader
+        self.writer = writer
+
+    def read_message(self) -> Optional[Message]:
+        """Read the next message.
+
+        Returns:
+            Decoded message, or None once the client closed the stream.
+
+        Raises:
+            ValueError: If the framing or the JSON body is invalid.
+        """
+        length = None
+        while True:
+            line = self.reader.readline()
+            if not line:
+                return None
+            line = line.strip()
+            if not line:
+                break
+            name, _, value = line.decode("ascii").partition(":")
+            if name.strip().lower() == "content-length":
+                length = int(value)
+        if length is None:
+            raise ValueError("Message without Content-Length header")
+
+        body = self.reader.read(length)
+        if len(body) < length:
+            return None
+        message = json.loads(body.decode("utf-8"))
+        if not isinstance(message, dict):
+            raise ValueError("Message is not a JSON object")
+        return message
+
+    def write_message(self, message: Message) -> None:
+        """Write one message and flush it to the client.
+
+        Args:
+            message: JSON-RPC message without the ``jsonrpc`` member.
+        """
+        body = json.dumps({"jsonrpc": "2.0", **message}, separators=(",", ":")).encode("utf-8")
+        self.writer.write(b"Content-Length: %d\r\n\r\n" % len(body) + body)
+        self.writer.flush()
+
+
+class LanguageServer:
+    """Validates open documents against an in-memory index of the repository.
+
+    The repository is scanned once, when the client reports it is ready.
+    After that, edits are validated from the buffer contents sent by the
+    editor without writing them to disk: only the edited file is scanned
+    again, and files linking to its anchors are rechecked when its headings
+    change. Saved and closed documents and files changed outside the editor
+    are read from disk again. Diagnostics are published whenever a file's
+    diagnostics change.
+    """
+
+    def __init__(self, connection: Connection, root_path: Path, make_checker: Callable[[Path], LinkChecker]):
+        """Create a server that has not been initialized yet.
+
+        Args:
+            connection: Connection to the client.
+            root_path: Repository root used when the client does not send one.
+            make_checker: Creates the link checker for a repository root.
+        """
+        self.connection = connection
+        self.root_path = Path(root_path)
+        self.make_checker = make_checker
+        self.checker: Optional[LinkChecker] = None
+        self.documents: Dict[Path, str] = {}
+        self.uris: Dict[Path, str] = {}
+        self.initialize_received = False
+        self.shutdown_requested = False
+        self.handlers: Dict[str, Callable[[Dict[str, Any]], Any]] = {
+            "initialize": self.initialize,
+            "initialized": self.initialized,
+            "shutdown": self.shutdown,
+            "textDocument/didOpen": self.did_open,
+            "textDocument/didChange": self.did_change,
+            "textDocument/didSave": self.did_save,
+            "textDocument/didClose": self.did_close,
+            "workspace/didChangeWatchedFiles": self.did_change_watched_files,
+        }
+
+    def serve(self) -> int:
+        """Handle messages until the client exits.
+
+        Returns:
+            Exit code: 0 if ``shutdown`` was requested before ``exit``,
+            1 otherwise.
+        """
+        while True:
+            try:
+                message = self.connection.read_message()
+            except ValueError as e:
+                logger.error("Invalid message: %s", e)
+                self.connection.write_message({"id": None, "error": {"code": PARSE_ERROR, "message": str(e)}})
+                continue
+            if message is None or message.get("method") == "exit":
+                break
+            self.handle(message)
+
+        if self.checker is not None and self.checker.cache is not None:
+            self.checker.cache.save()
+        return 0 if self.shutdown_requested else 1
+
+    def handle(self, message: Message) -> None:
+        """Dispatch one request or notification.
+
+        Requests get a response; failing notifications are only logged.
+
+        Args:
+            message: Decoded JSON-RPC message.
+        """
+        method = message.get("method")
+        is_request = "id" in message
+        if not isinstance(method, str):
+            if is_request:
+                self._respond_error(message["id"], INVALID_REQUEST, "Message has no method")
+            return
+
+        handler = self.handlers.get(method)
+        if handler is None:
+            if is_request:
+                self._respond_error(message["id"], METHOD_NOT_FOUND, f"Unknown method: {method}")
+            return
+
+        if not self.initialize_received and method != "initialize":
+            if is_request:
+                self._respond_error(message["id"], SERVER_NOT_INITIALIZED, "Server is not initialized")
+            return
+
+        try:
+            result = handler(message.get("params") or {})
+        except Exception as e:  # one failing message must not stop the server
+            logger.exception("Failed to handle %s", method)
+            self._report_failure(message, INTERNAL_ERROR, f"{type(e).__name__}: {e}")
+        else:
+            if is_request:
+                self.connection.write_message({"id": message["id"], "result": result})
+
+    def initialize(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Answer the client's capabilities with the server's.
+
+        Args:
+            params: ``InitializeParams``; ``rootUri`` or ``rootPath`` replaces
+                the root given on the command line.
+
+        Returns:
+            ``InitializeResult``.
+        """
+        if params.get("rootUri"):
+            self.root_path = uri_to_path(params["rootUri"]).resolve()
+        elif params.get("rootPath"):
+            self.root_path = Path(params["rootPath"]).resolve()
+        self.initialize_received = True
+        return {
+            "capabilities": {
+                "textDocumentSync": {"openClose": True, "change": TEXT_DOCUMENT_SYNC_FULL, "save": True},
+            },
+            "serverInfo": {"name": SOURCE},
+        }
+
+    def initialized(self, params: Dict[str, Any]) -> None:
+        """Scan and validate the whole repository.
+
+        Args:
+            params: Unused ``InitializedParams``.
+        """
+        self._ensure_checker()
+
+    def shutdown(self, params: Dict[str, Any]) -> None:
+        """Prepare to exit.
+
+        Args:
+            params: Unused.
+        """
+        self.shutdown_requested = True
+
+    def did_open(self, params: Dict[str, Any]) -> None:
+        """Validate a document as the editor shows it.
+
+        Args:
+            params: ``DidOpenTextDocumentParams``.
+        """
+        document = params["textDocument"]
+        file_path = self._document_path(document["uri"])
+        if file_path is None:
+            return
+        self.documents[file_path] = document["text"]
+        self._update(file_path)
+
+    def did_change(self, params: Dict[str, Any]) -> None:
+        """Validate the new contents of an open document.
+
+        Args:
+            params: ``DidChangeTextDocumentParams``. Changes with a range are
+                applied to the previous text; others replace it.
+        """
+        file_path = self._document_path(params["textDocument"]["uri"])
+        if file_path is None or file_path not in self.documents:
+            return
+        text = self.documents[file_path]
+        for change in params["contentChanges"]:
+            text = apply_change(text, change)
+        self.documents[file_path] = text
+        self._update(file_path)
+
+    def did_save(self, params: Dict[str, Any]) -> None:
+        """Validate a saved document from disk, updating the cache.
+
+        Args:
+            params: ``DidSaveTextDocumentParams``.
+        """
+        file_path = self._document_path(params["textDocument"]["uri"])
+        if file_path is not None:
+            self._publish(self._ensure_checker().discard_text(file_path))
+
+    def did_close(self, params: Dict[str, Any]) -> None:
+        """Go back to the file on disk, dropping any unsaved changes.
+
+        Args:
+            params: ``DidCloseTextDocumentParams``.
+        """
+        file_path = self._document_path(params["textDocument"]["uri"])
+        if file_path is not None and self.documents.pop(file_path, None) is not None:
+            self._publish(self._ensure_checker().discard_text(file_path))
+
+    def did_change_watched_files(self, params: Dict[str, Any]) -> None:
+        """Recheck files changed outside the editor.
+
+        Args:
+            params: ``DidChangeWatchedFilesParams``. Documents with unsaved
+                changes keep being validated from their buffers.
+        """
+        paths = [uri_to_path(change["uri"]) for change in params.get("changes", ())]
+        if paths:
+            self._publish(self._ensure_checker().refresh(paths))
+
+    def _ensure_checker(self) -> LinkChecker:
+        """Return the checker, validating the repository on first use.
+
+        Returns:
+            Checker holding results for the whole repository.
+        """
+        if self.checker is None:
+            start = time.perf_counter()
+            self.checker = self.make_checker(self.root_path)
+            self.checker.check_all_links()
+            total_errors = sum(len(errors) for errors in self.checker.results.values())
+            logger.info(
+                "Indexed %s in %.2f s: %s error(s) in %s file(s)",
+                self.root_path,
+                time.perf_counter() - start,
+                total_errors,
+                len(self.checker.results),
+            )
+            self._publish(self.checker.results)
+        return self.checker
+
+    def _document_path(self, uri: str) -> Optional[Path]:
+        """Map a document URI to a markdown file in the repository.
+
+        Args:
+            uri: Document URI sent by the client.
+
+        Returns:
+            File path, or None if the document is not validated.
+        """
+        if not uri.startswith("file:"):
+            return None
+        file_path = uri_to_path(uri)
+        if file_path.suffix != ".md" or not file_path.is_relative_to(self.root_path):
+            return None
+        self.uris[file_path] = uri
+        return file_path
+
+    def _update(self, file_path: Path) -> None:
+        """Validate an open document's buffer and publish what changed.
+
+        Args:
+            file_path: Open document.
+        """
+        checker = self._ensure_checker()
+        start = time.perf_counter()
+        changes = checker.update_text(file_path, self.documents[file_path])
+        seconds = time.perf_counter() - start
+        logger.debug(
+            "Validated %s in %.1f ms", file_path, seconds * 1000, extra={"file": str(file_path), "duration": seconds}
+        )
+        self._publish(changes)
+
+    def _publish(self, changes: Dict[Path, List[Diagnostic]]) -> None:
+        """Send the diagnostics of each changed file to the client.
+
+        Args:
+            changes: Complete diagnostics of each file whose diagnostics
+                changed; an empty list clears them.
+        """
+        for file_path, errors in sorted(changes.items()):
+            uri = self.uris.get(file_path) or file_path.as_uri()
+            text = self._text(file_path) if any(error.column > 1 for error in errors) else None
+            self.connection.write_message(
+                {
+                    "method": "textDocument/publishDiagnostics",
+                    "params": {"uri": uri, "diagnostics": [lsp_diagnostic(error, text) for error in errors]},
+                }
+            )
+
+    def _text(self, file_path: Path) -> Optional[str]:
+        """Return the text diagnostics of a file were computed from.
+
+        Args:
+            file_path: Open document or file on disk.
+
+        Returns:
+            Unsaved text of the document, else the file's content, or None if
+            it cannot be read.
+        """
+        text = self.documents.get(file_path)
+        if text is None:
+            try:
+                text = file_path.read_text(encoding="utf-8", errors="replace")
+            except OSError:
+                return None
+        return text
+
+    def _report_failure(self, message: Message, code: int, text: str) -> None:
+        """Answer a failed request, or log a failed notification.
+
+        Args:
+            message: Message that failed.
+            code: JSON-RPC error code.
+            text: Description of the failure.
+        """
+        if "id" in message:
+            self._respond_error(message["id"], code, text)
+        else:
+            logger.error("%s: %s", message.get("method"), text)
+
+    def _respond_error(self, request_id: Any, code: int, text: str) -> None:
+        """Send an error response.
+
+        Args:
+            request_id: Id of the failed request.
+            code: JSON-RPC error code.
+            text: Description of the failure.
+        """
+        self.connection.write_message({"id": request_id, "error": {"code": code, "message": text}})
+
+
+def uri_to_path(uri: str) -> Path:
+    """Convert a ``file:`` URI to a path.
+
+    Args:
+        uri: File URI.
+
+    Returns:
+        Absolute path.
+    """
+    # url2pathname percent-decodes the path itself.
+    return Path(url2pathname(urlparse(uri).path))
+
+
+def apply_change(text: str, change: Dict[str, Any]) -> str:
+    """Apply one ``TextDocumentContentChangeEvent`` to a document.
+
+    Args:
+        text: Current document text.
+        change: Change event; without a ``range`` it replaces the whole text.
+
+    Returns:
+        Updated text.
+    """
+    new_text: str = change["text"]
+    if "range" not in change:
+        return new_text
+    start = _offset(text, change["range"]["start"])
+    end = _offset(text, change["range"]["end"])
+    return text[:start] + new_text + text[end:]
+
+
+def _offset(text: str, position: Dict[str, int]) -> int:
+    """Find the string index of an LSP position.
+
+    Args:
+        text: Document text.
+        position: 0-based line and character, counted in UTF-16 code units.
+
+    Returns:
+        Index into ``text``, clamped to the end of the line or document.
+    """
+    offset = 0
+    for _ in range(position["line"]):
+        newline = text.find("\n", offset)
+        if newline == -1:
+            return len(text)
+        offset = newline + 1
+
+    units = position["character"]
+    while units > 0 and offset < len(text) and text[offset] != "\n":
+        units -= 2 if ord(text[offset]) > 0xFFFF else 1
+        offset += 1
+    return offset
+
+
+def _utf16_character(text: str, line: int, index: int) -> int:
+    """Convert a string index within a line to an LSP character.
+
+    Args:
+        text: Document text.
+        line: 0-based line.
+        index: 0-based index into the line, in code points.
+
+    Returns:
+        The same position counted in UTF-16 code units.
+    """
+    start = 0
+    for _ in range(line):
+        newline = text.find("\n", start)
+        if newline == -1:
+            return index
+        start = newline + 1
+    prefix = text[start : start + index]
+    return index + sum(1 for char in prefix if ord(char) > 0xFFFF)
+
+
+def lsp_diagnostic(error: Diagnostic, text: Optional[str] = None) -> Dict[str, Any]:
+    """Convert a diagnostic to an LSP ``Diagnostic``.
+
+    Args:
+        error: Diagnostic to convert.
+        text: Text the diagnostic was computed from. Columns are counted in
+            code points and LSP counts UTF-16 code units, so without it
+            columns after characters outside the Basic Multilingual Plane are
+            off.
+
+    Returns:
+        Diagnostic with a 0-based, empty range at the reported position.
+        Problems with the whole file are placed at its start.
+    """
+    line = max(error.line - 1, 0)
+    character = max(error.column - 1, 0)
+    if text is not None and character:
+        character = _utf16_character(text, line, character)
+    position = {"line": line, "character": character}
+    return {
+        "range": {"start": position, "end": position},
+        "severity": SEVERITY_ERROR,
+        "code": error.rule,
+        "source": SOURCE,
+        "message": error.message,
+    }
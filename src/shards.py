@@ -0,0 +1,281 @@
+"""Splitting a validation run into shards and merging their results."""
+
+import hashlib
+import heapq
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from src import __version__
+from src.diagnostics import Diagnostic
+
+SHARD_FORMAT = 1
+DEFAULT_OUTPUT = "ai-fundamentals-shard-{index}-of-{count}.json"
+
+
+def shard_hash(name: str) -> int:
+    """Hash a relative path the same way on every machine and Python run.
+
+    Args:
+        name: Path relative to the repository root, with ``/`` separators.
+
+    Returns:
+        Unsigned 64-bit hash.
+    """
+    return int.from_bytes(hashlib.blake2b(name.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def relative_name(file_path: Path, root_path: Path) -> str:
+    """Return a file's path relative to the root in a platform-neutral form.
+
+    Args:
+        file_path: File inside the root.
+        root_path: Repository root.
+
+    Returns:
+        Relative path with ``/`` separators.
+    """
+    return Path(os.path.relpath(file_path, root_path)).as_posix()
+
+
+class ShardPlan:
+    """Assignment of every markdown file in a tree to one of N shards.
+
+    Without timings a file's shard follows from the hash of its relative path
+    alone, so adding or removing a file never moves other files. With the
+    per-file timings of a previous run, files are instead assigned slowest
+    first to the shard with the least work so far; files without a timing
+    count as the mean of those with one. Either way every shard computes the
+    same plan from the same tree and timings.
+    """
+
+    def __init__(self, root_path: Path, files: Iterable[Path], count: int, timings: Optional[Dict[str, float]] = None):
+        """Assign files to shards.
+
+        Args:
+            root_path: Repository root that names are relative to.
+            files: Every markdown file in the tree.
+            count: Number of shards.
+            timings: Seconds each file took to validate, by relative name.
+        """
+        self.root_path = Path(root_path)
+        self.count = count
+        names = sorted(relative_name(file_path, self.root_path) for file_path in files)
+        self.assignments: Dict[str, int] = (
+            _balance(names, count, timings) if timings else {name: shard_hash(name) % count for name in names}
+        )
+
+    @property
+    def digest(self) -> str:
+        """Hex digest identifying the plan, equal on every shard that shares it."""
+        hasher = hashlib.blake2b(digest_size=16)
+        hasher.update(str(self.count).encode())
+        for name, shard in sorted(self.assignments.items()):
+            hasher.update(f"\0{name}\0{shard}".encode("utf-8"))
+        return hasher.hexdigest()
+
+    def files(self, index: int) -> List[Path]:
+        """Return the files of one shard.
+
+        Args:
+            index: 1-based shard number.
+
+        Returns:
+            Files assigned to the shard, sorted.
+        """
+        return sorted(self.root_path / name for name, shard in self.assignments.items() if shard == index - 1)
+
+
+def _balance(names: List[str], count: int, timings: Dict[str, float]) -> Dict[str, int]:
+    """Assign files to shards so their expected times are close.
+
+    Args:
+        names: Sorted relative names of every file.
+        count: Number of shards.
+        timings: Seconds per file from a previous run.
+
+    Returns:
+        0-based shard of each name.
+    """
+    known = [timings[name] for name in names if name in timings]
+    default = sum(known) / len(known) if known else 1.0
+    weighted = sorted(names, key=lambda name: (-timings.get(name, default), name))
+    loads = [(0.0, shard) for shard in range(count)]
+    assignments = {}
+    for name in weighted:
+        load, shard = heapq.heappop(loads)
+        assignments[name] = shard
+        heapq.heappush(loads, (load + timings.get(name, default), shard))
+    return assignments
+
+
+class ShardResult:
+    """Diagnostics and timings of one shard, written for ``merge`` to combine."""
+
+    def __init__(
+        self,
+        index: int,
+        count: int,
+        rules: str,
+        plan: str,
+        diagnostics: Optional[List[Diagnostic]] = None,
+        timings: Optional[Dict[str, float]] = None,
+    ):
+        """Initialize shard result.
+
+        Args:
+            index: 1-based shard number.
+            count: Number of shards.
+            rules: Fingerprint of the rules the shard ran.
+            plan: Digest of the shard plan.
+            diagnostics: Diagnostics found by the shard.
+            timings: Seconds each validated file took, by relative name.
+        """
+        self.index = index
+        self.count = count
+        self.rules = rules
+        self.plan = plan
+        self.diagnostics = diagnostics if diagnostics is not None else []
+        self.timings = timings if timings is not None else {}
+
+    def collect(self, diagnostics: Iterable[Diagnostic]) -> Iterator[Diagnostic]:
+        """Record diagnostics as they pass through to the reporter.
+
+        Args:
+            diagnostics: Diagnostics, possibly still being computed.
+
+        Yields:
+            The same diagnostics.
+        """
+        for diagnostic in diagnostics:
+            self.diagnostics.append(diagnostic)
+            yield diagnostic
+
+    def write(self, output_path: Path, root_path: Path) -> None:
+        """Write the result as JSON with paths relative to the root.
+
+        Args:
+            output_path: File to write.
+            root_path: Repository root.
+        """
+        data = {
+            "format": SHARD_FORMAT,
+            "version": __version__,
+            "shard": self.index,
+            "shards": self.count,
+            "rules": self.rules,
+            "plan": self.plan,
+            "timings": self.timings,
+            "diagnostics": [
+                [
+                    relative_name(diagnostic.path, root_path),
+                    diagnostic.line,
+                    diagnostic.column,
+                    diagnostic.rule,
+                    diagnostic.message,
+                ]
+                for diagnostic in self.diagnostics
+            ],
+        }
+        with open(output_path, "w", encoding="utf-8") as handle:
+            json.dump(data, handle, separators=(",", ":"))
+
+    @classmethod
+    def read(cls, input_path: Path, root_path: Path) -> "ShardResult":
+        """Read a result written by ``write``.
+
+        Args:
+            input_path: File to read.
+            root_path: Directory that diagnostic paths are resolved against.
+
+        Returns:
+            Shard result.
+
+        Raises:
+            ValueError: If the file is not a shard result of this format.
+            OSError: If the file cannot be read.
+        """
+        data = _load(input_path)
+        diagnostics = [
+            Diagnostic(root_path / name, rule, message, line, column)
+            for name, line, column, rule, message in data["diagnostics"]
+        ]
+        return cls(data["shard"], data["shards"], data["rules"], data["plan"], diagnostics, data["timings"])
+
+
+def _load(input_path: Path) -> Dict[str, Any]:
+    """Load and check the JSON of a shard result.
+
+    Args:
+        input_path: File to read.
+
+    Returns:
+        Decoded data.
+
+    Raises:
+        ValueError: If the file is not a shard result of this format.
+        OSError: If the file cannot be read.
+    """
+    with open(input_path, encoding="utf-8") as handle:
+        try:
+            data = json.load(handle)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"{input_path} is not valid JSON: {e}") from None
+    if not isinstance(data, dict) or data.get("format") != SHARD_FORMAT:
+        raise ValueError(f"{input_path} is not a shard result of format {SHARD_FORMAT}")
+    return data
+
+
+def load_timings(paths: Iterable[str]) -> Dict[str, float]:
+    """Collect per-file timings from the shard results of a previous run.
+
+    Args:
+        paths: Shard result files.
+
+    Returns:
+        Seconds per relative file name.
+
+    Raises:
+        ValueError: If a file is not a shard result of this format.
+        OSError: If a file cannot be read.
+    """
+    timings: Dict[str, float] = {}
+    for path in paths:
+        timings.update(_load(Path(path))["timings"])
+    return timings
+
+
+def merge_results(results: List[ShardResult]) -> List[Diagnostic]:
+    """Combine the results of every shard of one run.
+
+    Args:
+        results: One result per shard, in any order.
+
+    Returns:
+        Every diagnostic, grouped by file in sorted order. Within a file the
+        order of the unsharded run is kept.
+
+    Raises:
+        ValueError: If shards are missing or repeated, or were run with
+            different shard counts, rules or plans.
+    """
+    if not results:
+        raise ValueError("No shard results to merge")
+    first = results[0]
+    for result in results[1:]:
+        if result.count != first.count:
+            raise ValueError(f"Shard {result.index} is one of {result.count} shards, not {first.count}")
+        if result.rules != first.rules:
+            raise ValueError(f"Shard {result.index} ran different rules than shard {first.index}")
+        if result.plan != first.plan:
+            raise ValueError(f"Shard {result.index} partitioned a different tree than shard {first.index}")
+
+    indexes = sorted(result.index for result in results)
+    if indexes != list(range(1, first.count + 1)):
+        missing = sorted(set(range(1, first.count + 1)) - set(indexes))
+        repeated = sorted({index for index in indexes if indexes.count(index) > 1})
+        raise ValueError(f"Expected shards 1-{first.count}; missing {missing}, repeated {repeated}")
+
+    diagnostics = [diagnostic for result in results for diagnostic in result.diagnostics]
+    return sorted(diagnostics, key=lambda diagnostic: diagnostic.path)
@@ -0,0 +1,137 @@
+"""Bounded-memory reading of large files."""
+
+import mmap
+import os
+from typing import BinaryIO, Iterator, Optional, Tuple, Union
+
+# Files larger than this are validated in chunks instead of being read whole.
+STREAM_THRESHOLD = 32 * 1024 * 1024
+
+# Bytes handed to the scanner at a time; chunks are extended to the next line end.
+CHUNK_SIZE = 1024 * 1024
+
+PathLike = Union[str, "os.PathLike[str]"]
+
+
+def iter_line_chunks(file_path: PathLike, chunk_size: Optional[int] = None) -> Iterator[Tuple[int, bytes]]:
+    """Read a file in chunks that end on line boundaries.
+
+    The file is memory-mapped and read front to back. Pages already passed
+    are handed back to the kernel where the platform allows it, so resident
+    memory stays near one chunk however large the file is. A single line
+    longer than ``chunk_size`` is returned whole.
+
+    Args:
+        file_path: File to read.
+        chunk_size: Approximate chunk size in bytes. Defaults to
+            ``CHUNK_SIZE``.
+
+    Yields:
+        Byte offset of each chunk and its bytes. Every chunk but the last
+        ends with a newline.
+    """
+    chunk_size = chunk_size or CHUNK_SIZE
+    with open(file_path, "rb") as handle:
+        size = os.fstat(handle.fileno()).st_size
+        if size == 0:
+            return
+        with mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as view:
+            _advise(view, "MADV_SEQUENTIAL", 0, size)
+            released = 0
+            pos = 0
+            while pos < size:
+                end = view.find(b"\n", min(pos + chunk_size, size) - 1)
+                end = size if end == -1 else end + 1
+                yield pos, view[pos:end]
+                pos = end
+                # Drop whole pages behind the read position from this process's mapping.
+                done = pos - pos % mmap.PAGESIZE
+                if done > released:
+                    _advise(view, "MADV_DONTNEED", released, done - released)
+                    released = done
+
+
+def iter_stream_chunks(handle: BinaryIO, chunk_size: Optional[int] = None) -> Iterator[Tuple[int, bytes]]:
+    """Read an unseekable stream in chunks that end on line boundaries.
+
+    Unlike ``iter_line_chunks`` this works on any binary file object, such
+    as a member of a compressed archive. Each chunk ends at the last line
+    end within the bytes read so far; a single line longer than
+    ``chunk_size`` is returned whole.
+
+    Args:
+        handle: Binary stream to read to its end.
+        chunk_size: Approximate chunk size in bytes. Defaults to
+            ``CHUNK_SIZE``.
+
+    Yields:
+        Byte offset of each chunk and its bytes. Every chunk but the last
+        ends with a newline.
+    """
+    chunk_size = chunk_size or CHUNK_SIZE
+    offset = 0
+    pending = b""
+    while True:
+        data = handle.read(chunk_size)
+        if not data:
+            break
+        pending += data
+        end = pending.rfind(b"\n") + 1
+        if end:
+            yield offset, pending[:end]
+            offset += end
+            pending = pending[end:]
+    if pending:
+        yield offset, pending
+
+
+def read_chunks(file_path: PathLike, threshold: int = STREAM_THRESHOLD) -> Iterator[Tuple[int, bytes]]:
+    """Read a small file whole or a large one in line-aligned chunks.
+
+    Args:
+        file_path: File to read.
+        threshold: Size in bytes above which the file is read in chunks.
+
+    Yields:
+        Byte offset of each chunk and its bytes.
+
+    Raises:
+        OSError: If the file cannot be read.
+    """
+    with open(file_path, "rb") as handle:
+        if os.fstat(handle.fileno()).st_size <= threshold:
+            yield 0, handle.read()
+            return
+    yield from iter_line_chunks(file_path)
+
+
+def _advise(view: mmap.mmap, advice: str, start: int, length: int) -> None:
+    """Give the kernel a hint about a mapped range if the platform supports it.
+
+    Args:
+        view: Memory map.
+        advice: Name of an ``mmap.MADV_*`` constant.
+        start: Page-aligned offset.
+        length: Length of the range in bytes.
+    """
+    flag = getattr(mmap, advice, None)
+    if flag is not None and hasattr(view, "madvise"):
+        view.madvise(flag, start, length)
+
+
+def encoding_error_message(error: UnicodeDecodeError, offset: int) -> str:
+    """Describe a decoding error found in a chunk by its position in the file.
+
+    Args:
+        error: Error raised while decoding the chunk.
+        offset: Byte offset of the chunk in the file.
+
+    Returns:
+        The message ``str(error)`` would give had the whole file been decoded.
+    """
+    start = offset + error.start
+    if error.end - error.start == 1:
+        byte = error.object[error.start]
+        return f"'{error.encoding}' codec can't decode byte 0x{byte:02x} in position {start}: {error.reason}"
+    end = offset + error.end - 1
+    return f"'{error.encoding}' codec can't decode bytes in position {start}-{end}: {error.reason}"
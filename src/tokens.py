@@ -0,0 +1,704 @@
+"""Token counts and context cost of markdown files with a byte-level BPE tokenizer.
+
+The tokenizer reads merge tables in the GPT-2 ``merges.txt`` format, so a
+table saved from any byte-level BPE model can be used as it is. Nothing is
+downloaded: the bundled table ``bpe_merges.txt`` was learned from this
+repository's markdown with ``train_merges(texts, 3000)``.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+from collections import Counter
+from itertools import accumulate
+from pathlib import Path
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Set,
+    TextIO,
+    Tuple,
+    Union,
+)
+
+from src import __version__
+from src.cache import ensure_cache_dir
+from src.scanner import Header, scan_markdown
+from src.utils import MIN_PARALLEL_FILES, content_digest, make_batches
+
+logger = logging.getLogger(__name__)
+
+MERGES_FILE = Path(__file__).with_name("bpe_merges.txt")
+TOKEN_CACHE_FILE_NAME = "tokens.json"
+
+DEFAULT_BUDGET = 4096
+
+# Memoized chunks and pieces per tokenizer; the memo starts over once it holds this many.
+MEMO_LIMIT = 200_000
+
+# Pieces of a run of non-whitespace: contractions, letters, digits, and anything else.
+PIECE_PATTERN = re.compile(r"'(?:[sdmt]|ll|ve|re)|[^\W\d_]+|\d+|(?:[^\w\s]|_)+")
+
+# Whitespace runs that cost tokens: all but a single space, which joins the word after it.
+# Newlines are spelled out because a literal first character makes the search much faster.
+WHITESPACE_PATTERN = re.compile(r"\n\s*|[^\S \n]\s*| \s+")
+
+SPLIT_PATTERN = re.compile(r"(\s+)")
+
+
+def _byte_symbols() -> List[str]:
+    """Map every byte to the printable character GPT-2 merge tables use for it.
+
+    Returns:
+        Character for each byte value.
+    """
+    printable = [*range(ord("!"), ord("~") + 1), *range(ord("¡"), ord("¬") + 1), *range(ord("®"), ord("ÿ") + 1)]
+    symbols = {byte: chr(byte) for byte in printable}
+    extra = 0
+    for byte in range(256):
+        if byte not in symbols:
+            symbols[byte] = chr(256 + extra)
+            extra += 1
+    return [symbols[byte] for byte in range(256)]
+
+
+BYTE_SYMBOLS = _byte_symbols()
+
+
+def pretokenize(text: str) -> Iterator[str]:
+    """Split text into the pieces that are encoded independently.
+
+    Args:
+        text: Text to split.
+
+    Yields:
+        Pieces in order; runs of non-whitespace start with a space.
+    """
+    for part in SPLIT_PATTERN.split(text):
+        if not part:
+            continue
+        if part.isspace():
+            run = part[:-1] if part.endswith(" ") else part
+            if run:
+                yield run
+            continue
+        pieces = PIECE_PATTERN.findall(part)
+        yield " " + pieces[0]
+        yield from pieces[1:]
+
+
+def _merge_pair(symbols: Sequence[str], pair: Tuple[str, str]) -> List[str]:
+    """Merge every occurrence of a pair of adjacent symbols.
+
+    Args:
+        symbols: Symbols of a piece.
+        pair: Symbols to merge.
+
+    Returns:
+        Symbols after the merge.
+    """
+    first, second = pair
+    merged: List[str] = []
+    index = 0
+    while index < len(symbols):
+        if symbols[index] == first and index + 1 < len(symbols) and symbols[index + 1] == second:
+            merged.append(first + second)
+            index += 2
+        else:
+            merged.append(symbols[index])
+            index += 1
+    return merged
+
+
+def train_merges(texts: Iterable[str], count: int) -> List[Tuple[str, str]]:
+    """Learn a merge table from sample text.
+
+    Each round merges the pair of adjacent symbols that occurs most often
+    across all pieces, until ``count`` merges are learned or no pair occurs
+    twice.
+
+    Args:
+        texts: Sample documents.
+        count: Number of merges to learn.
+
+    Returns:
+        Symbol pairs in merge order.
+    """
+    pieces: Counter = Counter()
+    for text in texts:
+        pieces.update(pretokenize(text))
+    vocabulary = {tuple(BYTE_SYMBOLS[byte] for byte in piece.encode("utf-8")): times for piece, times in pieces.items()}
+
+    merges: List[Tuple[str, str]] = []
+    while len(merges) < count:
+        pairs: Counter = Counter()
+        for symbols, times in vocabulary.items():
+            for pair in zip(symbols, symbols[1:]):
+                pairs[pair] += times
+        if not pairs:
+            break
+        # Ties go to the greater pair, so the table does not depend on the order of the texts.
+        best = max(pairs, key=lambda pair: (pairs[pair], pair))
+        if pairs[best] < 2:
+            break
+        merges.append(best)
+        vocabulary = {tuple(_merge_pair(symbols, best)): times for symbols, times in vocabulary.items()}
+    return merges
+
+
+class SectionTokens(NamedTuple):
+    """Token count of a heading-delimited part of a markdown file."""
+
+    line: int
+    title: str
+    tokens: int
+
+
+class FileTokens(NamedTuple):
+    """Token counts of a markdown file and its sections."""
+
+    path: Path
+    sections: List[SectionTokens]
+
+    @property
+    def tokens(self) -> int:
+        """Tokens in the whole file."""
+        return sum(section.tokens for section in self.sections)
+
+
+class _Memo(Dict[str, int]):
+    """Token counts by text, computed on first lookup."""
+
+    def __init__(self, cost: Callable[[str], int]):
+        """Initialize memo.
+
+        Args:
+            cost: Counts the tokens of a text.
+        """
+        super().__init__()
+        self.cost = cost
+
+    def __missing__(self, text: str) -> int:
+        """Count, remember and return the tokens of a text seen for the first time."""
+        tokens = self[text] = self.cost(text)
+        return tokens
+
+
+class Tokenizer:
+    """Byte-level BPE tokenizer.
+
+    Text is split into runs of whitespace and runs of anything else. The
+    latter are split into pieces like GPT-2 does, with the first piece
+    taking the space before it, which is assumed even after a newline so that
+    counts do not depend on context. A whitespace run other than a single
+    space is a piece of its own, minus a trailing space. Every piece is
+    encoded to UTF-8 bytes, which are merged by rank.
+
+    Counting skips building tokens: it looks up what each run of
+    non-whitespace costs, computed once per distinct run, which gives the
+    same totals as ``encode`` several times faster.
+    """
+
+    def __init__(self, merges: Sequence[Tuple[str, str]]):
+        """Initialize tokenizer.
+
+        Args:
+            merges: Symbol pairs in merge order, in the byte alphabet of
+                ``BYTE_SYMBOLS``.
+        """
+        self.ranks = {pair: rank for rank, pair in enumerate(merges)}
+        self.digest = hashlib.blake2b("\n".join(" ".join(pair) for pair in merges).encode(), digest_size=16).hexdigest()
+        self._reset_memos()
+
+    def _reset_memos(self) -> None:
+        """Start with empty memos of encoded pieces and counted runs."""
+        self._pieces: Dict[str, Tuple[str, ...]] = {}
+        self._chunks = _Memo(self._chunk_cost)
+        self._runs = _Memo(self._run_cost)
+
+    @classmethod
+    def load(cls, path: Optional[Union[str, Path]] = None) -> "Tokenizer":
+        """Read a merge table.
+
+        Args:
+            path: ``merges.txt`` file. Defaults to the bundled table.
+
+        Returns:
+            Tokenizer using the table.
+
+        Raises:
+            OSError: If the file cannot be read.
+            ValueError: If a line is not a pair of symbols.
+        """
+        path = Path(path) if path is not None else MERGES_FILE
+        merges = []
+        with open(path, encoding="utf-8") as handle:
+            for number, line in enumerate(handle, 1):
+                if number == 1 and line.startswith("#version"):
+                    continue
+                if not line.strip():
+                    continue
+                pair = line.split()
+                if len(pair) != 2:
+                    raise ValueError(f"{path}:{number}: expected two symbols, got {line.strip()!r}")
+                merges.append((pair[0], pair[1]))
+        return cls(merges)
+
+    def __getstate__(self) -> Dict[str, Any]:
+        """Leave the memos out when shipping the tokenizer to a worker process."""
+        return {"ranks": self.ranks, "digest": self.digest}
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        """Restore a shipped tokenizer with empty memos."""
+        self.__dict__.update(state)
+        self._reset_memos()
+
+    def encode(self, text: str) -> List[str]:
+        """Split text into tokens.
+
+        Args:
+            text: Text to tokenize.
+
+        Returns:
+            Tokens as strings of ``BYTE_SYMBOLS`` characters.
+        """
+        tokens: List[str] = []
+        for piece in pretokenize(text):
+            tokens.extend(self._piece(piece))
+        return tokens
+
+    def count(self, text: str) -> int:
+        """Count the tokens ``encode`` would give.
+
+        Args:
+            text: Text to tokenize.
+
+        Returns:
+            Number of tokens.
+        """
+        if len(self._chunks) > MEMO_LIMIT:
+            self._chunks.clear()
+        chunks = sum(map(self._chunks.__getitem__, text.split()))
+        return chunks + sum(map(self._runs.__getitem__, WHITESPACE_PATTERN.findall(text)))
+
+    def _chunk_cost(self, chunk: str) -> int:
+        """Count the tokens of a run of non-whitespace.
+
+        Args:
+            chunk: Run of non-whitespace.
+
+        Returns:
+            Number of tokens, counting the space assumed before it.
+        """
+        pieces = PIECE_PATTERN.findall(chunk)
+        pieces[0] = " " + pieces[0]
+        return sum(len(self._piece(piece)) for piece in pieces)
+
+    def _run_cost(self, run: str) -> int:
+        """Count the tokens of a whitespace run other than a single space.
+
+        Args:
+            run: Whitespace run.
+
+        Returns:
+            Number of tokens, not counting a trailing space.
+        """
+        return len(self._piece(run[:-1] if run.endswith(" ") else run))
+
+    def _piece(self, piece: str) -> Tuple[str, ...]:
+        """Encode one piece, memoized.
+
+        Args:
+            piece: Piece of pre-tokenized text.
+
+        Returns:
+            Its tokens.
+        """
+        tokens = self._pieces.get(piece)
+        if tokens is None:
+            if len(self._pieces) > MEMO_LIMIT:
+                self._pieces.clear()
+            tokens = self._pieces[piece] = tuple(self._merge([BYTE_SYMBOLS[byte] for byte in piece.encode("utf-8")]))
+        return tokens
+
+    def _merge(self, symbols: List[str]) -> List[str]:
+        """Apply merges to a piece's symbols, lowest rank first.
+
+        Args:
+            symbols: One symbol per byte.
+
+        Returns:
+            Merged symbols.
+        """
+        ranks = self.ranks
+        unranked = len(ranks)
+        while len(symbols) > 1:
+            rank, pair = min((ranks.get(pair, unranked), pair) for pair in zip(symbols, symbols[1:]))
+            if rank == unranked:
+                break
+            symbols = _merge_pair(symbols, pair)
+        return symbols
+
+
+def count_sections(tokenizer: Tokenizer, content: str) -> List[SectionTokens]:
+    """Count the tokens of each section of a document.
+
+    Sections start at every heading outside code fences and run to the next
+    one, so the section counts add up to the document's. Text before the first
+    heading is a section at line 1 with an empty title, left out if it has
+    no tokens.
+
+    Args:
+        tokenizer: Tokenizer to count with.
+        content: Document text.
+
+    Returns:
+        Sections in order.
+    """
+    headers = [event for event in scan_markdown(content, links=False) if isinstance(event, Header)]
+    starts = [(1, "", 0)]
+    if headers:
+        # A heading starts its line, whose offset is the length of the lines before it plus their newlines.
+        lengths = list(accumulate(map(len, content.split("\n")), initial=0))
+        starts.extend((header.line, header.text, lengths[header.line - 1] + header.line - 1) for header in headers)
+
+    sections = []
+    for index, (line, title, start) in enumerate(starts):
+        end = starts[index + 1][2] if index + 1 < len(starts) else len(content)
+        tokens = tokenizer.count(content[start:end])
+        if tokens or index:
+            sections.append(SectionTokens(line, title, tokens))
+    return sections
+
+
+class TokenCache:
+    """Persistent store of section token counts by file content digest.
+
+    Files with the same content share an entry, and a moved file keeps its
+    counts. The whole cache is discarded when the merge table differs.
+    """
+
+    def __init__(self, path: Path, parameters: Dict[str, Any]):
+        """Initialize cache and load any existing entries.
+
+        Args:
+            path: JSON file holding the entries.
+            parameters: Settings the counts depend on.
+        """
+        self.path = Path(path)
+        self.parameters = parameters
+        self.hits = 0
+        self.misses = 0
+        self._entries: Dict[str, List[List[Any]]] = {}
+        self._dirty = False
+        self._load()
+
+    def _load(self) -> None:
+        """Read entries from disk, ignoring missing, unreadable or stale files."""
+        try:
+            with open(self.path, encoding="utf-8") as handle:
+                data = json.load(handle)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.warning("Ignoring unreadable token cache %s: %s", self.path, e)
+            return
+        if data.get("version") == __version__ and data.get("parameters") == self.parameters:
+            self._entries = data.get("entries", {})
+
+    def known(self) -> Set[str]:
+        """Return the content digests that have entries."""
+        return set(self._entries)
+
+    def lookup(self, digest: str) -> Optional[List[SectionTokens]]:
+        """Return the cached sections of a file's content.
+
+        Args:
+            digest: Content digest of the file.
+
+        Returns:
+            Cached sections, or None if the content must be counted.
+        """
+        entry = self._entries.get(digest)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return [SectionTokens(*section) for section in entry]
+
+    def store(self, digest: str, sections: List[SectionTokens]) -> None:
+        """Record the sections of a file's content.
+
+        Args:
+            digest: Content digest of the file.
+            sections: Sections of the file.
+        """
+        self._entries[digest] = [list(section) for section in sections]
+        self._dirty = True
+
+    def prune(self, digests: Iterable[str]) -> None:
+        """Drop entries of content no file in the tree has any more.
+
+        Args:
+            digests: Content digest of every file in the tree.
+        """
+        keep = set(digests)
+        stale = [digest for digest in self._entries if digest not in keep]
+        for digest in stale:
+            del self._entries[digest]
+        self._dirty = self._dirty or bool(stale)
+
+    def save(self) -> None:
+        """Write entries to disk atomically if anything changed."""
+        if not self._dirty:
+            return
+        ensure_cache_dir(self.path.parent)
+        data = {"version": __version__, "parameters": self.parameters, "entries": self._entries}
+        tmp_path = self.path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as handle:
+            json.dump(data, handle, separators=(",", ":"))
+        os.replace(tmp_path, self.path)
+        self._dirty = False
+
+
+class _Counted(NamedTuple):
+    """What a worker found for one file."""
+
+    path: Path
+    size: int
+    digest: Optional[str]
+    sections: Optional[List[SectionTokens]]
+    error: Optional[str] = None
+
+
+class TokenCounter:
+    """Counts the tokens of markdown files, on a process pool for large trees.
+
+    Workers read and hash each file and count only content the cache does not
+    know, so unchanged files cost a read and a hash.
+    """
+
+    def __init__(self, tokenizer: Tokenizer, cache: Optional[TokenCache] = None):
+        """Initialize counter.
+
+        Args:
+            tokenizer: Tokenizer to count with.
+            cache: Optional store of counts from earlier runs.
+        """
+        self.tokenizer = tokenizer
+        self.cache = cache
+        self.digests: Set[str] = set()
+        self.bytes_counted = 0
+
+    def count_files(self, files: List[Path], jobs: int = 1) -> List[FileTokens]:
+        """Count the tokens of files.
+
+        Args:
+            files: Markdown files.
+            jobs: Number of worker processes.
+
+        Returns:
+            Counts in the order of ``files``; unreadable files are left out.
+        """
+        known = self.cache.known() if self.cache is not None else set()
+        if jobs > 1 and len(files) >= MIN_PARALLEL_FILES:
+            counted = self._count_parallel(files, jobs, known)
+        else:
+            counted = iter(_count_batch(files, self.tokenizer, known))
+
+        results = []
+        for item in counted:
+            if item.digest is None:
+                logger.warning("Cannot read %s: %s", item.path, item.error)
+                continue
+            self.digests.add(item.digest)
+            sections = item.sections
+            if sections is None:
+                # Workers only skip content the cache has counts for.
+                sections = self.cache.lookup(item.digest) if self.cache is not None else None
+            else:
+                self.bytes_counted += item.size
+                if self.cache is not None:
+                    self.cache.misses += 1
+                    self.cache.store(item.digest, sections)
+            results.append(FileTokens(item.path, sections or []))
+        return results
+
+    def _count_parallel(self, files: List[Path], jobs: int, known: Set[str]) -> Iterator[_Counted]:
+        """Count files on a process pool.
+
+        Args:
+            files: Markdown files.
+            jobs: Number of worker processes.
+            known: Content digests whose counts are cached.
+
+        Yields:
+            Each file's result, in order.
+        """
+        from concurrent.futures import ProcessPoolExecutor
+
+        batches = make_batches(files, jobs)
+        logger.debug("Counting tokens of %s files in %s batches on %s workers", len(files), len(batches), jobs)
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=(self.tokenizer, known)) as pool:
+            for batch in pool.map(_count_batch, batches):
+                yield from batch
+
+
+_worker_tokenizer: Optional[Tokenizer] = None
+_worker_known: Set[str] = set()
+
+
+def _init_worker(tokenizer: Tokenizer, known: Set[str]) -> None:
+    """Store the tokenizer and the cached digests in a worker process.
+
+    Args:
+        tokenizer: Tokenizer to use for every batch in this process.
+        known: Content digests whose counts are cached.
+    """
+    global _worker_tokenizer, _worker_known
+    _worker_tokenizer = tokenizer
+    _worker_known = known
+
+
+def _count_batch(
+    files: List[Path], tokenizer: Optional[Tokenizer] = None, known: Optional[Set[str]] = None
+) -> List[_Counted]:
+    """Read, hash and count a batch of files.
+
+    Args:
+        files: Files to count.
+        tokenizer: Tokenizer to use. Defaults to the worker's tokenizer.
+        known: Content digests whose counts are cached. Defaults to the
+            worker's.
+
+    Returns:
+        Result per file in input order; sections are None for cached content.
+    """
+    tokenizer = tokenizer or _worker_tokenizer
+    if tokenizer is None:
+        raise RuntimeError("Worker tokenizer not initialized")
+    known = _worker_known if known is None else known
+    counted = []
+    for file_path in files:
+        try:
+            with open(file_path, "rb") as handle:
+                data = handle.read()
+        except OSError as e:
+            counted.append(_Counted(file_path, 0, None, None, str(e)))
+            continue
+        digest = content_digest(data)
+        sections = None if digest in known else count_sections(tokenizer, data.decode("utf-8", errors="replace"))
+        counted.append(_Counted(file_path, len(data), digest, sections))
+    return counted
+
+
+def estimate_cost(tokens: int, prices: Dict[str, float]) -> Dict[str, float]:
+    """Price a number of tokens.
+
+    Args:
+        tokens: Number of tokens.
+        prices: US dollars per million tokens, by name.
+
+    Returns:
+        US dollars by price name.
+    """
+    return {name: tokens * price / 1_000_000 for name, price in prices.items()}
+
+
+def over_budget(results: List[FileTokens], budget: int) -> List[Tuple[Path, SectionTokens]]:
+    """Find the sections too long for a context budget.
+
+    Args:
+        results: Counts per file.
+        budget: Most tokens a section may have.
+
+    Returns:
+        Files and their sections above the budget, largest first.
+    """
+    found = [(result.path, section) for result in results for section in result.sections if section.tokens > budget]
+    return sorted(found, key=lambda item: (-item[1].tokens, item[0], item[1].line))
+
+
+def write_text(
+    results: List[FileTokens],
+    root_path: Path,
+    stream: TextIO,
+    prices: Dict[str, float],
+    budget: int,
+    sections: bool = False,
+) -> None:
+    """Write token counts for people to read.
+
+    Args:
+        results: Counts per file.
+        root_path: Directory that paths are shown relative to.
+        stream: Output stream.
+        prices: US dollars per million tokens, by name.
+        budget: Most tokens a section may have.
+        sections: List every section under its file.
+    """
+    for result in results:
+        stream.write(f"{result.tokens:>10,}  {os.path.relpath(result.path, root_path)}\n")
+        if sections:
+            for section in result.sections:
+                title = f" ({section.title})" if section.title else ""
+                stream.write(f"{section.tokens:>16,}  line {section.line}{title}\n")
+    total = sum(result.tokens for result in results)
+    stream.write(f"\nTotal: {total:,} tokens in {len(results)} file(s)\n")
+    for name, dollars in estimate_cost(total, prices).items():
+        stream.write(f"Estimated cost ({name}, ${prices[name]:g} per million tokens): ${dollars:,.4f}\n")
+
+    large = over_budget(results, budget)
+    if large:
+        stream.write(f"\n{len(large)} section(s) over the budget of {budget:,} tokens:\n")
+        for file_path, section in large:
+            title = f" ({section.title})" if section.title else ""
+            location = f"{os.path.relpath(file_path, root_path)}:{section.line}{title}"
+            stream.write(f"  {location}: {section.tokens:,} tokens\n")
+
+
+def write_json(
+    results: List[FileTokens], root_path: Path, stream: TextIO, prices: Dict[str, float], budget: int
+) -> None:
+    """Write token counts as JSON.
+
+    Args:
+        results: Counts per file.
+        root_path: Directory that paths are written relative to.
+        stream: Output stream.
+        prices: US dollars per million tokens, by name.
+        budget: Most tokens a section may have.
+    """
+
+    def relative(file_path: Path) -> str:
+        return Path(os.path.relpath(file_path, root_path)).as_posix()
+
+    files = [
+        {
+            "path": relative(result.path),
+            "tokens": result.tokens,
+            "cost": estimate_cost(result.tokens, prices),
+            "sections": [section._asdict() for section in result.sections],
+        }
+        for result in results
+    ]
+    total = sum(result.tokens for result in results)
+    large = [{"path": relative(file_path), **section._asdict()} for file_path, section in over_budget(results, budget)]
+    data = {
+        "files": files,
+        "total": {"tokens": total, "cost": estimate_cost(total, prices)},
+        "prices": prices,
+        "budget": budget,
+        "over_budget": large,
+    }
+    json.dump(data, stream, indent=2)
+    stream.write("\n")
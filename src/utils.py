@@ -1,23 +1,171 @@
 """Utility functions for AI Fundamentals documentation repository."""
 
+import hashlib
 import logging
-import re
+import os
+import time
+from collections import defaultdict
 from pathlib import Path
-from typing import Dict, List, Set
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple, Union
+
+from src.anchors import AnchorCounter, SlugIndex
+from src.diagnostics import BROKEN_ANCHOR, ENCODING, MISSING_FILE, Diagnostic
+from src.external import external_link_errors, normalize_url
+from src.path_index import PathIndex
+from src.profiling import Profiler, phase
+from src.rules import RuleContext, RuleSet
+from src.scanner import Fence, Header, Link, MarkdownScanner, scan_markdown
+from src.streaming import CHUNK_SIZE, STREAM_THRESHOLD, encoding_error_message, iter_line_chunks
+from src.walker import Walker
+
+if TYPE_CHECKING:
+    from src.archive import ArchiveReader
+    from src.cache import ValidationCache
+    from src.external import ExternalLinkChecker, LinkStatus
+    from src.prefetch import Prefetcher
 
 logger = logging.getLogger(__name__)
 
+# Below this many files the cost of starting worker processes outweighs the gain.
+MIN_PARALLEL_FILES = 32
+
+# Each worker receives a few batches so slow files do not leave others idle,
+# while keeping the number of pickled round-trips small.
+BATCHES_PER_WORKER = 4
+MAX_BATCH_SIZE = 256
+
+# (resolved target, fragment, original url, line, column) for a link into another markdown file.
+AnchorRef = Tuple[str, str, str, int, int]
+
+# (url, line, column) for an http(s) link.
+ExternalLink = Tuple[str, int, int]
+
+# A file's bytes, or its (offset, bytes) line-aligned chunks if it is too large to hold whole.
+FileContent = Union[bytes, Iterator[Tuple[int, bytes]]]
+
+
+def content_digest(data: bytes) -> str:
+    """Hash file content for change detection.
+
+    Args:
+        data: Raw file bytes.
+
+    Returns:
+        Hex digest of the content.
+    """
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def file_digest(file_path: Union[str, Path]) -> str:
+    """Hash a file's content without holding all of it in memory.
+
+    Args:
+        file_path: File to hash.
+
+    Returns:
+        The same digest ``content_digest`` gives for the file's bytes.
+
+    Raises:
+        OSError: If the file cannot be read.
+    """
+    hasher = hashlib.blake2b(digest_size=16)
+    with open(file_path, "rb") as handle:
+        while chunk := handle.read(CHUNK_SIZE):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+class FileResult:
+    """Outcome of validating a single markdown file."""
+
+    __slots__ = ("errors", "dependencies", "digest", "anchors", "anchor_refs", "external_links")
+
+    def __init__(
+        self,
+        errors: List[Diagnostic],
+        dependencies: Optional[Dict[str, bool]] = None,
+        digest: Optional[str] = None,
+        anchors: Optional[List[str]] = None,
+        anchor_refs: Optional[List[AnchorRef]] = None,
+        external_links: Optional[List[ExternalLink]] = None,
+    ):
+        """Initialize file result.
+
+        Args:
+            errors: Diagnostics decided by the file's own content.
+            dependencies: Resolved relative link targets mapped to whether
+                they existed when the file was checked.
+            digest: Content digest of the bytes that were validated.
+            anchors: Anchors defined by the file's headings.
+            anchor_refs: Links into other markdown files that carry a
+                fragment. These are checked against a slug index once every
+                file's anchors are known.
+            external_links: http(s) links and their positions, checked separately
+                because their status changes independently of the file.
+        """
+        self.errors = errors
+        self.dependencies = dependencies or {}
+        self.digest = digest
+        self.anchors = anchors or []
+        self.anchor_refs = anchor_refs or []
+        self.external_links = external_links or []
+
+
+def _encoding_error(
+    file_path: Path, data: bytes, error: UnicodeDecodeError, offset: int = 0, first_line: int = 1
+) -> Diagnostic:
+    """Report content that is not valid UTF-8.
+
+    Args:
+        file_path: File being validated.
+        data: Bytes that failed to decode; the whole file or one chunk.
+        error: Decoding error.
+        offset: Byte offset of ``data`` in the file.
+        first_line: 1-based line number at the start of ``data``.
+
+    Returns:
+        Encoding diagnostic at the first invalid byte.
+    """
+    line_start = data.rfind(b"\n", 0, error.start) + 1
+    line = first_line + data.count(b"\n", 0, error.start)
+    message = f"Encoding error: {encoding_error_message(error, offset)}"
+    return Diagnostic(file_path, ENCODING, message, line, error.start - line_start + 1)
+
 
 class MarkdownValidator:
     """Validates markdown files for common issues."""
 
-    def __init__(self, root_path: Path):
+    def __init__(
+        self,
+        root_path: Path,
+        path_index: Optional[PathIndex] = None,
+        slug_index: Optional[SlugIndex] = None,
+        profiler: Optional[Profiler] = None,
+        rules: Optional[RuleSet] = None,
+        stream_threshold: int = STREAM_THRESHOLD,
+    ):
         """Initialize validator.
 
         Args:
             root_path: Root directory of the repository.
+            path_index: Optional snapshot of the repository used to resolve
+                relative links without filesystem calls.
+            slug_index: Optional heading anchors of other files. Files missing
+                from it are read when a link first points into them.
+            profiler: Optional profiler timing each step of ``check_file``
+                and each rule.
+            rules: Rules to run. Defaults to the rules enabled by default.
+            stream_threshold: Size in bytes above which files are validated
+                in chunks, keeping memory use independent of their size.
         """
         self.root_path = Path(root_path)
+        self.path_index = path_index
+        self.slug_index = slug_index if slug_index is not None else SlugIndex()
+        self.profiler = profiler
+        self.rules = rules if rules is not None else RuleSet.default()
+        self.stream_threshold = stream_threshold
+        if profiler is not None:
+            profiler.instrument(self)
 
     def validate_file(self, file_path: Path) -> List[str]:
         """Validate a single markdown file.
@@ -28,142 +176,883 @@ class MarkdownValidator:
         Returns:
             List of validation errors found.
         """
-        errors = []
+        return [str(diagnostic) for diagnostic in self.diagnose_file(file_path)]
 
-        if not file_path.exists():
-            return [f"File does not exist: {file_path}"]
+    def diagnose_file(self, file_path: Path) -> List[Diagnostic]:
+        """Validate a single markdown file, including links into other files.
+
+        Args:
+            file_path: Path to markdown file.
 
+        Returns:
+            Diagnostics in the order they were found.
+        """
+        result = self.check_file(file_path)
+        if not result.anchor_refs:
+            return result.errors
+        return result.errors + self.check_anchor_refs(file_path, result.anchor_refs)
+
+    def check_anchor_refs(self, file_path: Path, anchor_refs: List[AnchorRef]) -> List[Diagnostic]:
+        """Check links into other markdown files against their heading anchors.
+
+        Args:
+            file_path: File containing the links.
+            anchor_refs: Links recorded by ``check_file``.
+
+        Returns:
+            List of broken-anchor diagnostics.
+        """
+        return [
+            Diagnostic(file_path, BROKEN_ANCHOR, f"Broken anchor in link to {url}", line, column)
+            for target, fragment, url, line, column in anchor_refs
+            if not self.slug_index.has_anchor(target, fragment)
+        ]
+
+    def resolve_path(self, path: Path) -> str:
+        """Resolve a path the same way link targets are resolved.
+
+        Args:
+            path: Path to resolve.
+
+        Returns:
+            Resolved path, usable as a slug index key.
+        """
+        if self.path_index is not None:
+            return self.path_index.lookup(str(path))[0]
+        return os.path.realpath(path)
+
+    def check_file(self, file_path: Path, data: Optional[bytes] = None) -> FileResult:
+        """Validate a single markdown file and record what the result depends on.
+
+        Args:
+            file_path: Path to markdown file.
+            data: The file's content if it has already been read, for
+                example by a ``Prefetcher``. The file is then not touched.
+
+        Returns:
+            Errors together with the link targets and content digest they were
+            computed from.
+        """
+        if data is None:
+            try:
+                size = file_path.stat().st_size
+            except OSError:
+                return FileResult([Diagnostic(file_path, MISSING_FILE, "File does not exist")])
+            if size > self.stream_threshold:
+                return self._check_streamed(file_path)
+            data = self._read(file_path)
+
+        digest = content_digest(data)
         try:
-            content = file_path.read_text(encoding="utf-8")
+            content = self._decode(data)
         except UnicodeDecodeError as e:
-            return [f"Encoding error in {file_path}: {e}"]
+            return FileResult([_encoding_error(file_path, data, e)], digest=digest)
 
-        errors.extend(self._check_headers(content, file_path))
-        errors.extend(self._check_links(content, file_path))
-        errors.extend(self._check_code_blocks(content, file_path))
+        return self._check_content(file_path, content, digest)
 
-        return errors
+    def check_chunks(self, file_path: Path, chunks: Iterator[Tuple[int, bytes]]) -> FileResult:
+        """Validate a file that is read elsewhere in line-aligned chunks.
+
+        Args:
+            file_path: Path the chunks belong to.
+            chunks: Byte offset and bytes of each chunk, as produced by
+                ``iter_stream_chunks``.
+
+        Returns:
+            The same result ``check_file`` gives for the whole content.
+        """
+        return self._check_streamed(file_path, chunks)
+
+    def check_text(self, file_path: Path, content: str) -> FileResult:
+        """Validate markdown text as if it were a file's content.
 
-    def _check_headers(self, content: str, file_path: Path) -> List[str]:
-        """Check header structure.
+        The file itself is not read, so text that has not been saved can be
+        checked; link targets are still resolved as usual.
 
         Args:
-            content: File content.
-            file_path: Path to file.
+            file_path: Path the text belongs to.
+            content: Markdown text.
 
         Returns:
-            List of header-related errors.
+            Errors together with the link targets and content digest they were
+            computed from.
         """
-        errors = []
-        lines = content.split("\n")
+        return self._check_content(file_path, content, content_digest(content.encode("utf-8")))
 
-        # Check for title (H1)
-        h1_count = sum(1 for line in lines if line.startswith("# "))
-        if h1_count == 0:
-            errors.append(f"{file_path}: Missing H1 title")
-        elif h1_count > 1:
-            errors.append(f"{file_path}: Multiple H1 headers found")
+    def _check_content(self, file_path: Path, content: str, digest: str) -> FileResult:
+        """Run the rules on decoded content.
 
-        # Check header hierarchy
-        prev_level = 0
-        for line_num, line in enumerate(lines, 1):
-            if match := re.match(r"^(#{1,6})\s+", line):
-                level = len(match.group(1))
-                if level > prev_level + 1:
-                    msg = f"{file_path}:{line_num}: " f"Header level skipped (from H{prev_level} to H{level})"
-                    errors.append(msg)
-                prev_level = level
+        Args:
+            file_path: Path the content belongs to.
+            content: Decoded content.
+            digest: Digest of the content's bytes.
 
-        return errors
+        Returns:
+            Result for the content.
+        """
+        errors: List[Diagnostic] = []
+        events = self._scan(content)
+        anchors = AnchorCounter()
+        for header in events[Header]:
+            anchors.add(header.text)
+        result = FileResult(errors, digest=digest, anchors=list(anchors))
+        context = RuleContext(file_path, content, result, self._resolve_link, anchors)
+        errors.extend(self.rules.run(context, events, self.profiler))
 
-    def _check_links(self, content: str, file_path: Path) -> List[str]:
-        """Check markdown links.
+        return result
+
+    def _check_streamed(self, file_path: Path, chunks: Optional[Iterator[Tuple[int, bytes]]] = None) -> FileResult:
+        """Validate a large file chunk by chunk.
+
+        The file is memory-mapped and each line-aligned chunk is hashed,
+        decoded, scanned and checked before the next is read, so memory use
+        depends on the chunk size and on what is found, not on the file size.
 
         Args:
-            content: File content.
-            file_path: Path to file.
+            file_path: Path to markdown file.
+            chunks: The file's chunks if they come from elsewhere; by default
+                the file is memory-mapped.
 
         Returns:
-            List of link-related errors.
+            The same result ``check_file`` gives when reading the file whole.
         """
-        errors = []
+        hasher = hashlib.blake2b(digest_size=16)
+        result = FileResult([])
+        anchors = AnchorCounter()
+        context = RuleContext(file_path, "", result, self._resolve_link, anchors)
+        run = self.rules.stream(context, self.profiler)
+        scanner = MarkdownScanner()
 
-        # Find all markdown links [text](url)
-        link_pattern = r"\[([^\]]+)\]\(([^)]+)\)"
-        for match in re.finditer(link_pattern, content):
-            url = match.group(2)
+        chunks = iter_line_chunks(file_path) if chunks is None else chunks
+        for offset, data in chunks:
+            hasher.update(data)
+            if self.profiler is not None:
+                self.profiler.count("bytes_read", len(data))
+            try:
+                text = self._decode(data)
+            except UnicodeDecodeError as e:
+                diagnostic = _encoding_error(file_path, data, e, offset, scanner.line)
+                for _, rest in chunks:
+                    hasher.update(rest)
+                return FileResult([diagnostic], digest=hasher.hexdigest())
 
-            # Skip external URLs
-            if url.startswith(("http://", "https://", "mailto:")):
-                continue
+            first_line = scanner.line
+            events = self._scan(text, scanner)
+            for header in events[Header]:
+                anchors.add(header.text)
+            context.content = text
+            run.feed(events, text, first_line)
 
-            # Skip anchors
-            if url.startswith("#"):
-                continue
+        result.digest = hasher.hexdigest()
+        result.anchors = list(anchors)
+        result.errors.extend(run.finish())
+        return result
 
-            # Check relative file paths
-            target_path = (file_path.parent / url).resolve()
-            if not target_path.exists():
-                errors.append(f"{file_path}: Broken link to {url}")
+    def _read(self, file_path: Path) -> bytes:
+        """Read a file's bytes.
 
-        return errors
+        Args:
+            file_path: File to read.
+
+        Returns:
+            File content.
+        """
+        return file_path.read_bytes()
 
-    def _check_code_blocks(self, content: str, file_path: Path) -> List[str]:
-        """Check code block formatting.
+    def _decode(self, data: bytes) -> str:
+        """Decode file content.
 
         Args:
-            content: File content.
-            file_path: Path to file.
+            data: File content.
 
         Returns:
-            List of code block errors.
+            Decoded text.
+
+        Raises:
+            UnicodeDecodeError: If the content is not valid UTF-8.
         """
-        errors = []
-        lines = content.split("\n")
+        return data.decode("utf-8")
 
-        fence_count = 0
-        for line in lines:
-            if line.strip().startswith("```"):
-                fence_count += 1
+    def _scan(self, content: str, scanner: Optional[MarkdownScanner] = None) -> Dict[type, List[Any]]:
+        """Split a document into headings, links and code fences in one pass.
 
-        if fence_count % 2 != 0:
-            errors.append(f"{file_path}: Unclosed code fence")
+        Args:
+            content: Decoded file content, or the next chunk of it.
+            scanner: Scanner to continue with when content arrives in chunks.
 
-        return errors
+        Returns:
+            Events by type, each list in document order.
+        """
+        events: Dict[type, List[Any]] = {Header: [], Link: [], Fence: []}
+        for event in scan_markdown(content) if scanner is None else scanner.feed(content):
+            events[type(event)].append(event)
+        return events
+
+    def _resolve_link(self, file_path: Path, url: str) -> Tuple[str, bool]:
+        """Resolve a relative link target.
+
+        Args:
+            file_path: File containing the link.
+            url: Relative link target.
+
+        Returns:
+            Resolved target path and whether it exists.
+        """
+        if self.path_index is not None:
+            return self.path_index.lookup(os.path.join(file_path.parent, url))
+
+        target_path = (file_path.parent / url).resolve()
+        return str(target_path), target_path.exists()
 
 
 class LinkChecker:
     """Checks internal links across documentation."""
 
-    def __init__(self, root_path: Path):
+    def __init__(
+        self,
+        root_path: Path,
+        cache: Optional["ValidationCache"] = None,
+        external_checker: Optional["ExternalLinkChecker"] = None,
+        exclude: Sequence[str] = (),
+        profiler: Optional[Profiler] = None,
+        rules: Optional[RuleSet] = None,
+        prefetcher: Optional[Union["Prefetcher", "ArchiveReader"]] = None,
+    ):
         """Initialize link checker.
 
         Args:
             root_path: Root directory of the repository.
+            cache: Optional on-disk cache of per-file results.
+            external_checker: Optional checker for http(s) links. Without it
+                external links are not checked.
+            exclude: Extra ``.gitignore``-style patterns for paths to leave
+                out, on top of ``.gitignore`` files and the default excludes.
+            profiler: Optional profiler recording phase and per-file times.
+                Profiled runs validate in this process.
+            rules: Rules to run. Defaults to the rules enabled by default.
+                A cache must have been created for the same rules.
+            prefetcher: Optional reader of files ahead of validation. Files
+                are then validated in this process while the next ones are
+                read, instead of on worker processes. An ``ArchiveReader``
+                supplies archive members, possibly out of order.
         """
         self.root_path = Path(root_path)
+        self.exclude = list(exclude)
+        self.profiler = profiler
+        self.rules = rules if rules is not None else RuleSet.default()
+        self.prefetcher = prefetcher
         self.all_files: Set[Path] = set()
+        self.path_index: Optional[PathIndex] = None
+        self.slug_index = SlugIndex()
+        self.cache = cache
+        self.external_checker = external_checker
+        self.outcomes: Dict[Path, FileResult] = {}
+        self.results: Dict[Path, List[Diagnostic]] = {}
+        self.dependents: Dict[str, Set[Path]] = defaultdict(set)
+        self.anchor_dependents: Dict[str, Set[Path]] = defaultdict(set)
+        self.unsaved: Dict[Path, str] = {}
+        self.timings: Dict[Path, float] = {}
+        self._validator: Optional[MarkdownValidator] = None
+        self._statuses: Dict[str, "LinkStatus"] = {}
 
-    def scan_repository(self) -> None:
-        """Scan repository for all markdown files."""
-        self.all_files = set(self.root_path.rglob("*.md"))
-        logger.info(f"Found {len(self.all_files)} markdown files")
+    def scan_repository(self, jobs: int = 1) -> None:
+        """Scan repository for markdown files in scope and index every path.
 
-    def check_all_links(self) -> Dict[Path, List[str]]:
+        Args:
+            jobs: Number of threads walking the tree.
+        """
+        walker = Walker(self.root_path, exclude=self.exclude, jobs=jobs)
+        with phase(self.profiler, "walk"):
+            self.path_index = PathIndex.build(self.root_path, walker)
+            self.all_files = set(self.path_index.markdown_files())
+        logger.info("Found %s markdown files", len(self.all_files))
+
+    def check_all_links(self, jobs: int = 1) -> Dict[Path, List[str]]:
         """Check all internal links.
 
+        Files are validated in sorted order, so the returned mapping is the
+        same whether the work runs serially or across worker processes.
+
+        Args:
+            jobs: Number of worker processes. Values above 1 validate files in
+                batches on a process pool.
+
         Returns:
             Dictionary mapping file paths to lists of broken links.
         """
-        if not self.all_files:
-            self.scan_repository()
+        results: Dict[Path, List[str]] = {}
+        for diagnostic in self.iter_results(jobs):
+            results.setdefault(diagnostic.path, []).append(str(diagnostic))
+        return dict(sorted(results.items()))
+
+    def iter_results(self, jobs: int = 1, selection: Optional[Iterable[Path]] = None) -> Iterator[Diagnostic]:
+        """Check every markdown file, yielding diagnostics as files finish.
+
+        Diagnostics decided by a file's own content are yielded in sorted
+        file order as soon as that file is validated or found in the cache.
+        Links into other files' anchors and external links can only be
+        checked once every file has been seen, so those diagnostics follow
+        after the last file. Afterwards ``results`` holds every file's
+        diagnostics, ``timings`` the seconds spent validating each file that
+        was not cached, and ``refresh`` can be used.
+
+        Args:
+            jobs: Number of worker processes. Values above 1 validate files in
+                batches on a process pool.
+            selection: Check only these markdown files. The tree is not
+                scanned, links are resolved through the filesystem and cache
+                entries of other files are kept.
+
+        Yields:
+            Diagnostics, in the same order whether run serially or in parallel.
+        """
+        if selection is not None:
+            self.all_files = set(selection)
+        elif not self.all_files:
+            self.scan_repository(jobs)
+
+        files = sorted(self.all_files)
+        self.timings = {}
+        outcomes: Dict[Path, FileResult] = {}
+        stats: Dict[Path, os.stat_result] = {}
+        pending = files
 
-        results = {}
-        validator = MarkdownValidator(self.root_path)
+        if self.cache is not None:
+            exists = self.path_index.exists if self.path_index is not None else os.path.exists
+            with phase(self.profiler, "cache"):
+                pending = _load_cached(self.cache, files, outcomes, stats, exists)
+
+        validator = MarkdownValidator(
+            self.root_path,
+            path_index=self.path_index,
+            slug_index=self.slug_index,
+            profiler=self.profiler,
+            rules=self.rules,
+        )
+        # Instrumented validators hold closures, which cannot be sent to workers.
+        validated = self._validate(validator, pending, 1 if self.profiler is not None else jobs)
+        results: Dict[Path, List[Diagnostic]] = {}
+        yield from self._iter_file_errors(files, outcomes, stats, validated, results)
+
+        if self.cache is not None:
+            if selection is None:
+                self.cache.prune(files)
+            self.cache.save()
+
+        self._index_outcomes(files, outcomes, validator)
+        self.results = results
+        yield from self._iter_cross_file_errors(files, outcomes, results)
+
+        if self.profiler is not None:
+            self._count_run(self.profiler, len(files))
+            self.profiler.flush()
+
+    def _iter_file_errors(
+        self,
+        files: List[Path],
+        outcomes: Dict[Path, FileResult],
+        stats: Dict[Path, os.stat_result],
+        validated: Iterator[Tuple[Path, FileResult, float]],
+        results: Dict[Path, List[Diagnostic]],
+    ) -> Iterator[Diagnostic]:
+        """Yield each file's own diagnostics in file order as validation finishes.
+
+        Args:
+            files: Files of the run, sorted.
+            outcomes: Results of files found in the cache; receives the
+                results of validated files.
+            stats: Stat of each file that was looked up in the cache.
+            validated: Validation results of the files not found in the cache.
+            results: Receives each file's diagnostics.
 
-        for file_path in self.all_files:
-            errors = validator.validate_file(file_path)
+        Yields:
+            Diagnostics decided by each file's own content.
+        """
+        for file_path in files:
+            result = outcomes.get(file_path)
+            # Readers of archives may validate out of order; earlier arrivals wait in outcomes.
+            while result is None:
+                done, done_result, self.timings[done] = next(validated)
+                outcomes[done] = done_result
+                self._record(done, done_result, stats)
+                result = outcomes.get(file_path)
+            if result.errors:
+                results[file_path] = list(result.errors)
+                yield from result.errors
+        # Finish the validation iterator, which shuts its pool down and reports.
+        for _ in validated:
+            pass
+
+    def _record(self, file_path: Path, result: FileResult, stats: Dict[Path, os.stat_result]) -> None:
+        """Log a validated file and store its result in the cache.
+
+        Args:
+            file_path: Validated file.
+            result: Its validation result.
+            stats: Stat of each file that was looked up in the cache.
+        """
+        if logger.isEnabledFor(logging.DEBUG):
+            seconds = self.timings[file_path]
+            logger.debug(
+                "Validated %s in %.1f ms",
+                file_path,
+                seconds * 1000,
+                extra={"file": str(file_path), "duration": seconds},
+            )
+        if self.cache is not None and file_path in stats:
+            self.cache.store(file_path, stats[file_path], result)
+
+    def _index_outcomes(
+        self, files: List[Path], outcomes: Dict[Path, FileResult], validator: "MarkdownValidator"
+    ) -> None:
+        """Index the anchors and dependencies of every file and check external links.
+
+        Args:
+            files: Files of the run.
+            outcomes: Validation result of each file.
+            validator: Validator the run used.
+        """
+        self.outcomes = outcomes
+        self.dependents = defaultdict(set)
+        self.anchor_dependents = defaultdict(set)
+        self._validator = validator
+        for file_path in files:
+            self.slug_index.add(validator.resolve_path(file_path), outcomes[file_path].anchors)
+            self._track_dependencies(file_path, outcomes[file_path])
+
+        self._statuses = {}
+        with phase(self.profiler, "external"):
+            self._check_external(outcomes.values())
+
+    def _iter_cross_file_errors(
+        self, files: List[Path], outcomes: Dict[Path, FileResult], results: Dict[Path, List[Diagnostic]]
+    ) -> Iterator[Diagnostic]:
+        """Yield diagnostics that depend on other files or external links.
+
+        Every file's anchors are known by now, so cross-file fragments are
+        plain lookups.
+
+        Args:
+            files: Files of the run, sorted.
+            outcomes: Validation result of each file.
+            results: Receives each file's diagnostics.
+
+        Yields:
+            Diagnostics of links into other files' anchors and of external links.
+        """
+        for file_path in files:
+            with phase(self.profiler, "cross_file"):
+                diagnostics = self._cross_file_errors(file_path, outcomes[file_path])
+            if diagnostics:
+                results.setdefault(file_path, []).extend(diagnostics)
+                yield from diagnostics
+
+    def _count_run(self, profiler: Profiler, files: int) -> None:
+        """Add run-wide counters to the profiler.
+
+        Args:
+            profiler: Profiler receiving the counters.
+            files: Number of files in the run.
+        """
+        if self.cache is not None:
+            profiler.count("cache_hits", self.cache.hits)
+            profiler.count("cache_misses", self.cache.misses)
+            # Every file is stat-ed to look up its cache entry.
+            profiler.count("stat_calls", files)
+        if self.path_index is not None:
+            profiler.count("path_index_fallbacks", self.path_index.fallbacks)
+            profiler.count("stat_calls", self.path_index.fallbacks)
+
+    def refresh(self, changed: Iterable[Path]) -> Dict[Path, List[Diagnostic]]:
+        """Revalidate changed paths and the files that link to them.
+
+        Changed markdown files are read again, as are files with links to a
+        path that was created or deleted. If a changed file's headings now
+        define different anchors, files linking to its anchors have their
+        anchor checks repeated. Everything else keeps the result from the
+        previous run. ``iter_results`` or ``check_all_links`` must have run
+        first; ``results`` always holds the diagnostics of the whole tree.
+
+        Args:
+            changed: Paths under the root that were modified, created or
+                deleted.
+
+        Returns:
+            Diagnostics of every rechecked file whose diagnostics changed,
+            with an empty list for files that became clean or were deleted.
+        """
+        validator = self._validator
+        if validator is None or self.path_index is None:
+            raise RuntimeError("check_all_links() must run before refresh()")
+
+        revalidate: Set[Path] = set()
+        for path in map(Path, changed):
+            existence_changed = self.path_index.update(path)
+            revalidate.update(self._affected_markdown(path, existence_changed))
+            if existence_changed:
+                revalidate.update(self.dependents.get(validator.resolve_path(path), ()))
+
+        rereport: Set[Path] = set()
+        for file_path in sorted(revalidate):
+            old = self.outcomes.get(file_path)
+            new = self._revalidate(validator, file_path)
+            if (old and old.anchors) != (new and new.anchors):
+                rereport.update(self.anchor_dependents.get(validator.resolve_path(file_path), ()))
+        self._check_external(self.outcomes[file_path] for file_path in revalidate if file_path in self.outcomes)
+
+        return self._report(revalidate | rereport)
+
+    def update_text(self, file_path: Path, content: str) -> Dict[Path, List[Diagnostic]]:
+        """Revalidate a markdown file from text that may not be saved yet.
+
+        Until ``discard_text`` is called, the text stands in for the file's
+        content whenever the file is revalidated, and its anchors are what
+        links from other files are checked against. Results for the text are
+        not cached and its external links are not checked.
+        ``iter_results`` or ``check_all_links`` must have run first.
+
+        Args:
+            file_path: Markdown file the text belongs to.
+            content: Current text of the file.
+
+        Returns:
+            Diagnostics of the file and of files linking to its anchors,
+            for each of them whose diagnostics changed.
+        """
+        validator = self._validator
+        if validator is None:
+            raise RuntimeError("check_all_links() must run before update_text()")
+
+        self.unsaved[file_path] = content
+        old = self.outcomes.get(file_path)
+        new = self._revalidate(validator, file_path)
+        affected = {file_path}
+        if (old and old.anchors) != (new and new.anchors):
+            affected.update(self.anchor_dependents.get(validator.resolve_path(file_path), ()))
+        return self._report(affected)
+
+    def discard_text(self, file_path: Path) -> Dict[Path, List[Diagnostic]]:
+        """Stop using text given to ``update_text`` and read the file again.
+
+        Args:
+            file_path: Markdown file whose text was given.
+
+        Returns:
+            Diagnostics of every rechecked file whose diagnostics changed.
+        """
+        self.unsaved.pop(file_path, None)
+        return self.refresh([file_path])
+
+    def _report(self, files: Iterable[Path]) -> Dict[Path, List[Diagnostic]]:
+        """Update ``results`` for rechecked files.
+
+        Args:
+            files: Files whose own or cross-file results may have changed.
+
+        Returns:
+            Diagnostics of each file whose diagnostics changed, with an empty
+            list for files that became clean or were deleted.
+        """
+        changes = {}
+        for file_path in files:
+            result = self.outcomes.get(file_path)
+            errors = result.errors + self._cross_file_errors(file_path, result) if result is not None else []
+            if errors != self.results.get(file_path, []):
+                changes[file_path] = errors
             if errors:
-                results[file_path] = errors
+                self.results[file_path] = errors
+            else:
+                self.results.pop(file_path, None)
+        return changes
+
+    def _affected_markdown(self, path: Path, existence_changed: bool) -> Set[Path]:
+        """Find the markdown files a changed path stands for.
+
+        Args:
+            path: Changed path.
+            existence_changed: Whether the path was created or deleted.
+
+        Returns:
+            The path itself if it is a tracked or in-scope markdown file,
+            tracked and new markdown files below it if it is a directory that
+            appeared or disappeared, and nothing otherwise.
+        """
+        assert self.path_index is not None
+        if path.suffix == ".md":
+            return {path} if path in self.all_files or self.path_index.is_markdown(path) else set()
+        if not existence_changed:
+            return set()
+
+        prefix = os.path.join(path, "")
+        found = {file_path for file_path in self.all_files if str(file_path).startswith(prefix)}
+        found.update(file_path for file_path in self.path_index.markdown_files() if str(file_path).startswith(prefix))
+        return found
+
+    def _revalidate(self, validator: MarkdownValidator, file_path: Path) -> Optional[FileResult]:
+        """Validate one file again, or forget it if it no longer exists.
+
+        Text given to ``update_text`` is validated instead of the file.
+
+        Args:
+            validator: Validator from the last full run.
+            file_path: Markdown file to revalidate.
+
+        Returns:
+            New result, or None if the file was deleted.
+        """
+        self._forget(file_path)
+        content = self.unsaved.get(file_path)
+        if content is not None:
+            result = validator.check_text(file_path, content)
+            self._remember(validator, file_path, result)
+            return result
+
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            self.all_files.discard(file_path)
+            self.slug_index.discard(validator.resolve_path(file_path))
+            return None
+
+        result = validator.check_file(file_path)
+        self._remember(validator, file_path, result)
+        if self.cache is not None:
+            self.cache.store(file_path, stat, result)
+        return result
+
+    def _forget(self, file_path: Path) -> None:
+        """Drop a file's result and the link dependencies it recorded.
+
+        Args:
+            file_path: File about to be revalidated or removed.
+        """
+        old = self.outcomes.pop(file_path, None)
+        if old is not None:
+            for target in old.dependencies:
+                self.dependents[target].discard(file_path)
+            for target, *_ in old.anchor_refs:
+                self.anchor_dependents[target].discard(file_path)
+
+    def _remember(self, validator: MarkdownValidator, file_path: Path, result: FileResult) -> None:
+        """Record a file's new result, anchors and link dependencies.
+
+        Args:
+            validator: Validator that produced the result.
+            file_path: File the result belongs to.
+            result: New validation result.
+        """
+        self.all_files.add(file_path)
+        self.outcomes[file_path] = result
+        self.slug_index.add(validator.resolve_path(file_path), result.anchors)
+        self._track_dependencies(file_path, result)
+
+    def _track_dependencies(self, file_path: Path, result: FileResult) -> None:
+        """Record which link targets a file depends on.
+
+        Args:
+            file_path: File the result belongs to.
+            result: Validation result of the file.
+        """
+        for target in result.dependencies:
+            self.dependents[target].add(file_path)
+        for target, *_ in result.anchor_refs:
+            self.anchor_dependents[target].add(file_path)
+
+    def _cross_file_errors(self, file_path: Path, result: FileResult) -> List[Diagnostic]:
+        """Check a file's links into other files' anchors and its external links.
+
+        Args:
+            file_path: File the result belongs to.
+            result: Validation result of the file.
+
+        Returns:
+            Broken anchor and broken external link diagnostics.
+        """
+        assert self._validator is not None
+        errors = self._validator.check_anchor_refs(file_path, result.anchor_refs) if result.anchor_refs else []
+        if self._statuses and result.external_links:
+            errors += external_link_errors(file_path, result.external_links, self._statuses)
+        return errors
+
+    def _check_external(self, outcomes: Iterable[FileResult]) -> None:
+        """Check external links that have not been checked in this session.
+
+        Args:
+            outcomes: Results whose external links should be known.
+        """
+        if self.external_checker is None:
+            return
+        urls = {url for result in outcomes for url, _, _ in result.external_links}
+        unknown = [url for url in urls if normalize_url(url) not in self._statuses]
+        if unknown:
+            self._statuses.update(self.external_checker.check(unknown))
+
+    def _validate(
+        self, validator: MarkdownValidator, files: List[Path], jobs: int
+    ) -> Iterator[Tuple[Path, FileResult, float]]:
+        """Validate files serially or on a process pool.
+
+        Args:
+            validator: Validator to run, shipped once to each worker process.
+            files: Sorted files to validate.
+            jobs: Number of worker processes.
+
+        Returns:
+            Iterator over ``(file_path, result, seconds)`` triples in the same
+            order as ``files``, producing each as soon as it is available.
+        """
+        if self.prefetcher is not None:
+            return self._validate_prefetched(self.prefetcher, validator, files)
+        if jobs > 1 and len(files) >= MIN_PARALLEL_FILES:
+            return self._validate_parallel(validator, files, jobs)
+        return (_check_timed(validator, file_path) for file_path in files)
+
+    def _validate_prefetched(
+        self, prefetcher: Union["Prefetcher", "ArchiveReader"], validator: MarkdownValidator, files: List[Path]
+    ) -> Iterator[Tuple[Path, FileResult, float]]:
+        """Validate files in this process while the prefetcher reads ahead.
+
+        Args:
+            prefetcher: Reader of files ahead of validation.
+            validator: Validator to run.
+            files: Sorted files to validate.
+
+        Yields:
+            ``(file_path, result, seconds)`` triples in the order the
+            prefetcher hands files over, which is that of ``files`` unless it
+            reads an archive; the seconds leave out time spent waiting for
+            reads.
+        """
+        for file_path, data in prefetcher.read(files, self.profiler):
+            yield _check_timed(validator, file_path, data)
+
+    def _validate_parallel(
+        self, validator: MarkdownValidator, files: List[Path], jobs: int
+    ) -> Iterator[Tuple[Path, FileResult, float]]:
+        """Validate files on a process pool.
+
+        Args:
+            validator: Validator shipped once to each worker process.
+            files: Sorted files to validate.
+            jobs: Number of worker processes.
+
+        Yields:
+            ``(file_path, result, seconds)`` triples in the same order as
+            ``files``, one batch at a time as batches complete.
+        """
+        # Only parallel runs need multiprocessing, which is slow to import.
+        from concurrent.futures import ProcessPoolExecutor
+
+        batches = make_batches(files, jobs)
+        logger.debug("Validating %s files in %s batches on %s workers", len(files), len(batches), jobs)
+
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=(validator,)) as executor:
+            for batch_outcomes in executor.map(_validate_batch, batches):
+                yield from batch_outcomes
+
+
+_worker_validator: Optional[MarkdownValidator] = None
+
+
+def _init_worker(validator: MarkdownValidator) -> None:
+    """Store the validator in a worker process.
+
+    Args:
+        validator: Validator to use for every batch in this process.
+    """
+    global _worker_validator
+    _worker_validator = validator
+
+
+def _validate_batch(
+    files: List[Path], validator: Optional[MarkdownValidator] = None
+) -> List[Tuple[Path, FileResult, float]]:
+    """Validate a batch of files.
+
+    Args:
+        files: Files to validate.
+        validator: Validator to use. Defaults to the worker's validator.
+
+    Returns:
+        List of ``(file_path, result, seconds)`` triples in input order.
+    """
+    validator = validator or _worker_validator
+    if validator is None:
+        raise RuntimeError("Worker validator not initialized")
+    return [_check_timed(validator, file_path) for file_path in files]
+
+
+def _check_timed(
+    validator: MarkdownValidator, file_path: Path, data: Optional[FileContent] = None
+) -> Tuple[Path, FileResult, float]:
+    """Validate one file and measure how long it took.
+
+    Args:
+        validator: Validator to run.
+        file_path: File to validate.
+        data: The file's content if it has already been read, or an
+            iterator over its chunks.
+
+    Returns:
+        The file, its result and the wall-clock seconds spent on it.
+    """
+    start = time.perf_counter()
+    if data is None:
+        result = validator.check_file(file_path)
+    elif isinstance(data, bytes):
+        result = validator.check_file(file_path, data)
+    else:
+        result = validator.check_chunks(file_path, data)
+    return file_path, result, time.perf_counter() - start
+
+
+def _load_cached(
+    cache: "ValidationCache",
+    files: List[Path],
+    outcomes: Dict[Path, FileResult],
+    stats: Dict[Path, os.stat_result],
+    exists: Callable[[str], bool],
+) -> List[Path]:
+    """Fill in results for files whose cache entries are still valid.
+
+    Args:
+        cache: Cache to consult.
+        files: Files to look up.
+        outcomes: Receives cached results.
+        stats: Receives the stat taken before validating each cache miss.
+        exists: Checks whether a recorded link target exists.
+
+    Returns:
+        Files that still need to be validated.
+    """
+    pending = []
+    for file_path in files:
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            pending.append(file_path)
+            continue
+        cached = cache.lookup(file_path, stat, exists)
+        if cached is None:
+            stats[file_path] = stat
+            pending.append(file_path)
+        else:
+            outcomes[file_path] = cached
+
+    logger.debug("Cache hits: %s, misses: %s", len(files) - len(pending), len(pending))
+    return pending
+
+
+def make_batches(files: List[Path], jobs: int) -> List[List[Path]]:
+    """Split files into contiguous batches for the worker pool.
+
+    Args:
+        files: Files to split.
+        jobs: Number of worker processes.
 
-        return results
+    Returns:
+        Batches of files, preserving order.
+    """
+    target = -(-len(files) // (jobs * BATCHES_PER_WORKER))
+    size = max(1, min(MAX_BATCH_SIZE, target))
+    return [files[i : i + size] for i in range(0, len(files), size)]
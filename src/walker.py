@@ -0,0 +1,324 @@
+"""Pruning, ignore-aware directory walker."""
+
+import os
+import re
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Pattern, Set, Tuple
+
+# Directories that never hold documentation in scope, pruned at any depth. The
+# validation cache directory is skipped through the .gitignore it creates.
+DEFAULT_EXCLUDES = frozenset(
+    {
+        ".git",
+        ".hg",
+        ".svn",
+        "node_modules",
+        ".venv",
+        "venv",
+        "htmlcov",
+        "__pycache__",
+        ".tox",
+        ".nox",
+        ".mypy_cache",
+        ".pytest_cache",
+        ".ruff_cache",
+    }
+)
+
+GITIGNORE_NAME = ".gitignore"
+
+
+class IgnoreRule(NamedTuple):
+    """One compiled ``.gitignore``-style pattern."""
+
+    base: str
+    pattern: Pattern[str]
+    negate: bool
+    dir_only: bool
+
+
+Rules = Tuple[IgnoreRule, ...]
+
+
+def compile_pattern(line: str, base: str = "") -> Optional[IgnoreRule]:
+    """Compile one line of a ``.gitignore`` file.
+
+    Supports comments, ``!`` negation, trailing ``/`` for directories,
+    leading or embedded ``/`` for anchoring, and ``*``, ``?``, ``[...]`` and
+    ``**`` wildcards.
+
+    Args:
+        line: Pattern line.
+        base: Directory of the ignore file, relative to the root.
+
+    Returns:
+        Compiled rule, or None for blank lines and comments.
+    """
+    line = line.rstrip("\n")
+    if not line.endswith("\\ "):
+        line = line.rstrip()
+    if not line or line.startswith("#"):
+        return None
+
+    negate = line.startswith("!")
+    if negate:
+        line = line[1:]
+    elif line.startswith(("\\!", "\\#")):
+        line = line[1:]
+
+    dir_only = line.endswith("/")
+    line = line.rstrip("/")
+    anchored = "/" in line
+    line = line.lstrip("/")
+    if not line:
+        return None
+
+    prefix = "^" if anchored else "^(?:.*/)?"
+    return IgnoreRule(base, re.compile(prefix + _translate(line) + "$"), negate, dir_only)
+
+
+def _translate(pattern: str) -> str:
+    """Translate a gitignore glob into a regular expression body.
+
+    Args:
+        pattern: Glob without negation, anchoring or trailing slash.
+
+    Returns:
+        Regular expression source.
+    """
+    parts = []
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if pattern.startswith("**/", i):
+            parts.append("(?:.*/)?")
+            i += 3
+            continue
+        if pattern.startswith("**", i):
+            parts.append(".*")
+            i += 2
+            continue
+        if char == "*":
+            parts.append("[^/]*")
+        elif char == "?":
+            parts.append("[^/]")
+        elif char == "[" and "]" in pattern[i + 2 :]:
+            end = pattern.index("]", i + 2)
+            body = pattern[i + 1 : end]
+            parts.append("[" + ("^" + body[1:] if body.startswith("!") else body) + "]")
+            i = end
+        elif char == "\\" and i + 1 < len(pattern):
+            i += 1
+            parts.append(re.escape(pattern[i]))
+        else:
+            parts.append(re.escape(char))
+        i += 1
+    return "".join(parts)
+
+
+def load_rules(path: str, base: str) -> Rules:
+    """Read and compile an ignore file.
+
+    Args:
+        path: Path to the ignore file.
+        base: Directory of the ignore file, relative to the root.
+
+    Returns:
+        Compiled rules in file order; empty if the file cannot be read.
+    """
+    try:
+        with open(path, encoding="utf-8", errors="replace") as handle:
+            lines = handle.readlines()
+    except OSError:
+        return ()
+    return tuple(rule for rule in (compile_pattern(line, base) for line in lines) if rule is not None)
+
+
+def is_ignored(rules: Rules, rel_path: str, is_dir: bool) -> bool:
+    """Apply ignore rules to a path; the last matching rule wins.
+
+    Args:
+        rules: Rules from the root down to the path's directory.
+        rel_path: Path relative to the root.
+        is_dir: Whether the path is a directory.
+
+    Returns:
+        True if the path is ignored.
+    """
+    for rule in reversed(rules):
+        if rule.dir_only and not is_dir:
+            continue
+        if rule.base:
+            if not rel_path.startswith(rule.base + "/"):
+                continue
+            subject = rel_path[len(rule.base) + 1 :]
+        else:
+            subject = rel_path
+        if rule.pattern.match(subject):
+            return not rule.negate
+    return False
+
+
+class WalkResult:
+    """Paths found by a walk, relative to the root in POSIX form."""
+
+    __slots__ = ("files", "dirs", "symlinks", "pruned", "markdown")
+
+    def __init__(self) -> None:
+        """Initialize empty result."""
+        self.files: Set[str] = set()
+        self.dirs: Set[str] = set()
+        self.symlinks: Dict[str, str] = {}
+        self.pruned: Set[str] = set()
+        self.markdown: Set[str] = set()
+
+
+class Walker:
+    """Walks a tree with ``os.scandir``, pruning out-of-scope directories.
+
+    Directories named in ``DEFAULT_EXCLUDES``, matched by ``.gitignore``
+    files or by extra exclude patterns are recorded as pruned and never
+    entered. Other files are recorded even when ignored, so links to them
+    still resolve, but ignored markdown files are not validated. Symlinked
+    directories are recorded but not followed. With several jobs,
+    directories are scanned concurrently on a thread pool.
+    """
+
+    def __init__(
+        self,
+        root_path: Path,
+        exclude: Iterable[str] = (),
+        gitignore: bool = True,
+        jobs: int = 1,
+        excluded_names: FrozenSet[str] = DEFAULT_EXCLUDES,
+    ):
+        """Initialize walker.
+
+        Args:
+            root_path: Root directory to walk.
+            exclude: Extra ``.gitignore``-style patterns relative to the root.
+                They take precedence over ``.gitignore`` negations.
+            gitignore: Whether to honor ``.gitignore`` files.
+            jobs: Number of threads scanning directories.
+            excluded_names: Directory names pruned at any depth.
+        """
+        self.root_path = Path(root_path)
+        self.exclude = tuple(rule for rule in (compile_pattern(pattern) for pattern in exclude) if rule is not None)
+        self.gitignore = gitignore
+        self.jobs = jobs
+        self.excluded_names = excluded_names
+        self._dir_rules: Dict[str, Rules] = {}
+
+    def walk(self, top: str = "") -> WalkResult:
+        """Walk the tree below a directory.
+
+        Args:
+            top: Directory relative to the root; empty for the root itself.
+
+        Returns:
+            Everything found below ``top``.
+        """
+        result = WalkResult()
+        if self.jobs <= 1:
+            stack = [top]
+            while stack:
+                stack.extend(self._scan_dir(stack.pop(), result))
+            return result
+
+        with ThreadPoolExecutor(max_workers=self.jobs) as executor:
+            pending: Set["Future[List[str]]"] = {executor.submit(self._scan_dir, top, result)}
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    pending.update(executor.submit(self._scan_dir, rel_dir, result) for rel_dir in future.result())
+        return result
+
+    def is_excluded(self, rel_path: str, is_dir: bool) -> bool:
+        """Check whether a path is out of scope.
+
+        Args:
+            rel_path: Path relative to the root.
+            is_dir: Whether the path is a directory.
+
+        Returns:
+            True if the path is excluded by name, pattern or ``.gitignore``.
+        """
+        parent, _, name = rel_path.rpartition("/")
+        if is_dir and name in self.excluded_names:
+            return True
+        return self._ignored(self._rules_for(parent), rel_path, is_dir)
+
+    def _scan_dir(self, rel_dir: str, result: WalkResult) -> List[str]:
+        """Record the entries of one directory.
+
+        Args:
+            rel_dir: Directory relative to the root.
+            result: Receives the entries.
+
+        Returns:
+            Subdirectories to descend into.
+        """
+        try:
+            with os.scandir(os.path.join(self.root_path, rel_dir)) as iterator:
+                entries = list(iterator)
+        except OSError:
+            return []
+
+        rules = self._rules_for(rel_dir, entries)
+        subdirs = []
+        for entry in entries:
+            rel_path = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+            if entry.is_symlink():
+                result.symlinks[rel_path] = os.path.realpath(entry.path)
+                if entry.name.endswith(".md") and not self._ignored(rules, rel_path, False):
+                    result.markdown.add(rel_path)
+            elif entry.is_dir():
+                if entry.name in self.excluded_names or self._ignored(rules, rel_path, True):
+                    result.pruned.add(rel_path)
+                else:
+                    result.dirs.add(rel_path)
+                    subdirs.append(rel_path)
+            else:
+                result.files.add(rel_path)
+                if entry.name.endswith(".md") and not self._ignored(rules, rel_path, False):
+                    result.markdown.add(rel_path)
+        return subdirs
+
+    def _ignored(self, rules: Rules, rel_path: str, is_dir: bool) -> bool:
+        """Apply exclude patterns and ignore rules to a path.
+
+        Args:
+            rules: Ignore rules for the path's directory.
+            rel_path: Path relative to the root.
+            is_dir: Whether the path is a directory.
+
+        Returns:
+            True if the path is excluded or ignored.
+        """
+        if self.exclude and is_ignored(self.exclude, rel_path, is_dir):
+            return True
+        return is_ignored(rules, rel_path, is_dir)
+
+    def _rules_for(self, rel_dir: str, entries: Optional[List[os.DirEntry]] = None) -> Rules:
+        """Collect the ignore rules that apply inside a directory.
+
+        Args:
+            rel_dir: Directory relative to the root.
+            entries: The directory's entries if already listed, to avoid
+                probing for an ignore file that does not exist.
+
+        Returns:
+            Rules from the root down to and including the directory's own
+            ignore file.
+        """
+        rules = self._dir_rules.get(rel_dir)
+        if rules is not None:
+            return rules
+
+        rules = self._rules_for(rel_dir.rpartition("/")[0]) if rel_dir else ()
+        has_ignore_file = entries is None or any(entry.name == GITIGNORE_NAME for entry in entries)
+        if self.gitignore and has_ignore_file:
+            rules += load_rules(os.path.join(self.root_path, rel_dir, GITIGNORE_NAME), rel_dir)
+        self._dir_rules[rel_dir] = rules
+        return rules
@@ -0,0 +1,354 @@
+"""Filesystem watching for incremental revalidation."""
+
+import ctypes
+import ctypes.util
+import errno
+import logging
+import os
+import select
+import struct
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, FrozenSet, List, Optional, Set, Tuple, Union
+
+from src.cache import CACHE_DIR_NAME
+from src.diagnostics import Diagnostic
+from src.utils import LinkChecker
+from src.walker import DEFAULT_EXCLUDES
+
+logger = logging.getLogger(__name__)
+
+# Directories whose contents never affect documentation results.
+IGNORED_DIRS = DEFAULT_EXCLUDES | {CACHE_DIR_NAME}
+
+# Quiet period that ends a burst of events, e.g. an editor's write-rename-chmod save.
+DEFAULT_DEBOUNCE = 0.05
+# Upper bound on how long a continuous stream of events can delay a recheck.
+MAX_DEBOUNCE_WAIT = 1.0
+DEFAULT_POLL_INTERVAL = 1.0
+
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = getattr(os, "O_CLOEXEC", 0o2000000)
+
+WATCH_MASK = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_ONLYDIR
+EVENT_HEADER = struct.Struct("iIII")
+READ_SIZE = 64 * 1024
+
+Snapshot = Dict[str, Tuple[int, int, bool]]
+
+
+class WatchOverflowError(Exception):
+    """Raised when events were lost and the whole tree must be rechecked."""
+
+
+class InotifyWatcher:
+    """Reports changed paths using Linux inotify.
+
+    Every directory under the root gets a watch, and directories created
+    later are added as their events arrive. The kernel interface is called
+    through ctypes, so no extra dependency is needed.
+    """
+
+    def __init__(self, root_path: Path, ignored: FrozenSet[str] = IGNORED_DIRS):
+        """Start watching a directory tree.
+
+        Args:
+            root_path: Root directory to watch.
+            ignored: Directory names that are not watched.
+
+        Raises:
+            OSError: If inotify is unavailable or the watch limit is reached.
+        """
+        self.root_path = Path(root_path)
+        self.ignored = ignored
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        if not hasattr(self._libc, "inotify_init1"):
+            raise OSError(errno.ENOSYS, "inotify is not available")
+        self._fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._dirs: Dict[int, str] = {}
+        try:
+            self._add_tree(str(self.root_path))
+        except OSError:
+            self.close()
+            raise
+
+    def poll(self, timeout: float) -> Set[Path]:
+        """Wait for filesystem events.
+
+        Args:
+            timeout: Seconds to wait for the first event.
+
+        Returns:
+            Paths that were modified, created or deleted; empty on timeout.
+
+        Raises:
+            WatchOverflowError: If the kernel dropped events.
+        """
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return set()
+
+        changed: Set[Path] = set()
+        while True:
+            try:
+                data = os.read(self._fd, READ_SIZE)
+            except BlockingIOError:
+                break
+            self._parse(data, changed)
+        return changed
+
+    def _parse(self, data: bytes, changed: Set[Path]) -> None:
+        """Translate raw inotify events into paths.
+
+        Args:
+            data: Bytes read from the inotify descriptor.
+            changed: Receives changed paths.
+
+        Raises:
+            WatchOverflowError: If the kernel dropped events.
+        """
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset : offset + length].rstrip(b"\0")
+            offset += length
+
+            if mask & IN_Q_OVERFLOW:
+                raise WatchOverflowError("inotify event queue overflowed")
+            if mask & IN_IGNORED:
+                self._dirs.pop(wd, None)
+                continue
+            directory = self._dirs.get(wd)
+            if directory is None or not name:
+                continue
+
+            path = os.path.join(directory, os.fsdecode(name))
+            if mask & IN_ISDIR:
+                if os.path.basename(path) in self.ignored:
+                    continue
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    # Files may land in a new directory before its watch exists.
+                    changed.update(Path(file_path) for file_path in self._add_tree(path))
+            changed.add(Path(path))
+
+    def _add_tree(self, top: str) -> List[str]:
+        """Watch a directory and every directory below it.
+
+        Args:
+            top: Directory to watch.
+
+        Returns:
+            Files found below the directory.
+
+        Raises:
+            OSError: If a watch cannot be added, e.g. because the limit on
+                watches was reached.
+        """
+        files: List[str] = []
+        for dir_path, dir_names, file_names in os.walk(top):
+            dir_names[:] = [name for name in dir_names if name not in self.ignored]
+            wd = self._libc.inotify_add_watch(self._fd, os.fsencode(dir_path), WATCH_MASK)
+            if wd < 0:
+                code = ctypes.get_errno()
+                if code in (errno.ENOENT, errno.ENOTDIR):
+                    continue
+                raise OSError(code, f"Cannot watch {dir_path}: {os.strerror(code)}")
+            self._dirs[wd] = dir_path
+            files.extend(os.path.join(dir_path, name) for name in file_names)
+        return files
+
+    def close(self) -> None:
+        """Stop watching and release the inotify descriptor."""
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+class PollingWatcher:
+    """Reports changed paths by comparing periodic stat snapshots.
+
+    Used where inotify is unavailable or exhausted. Each scan stats every
+    path in the tree, so the interval trades latency for CPU time.
+    """
+
+    def __init__(
+        self, root_path: Path, interval: float = DEFAULT_POLL_INTERVAL, ignored: FrozenSet[str] = IGNORED_DIRS
+    ):
+        """Take the initial snapshot.
+
+        Args:
+            root_path: Root directory to watch.
+            interval: Seconds between scans.
+            ignored: Directory names that are not scanned.
+        """
+        self.root_path = Path(root_path)
+        self.interval = interval
+        self.ignored = ignored
+        self._snapshot = self._scan()
+        self._next_scan = time.monotonic() + interval
+
+    def poll(self, timeout: float) -> Set[Path]:
+        """Wait for the next scan and report differences.
+
+        Args:
+            timeout: Maximum seconds to wait.
+
+        Returns:
+            Paths that were modified, created or deleted; empty if no scan
+            was due within the timeout.
+        """
+        delay = self._next_scan - time.monotonic()
+        if delay > timeout:
+            time.sleep(timeout)
+            return set()
+        if delay > 0:
+            time.sleep(delay)
+
+        snapshot = self._scan()
+        self._next_scan = time.monotonic() + self.interval
+        changed = {path for path, state in snapshot.items() if self._snapshot.get(path) != state}
+        changed.update(path for path in self._snapshot if path not in snapshot)
+        self._snapshot = snapshot
+        return {Path(path) for path in changed}
+
+    def _scan(self) -> Snapshot:
+        """Stat every path in the tree.
+
+        Returns:
+            Mapping of path to modification time, size and directory flag.
+        """
+        snapshot: Snapshot = {}
+        stack = [str(self.root_path)]
+        while stack:
+            try:
+                entries = os.scandir(stack.pop())
+            except OSError:
+                continue
+            with entries:
+                for entry in entries:
+                    try:
+                        stat = entry.stat(follow_symlinks=False)
+                    except OSError:
+                        continue
+                    is_dir = entry.is_dir(follow_symlinks=False)
+                    if is_dir and entry.name in self.ignored:
+                        continue
+                    snapshot[entry.path] = (stat.st_mtime_ns, stat.st_size, is_dir)
+                    if is_dir:
+                        stack.append(entry.path)
+        return snapshot
+
+    def close(self) -> None:
+        """Release resources; nothing to do for polling."""
+
+
+Watcher = Union[InotifyWatcher, PollingWatcher]
+ChangeHandler = Callable[[Dict[Path, List[Diagnostic]], float], None]
+
+
+def create_watcher(root_path: Path, poll_interval: float = DEFAULT_POLL_INTERVAL) -> Watcher:
+    """Create the best available watcher for a directory tree.
+
+    Args:
+        root_path: Root directory to watch.
+        poll_interval: Seconds between scans if polling is needed.
+
+    Returns:
+        An inotify watcher, or a polling watcher if inotify cannot be used.
+    """
+    try:
+        return InotifyWatcher(root_path)
+    except (OSError, AttributeError) as e:
+        logger.warning("inotify unavailable (%s); polling every %gs", e, poll_interval)
+        return PollingWatcher(root_path, interval=poll_interval)
+
+
+def watch(
+    checker: LinkChecker,
+    watcher: Watcher,
+    on_change: ChangeHandler,
+    debounce: float = DEFAULT_DEBOUNCE,
+    stop: Optional[threading.Event] = None,
+    idle_timeout: float = 0.5,
+) -> None:
+    """Revalidate files as they change until stopped.
+
+    ``checker.check_all_links`` must have run already. Events are collected
+    until none arrive for ``debounce`` seconds, then the affected files are
+    rechecked in one go.
+
+    Args:
+        checker: Link checker holding the results of the last full run.
+        watcher: Source of changed paths.
+        on_change: Called with the files whose errors changed and the
+            recheck time in seconds.
+        debounce: Quiet period that ends a burst of events.
+        stop: Event that ends the loop when set. Without it the loop runs
+            until interrupted.
+        idle_timeout: Seconds between checks of the stop event while idle.
+    """
+    while stop is None or not stop.is_set():
+        try:
+            changed = watcher.poll(idle_timeout)
+            if not changed:
+                continue
+            _collect_burst(watcher, changed, debounce)
+            start = time.perf_counter()
+            changes = checker.refresh(changed)
+        except WatchOverflowError as e:
+            logger.warning("%s; rechecking everything", e)
+            start = time.perf_counter()
+            changes = _recheck_all(checker)
+        on_change(changes, time.perf_counter() - start)
+
+
+def _collect_burst(watcher: Watcher, changed: Set[Path], debounce: float) -> None:
+    """Keep collecting events until the tree has been quiet for a while.
+
+    Args:
+        watcher: Source of changed paths.
+        changed: Paths seen so far; receives further paths.
+        debounce: Quiet period that ends the burst.
+    """
+    deadline = time.monotonic() + MAX_DEBOUNCE_WAIT
+    while time.monotonic() < deadline:
+        more = watcher.poll(debounce)
+        if not more:
+            return
+        changed.update(more)
+
+
+def _recheck_all(checker: LinkChecker) -> Dict[Path, List[Diagnostic]]:
+    """Rescan and recheck the whole tree after events were lost.
+
+    Args:
+        checker: Link checker to refresh.
+
+    Returns:
+        Files whose errors changed, with an empty list for files now clean.
+    """
+    before = checker.results
+    checker.all_files = set()
+    for _ in checker.iter_results():
+        pass
+    after = checker.results
+    return {
+        file_path: after.get(file_path, [])
+        for file_path in set(before) | set(after)
+        if before.get(file_path) != after.get(file_path)
+    }
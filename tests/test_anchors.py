@@ -0,0 +1,86 @@
+"""Tests for heading anchors and slug index."""
+
+from src.anchors import SlugIndex, github_slug, heading_anchors, load_anchors
+
+
+class TestGithubSlug:
+    """Tests for github_slug function."""
+
+    def test_basic(self):
+        """Test lowercasing and hyphenation."""
+        assert github_slug("Getting Started") == "getting-started"
+
+    def test_punctuation_removed(self):
+        """Test that punctuation is dropped but hyphens and underscores kept."""
+        assert github_slug("What's new in v2.0? (beta)") == "whats-new-in-v20-beta"
+        assert github_slug("snake_case and kebab-case") == "snake_case-and-kebab-case"
+
+    def test_markup_reduced_to_text(self):
+        """Test that code spans, emphasis, links and images render as text."""
+        assert github_slug("Use `pip` **now**") == "use-pip-now"
+        assert github_slug("See [the guide](guide.md)") == "see-the-guide"
+        assert github_slug("Logo ![alt](logo.png)") == "logo-"
+
+    def test_unicode_letters_kept(self):
+        """Test that non-ASCII letters survive."""
+        assert github_slug("Café Überblick") == "café-überblick"
+
+    def test_repeated_spaces(self):
+        """Test that each space becomes a hyphen."""
+        assert github_slug("A -  B") == "a----b"
+
+
+class TestHeadingAnchors:
+    """Tests for heading_anchors function."""
+
+    def test_duplicates_get_suffixes(self):
+        """Test GitHub's duplicate suffix rules."""
+        assert heading_anchors(["Setup", "Setup", "Setup"]) == ["setup", "setup-1", "setup-2"]
+
+    def test_suffix_collision(self):
+        """Test that an explicit heading matching a suffix is skipped over."""
+        assert heading_anchors(["Foo", "Foo-1", "Foo"]) == ["foo", "foo-1", "foo-2"]
+
+
+class TestSlugIndex:
+    """Tests for SlugIndex class."""
+
+    def test_add_and_lookup(self):
+        """Test lookups against added anchors."""
+        index = SlugIndex(loader=None)
+        index.add("/docs/a.md", ["intro", "usage"])
+
+        assert index.has_anchor("/docs/a.md", "usage")
+        assert index.has_anchor("/docs/a.md", "Usage")
+        assert not index.has_anchor("/docs/a.md", "missing")
+        assert "/docs/a.md" in index
+
+    def test_percent_encoded_fragment(self):
+        """Test that fragments are percent-decoded."""
+        index = SlugIndex(loader=None)
+        index.add("/docs/a.md", ["café"])
+
+        assert index.has_anchor("/docs/a.md", "caf%C3%A9")
+
+    def test_lazy_load(self, tmp_path):
+        """Test that unindexed files are loaded once."""
+        target = tmp_path / "a.md"
+        target.write_text("# Title\n\n```\n# not a heading\n```\n\n## Usage\n")
+        calls = []
+
+        def loader(path):
+            calls.append(path)
+            return load_anchors(path)
+
+        index = SlugIndex(loader=loader)
+
+        assert index.has_anchor(str(target), "usage")
+        assert not index.has_anchor(str(target), "not-a-heading")
+        assert calls == [str(target)]
+
+    def test_unreadable_file_has_no_anchors(self, tmp_path):
+        """Test that missing files have no anchors."""
+        index = SlugIndex()
+
+        assert not index.has_anchor(str(tmp_path / "missing.md"), "x")
+        assert len(index) == 1
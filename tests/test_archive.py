@@ -0,0 +1,185 @@
+"""Tests for validating markdown inside archives."""
+
+import io
+import json
+import sys
+import tarfile
+import zipfile
+from unittest.mock import patch
+
+import pytest
+
+from src.archive import ArchiveIndex, archive_checker
+from src.cli import main
+from src.utils import LinkChecker
+
+TREE = {
+    "README.md": "# Docs\n\n[guide](guide/intro.md#setup) [gone](guide/intro.md#gone) [img](assets/logo.png)\n",
+    "guide/intro.md": "# Intro\n\n## Setup\n\n[back](../README.md) [missing](missing.md) [up](../../outside.md)\n",
+    "guide/untitled.md": "No title\n\n[vendored](../vendor/lib.md#api) [bad](../vendor/lib.md#nope)\n",
+    "guide/big.md": "# Big\n\n" + "[ok](intro.md#setup) [bad](intro.md#nope)\n" * 200,
+    "assets/logo.png": "png",
+    "vendor/lib.md": "# Lib\n\n## API\n\n[broken](nowhere.md)\n",
+    "drafts/wip.md": "no title, but ignored\n",
+    ".gitignore": "drafts/\n",
+}
+
+
+def extracted(tmp_path, exclude=()):
+    """Return the diagnostics of the extracted tree, relative to its root."""
+    root = tmp_path / "tree"
+    for name, content in TREE.items():
+        (root / name).parent.mkdir(parents=True, exist_ok=True)
+        (root / name).write_text(content)
+    return relative(LinkChecker(root, exclude=exclude).iter_results(), root)
+
+
+def relative(diagnostics, root):
+    """Return diagnostics as comparable tuples with paths relative to root."""
+    return [
+        (diagnostic.path.relative_to(root).as_posix(), diagnostic.rule, diagnostic.line, diagnostic.message)
+        for diagnostic in diagnostics
+    ]
+
+
+def make_tar(path, members=TREE):
+    """Write members to a gzipped tar archive, not in sorted order."""
+    with tarfile.open(path, "w:gz") as tar:
+        for name, content in reversed(list(members.items())):
+            data = content.encode()
+            info = tarfile.TarInfo(f"./{name}")
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+    return path
+
+
+def make_zip(path, members=TREE):
+    """Write members to a zip archive."""
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive_file:
+        for name, content in members.items():
+            archive_file.writestr(name, content)
+    return path
+
+
+@pytest.fixture(params=["tar", "zip"])
+def docs_archive(request, tmp_path):
+    """Create an archive of the tree in each supported format."""
+    if request.param == "tar":
+        return make_tar(tmp_path / "docs.tar.gz")
+    return make_zip(tmp_path / "docs.zip")
+
+
+class TestArchiveIndex:
+    """Tests for ArchiveIndex class."""
+
+    def test_members_resolve_without_filesystem(self, docs_archive):
+        """Test that member paths resolve inside the archive and nothing outside it exists."""
+        index = ArchiveIndex.from_archive(docs_archive)
+
+        assert index.exists(str(docs_archive / "guide" / ".." / "assets" / "logo.png"))
+        assert index.exists(str(docs_archive / "vendor"))
+        assert not index.exists(str(docs_archive / "guide" / "missing.md"))
+        assert not index.exists(str(docs_archive.parent / "docs.zip.md"))
+        assert sorted(index.markdown) == [
+            "README.md",
+            "guide/big.md",
+            "guide/intro.md",
+            "guide/untitled.md",
+            "vendor/lib.md",
+        ]
+
+    def test_excludes(self, docs_archive):
+        """Test that --exclude patterns and default excludes apply to members."""
+        index = ArchiveIndex.from_archive(docs_archive, exclude=["vendor/"])
+
+        assert "vendor/lib.md" not in index.markdown
+        assert "vendor/lib.md" in index.files
+
+    def test_symlinks_and_repeated_members(self, tmp_path):
+        """Test that a symlinked file and the last of repeated entries are what gets validated."""
+        path = tmp_path / "docs.tar"
+        with tarfile.open(path, "w") as tar:
+            for name, content in (("a.md", "no title\n"), ("a.md", "# A\n")):
+                info = tarfile.TarInfo(name)
+                info.size = len(content)
+                tar.addfile(info, io.BytesIO(content.encode()))
+            link = tarfile.TarInfo("docs/alias.md")
+            link.type = tarfile.SYMTYPE
+            link.linkname = "../a.md"
+            tar.addfile(link)
+
+        checker = archive_checker(path)
+
+        assert list(checker.iter_results()) == []
+        assert set(checker.outcomes) == {path / "a.md", path / "docs" / "alias.md"}
+
+    def test_hard_links(self, tmp_path):
+        """Test that hard links are validated with their target's content, as extraction would leave them."""
+        path = tmp_path / "docs.tar"
+        with tarfile.open(path, "w") as tar:
+            for name, content in (("a.md", "# A\n\n[x](b.md)\n"), ("b.md", "# B\n"), ("copy.md", "no title\n")):
+                info = tarfile.TarInfo(name)
+                info.size = len(content)
+                tar.addfile(info, io.BytesIO(content.encode()))
+            for name, target in (("docs/alias.md", "a.md"), ("docs/again.md", "docs/alias.md"), ("copy.md", "b.md")):
+                link = tarfile.TarInfo(name)
+                link.type = tarfile.LNKTYPE
+                link.linkname = target
+                tar.addfile(link)
+        root = tmp_path / "tree"
+        with tarfile.open(path) as tar:
+            tar.extractall(root)
+
+        expected = relative(LinkChecker(root).iter_results(), root)
+        checker = archive_checker(path)
+
+        assert relative(checker.iter_results(), path) == expected
+        assert ("docs/alias.md", "broken-link", 3, "Broken link to b.md") in expected
+        assert set(checker.outcomes) == {
+            path / name for name in ("a.md", "b.md", "copy.md", "docs/alias.md", "docs/again.md")
+        }
+
+
+class TestArchiveValidation:
+    """Tests for validating archives like their extracted trees."""
+
+    def test_same_diagnostics_as_extracted_tree(self, docs_archive, tmp_path):
+        """Test that validating the archive finds exactly what the extracted tree gives."""
+        expected = extracted(tmp_path)
+
+        assert relative(archive_checker(docs_archive).iter_results(), docs_archive) == expected
+        assert ("guide/untitled.md", "broken-anchor", 3, "Broken anchor in link to ../vendor/lib.md#nope") in expected
+        assert not any(path == "drafts/wip.md" for path, *_ in expected)
+
+    def test_streamed_members(self, docs_archive, tmp_path, monkeypatch):
+        """Test that members above the streaming threshold are checked in chunks with the same result."""
+        expected = extracted(tmp_path, exclude=["vendor/"])
+        monkeypatch.setattr("src.streaming.CHUNK_SIZE", 64)
+
+        checker = archive_checker(docs_archive, exclude=["vendor/"])
+        checker.prefetcher.stream_threshold = 100
+
+        assert relative(checker.iter_results(), docs_archive) == expected
+
+    def test_command(self, docs_archive, capsys):
+        """Test that validate accepts an archive and reports members relative to it."""
+        with patch.object(sys, "argv", ["cli.py", "validate", "--format", "ndjson", str(docs_archive)]):
+            assert main() == 1
+
+        records = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+        assert {record["path"] for record in records} == {
+            "README.md",
+            "guide/big.md",
+            "guide/intro.md",
+            "guide/untitled.md",
+            "vendor/lib.md",
+        }
+
+    def test_corrupt_archive(self, tmp_path, caplog):
+        """Test that an unreadable archive fails with an error instead of a traceback."""
+        path = tmp_path / "docs.tar.gz"
+        path.write_bytes(b"\x1f\x8b not really gzip")
+
+        with patch.object(sys, "argv", ["cli.py", "validate", str(path)]):
+            assert main() == 1
+        assert "Cannot read archive" in caplog.text
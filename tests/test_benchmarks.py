@@ -0,0 +1,115 @@
+"""Tests for the benchmark corpus generator and regression gate."""
+
+import json
+
+from benchmarks.corpus import CorpusSpec, generate_corpus
+from benchmarks.logging_overhead import LEVELS
+from benchmarks.logging_overhead import run as run_logging
+from benchmarks.run import BENCHMARKS, compare, main, run_benchmarks
+from src.utils import LinkChecker
+
+
+def snapshot(root):
+    """Return the content of every markdown file under a root."""
+    return {path.relative_to(root): path.read_bytes() for path in root.rglob("*.md")}
+
+
+class TestCorpus:
+    """Tests for generate_corpus function."""
+
+    def test_same_spec_same_bytes(self, tmp_path):
+        """Test that a seed reproduces the corpus exactly."""
+        spec = CorpusSpec(files=30, files_per_dir=10)
+
+        generate_corpus(tmp_path / "a", spec)
+        generate_corpus(tmp_path / "b", spec)
+
+        assert snapshot(tmp_path / "a") == snapshot(tmp_path / "b")
+        assert len(snapshot(tmp_path / "a")) == 30
+
+    def test_broken_links_are_counted(self, tmp_path):
+        """Test that the validator finds exactly the broken links that were planted."""
+        stats = generate_corpus(tmp_path, CorpusSpec(files=100, links_per_file=8, broken_fraction=0.1))
+
+        results = LinkChecker(tmp_path).check_all_links()
+
+        assert stats.broken_links > 0
+        assert sum(len(errors) for errors in results.values()) == stats.broken_links
+
+    def test_size_distribution(self, tmp_path):
+        """Test that file sizes vary around the requested mean."""
+        stats = generate_corpus(tmp_path, CorpusSpec(files=200, mean_size=4000, size_sigma=0.5))
+
+        sizes = [len(data) for data in snapshot(tmp_path).values()]
+        assert 3000 < stats.bytes / stats.files < 5000
+        assert min(sizes) < 3000 < 5000 < max(sizes)
+
+    def test_existing_corpus_is_reused(self, tmp_path):
+        """Test that a second generation with the same spec writes nothing."""
+        spec = CorpusSpec(files=10)
+        first = generate_corpus(tmp_path, spec)
+        for path in tmp_path.rglob("*.md"):
+            path.unlink()
+
+        assert generate_corpus(tmp_path, spec) == first
+        assert not list(tmp_path.rglob("*.md"))
+
+
+class TestRegressionGate:
+    """Tests for benchmark results and baseline comparison."""
+
+    def test_results_report_throughput(self, tmp_path):
+        """Test that each benchmark reports timing and throughput."""
+        results = run_benchmarks(tmp_path, CorpusSpec(files=20), isolate=False)
+
+        assert set(results["benchmarks"]) == set(BENCHMARKS)
+        measured = results["benchmarks"]["check_all_links"]
+        assert measured["files"] == 20
+        assert measured["files_per_sec"] > 0
+        assert measured["mb_per_sec"] > 0
+        json.dumps(results)
+
+    def test_compare(self):
+        """Test that only drops beyond the threshold are regressions."""
+        spec = CorpusSpec()._asdict()
+        baseline = {"spec": spec, "jobs": 1, "benchmarks": {"a": {"files_per_sec": 100}, "b": {"files_per_sec": 100}}}
+        results = {"spec": spec, "jobs": 1, "benchmarks": {"a": {"files_per_sec": 85}, "b": {"files_per_sec": 70}}}
+
+        regressions = compare(results, baseline, threshold=0.2)
+
+        assert len(regressions) == 1
+        assert regressions[0].startswith("b:")
+
+    def test_compare_rejects_other_corpus(self):
+        """Test that results for a different corpus are not compared."""
+        baseline = {"spec": CorpusSpec(files=10)._asdict(), "jobs": 1, "benchmarks": {}}
+        results = {"spec": CorpusSpec(files=20)._asdict(), "jobs": 1, "benchmarks": {}}
+
+        assert compare(results, baseline)
+
+    def test_main_fails_on_regression(self, tmp_path, capsys):
+        """Test that the command exits non-zero against a much faster baseline."""
+        args = ["--files", "20", "--repeat", "1", "--in-process", "--work-dir", str(tmp_path)]
+        baseline = tmp_path / "baseline.json"
+        assert main([*args, "--output", str(baseline)]) == 0
+
+        data = json.loads(baseline.read_text())
+        for measured in data["benchmarks"].values():
+            measured["files_per_sec"] *= 100
+        baseline.write_text(json.dumps(data))
+
+        assert main([*args, "--baseline", str(baseline)]) == 1
+        assert "REGRESSION" in capsys.readouterr().out
+
+
+class TestLoggingOverhead:
+    """Tests for the logging overhead benchmark."""
+
+    def test_queue_does_not_wait_for_writes(self):
+        """Test that queued calls skip the stream's latency and disabled levels cost little."""
+        results = run_logging(records=20, latency=0.002, threshold="WARNING")
+
+        assert set(results) == set(LEVELS)
+        assert results["WARNING"]["text"] >= 2_000_000
+        assert results["WARNING"]["queued text"] < 1_000_000
+        assert results["DEBUG"]["text"] < 1_000_000
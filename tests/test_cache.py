@@ -0,0 +1,132 @@
+"""Tests for validation cache."""
+
+import os
+
+from src.cache import CACHE_DIR_NAME, ValidationCache
+from src.utils import FileResult, LinkChecker
+
+
+def run_checker(root):
+    """Run a cached link check and return the results and cache."""
+    cache = ValidationCache(root)
+    results = LinkChecker(root, cache=cache).check_all_links()
+    return results, cache
+
+
+class TestValidationCache:
+    """Tests for ValidationCache class."""
+
+    def test_cold_run_writes_cache(self, tmp_path):
+        """Test that the first run stores results on disk."""
+        (tmp_path / "file1.md").write_text("# File 1\n")
+
+        _, cache = run_checker(tmp_path)
+
+        assert cache.misses == 1
+        assert (tmp_path / CACHE_DIR_NAME / "validation.json").exists()
+        assert (tmp_path / CACHE_DIR_NAME / ".gitignore").exists()
+
+    def test_warm_run_uses_cache(self, tmp_path):
+        """Test that an unchanged tree is served from the cache."""
+        (tmp_path / "file1.md").write_text("# File 1\n\n[Link](missing.md)\n")
+        (tmp_path / "file2.md").write_text("# File 2\n")
+
+        cold, _ = run_checker(tmp_path)
+        warm, cache = run_checker(tmp_path)
+
+        assert warm == cold
+        assert cache.hits == 2
+        assert cache.misses == 0
+
+    def test_modified_file_is_rechecked(self, tmp_path):
+        """Test that editing a file invalidates its entry."""
+        file_path = tmp_path / "file1.md"
+        file_path.write_text("# File 1\n")
+        run_checker(tmp_path)
+
+        file_path.write_text("## No title any more\n")
+        results, cache = run_checker(tmp_path)
+
+        assert cache.misses == 1
+        assert any("Missing H1" in error for error in results[file_path])
+
+    def test_touched_file_matches_by_digest(self, tmp_path):
+        """Test that a changed mtime with identical content is still a hit."""
+        file_path = tmp_path / "file1.md"
+        file_path.write_text("# File 1\n")
+        run_checker(tmp_path)
+
+        stat = file_path.stat()
+        os.utime(file_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        _, cache = run_checker(tmp_path)
+
+        assert cache.hits == 1
+
+    def test_created_link_target_invalidates_entry(self, tmp_path):
+        """Test that creating a missing link target triggers a recheck."""
+        (tmp_path / "file1.md").write_text("# File 1\n\n[Link](target.md)\n")
+        cold, _ = run_checker(tmp_path)
+        assert len(cold) == 1
+
+        (tmp_path / "target.md").write_text("# Target\n")
+        warm, cache = run_checker(tmp_path)
+
+        assert warm == {}
+        assert cache.misses == 2
+
+    def test_deleted_link_target_invalidates_entry(self, tmp_path):
+        """Test that deleting a link target triggers a recheck."""
+        (tmp_path / "file1.md").write_text("# File 1\n\n[Link](target.txt)\n")
+        (tmp_path / "target.txt").write_text("target\n")
+        run_checker(tmp_path)
+
+        (tmp_path / "target.txt").unlink()
+        results, _ = run_checker(tmp_path)
+
+        assert any("Broken link" in error for error in results[tmp_path / "file1.md"])
+
+    def test_clear_removes_entries(self, tmp_path):
+        """Test that clearing the cache forces a full recheck."""
+        (tmp_path / "file1.md").write_text("# File 1\n")
+        _, cache = run_checker(tmp_path)
+
+        cache.clear()
+        _, cache = run_checker(tmp_path)
+
+        assert cache.hits == 0
+        assert cache.misses == 1
+
+    def test_corrupt_cache_is_ignored(self, tmp_path):
+        """Test that an unreadable cache file is treated as empty."""
+        cache_dir = tmp_path / CACHE_DIR_NAME
+        cache_dir.mkdir()
+        (cache_dir / "validation.json").write_text("{not json")
+        (tmp_path / "file1.md").write_text("# File 1\n")
+
+        results, cache = run_checker(tmp_path)
+
+        assert results == {}
+        assert cache.misses == 1
+
+    def test_store_skips_results_without_digest(self, tmp_path):
+        """Test that results for unreadable files are not cached."""
+        file_path = tmp_path / "file1.md"
+        file_path.write_text("# File 1\n")
+        cache = ValidationCache(tmp_path)
+
+        cache.store(file_path, file_path.stat(), FileResult(["error"]))
+
+        assert cache.lookup(file_path, file_path.stat()) is None
+
+    def test_warm_run_checks_anchors_without_reading(self, tmp_path):
+        """Test that cached anchors are reused and fragments rechecked."""
+        (tmp_path / "a.md").write_text("# A\n\n[b](b.md#usage)\n")
+        (tmp_path / "b.md").write_text("# B\n\n## Usage\n")
+        cold, _ = run_checker(tmp_path)
+        assert cold == {}
+
+        (tmp_path / "b.md").write_text("# B\n\n## Install\n")
+        warm, cache = run_checker(tmp_path)
+
+        assert cache.hits == 1
+        assert warm == {tmp_path / "a.md": [f"{tmp_path / 'a.md'}:3: Broken anchor in link to b.md#usage"]}
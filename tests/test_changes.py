@@ -0,0 +1,137 @@
+"""Tests for git-aware changed-file selection."""
+
+import argparse
+import shutil
+import subprocess
+
+import pytest
+
+from src.cache import ValidationCache
+from src.changes import ChangeSet, GitError, ReverseLinkIndex, affected_files, git_changes
+from src.cli import validate_command
+from src.utils import LinkChecker
+
+pytestmark = pytest.mark.skipif(shutil.which("git") is None, reason="git is not installed")
+
+
+def git(root, *args):
+    """Run a git command in a test repository."""
+    subprocess.run(
+        ["git", "-c", "user.name=Test", "-c", "user.email=test@example.com", *args],
+        cwd=root,
+        check=True,
+        capture_output=True,
+    )
+
+
+@pytest.fixture
+def repo(tmp_path):
+    """Create a committed repository where several files link to one another."""
+    (tmp_path / "docs").mkdir()
+    (tmp_path / "README.md").write_text("# Readme\n\n[Guide](docs/guide.md)\n")
+    (tmp_path / "docs" / "guide.md").write_text("# Guide\n\n## Setup\n")
+    (tmp_path / "docs" / "faq.md").write_text("# FAQ\n\n[Setup](guide.md#setup)\n")
+    (tmp_path / "docs" / "other.md").write_text("# Other\n")
+    git(tmp_path, "init", "-q", "-b", "main")
+    git(tmp_path, "add", ".")
+    git(tmp_path, "commit", "-q", "-m", "initial")
+    return tmp_path
+
+
+class TestGitChanges:
+    """Tests for git_changes function."""
+
+    def test_since_reports_committed_uncommitted_and_untracked(self, repo):
+        """Test that --since covers commits, working tree edits and new files."""
+        git(repo, "checkout", "-q", "-b", "feature")
+        (repo / "docs" / "other.md").write_text("# Other\n\nMore.\n")
+        git(repo, "commit", "-q", "-am", "edit")
+        (repo / "README.md").write_text("# Readme\n")
+        (repo / "docs" / "new.md").write_text("# New\n")
+
+        changes = git_changes(repo, since="main")
+
+        assert changes.modified == [repo / "README.md", repo / "docs" / "new.md", repo / "docs" / "other.md"]
+        assert changes.deleted == []
+
+    def test_renames_are_deletions_and_additions(self, repo):
+        """Test that a staged rename reports the old path as deleted."""
+        git(repo, "mv", "docs/guide.md", "docs/manual.md")
+
+        changes = git_changes(repo, staged=True)
+
+        assert changes == ChangeSet([repo / "docs" / "manual.md"], [repo / "docs" / "guide.md"])
+
+    def test_unknown_ref(self, repo):
+        """Test that a bad ref raises GitError."""
+        with pytest.raises(GitError):
+            git_changes(repo, since="no-such-branch")
+
+
+class TestAffectedFiles:
+    """Tests for affected_files function."""
+
+    def test_deleted_path_selects_linking_files(self, repo):
+        """Test that files linking to a deleted file are selected without a cache."""
+        (repo / "docs" / "guide.md").unlink()
+
+        files = affected_files(repo, ChangeSet([], [repo / "docs" / "guide.md"]))
+
+        assert files == [repo / "README.md", repo / "docs" / "faq.md"]
+
+    def test_changed_headings_select_anchor_links(self, repo):
+        """Test that only files linking to anchors in a changed file are selected."""
+        LinkChecker(repo, cache=ValidationCache(repo)).check_all_links()
+
+        files = affected_files(repo, ChangeSet([repo / "docs" / "guide.md"], []), cache=ValidationCache(repo))
+
+        assert files == [repo / "docs" / "faq.md", repo / "docs" / "guide.md"]
+
+    def test_cached_links_are_used(self, repo):
+        """Test that files with a current cache entry are not read for the search."""
+        LinkChecker(repo, cache=ValidationCache(repo)).check_all_links()
+        cache = ValidationCache(repo)
+        (repo / "docs" / "other.md").write_text("# Other\n\nguide.md is mentioned but not linked.\n")
+
+        index = ReverseLinkIndex(cache).build(sorted(map(str, repo.rglob("*.md"))))
+        dependents = index.dependents([str(repo / "docs" / "guide.md")])
+
+        assert index.unindexed == [str(repo / "docs" / "other.md")]
+        assert dependents == {str(repo / name) for name in ("README.md", "docs/faq.md", "docs/other.md")}
+
+
+class TestChangedValidation:
+    """Tests for the --since and --staged options."""
+
+    def test_staged_rename_reports_broken_links(self, repo, capsys):
+        """Test that a rename breaks links in files that were not touched."""
+        git(repo, "mv", "docs/guide.md", "docs/manual.md")
+        (repo / "docs" / "other.md").write_text("no title\n")
+        args = argparse.Namespace(path=str(repo), jobs=1, no_cache=True, staged=True)
+
+        exit_code = validate_command(args)
+
+        output = capsys.readouterr().out
+        assert exit_code == 1
+        assert "Broken link to docs/guide.md" in output
+        assert "Broken link to guide.md#setup" in output
+        assert "other.md" not in output
+
+    def test_since_with_cache_keeps_other_entries(self, repo):
+        """Test that a partial run does not prune cache entries of unselected files."""
+        LinkChecker(repo, cache=ValidationCache(repo)).check_all_links()
+        (repo / "docs" / "other.md").write_text("# Other\n\nMore.\n")
+        args = argparse.Namespace(path=str(repo), jobs=1, since="main")
+
+        assert validate_command(args) == 0
+
+        cache = ValidationCache(repo)
+        LinkChecker(repo, cache=cache).check_all_links()
+        assert cache.misses == 0
+
+    def test_since_requires_git(self, tmp_path):
+        """Test that a directory outside a repository fails cleanly."""
+        (tmp_path / "a.md").write_text("# A\n")
+        args = argparse.Namespace(path=str(tmp_path), jobs=1, no_cache=True, since="main")
+
+        assert validate_command(args) == 1
@@ -1,10 +1,55 @@
 """Tests for CLI module."""
 
+import io
+import json
+import os
+import subprocess
 import sys
+from pathlib import Path
 from unittest.mock import patch
 
+import pytest
+
 from src.cli import main, validate_command
 
+# Time from importing the CLI to starting on the first file, on a machine that
+# imports CALIBRATION_IMPORTS in REFERENCE_IMPORT_TIME seconds. Slower machines
+# get a proportionally larger budget.
+STARTUP_BUDGET = 0.05
+CALIBRATION_IMPORTS = "argparse, json, logging, pathlib, re"
+REFERENCE_IMPORT_TIME = 0.01
+
+# Imports that took most of the startup time before they were deferred.
+DEFERRED_MODULES = ["asyncio", "ssl", "multiprocessing", "xml.sax", "urllib.request", "ctypes", "tomllib"]
+
+STARTUP_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+from src import cli, utils
+check_file = utils.MarkdownValidator.check_file
+first = None
+def timed_check_file(self, file_path):
+    global first
+    if first is None:
+        first = time.perf_counter() - start
+    return check_file(self, file_path)
+utils.MarkdownValidator.check_file = timed_check_file
+sys.argv = ["cli.py", "validate", sys.argv[1]]
+exit_code = cli.main()
+print(json.dumps({"exit": exit_code, "first_file": first, "modules": sorted(sys.modules)}))
+"""
+
+
+def run_python(pycache, *args):
+    """Run a fresh interpreter from the repository root and return its output.
+
+    Bytecode is cached under ``pycache``, as it would be for an installed package.
+    """
+    root = Path(__file__).resolve().parent.parent
+    env = {key: value for key, value in os.environ.items() if key != "PYTHONDONTWRITEBYTECODE"}
+    command = [sys.executable, "-X", f"pycache_prefix={pycache}", *args]
+    return subprocess.run(command, cwd=root, env=env, capture_output=True, text=True, check=True).stdout
+
 
 class TestValidateCommand:
     """Tests for validate command."""
@@ -90,6 +135,48 @@ class TestMain:
 
         assert exit_code == 0
 
+    def test_main_validate_with_jobs(self, tmp_path):
+        """Test main with validate command and explicit job count."""
+        (tmp_path / "test.md").write_text("# Title\n")
+
+        with patch.object(sys, "argv", ["cli.py", "validate", "--jobs", "2", str(tmp_path)]):
+            exit_code = main()
+
+        assert exit_code == 0
+
+    def test_main_validate_rejects_zero_jobs(self, tmp_path):
+        """Test that a zero job count is rejected."""
+        with patch.object(sys, "argv", ["cli.py", "validate", "--jobs", "0", str(tmp_path)]):
+            with pytest.raises(SystemExit):
+                main()
+
+    def test_main_validate_no_cache(self, tmp_path):
+        """Test that --no-cache leaves no cache directory behind."""
+        (tmp_path / "test.md").write_text("# Title\n")
+
+        with patch.object(sys, "argv", ["cli.py", "validate", "--no-cache", str(tmp_path)]):
+            exit_code = main()
+
+        assert exit_code == 0
+        assert not (tmp_path / ".ai-fundamentals-cache").exists()
+
+    def test_main_validate_clear_cache(self, tmp_path):
+        """Test that --clear-cache discards cached results but keeps other caches."""
+        (tmp_path / "test.md").write_text("# Title\n")
+        cache_dir = tmp_path / ".ai-fundamentals-cache"
+        cache_dir.mkdir()
+        stale = cache_dir / "validation.json"
+        stale.write_text('{"entries": {"stale.md": {}}}')
+        other = cache_dir / "tokens.json"
+        other.write_text("{}")
+
+        with patch.object(sys, "argv", ["cli.py", "validate", "--clear-cache", str(tmp_path)]):
+            exit_code = main()
+
+        assert exit_code == 0
+        assert "stale.md" not in stale.read_text()
+        assert other.exists()
+
     def test_main_validate_with_errors(self, tmp_path):
         """Test main with validate command and errors."""
         file_path = tmp_path / "test.md"
@@ -99,3 +186,101 @@ class TestMain:
             exit_code = main()
 
         assert exit_code == 1
+
+
+class TestBatchValidation:
+    """Tests for validating many paths in one run."""
+
+    def test_several_files(self, tmp_path, capsys):
+        """Test that each named file is validated and non-markdown paths are skipped."""
+        (tmp_path / "good.md").write_text("# Good\n\n[bad](bad.md)\n")
+        (tmp_path / "bad.md").write_text("## No title\n")
+        (tmp_path / "notes.txt").write_text("## Not markdown\n")
+        paths = [str(tmp_path / name) for name in ("good.md", "bad.md", "notes.txt")]
+
+        with patch.object(sys, "argv", ["cli.py", "validate", "--no-cache", *paths]):
+            exit_code = main()
+
+        assert exit_code == 1
+        output = capsys.readouterr().out
+        assert "bad.md:" in output
+        assert "good.md:" not in output
+
+    def test_directories_are_expanded(self, tmp_path, capsys):
+        """Test that directories among the paths contribute their markdown files."""
+        (tmp_path / "docs").mkdir()
+        (tmp_path / "docs" / "a.md").write_text("## No title\n")
+        (tmp_path / "b.md").write_text("# B\n")
+
+        with patch.object(sys, "argv", ["cli.py", "validate", str(tmp_path / "docs"), str(tmp_path / "b.md")]):
+            exit_code = main()
+
+        assert exit_code == 1
+        assert os.path.join("docs", "a.md") in capsys.readouterr().out
+
+    def test_files_from_stdin_nul_separated(self, tmp_path, monkeypatch):
+        """Test that --files-from - reads NUL-separated paths, which may contain newlines."""
+        odd = tmp_path / "odd\nname.md"
+        odd.write_text("# Odd\n")
+        (tmp_path / "b.md").write_text("# B\n")
+        listing = f"{odd}\0{tmp_path / 'b.md'}\0".encode()
+        monkeypatch.setattr(sys, "stdin", io.TextIOWrapper(io.BytesIO(listing)))
+
+        with patch.object(sys, "argv", ["cli.py", "validate", "--files-from", "-"]):
+            assert main() == 0
+
+    def test_files_from_file(self, tmp_path):
+        """Test that a list file is read one path per line, alongside named paths."""
+        (tmp_path / "a.md").write_text("# A\n")
+        (tmp_path / "b.md").write_text("No title\n")
+        listing = tmp_path / "files.txt"
+        listing.write_text(f"{tmp_path / 'a.md'}\n\n")
+
+        with patch.object(sys, "argv", ["cli.py", "validate", "--files-from", str(listing)]):
+            assert main() == 0
+        with patch.object(sys, "argv", ["cli.py", "validate", "--files-from", str(listing), str(tmp_path / "b.md")]):
+            assert main() == 1
+
+    def test_empty_list(self, tmp_path, monkeypatch):
+        """Test that an empty list of paths passes."""
+        monkeypatch.setattr(sys, "stdin", io.TextIOWrapper(io.BytesIO(b"")))
+
+        with patch.object(sys, "argv", ["cli.py", "validate", "--files-from", "-"]):
+            assert main() == 0
+
+    def test_missing_path(self, tmp_path, caplog):
+        """Test that a path that does not exist is an error."""
+        (tmp_path / "a.md").write_text("# A\n")
+
+        with patch.object(sys, "argv", ["cli.py", "validate", str(tmp_path / "a.md"), str(tmp_path / "gone")]):
+            assert main() == 1
+        assert "does not exist" in caplog.text
+
+    def test_single_directory_options_rejected(self, tmp_path, caplog):
+        """Test that --since needs a single directory."""
+        (tmp_path / "a.md").write_text("# A\n")
+
+        with patch.object(sys, "argv", ["cli.py", "validate", "--since", "HEAD", str(tmp_path), str(tmp_path)]):
+            assert main() == 1
+        assert "single directory" in caplog.text
+
+
+class TestStartup:
+    """Tests for the cost of starting the command."""
+
+    def test_startup_budget(self, tmp_path):
+        """Test that the first file is reached quickly and slow imports are deferred."""
+        file_path = tmp_path / "a.md"
+        file_path.write_text("# A\n")
+        pycache = tmp_path / "pycache"
+        calibration = f"import time; start = time.perf_counter(); import {CALIBRATION_IMPORTS}; "
+        calibration += "print(time.perf_counter() - start)"
+
+        run_python(pycache, "-c", STARTUP_SCRIPT, str(file_path))
+        imports = min(float(run_python(pycache, "-c", calibration)) for _ in range(3))
+        runs = [json.loads(run_python(pycache, "-c", STARTUP_SCRIPT, str(file_path))) for _ in range(3)]
+
+        assert all(run["exit"] == 0 for run in runs)
+        assert not set(DEFERRED_MODULES) & set(runs[0]["modules"])
+        budget = STARTUP_BUDGET * max(1.0, imports / REFERENCE_IMPORT_TIME)
+        assert min(run["first_file"] for run in runs) < budget
@@ -0,0 +1,153 @@
+"""Tests for near-duplicate section detection."""
+
+import json
+import random
+import sys
+from unittest.mock import patch
+
+import pytest
+
+from src.cli import main
+from src.duplicates import DuplicateFinder, MinHasher, SignatureCache, lsh_bands, shingles, split_sections, split_words
+
+WORDS = "model token context window prompt retrieval vector index agent tool latency cost eval data".split()
+
+
+def paragraph(seed, length=80):
+    """Return reproducible filler text."""
+    generator = random.Random(seed)
+    return " ".join(generator.choice(WORDS) + str(generator.randrange(50)) for _ in range(length))
+
+
+@pytest.fixture
+def docs(tmp_path):
+    """Create files where one section was copied with a small edit."""
+    shared = paragraph(1)
+    edited = shared.replace(shared.split()[40], "changed", 1)
+    (tmp_path / "tools.md").write_text(f"# Tools\n\n## Frameworks\n\n{shared}\n\n## Other\n\n{paragraph(2)}\n")
+    (tmp_path / "enterprise").mkdir()
+    (tmp_path / "enterprise" / "LLM.md").write_text(f"# LLM\n\n{paragraph(3)}\n\n## Copied\n\n{edited}\n")
+    (tmp_path / "short.md").write_text("# Short\n\nToo few words to compare.\n")
+    return tmp_path
+
+
+def sections(finder):
+    """Return the location of each pair of sections a finder reports."""
+    return [
+        [(section.path.name, section.line, section.title) for section in (pair.first, pair.second)]
+        for pair in finder.find()
+    ]
+
+
+class TestSplitSections:
+    """Tests for split_sections function."""
+
+    def test_headings_in_fences_do_not_split(self):
+        """Test that sections start at real headings and leave them out of the body."""
+        content = "intro\n# A\ntext\n```\n# not a heading\n```\n## B\nmore\n"
+
+        assert split_sections(content) == [
+            (1, "", "intro"),
+            (2, "A", "text\n```\n# not a heading\n```"),
+            (7, "B", "more\n"),
+        ]
+
+
+class TestMinHasher:
+    """Tests for MinHasher class."""
+
+    def test_similarity_estimate(self):
+        """Test that matching signature positions approximate Jaccard similarity."""
+        hasher = MinHasher()
+        first = {str(number) for number in range(1000)}
+        second = {str(number) for number in range(200, 1200)}
+
+        same = sum(x == y for x, y in zip(hasher.signature(first), hasher.signature(second)))
+
+        assert abs(same / hasher.num_perm - 800 / 1200) < 0.15
+        assert hasher.signature(first) == MinHasher().signature(first)
+
+    def test_numpy_matches_pure_python(self):
+        """Test that vectorized signatures equal the pure Python ones."""
+        pytest.importorskip("numpy")
+        shingle_set = shingles(split_words(paragraph(4, 5000)))
+        vectorized = MinHasher()
+        pure = MinHasher()
+        pure._numpy = None
+
+        assert vectorized.signature(shingle_set) == pure.signature(shingle_set)
+
+    def test_bands(self):
+        """Test that the band count puts the LSH threshold just below the requested one."""
+        assert lsh_bands(0.8, 128) == 16
+        assert lsh_bands(0.5, 128) == 32
+        assert 128 % lsh_bands(0.9, 128) == 0
+
+
+class TestDuplicateFinder:
+    """Tests for DuplicateFinder class."""
+
+    def test_finds_copied_section(self, docs):
+        """Test that a lightly edited copy is reported and unrelated sections are not."""
+        finder = DuplicateFinder()
+        for file_path in sorted(docs.rglob("*.md")):
+            finder.add_file(file_path)
+
+        assert sections(finder) == [[("LLM.md", 5, "Copied"), ("tools.md", 3, "Frameworks")]]
+        assert finder.find()[0].similarity > 0.8
+        assert len(finder.sections) == 4
+
+    def test_cache_skips_unchanged_files(self, docs):
+        """Test that reruns only hash files that changed."""
+        cache_file = docs / ".ai-fundamentals-cache" / "signatures.json"
+        files = sorted(docs.rglob("*.md"))
+        first = DuplicateFinder()
+        first.cache = SignatureCache(cache_file, docs, first.parameters)
+        for file_path in files:
+            first.add_file(file_path)
+        first.cache.save()
+
+        (docs / "short.md").write_text("# Short\n\nStill too short.\n")
+        second = DuplicateFinder()
+        second.cache = SignatureCache(cache_file, docs, second.parameters)
+        with patch.object(MinHasher, "signature", side_effect=AssertionError("rehashed")):
+            for file_path in files:
+                second.add_file(file_path)
+
+        assert (second.cache.hits, second.cache.misses) == (2, 1)
+        assert sections(second) == sections(first)
+
+    def test_cache_discarded_for_other_parameters(self, docs):
+        """Test that signatures made with other settings are not reused."""
+        cache_file = docs / "signatures.json"
+        finder = DuplicateFinder()
+        finder.cache = SignatureCache(cache_file, docs, finder.parameters)
+        finder.add_file(docs / "tools.md")
+        finder.cache.save()
+
+        other = DuplicateFinder(min_words=5)
+        other.cache = SignatureCache(cache_file, docs, other.parameters)
+        other.add_file(docs / "tools.md")
+
+        assert other.cache.misses == 1
+
+
+class TestDuplicatesCommand:
+    """Tests for the duplicates command."""
+
+    def test_json_report(self, docs, capsys):
+        """Test that the command reports pairs relative to the root."""
+        with patch.object(sys, "argv", ["cli.py", "duplicates", "--format", "json", str(docs)]):
+            assert main() == 0
+
+        pairs = json.loads(capsys.readouterr().out)["pairs"]
+        assert [[section["path"] for section in pair["sections"]] for pair in pairs] == [
+            ["enterprise/LLM.md", "tools.md"]
+        ]
+        assert (docs / ".ai-fundamentals-cache" / "signatures.json").exists()
+
+    def test_threshold_must_be_a_fraction(self, docs):
+        """Test that thresholds outside (0, 1] are rejected."""
+        with patch.object(sys, "argv", ["cli.py", "duplicates", "--threshold", "1.5", str(docs)]):
+            with pytest.raises(SystemExit):
+                main()
@@ -0,0 +1,146 @@
+"""Tests for automatic fixes."""
+
+import sys
+from unittest.mock import patch
+
+from src.cli import main
+from src.diagnostics import BROKEN_LINK, HEADING_INCREMENT, UNCLOSED_FENCE, Diagnostic
+from src.fixes import FileLocator, Fixer, fix_text, unified_diff
+from src.utils import FileResult
+
+LOCATOR = FileLocator(["guide/setup.md", "img/logo.png", "a/dup.md", "b/dup.md"], {}, {})
+
+
+def run(*argv):
+    """Run the CLI with the given arguments and return its exit code."""
+    with patch.object(sys, "argv", ["cli.py", *argv]):
+        return main()
+
+
+def diagnostic(rule, line=0, column=0):
+    """Return a diagnostic for docs/index.md."""
+    return Diagnostic("docs/index.md", rule, rule, line, column)
+
+
+class TestFixText:
+    """Tests for fix_text function."""
+
+    def test_links_point_at_unique_file_of_same_name(self):
+        """Test that fragments, titles and other links on the line survive the rewrite."""
+        content = '# T\n\n[a](setup.md#install "Setup") ![logo](../logo.png) [d](dup.md)\n'
+        broken = [diagnostic(BROKEN_LINK, 3, 1), diagnostic(BROKEN_LINK, 3, 32), diagnostic(BROKEN_LINK, 3, 52)]
+
+        text, fixed = fix_text(content, "docs/index.md", broken, LOCATOR)
+
+        assert text == '# T\n\n[a](../guide/setup.md#install "Setup") ![logo](../img/logo.png) [d](dup.md)\n'
+        assert fixed == broken[:2]
+
+    def test_previous_content_wins_over_name(self):
+        """Test that a file moved and renamed is found by the digest it had before."""
+        locator = FileLocator(["docs/new-name.md", "x/old.md"], {"docs/new-name.md": "d1"}, {"docs/old.md": "d1"})
+
+        text, _ = fix_text("[x](old.md)\n", "docs/index.md", [diagnostic(BROKEN_LINK, 1, 1)], locator)
+
+        assert text == "[x](new-name.md)\n"
+
+    def test_headings_renumbered(self):
+        """Test that skipped levels close up, siblings stay siblings and fenced lines are untouched."""
+        content = "# A\r\n### B\r\n#### C\r\n```\r\n#### code\r\n```\r\n### D\r\n## E\r\n"
+
+        text, fixed = fix_text(content, "docs/index.md", [diagnostic(HEADING_INCREMENT, 2, 1)], LOCATOR)
+
+        assert text == "# A\r\n## B\r\n### C\r\n```\r\n#### code\r\n```\r\n## D\r\n## E\r\n"
+        assert len(fixed) == 1
+
+    def test_headings_without_title(self, tmp_path):
+        """Test that only the first heading without a parent becomes H1 and the fixed file validates clean."""
+        (tmp_path / "doc.md").write_text("## Intro\n\n#### Detail\n\n## Usage\n")
+
+        run("validate", "--fix", "--no-cache", str(tmp_path))
+
+        assert (tmp_path / "doc.md").read_text() == "# Intro\n\n## Detail\n\n## Usage\n"
+        assert run("validate", "--no-cache", str(tmp_path)) == 0
+
+    def test_fence_closed(self):
+        """Test that an unclosed fence is closed with its own marker at the end."""
+        text, _ = fix_text("# A\n\n~~~~ python\ncode", "docs/index.md", [diagnostic(UNCLOSED_FENCE, 3)], LOCATOR)
+
+        assert text == "# A\n\n~~~~ python\ncode\n~~~~\n"
+
+    def test_diff_marks_missing_newline(self):
+        """Test that a change to a last line without newline gives a diff patch tools accept."""
+        diff = unified_diff("a\nb", "a\nb\n```\n", "x.md")
+
+        assert diff.splitlines()[-4:] == ["-b", "\\ No newline at end of file", "+b", "+```"]
+
+
+class TestFixer:
+    """Tests for Fixer class."""
+
+    def test_file_changed_since_validation_is_skipped(self, tmp_path):
+        """Test that a file whose digest no longer matches is not rewritten."""
+        file_path = tmp_path / "doc.md"
+        file_path.write_text("# A\n### B\n")
+        results = {file_path: [Diagnostic(file_path, HEADING_INCREMENT, "skip", 2, 1)]}
+
+        fixes = Fixer(tmp_path, LOCATOR).fix(results, {file_path: FileResult([], digest="stale")})
+
+        assert fixes == []
+        assert file_path.read_text() == "# A\n### B\n"
+
+
+class TestFixCommand:
+    """Tests for validate --fix."""
+
+    def make_tree(self, root):
+        """Create docs, validate them into the cache, then move a linked file."""
+        (root / "guide").mkdir()
+        (root / "guide" / "install.md").write_text("# Install\n\n## Steps\n")
+        (root / "index.md").write_text("# Index\n\n[install](guide/install.md#steps)\n\n### Deep\n\n```\nopen\n")
+        (root / "other.md").write_text("# Other\n\n[gone](nowhere.md)\n")
+        assert run("validate", str(root)) == 1
+        (root / "setup").mkdir()
+        (root / "guide" / "install.md").rename(root / "setup" / "getting-started.md")
+
+    def test_fix_in_place(self, tmp_path, capsys):
+        """Test that moved targets are found by content and unfixable errors are still reported."""
+        self.make_tree(tmp_path)
+        capsys.readouterr()
+
+        assert run("validate", "--fix", "-j", "2", str(tmp_path)) == 1
+
+        assert (tmp_path / "index.md").read_text() == (
+            "# Index\n\n[install](setup/getting-started.md#steps)\n\n## Deep\n\n```\nopen\n```\n"
+        )
+        output = capsys.readouterr().out
+        assert "nowhere.md" in output and "index.md" not in output
+        assert run("validate", str(tmp_path / "index.md")) == 0
+
+    def test_dry_run(self, tmp_path, capsys):
+        """Test that --dry-run prints a diff and leaves files alone."""
+        self.make_tree(tmp_path)
+        before = (tmp_path / "index.md").read_text()
+        capsys.readouterr()
+
+        run("validate", "--fix", "--dry-run", str(tmp_path))
+
+        output = capsys.readouterr().out
+        assert "+++ b/index.md" in output
+        assert "+[install](setup/getting-started.md#steps)" in output
+        assert (tmp_path / "index.md").read_text() == before
+
+    def test_dry_run_reports_like_validate(self, tmp_path, capsys):
+        """Test that --dry-run reports the errors it would fix and fails like a plain validate."""
+        self.make_tree(tmp_path)
+        (tmp_path / "other.md").unlink()
+        capsys.readouterr()
+
+        assert run("validate", "--fix", "--dry-run", str(tmp_path)) == 1
+        output = capsys.readouterr().out
+        assert "+[install](setup/getting-started.md#steps)" in output
+        assert "index.md:3: Broken link to guide/install.md#steps" in output
+
+    def test_dry_run_requires_fix(self, tmp_path, caplog):
+        """Test that --dry-run alone is rejected."""
+        assert run("validate", "--dry-run", str(tmp_path)) == 1
+        assert "--dry-run requires --fix" in caplog.text
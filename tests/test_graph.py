@@ -0,0 +1,169 @@
+"""Tests for the documentation link graph."""
+
+import io
+import json
+import sys
+from unittest.mock import patch
+
+import pytest
+
+from src.cli import main
+from src.graph import GraphReport, LinkGraph
+from src.utils import LinkChecker
+
+
+@pytest.fixture
+def docs(tmp_path):
+    """Create a small site: README -> guide <-> faq -> sub/, plus an orphan."""
+    (tmp_path / "README.md").write_text("# Home\n\n[Guide](guide.md) and [Sub](sub/)\n")
+    (tmp_path / "guide.md").write_text("# Guide\n\n[FAQ](faq.md#top) [self](guide.md) [web](https://example.com)\n")
+    (tmp_path / "faq.md").write_text("# FAQ\n\n[Guide](guide.md) [missing](gone.md)\n")
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "sub" / "README.md").write_text("# Sub\n\n![chart](chart.png)\n")
+    (tmp_path / "sub" / "chart.png").write_bytes(b"")
+    (tmp_path / "orphan.md").write_text("# Orphan\n\n[Home](README.md)\n")
+    return tmp_path
+
+
+def checked(root):
+    """Return a link checker that has checked the whole tree."""
+    checker = LinkChecker(root)
+    checker.check_all_links()
+    return checker
+
+
+def names(graph, nodes):
+    """Return the relative paths of nodes."""
+    return [graph.relative(node) for node in nodes]
+
+
+def edges(graph):
+    """Return the links of a graph as pairs of relative paths."""
+    return sorted(
+        (graph.relative(node), graph.relative(target)) for node in graph.nodes() for target in graph.targets[node]
+    )
+
+
+class TestLinkGraph:
+    """Tests for LinkGraph class."""
+
+    def test_build(self, docs):
+        """Test that links between markdown files become edges."""
+        graph = LinkGraph.build(checked(docs))
+
+        assert len(graph.nodes()) == 5
+        assert edges(graph) == [
+            ("README.md", "guide.md"),
+            ("README.md", "sub/README.md"),
+            ("faq.md", "guide.md"),
+            ("guide.md", "faq.md"),
+            ("orphan.md", "README.md"),
+        ]
+
+    def test_analysis(self, docs):
+        """Test orphans, dead ends, cycles and in-degree ranking."""
+        graph = LinkGraph.build(checked(docs))
+        readme = graph.node(docs / "README.md")
+
+        assert names(graph, graph.orphans([readme])) == ["orphan.md"]
+        assert names(graph, graph.dead_ends()) == ["sub/README.md"]
+        assert [names(graph, component) for component in graph.cycles()] == [["faq.md", "guide.md"]]
+        assert names(graph, graph.most_linked(2)) == ["guide.md", "README.md"]
+        assert names(graph, graph.unlinked()) == ["orphan.md"]
+
+    def test_long_chain(self, tmp_path):
+        """Test that a cycle longer than the recursion limit is found."""
+        count = sys.getrecursionlimit() + 100
+        for index in range(count):
+            (tmp_path / f"p{index}.md").write_text(f"# Page\n\n[next](p{(index + 1) % count}.md)\n")
+
+        graph = LinkGraph.build(checked(tmp_path))
+
+        assert [len(component) for component in graph.cycles()] == [count]
+
+    def test_incremental_update(self, docs):
+        """Test that updates after edits, creations and deletions match a rebuild."""
+        checker = checked(docs)
+        graph = LinkGraph.build(checker)
+
+        (docs / "faq.md").write_text("# FAQ\n\n[New](new.md)\n")
+        (docs / "new.md").write_text("# New\n\n[Orphan](orphan.md)\n")
+        (docs / "guide.md").unlink()
+        changed = [docs / "faq.md", docs / "new.md", docs / "guide.md"]
+        checker.refresh(changed)
+        graph.update(checker, changed)
+
+        assert edges(graph) == edges(LinkGraph.build(checker))
+        assert graph.in_degree.tolist()[graph.node(docs / "orphan.md")] == 1
+        assert graph.node(docs / "guide.md") is None
+
+    def test_created_file_gains_incoming_links(self, docs):
+        """Test that links written before their target existed become edges."""
+        checker = checked(docs)
+        graph = LinkGraph.build(checker)
+
+        (docs / "gone.md").write_text("# Back\n")
+        checker.refresh([docs / "gone.md"])
+        graph.update(checker, [docs / "gone.md"])
+
+        assert ("faq.md", "gone.md") in edges(graph)
+
+
+class TestGraphReport:
+    """Tests for GraphReport class."""
+
+    def test_json(self, docs):
+        """Test that the JSON export holds the graph and the analysis."""
+        graph = LinkGraph.build(checked(docs))
+        stream = io.StringIO()
+
+        GraphReport(graph, [graph.node(docs / "README.md")]).write_json(stream)
+
+        data = json.loads(stream.getvalue())
+        paths = {node["id"]: node["path"] for node in data["nodes"]}
+        assert sorted((paths[source], paths[target]) for source, target in data["edges"]) == edges(graph)
+        assert data["orphans"] == ["orphan.md"]
+        assert data["cycles"] == [["faq.md", "guide.md"]]
+        assert data["most_linked"][0] == {"path": "guide.md", "in_degree": 2}
+
+    def test_dot(self, docs):
+        """Test that the DOT export declares every node and edge."""
+        graph = LinkGraph.build(checked(docs))
+        stream = io.StringIO()
+
+        GraphReport(graph, []).write_dot(stream)
+
+        output = stream.getvalue()
+        assert output.startswith("digraph docs {")
+        assert output.count(" -> ") == 5
+        assert '"sub/README.md"' in output
+
+    def test_without_roots(self, docs):
+        """Test that files nothing links to are orphans when there are no roots."""
+        graph = LinkGraph.build(checked(docs))
+
+        assert names(graph, GraphReport(graph, []).orphans) == ["orphan.md"]
+
+
+class TestGraphCommand:
+    """Tests for the graph command."""
+
+    def test_text_report(self, docs, capsys):
+        """Test that the command reports orphans reachable from README.md."""
+        with patch.object(sys, "argv", ["cli.py", "graph", "--no-cache", str(docs)]):
+            assert main() == 0
+
+        output = capsys.readouterr().out
+        assert "5 files, 5 links" in output
+        assert "Orphans (not reachable from the roots): 1\n  orphan.md" in output
+
+    def test_configured_roots(self, docs, capsys):
+        """Test that roots can come from pyproject.toml."""
+        (docs / "pyproject.toml").write_text('[tool.ai-fundamentals.graph]\nroots = ["orphan.md"]\n')
+
+        with patch.object(sys, "argv", ["cli.py", "graph", "--no-cache", "--format", "json", str(docs)]):
+            assert main() == 0
+
+        data = json.loads(capsys.readouterr().out)
+        assert data["roots"] == ["orphan.md"]
+        assert data["orphans"] == []
@@ -1,8 +1,13 @@
 """Tests for logging configuration."""
 
+import json
 import logging
+import sys
+from pathlib import Path
+from unittest.mock import patch
 
-from src.logging_config import configure_logging
+from src.cli import main
+from src.logging_config import JsonFormatter, configure_logging, stop_logging
 
 
 class TestLoggingConfig:
@@ -42,3 +47,86 @@ class TestLoggingConfig:
 
         logger = logging.getLogger("src")
         assert len(logger.handlers) > 0
+
+    def test_records_still_propagate(self, caplog):
+        """Test that records reach handlers on the root logger too."""
+        configure_logging(level="INFO")
+
+        logging.getLogger("src.test").info("hello %s", "world")
+
+        assert "hello world" in caplog.text
+
+
+class TestJsonFormatter:
+    """Tests for JsonFormatter class."""
+
+    def test_structured_fields(self):
+        """Test that the message is merged and fields passed as extra become keys."""
+        record = logging.LogRecord("src.utils", logging.DEBUG, "utils.py", 1, "Validated %s", ("a.md",), None)
+        record.file = Path("a.md")
+        record.duration = 0.25
+
+        data = json.loads(JsonFormatter().format(record))
+
+        assert data["message"] == "Validated a.md"
+        assert data["level"] == "DEBUG" and data["logger"] == "src.utils"
+        assert data["file"] == "a.md" and data["duration"] == 0.25
+        assert "rule" not in data
+
+    def test_exception(self):
+        """Test that a logged exception is kept in one field."""
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            record = logging.LogRecord("src", logging.ERROR, "x.py", 1, "failed", (), sys.exc_info())
+
+        data = json.loads(JsonFormatter().format(record))
+
+        assert "ValueError: boom" in data["exception"]
+
+
+class TestQueuedLogging:
+    """Tests for logging through a queue."""
+
+    def test_records_written_by_listener(self, capsys):
+        """Test that queued records are formatted off the caller's thread and flushed on stop."""
+        configure_logging(level="INFO", json_format=True, use_queue=True)
+        logger = logging.getLogger("src.test")
+
+        logger.debug("hidden")
+        logger.warning("Not fixing %s", "a.md", extra={"file": "a.md", "rule": "broken-link"})
+        stop_logging()
+
+        records = [json.loads(line) for line in capsys.readouterr().err.splitlines()]
+        assert records == [
+            {
+                "time": records[0]["time"],
+                "level": "WARNING",
+                "logger": "src.test",
+                "message": "Not fixing a.md",
+                "file": "a.md",
+                "rule": "broken-link",
+            }
+        ]
+
+    def test_command_line(self, tmp_path, capsys):
+        """Test that the CLI sets logging up from its options."""
+        (tmp_path / "a.md").write_text("# A\n")
+        argv = ["cli.py", "--log-format", "json", "--log-queue", "--log-level", "DEBUG", "validate", str(tmp_path)]
+
+        with patch.object(sys, "argv", argv):
+            assert main() == 0
+        stop_logging()
+
+        records = [json.loads(line) for line in capsys.readouterr().err.splitlines()]
+        validated = [record for record in records if record.get("file") == str(tmp_path / "a.md")]
+        assert validated and validated[0]["duration"] >= 0
+
+    def test_script_logger(self, capsys):
+        """Test that the CLI's logger is configured when it runs as a script."""
+        configure_logging(level="INFO", use_queue=True)
+
+        logging.getLogger("__main__").info("from the script")
+        stop_logging()
+
+        assert "from the script" in capsys.readouterr().err
@@ -0,0 +1,110 @@
+"""Tests for repository path index."""
+
+import os
+
+from src.path_index import PathIndex
+from src.utils import LinkChecker, MarkdownValidator
+
+
+def make_tree(root):
+    """Create a small tree with nested directories and symlinks."""
+    (root / "docs" / "guide").mkdir(parents=True)
+    (root / "README.md").write_text("# Readme\n")
+    (root / "docs" / "intro.md").write_text("# Intro\n")
+    (root / "docs" / "guide" / "setup.md").write_text("# Setup\n")
+    (root / "image.png").write_bytes(b"png")
+    os.symlink(root / "docs" / "guide", root / "guide-link")
+    os.symlink(root / "docs" / "intro.md", root / "intro-link.md")
+
+
+class TestPathIndex:
+    """Tests for PathIndex class."""
+
+    def test_build_indexes_files_and_dirs(self, tmp_path):
+        """Test that building records files, directories and symlinks."""
+        make_tree(tmp_path)
+
+        index = PathIndex.build(tmp_path)
+
+        assert "docs/guide/setup.md" in index.files
+        assert "image.png" in index.files
+        assert "docs/guide" in index.dirs
+        assert index.symlinks["guide-link"] == os.path.realpath(tmp_path / "docs" / "guide")
+
+    def test_markdown_files_matches_rglob(self, tmp_path):
+        """Test that indexed markdown files match Path.rglob."""
+        make_tree(tmp_path)
+
+        index = PathIndex.build(tmp_path)
+
+        assert sorted(index.markdown_files()) == sorted(tmp_path.rglob("*.md"))
+
+    def test_lookup_matches_resolve(self, tmp_path):
+        """Test that lookups agree with Path.resolve() and exists()."""
+        make_tree(tmp_path)
+        index = PathIndex.build(tmp_path)
+        base = tmp_path / "docs"
+        urls = [
+            "intro.md",
+            "guide/setup.md",
+            "../README.md",
+            "../image.png",
+            "guide",
+            "missing.md",
+            "../guide-link/setup.md",
+            "../guide-link/../intro.md",
+            "../intro-link.md",
+            "./guide/../intro.md",
+        ]
+
+        for url in urls:
+            expected = (base / url).resolve()
+            assert index.lookup(os.path.join(base, url)) == (str(expected), expected.exists()), url
+        assert index.fallbacks == 0
+
+    def test_lookup_outside_root_falls_back(self, tmp_path):
+        """Test that paths leaving the root are checked on disk."""
+        root = tmp_path / "repo"
+        root.mkdir()
+        (tmp_path / "outside.md").write_text("# Outside\n")
+        os.symlink(tmp_path, root / "parent-link")
+        index = PathIndex.build(root)
+
+        assert index.exists(os.path.join(root, "..", "outside.md"))
+        assert index.exists(os.path.join(root, "parent-link", "outside.md"))
+        assert not index.exists(os.path.join(root, "..", "missing.md"))
+        assert index.fallbacks == 3
+
+    def test_lookup_relative_path(self, tmp_path, monkeypatch):
+        """Test that relative paths are resolved from the current directory."""
+        make_tree(tmp_path)
+        monkeypatch.chdir(tmp_path)
+        index = PathIndex.build(tmp_path)
+
+        assert index.exists(os.path.join("docs", "intro.md"))
+        assert not index.exists(os.path.join("docs", "missing.md"))
+
+
+class TestPathIndexIntegration:
+    """Tests for link checks that use the path index."""
+
+    def test_validator_uses_index(self, tmp_path):
+        """Test that indexed link checks do not fall back to the filesystem."""
+        make_tree(tmp_path)
+        (tmp_path / "docs" / "links.md").write_text("# Links\n\n[a](intro.md) [b](../image.png) [c](gone.md)\n")
+        index = PathIndex.build(tmp_path)
+
+        errors = MarkdownValidator(tmp_path, path_index=index).validate_file(tmp_path / "docs" / "links.md")
+
+        assert errors == [f"{tmp_path / 'docs' / 'links.md'}:3: Broken link to gone.md"]
+        assert index.fallbacks == 0
+
+    def test_scan_repository_builds_index(self, tmp_path):
+        """Test that scanning populates the path index."""
+        make_tree(tmp_path)
+
+        checker = LinkChecker(tmp_path)
+        checker.scan_repository()
+
+        assert checker.path_index is not None
+        assert tmp_path / "docs" / "intro.md" in checker.all_files
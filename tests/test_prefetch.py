@@ -0,0 +1,120 @@
+"""Tests for reading files ahead of validation."""
+
+import sys
+import time
+from unittest.mock import patch
+
+from src.cli import main
+from src.prefetch import Prefetcher
+from src.profiling import Profiler
+from src.utils import LinkChecker
+
+LATENCY = 0.02
+
+
+class SlowPrefetcher(Prefetcher):
+    """Prefetcher on a filesystem where every read takes a while."""
+
+    def _read(self, file_path):
+        """Wait, then read."""
+        time.sleep(LATENCY)
+        return super()._read(file_path)
+
+
+def make_files(root, count, size=100):
+    """Create markdown files of a given size and return them sorted."""
+    files = []
+    for index in range(count):
+        file_path = root / f"doc{index:03}.md"
+        file_path.write_text("# Doc\n\n" + "x" * (size - 8) + "\n")
+        files.append(file_path)
+    return files
+
+
+class TestPrefetcher:
+    """Tests for Prefetcher class."""
+
+    def test_order_and_content(self, tmp_path):
+        """Test that files arrive in order, with large and missing files left to the consumer."""
+        files = make_files(tmp_path, 20)
+        large = tmp_path / "large.md"
+        large.write_text("# Large\n" * 100)
+        missing = tmp_path / "missing.md"
+
+        items = list(Prefetcher(4, stream_threshold=500).read([*files, large, missing]))
+
+        assert [file_path for file_path, _ in items] == [*files, large, missing]
+        assert [data for _, data in items[:20]] == [file_path.read_bytes() for file_path in files]
+        assert items[20][1] is None and items[21][1] is None
+
+    def test_budget_bounds_buffered_bytes(self, tmp_path):
+        """Test that reading pauses while the budget is used up."""
+        files = make_files(tmp_path, 50, size=1000)
+        prefetcher = Prefetcher(4, max_bytes=2000)
+
+        for _ in prefetcher.read(files):
+            time.sleep(0.002)
+
+        assert prefetcher.stats.files == 50
+        assert prefetcher.stats.peak <= 2000 + 4 * 1000
+
+    def test_reuse_after_early_close(self, tmp_path):
+        """Test that a run closed early leaves no budget in use for the next one."""
+        files = make_files(tmp_path, 10, size=1000)
+        prefetcher = Prefetcher(4, max_bytes=3000)
+
+        items = prefetcher.read(files)
+        next(items)
+        items.close()
+
+        assert len(list(prefetcher.read(files))) == 10
+
+    def test_reads_overlap(self, tmp_path):
+        """Test that slow reads run concurrently instead of one after another."""
+        files = make_files(tmp_path, 40)
+        prefetcher = SlowPrefetcher(8)
+
+        start = time.perf_counter()
+        list(prefetcher.read(files))
+        elapsed = time.perf_counter() - start
+
+        assert elapsed < len(files) * LATENCY / 2
+        assert prefetcher.stats.wait <= elapsed
+
+
+class TestPrefetchedValidation:
+    """Tests for validating with a prefetcher."""
+
+    def test_same_results(self, tmp_path):
+        """Test that prefetching does not change what is found."""
+        make_files(tmp_path, 10)
+        (tmp_path / "bad.md").write_text("No title\n\n[x](missing.md) [y](doc001.md#nowhere)\n")
+
+        expected = LinkChecker(tmp_path).check_all_links()
+        checker = LinkChecker(tmp_path, prefetcher=Prefetcher(4))
+
+        assert checker.check_all_links(jobs=4) == expected
+        assert checker.prefetcher.stats.files == 11
+        assert len(checker.timings) == 11
+
+    def test_profiled(self, tmp_path):
+        """Test that waiting for reads and the bytes read ahead are profiled."""
+        files = make_files(tmp_path, 5)
+        profiler = Profiler()
+
+        LinkChecker(tmp_path, profiler=profiler, prefetcher=Prefetcher(2)).check_all_links()
+
+        assert profiler.phases["prefetch_wait"].calls == 5
+        assert profiler.phases["check_file"].calls == 5
+        assert profiler.counters["prefetch_bytes"] == sum(file_path.stat().st_size for file_path in files)
+
+    def test_command(self, tmp_path, caplog):
+        """Test that --prefetch validates and reports how the time was spent."""
+        make_files(tmp_path, 3)
+        argv = ["cli.py", "validate", "--no-cache", "--prefetch", "2", "--prefetch-budget", "1", str(tmp_path)]
+
+        with caplog.at_level("INFO"), patch.object(sys, "argv", argv):
+            assert main() == 0
+
+        assert "Prefetched 3 files" in caplog.text
+        assert "ms waiting for reads" in caplog.text
@@ -0,0 +1,140 @@
+"""Tests for opt-in profiling."""
+
+import argparse
+import json
+import tarfile
+
+from src.archive import archive_checker
+from src.cli import validate_command
+from src.profiling import Profiler
+from src.utils import LinkChecker, MarkdownValidator
+
+
+def make_docs(root):
+    """Create a few linked files, one of them much larger."""
+    (root / "a.md").write_text("# A\n\n[b](b.md) [c](c.md#c)\n")
+    (root / "b.md").write_text("# B\n\n" + "Some text with `code`.\n" * 5000)
+    (root / "c.md").write_text("# C\n\n```python\nprint()\n```\n")
+
+
+class TestProfiler:
+    """Tests for Profiler class."""
+
+    def test_phases_accumulate(self):
+        """Test that repeated phases add up their calls."""
+        profiler = Profiler()
+        timed = profiler.timed("work", lambda value: value * 2)
+
+        with profiler.phase("setup"):
+            pass
+        assert timed(2) == 4
+        assert timed(3) == 6
+
+        assert profiler.phases["setup"].calls == 1
+        assert profiler.phases["work"].calls == 2
+        assert profiler.phases["work"].wall >= 0
+
+    def test_hooks_receive_flat_metrics(self):
+        """Test that hooks get phase totals and counters on flush."""
+        profiler = Profiler()
+        received = []
+        profiler.add_hook(received.append)
+        with profiler.phase("scan"):
+            profiler.count("links_checked", 3)
+
+        profiler.flush()
+
+        (metrics,) = received
+        assert metrics["counter.links_checked"] == 3
+        assert metrics["phase.scan.calls"] == 1
+        assert "phase.scan.cpu_seconds" in metrics
+
+    def test_disabled_profiling_leaves_validator_alone(self, tmp_path):
+        """Test that a validator without a profiler keeps its class methods."""
+        validator = MarkdownValidator(tmp_path)
+
+        assert "check_file" not in vars(validator)
+        assert "_read" not in vars(validator)
+
+
+class TestProfiledRun:
+    """Tests for profiling a repository-wide check."""
+
+    def test_phases_files_and_counters(self, tmp_path):
+        """Test that a run records every phase, each file and the counters."""
+        make_docs(tmp_path)
+        profiler = Profiler()
+
+        LinkChecker(tmp_path, profiler=profiler).check_all_links()
+
+        for name in ("walk", "read", "decode", "scan", "rule.headings", "rule.links", "rule.code-blocks"):
+            assert profiler.phases[name].calls >= 1, name
+        assert profiler.phases["read"].calls == 3
+        assert profiler.counters["bytes_read"] == sum(path.stat().st_size for path in tmp_path.glob("*.md"))
+        assert profiler.counters["links_checked"] == 2
+        assert profiler.counters["files_validated"] == 3
+        assert profiler.slowest_files(1)[0][0] == str(tmp_path / "b.md")
+
+    def test_parallel_run_is_profiled_serially(self, tmp_path):
+        """Test that asking for workers still profiles every file."""
+        for index in range(40):
+            (tmp_path / f"file{index}.md").write_text(f"# File {index}\n")
+        profiler = Profiler()
+
+        results = LinkChecker(tmp_path, profiler=profiler).check_all_links(jobs=4)
+
+        assert results == {}
+        assert len(profiler.files) == 40
+
+    def test_streamed_archive_members_are_timed(self, tmp_path):
+        """Test that members checked in chunks appear among the slowest files."""
+        docs = tmp_path / "docs"
+        docs.mkdir()
+        make_docs(docs)
+        archive_path = tmp_path / "docs.tar"
+        with tarfile.open(archive_path, "w") as tar:
+            tar.add(docs, arcname=".")
+        profiler = Profiler()
+        checker = archive_checker(archive_path, profiler=profiler)
+        checker.prefetcher.stream_threshold = 1000
+
+        list(checker.iter_results())
+
+        assert set(profiler.files) == {str(archive_path / name) for name in ("a.md", "b.md", "c.md")}
+        assert profiler.slowest_files(1)[0][0] == str(archive_path / "b.md")
+
+    def test_hook_called_once_per_run(self, tmp_path):
+        """Test that the checker flushes metrics at the end of a run."""
+        make_docs(tmp_path)
+        profiler = Profiler()
+        received = []
+        profiler.add_hook(received.append)
+
+        LinkChecker(tmp_path, profiler=profiler).check_all_links()
+
+        assert len(received) == 1
+        assert received[0]["counter.files_validated"] == 3
+
+    def test_cli_warns_that_jobs_are_ignored(self, tmp_path, caplog):
+        """Test that --profile says it validates serially when workers were asked for."""
+        make_docs(tmp_path)
+        args = argparse.Namespace(path=str(tmp_path), jobs=4, no_cache=True, profile=True)
+
+        assert validate_command(args) == 0
+        assert "ignoring --jobs 4" in caplog.text
+
+    def test_cli_profile_json(self, tmp_path, capsys):
+        """Test that --profile-json writes a report and prints the table to stderr."""
+        docs = tmp_path / "docs"
+        docs.mkdir()
+        make_docs(docs)
+        report = tmp_path / "profile.json"
+        args = argparse.Namespace(path=str(docs), jobs=1, no_cache=True, profile_json=str(report))
+
+        assert validate_command(args) == 0
+
+        data = json.loads(report.read_text())
+        assert set(data) == {"phases", "counters", "files", "slowest_files"}
+        assert data["files"] == 3
+        assert data["slowest_files"][0]["path"] == str(docs / "b.md")
+        assert "Slowest 3 file(s)" in capsys.readouterr().err
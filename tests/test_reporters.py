@@ -0,0 +1,172 @@
+"""Tests for diagnostics and machine-readable output."""
+
+import argparse
+import io
+import json
+from xml.etree import ElementTree
+
+from src.cli import validate_command
+from src.diagnostics import BROKEN_LINK, MISSING_H1, RULES, Diagnostic
+from src.reporters import JUnitWriter, NdjsonWriter, SarifWriter
+from src.utils import LinkChecker, MarkdownValidator
+
+
+def sample(root):
+    """Return a located and a file-level diagnostic under a root."""
+    return [
+        Diagnostic(root / "docs" / "a.md", BROKEN_LINK, "Broken link to b.md", 3, 5),
+        Diagnostic(root / "c.md", MISSING_H1, "Missing H1 title"),
+    ]
+
+
+def render(writer_class, root, diagnostics):
+    """Write diagnostics with a writer and return the output."""
+    stream = io.StringIO()
+    writer = writer_class(stream, root)
+    writer.start()
+    for diagnostic in diagnostics:
+        writer.write(diagnostic)
+    writer.finish()
+    return stream.getvalue()
+
+
+class TestDiagnostic:
+    """Tests for Diagnostic class."""
+
+    def test_str_includes_known_line(self, tmp_path):
+        """Test the classic text form with and without a line number."""
+        located, file_level = sample(tmp_path)
+
+        assert str(located) == f"{tmp_path / 'docs' / 'a.md'}:3: Broken link to b.md"
+        assert str(file_level) == f"{tmp_path / 'c.md'}: Missing H1 title"
+
+    def test_equality(self, tmp_path):
+        """Test that diagnostics compare by value."""
+        assert sample(tmp_path) == sample(tmp_path)
+        assert len(set(sample(tmp_path) + sample(tmp_path))) == 2
+
+    def test_link_positions(self, tmp_path):
+        """Test that link diagnostics carry line and column."""
+        file_path = tmp_path / "test.md"
+        file_path.write_text("# Title\n\nSee [here](missing.md).\n")
+
+        diagnostics = MarkdownValidator(tmp_path).diagnose_file(file_path)
+
+        assert [(d.rule, d.line, d.column) for d in diagnostics] == [(BROKEN_LINK, 3, 5)]
+
+    def test_encoding_error_position(self, tmp_path):
+        """Test that encoding errors point at the offending byte."""
+        file_path = tmp_path / "test.md"
+        file_path.write_bytes(b"# Title\n\nab\xff\n")
+
+        (diagnostic,) = MarkdownValidator(tmp_path).diagnose_file(file_path)
+
+        assert (diagnostic.line, diagnostic.column) == (3, 3)
+
+
+class TestIterResults:
+    """Tests for LinkChecker.iter_results method."""
+
+    def test_yields_before_all_files_are_read(self, tmp_path, monkeypatch):
+        """Test that the first diagnostic arrives before later files are validated."""
+        for index in range(10):
+            (tmp_path / f"file{index}.md").write_text("no title\n")
+        read = []
+        original = MarkdownValidator.check_file
+        monkeypatch.setattr(
+            MarkdownValidator, "check_file", lambda self, path: read.append(path) or original(self, path)
+        )
+
+        diagnostics = LinkChecker(tmp_path).iter_results()
+        first = next(diagnostics)
+
+        assert first.path == tmp_path / "file0.md"
+        assert len(read) == 1
+        assert len(list(diagnostics)) == 9
+
+    def test_cross_file_diagnostics_follow(self, tmp_path):
+        """Test that anchor checks into other files come after the file pass."""
+        (tmp_path / "a.md").write_text("# A\n\n[b](b.md#nope)\n")
+        (tmp_path / "b.md").write_text("no title\n")
+
+        diagnostics = list(LinkChecker(tmp_path).iter_results())
+
+        assert [(d.path.name, d.rule) for d in diagnostics] == [("b.md", "missing-h1"), ("a.md", "broken-anchor")]
+
+
+class TestWriters:
+    """Tests for the streaming diagnostic writers."""
+
+    def test_ndjson(self, tmp_path):
+        """Test that each diagnostic is one JSON object per line."""
+        lines = render(NdjsonWriter, tmp_path, sample(tmp_path)).splitlines()
+
+        assert [json.loads(line) for line in lines] == [
+            {"path": "docs/a.md", "line": 3, "column": 5, "rule": BROKEN_LINK, "message": "Broken link to b.md"},
+            {"path": "c.md", "line": 0, "column": 0, "rule": MISSING_H1, "message": "Missing H1 title"},
+        ]
+
+    def test_sarif(self, tmp_path):
+        """Test that the SARIF log is valid JSON with located results."""
+        log = json.loads(render(SarifWriter, tmp_path, sample(tmp_path)))
+
+        run = log["runs"][0]
+        assert log["version"] == "2.1.0"
+        assert [rule["id"] for rule in run["tool"]["driver"]["rules"]] == list(RULES)
+        located, file_level = run["results"]
+        assert located["ruleId"] == BROKEN_LINK
+        assert located["locations"][0]["physicalLocation"] == {
+            "artifactLocation": {"uri": "docs/a.md"},
+            "region": {"startLine": 3, "startColumn": 5},
+        }
+        assert "region" not in file_level["locations"][0]["physicalLocation"]
+
+    def test_sarif_without_results(self, tmp_path):
+        """Test that an empty run is still a valid log."""
+        log = json.loads(render(SarifWriter, tmp_path, []))
+
+        assert log["runs"][0]["results"] == []
+
+    def test_junit(self, tmp_path):
+        """Test that each diagnostic becomes a failed test case."""
+        suite = ElementTree.fromstring(render(JUnitWriter, tmp_path, sample(tmp_path))).find("testsuite")
+
+        cases = suite.findall("testcase")
+        assert [case.get("classname") for case in cases] == ["docs/a.md", "c.md"]
+        assert cases[0].find("failure").get("message") == "Broken link to b.md"
+
+    def test_junit_clean_run(self, tmp_path):
+        """Test that a clean run reports one passing test case."""
+        suite = ElementTree.fromstring(render(JUnitWriter, tmp_path, [])).find("testsuite")
+
+        (case,) = suite.findall("testcase")
+        assert case.find("failure") is None
+
+
+class TestFormatOption:
+    """Tests for the --format option of the validate command."""
+
+    def test_ndjson_output(self, tmp_path, capsys):
+        """Test that directory validation streams NDJSON to stdout."""
+        (tmp_path / "a.md").write_text("# A\n\n[x](missing.md)\n")
+        (tmp_path / "b.md").write_text("# B\n")
+        args = argparse.Namespace(path=str(tmp_path), jobs=1, no_cache=True, format="ndjson")
+
+        exit_code = validate_command(args)
+
+        records = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+        assert exit_code == 1
+        assert records == [
+            {"path": "a.md", "line": 3, "column": 1, "rule": BROKEN_LINK, "message": "Broken link to missing.md"}
+        ]
+
+    def test_single_file_sarif(self, tmp_path, capsys):
+        """Test that single-file validation can write SARIF."""
+        file_path = tmp_path / "a.md"
+        file_path.write_text("# A\n")
+        args = argparse.Namespace(path=str(file_path), format="sarif")
+
+        exit_code = validate_command(args)
+
+        assert exit_code == 0
+        assert json.loads(capsys.readouterr().out)["runs"][0]["results"] == []
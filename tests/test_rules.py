@@ -0,0 +1,254 @@
+"""Tests for the rule registry and rule configuration."""
+
+import sys
+from unittest.mock import patch
+
+import pytest
+
+from src.cache import ValidationCache
+from src.cli import main
+from src.diagnostics import HEADING_INCREMENT, MISSING_H1, RULES, Diagnostic
+from src.profiling import Profiler
+from src.rules import (
+    FORBIDDEN_PHRASE,
+    IMAGE_ALT,
+    LINE_LENGTH,
+    REGISTRY,
+    Rule,
+    RuleSet,
+    load_config,
+    register_rule,
+    rules_from_config,
+)
+from src.scanner import Fence, Header
+from src.utils import LinkChecker, MarkdownValidator
+
+TODO = "todo-heading"
+
+
+class TodoHeadingRule(Rule):
+    """Headings do not say TODO."""
+
+    name = TODO
+    codes = {TODO: "Heading contains TODO"}
+    events = (Header, Fence)
+    default_enabled = False
+
+    def check(self, context, events):
+        """Report TODO headings and record the order events arrived in."""
+        self.seen = [type(event).__name__ for event in events]
+        return [
+            Diagnostic(context.path, TODO, "TODO in heading", event.line, 1)
+            for event in events
+            if isinstance(event, Header) and "TODO" in event.text
+        ]
+
+
+@pytest.fixture
+def todo_rule():
+    """Register the TODO rule for one test."""
+    register_rule(TodoHeadingRule)
+    yield TodoHeadingRule
+    del REGISTRY[TODO]
+    del RULES[TODO]
+
+
+def diagnose(tmp_path, content, rules):
+    """Validate one document with a rule set."""
+    file_path = tmp_path / "doc.md"
+    file_path.write_text(content)
+    return MarkdownValidator(tmp_path, rules=rules).diagnose_file(file_path)
+
+
+class TestRuleSet:
+    """Tests for rule selection."""
+
+    def test_default_rules(self):
+        """Test that only the original checks run by default."""
+        assert [rule.name for rule in RuleSet.default().rules] == ["headings", "links", "code-blocks"]
+
+    def test_disable_diagnostic_id(self, tmp_path):
+        """Test that disabling one id keeps the rest of its rule."""
+        rules = RuleSet.select(((), [HEADING_INCREMENT]))
+
+        errors = diagnose(tmp_path, "## Intro\n\n#### Deep\n", rules)
+
+        assert [error.rule for error in errors] == [MISSING_H1]
+
+    def test_disable_rule(self, tmp_path):
+        """Test that a disabled rule does not run at all."""
+        rules = RuleSet.select(((), ["headings", "code-blocks"]))
+
+        assert [rule.name for rule in rules.rules] == ["links"]
+        assert diagnose(tmp_path, "## Intro\n\n```\n", rules) == []
+
+    def test_later_layer_wins(self):
+        """Test that the command line overrides the configuration file."""
+        config = {"enable": ["line-length"], "disable": ["links"]}
+
+        rules = rules_from_config(config, enable=["links"], disable=["line-length"])
+
+        assert [rule.name for rule in rules.rules] == ["headings", "links", "code-blocks"]
+
+    def test_unknown_names(self):
+        """Test that unknown rules and options are rejected."""
+        with pytest.raises(ValueError, match="Unknown rule"):
+            RuleSet.select((["no-such-rule"], ()))
+        with pytest.raises(ValueError, match="Unknown option"):
+            RuleSet.select(options={"line-length": {"maximum": 80}})
+        with pytest.raises(ValueError, match="unknown rule"):
+            RuleSet.select(options={"no-such-rule": {}})
+
+    def test_fingerprint_tracks_configuration(self):
+        """Test that selections and options change the fingerprint."""
+        default = RuleSet.default().fingerprint
+
+        assert RuleSet.default().fingerprint == default
+        assert RuleSet.select(((), ["links"])).fingerprint != default
+        short = RuleSet.select(([LINE_LENGTH], ()), options={"line-length": {"max": 80}}).fingerprint
+        assert short != RuleSet.select(([LINE_LENGTH], ())).fingerprint
+
+
+class TestCustomRules:
+    """Tests for registering rules."""
+
+    def test_custom_rule_runs_in_shared_pass(self, tmp_path, todo_rule):
+        """Test that a registered rule receives its events in document order."""
+        rules = RuleSet.select(([TODO], ()))
+
+        errors = diagnose(tmp_path, "# Title\n\n```\ncode\n```\n\n## TODO later\n", rules)
+
+        assert [(error.rule, error.line) for error in errors] == [(TODO, 7)]
+        rule = next(rule for rule in rules.rules if rule.name == TODO)
+        assert rule.seen == ["Header", "Fence", "Fence", "Header"]
+        assert RULES[TODO] == "Heading contains TODO"
+
+    def test_duplicate_registration(self, todo_rule):
+        """Test that a name or id cannot be taken twice."""
+
+        class Other(Rule):
+            name = "headings"
+
+        class Thief(Rule):
+            name = "thief"
+            codes = {TODO: "Stolen"}
+
+        with pytest.raises(ValueError, match="already registered"):
+            register_rule(Other)
+        with pytest.raises(ValueError, match="already reported"):
+            register_rule(Thief)
+
+
+class TestBuiltinRules:
+    """Tests for the rules that are off by default."""
+
+    def test_line_length(self, tmp_path):
+        """Test that lines over the configured maximum are reported."""
+        rules = RuleSet.select(([LINE_LENGTH], ()), options={LINE_LENGTH: {"max": 10}})
+
+        errors = diagnose(tmp_path, "# Title\n\nshort\n\nthis line is long\n", rules)
+
+        assert [(error.rule, error.line, error.column) for error in errors] == [(LINE_LENGTH, 5, 11)]
+
+    def test_line_numbers_follow_newlines(self, tmp_path):
+        """Test that form feeds and Unicode line separators do not shift reported lines."""
+        rules = RuleSet.select(([LINE_LENGTH], ()), options={LINE_LENGTH: {"max": 10}})
+
+        errors = diagnose(tmp_path, "# Title\r\n\nshort\x0cshort\u2028\r\n\nthis line is long\r\n", rules)
+
+        assert [(error.rule, error.line) for error in errors] == [(LINE_LENGTH, 3), (LINE_LENGTH, 5)]
+
+    def test_image_alt(self, tmp_path):
+        """Test that only images without alt text are reported."""
+        (tmp_path / "a.png").write_bytes(b"")
+        rules = RuleSet.select(([IMAGE_ALT], ()))
+
+        errors = diagnose(tmp_path, "# Title\n\n![](a.png) ![Chart](a.png) [](a.png)\n", rules)
+
+        assert [(error.rule, error.line, error.column) for error in errors] == [(IMAGE_ALT, 3, 2)]
+
+    def test_forbidden_phrases(self, tmp_path):
+        """Test that phrases are matched as whole words, ignoring case."""
+        rules = RuleSet.select(
+            (["forbidden-phrases"], ()), options={"forbidden-phrases": {"phrases": ["click here", "simply"]}}
+        )
+
+        errors = diagnose(tmp_path, "# Title\n\nClick here, simply.\nsimplystic\n", rules)
+
+        assert [(error.rule, error.column) for error in errors] == [(FORBIDDEN_PHRASE, 1), (FORBIDDEN_PHRASE, 13)]
+
+
+class TestConfiguration:
+    """Tests for pyproject.toml configuration and the command line."""
+
+    def test_load_config(self, tmp_path):
+        """Test that the nearest pyproject.toml section is used."""
+        (tmp_path / "pyproject.toml").write_text(
+            '[tool.ai-fundamentals]\nenable = ["line-length"]\n\n[tool.ai-fundamentals.rules.line-length]\nmax = 40\n'
+        )
+        (tmp_path / "docs").mkdir()
+
+        config = load_config(tmp_path / "docs")
+
+        assert config == {"enable": ["line-length"], "rules": {"line-length": {"max": 40}}}
+        assert load_config(tmp_path.parent / "elsewhere") == {}
+
+    def test_unknown_plugin(self):
+        """Test that a plugin that cannot be imported is an error."""
+        with pytest.raises(ValueError, match="plugin"):
+            rules_from_config({"plugins": ["no_such_rules_module"]})
+
+    def test_cli_flags(self, tmp_path):
+        """Test that --disable and --enable change what is reported."""
+        (tmp_path / "doc.md").write_text("## No title\n")
+        with patch.object(sys, "argv", ["cli.py", "validate", "--no-cache", str(tmp_path)]):
+            assert main() == 1
+        with patch.object(sys, "argv", ["cli.py", "validate", "--no-cache", "--disable", "headings", str(tmp_path)]):
+            assert main() == 0
+        args = ["cli.py", "validate", "--no-cache", "--disable", "headings", "--enable", "missing-h1", str(tmp_path)]
+        with patch.object(sys, "argv", args):
+            assert main() == 1
+
+    def test_cli_uses_pyproject(self, tmp_path, capsys):
+        """Test that rules configured in pyproject.toml run and are listed."""
+        (tmp_path / "pyproject.toml").write_text('[tool.ai-fundamentals]\nenable = ["line-length"]\n')
+        (tmp_path / "doc.md").write_text("# Title\n\n" + "word " * 40 + "\n")
+        with patch.object(sys, "argv", ["cli.py", "validate", "--no-cache", str(tmp_path)]):
+            assert main() == 1
+        with patch.object(sys, "argv", ["cli.py", "validate", "--list-rules", str(tmp_path)]):
+            assert main() == 0
+        assert "line-length" in capsys.readouterr().out
+
+    def test_cli_unknown_rule(self, tmp_path, caplog):
+        """Test that an unknown rule name is reported as an error."""
+        with patch.object(sys, "argv", ["cli.py", "validate", "--enable", "nope", str(tmp_path)]):
+            assert main() == 1
+        assert "Unknown rule" in caplog.text
+
+
+class TestRuleIntegration:
+    """Tests for rules in full runs."""
+
+    def test_rules_are_timed(self, tmp_path):
+        """Test that the profiler records each enabled rule as a phase."""
+        (tmp_path / "doc.md").write_text("# Title\n")
+        profiler = Profiler()
+
+        LinkChecker(tmp_path, profiler=profiler, rules=RuleSet.select(([LINE_LENGTH], ()))).check_all_links()
+
+        assert profiler.phases["rule.line-length"].calls == 1
+        assert profiler.phases["rule.headings"].calls == 1
+
+    def test_cache_discarded_for_other_rules(self, tmp_path):
+        """Test that results cached under other rules are not reused."""
+        (tmp_path / "doc.md").write_text("## No title\n")
+        strict = RuleSet.default()
+        LinkChecker(tmp_path, cache=ValidationCache(tmp_path, rules=strict), rules=strict).check_all_links()
+
+        relaxed = RuleSet.select(((), ["headings"]))
+        cache = ValidationCache(tmp_path, rules=relaxed)
+        results = LinkChecker(tmp_path, cache=cache, rules=relaxed).check_all_links()
+
+        assert results == {}
+        assert cache.hits == 0
+        assert ValidationCache(tmp_path, rules=strict).hits == 0
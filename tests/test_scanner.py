@@ -0,0 +1,138 @@
+"""Tests for markdown scanner."""
+
+from src.scanner import Fence, Header, Link, MarkdownScanner, scan_markdown
+
+
+def scan(text):
+    """Scan text and return the list of events."""
+    return list(scan_markdown(text))
+
+
+class TestScanMarkdown:
+    """Tests for scan_markdown function."""
+
+    def test_headers(self):
+        """Test that ATX headings are reported with level and text."""
+        events = scan("# Title\n\nBody\n\n## Section ##\n####### Not a heading\n#hashtag\n")
+
+        assert events == [Header(1, 1, "Title"), Header(5, 2, "Section")]
+
+    def test_links_have_columns(self):
+        """Test that links are reported with line and column."""
+        events = scan("# Title\nSee [one](a.md) and [two](b.md#x).\n")
+
+        assert events[1:] == [Link(2, 5, "one", "a.md"), Link(2, 21, "two", "b.md#x")]
+
+    def test_fences_hide_headers_and_links(self):
+        """Test that fenced content produces no header or link events."""
+        events = scan("# Title\n\n```bash\n# comment\n[x](y.md)\n```\n")
+
+        assert events == [
+            Header(1, 1, "Title"),
+            Fence(3, "```", True, "bash"),
+            Fence(6, "```", False, ""),
+        ]
+
+    def test_tilde_fence(self):
+        """Test that tilde fences are recognized."""
+        events = scan("~~~\n# not a header\n~~~\n")
+
+        assert [type(event) for event in events] == [Fence, Fence]
+
+    def test_fence_requires_matching_marker(self):
+        """Test that a fence only closes with the same marker at least as long."""
+        events = scan("````\n```\n~~~\n````\n")
+
+        assert events == [Fence(1, "````", True, ""), Fence(4, "````", False, "")]
+
+    def test_fence_with_info_does_not_close(self):
+        """Test that a fence line with an info string does not close a block."""
+        events = scan("```\n```python\n")
+
+        assert events == [Fence(1, "```", True, "")]
+
+    def test_inline_code_is_not_a_fence(self):
+        """Test that backtick runs with backticks after them are inline code."""
+        events = scan("```code``` [a](b.md)\n")
+
+        assert events == [Link(1, 12, "a", "b.md")]
+
+    def test_links_in_code_spans_ignored(self):
+        """Test that links inside inline code spans are ignored."""
+        events = scan("Use `[x](y.md)` or [real](z.md)\n")
+
+        assert events == [Link(1, 20, "real", "z.md")]
+
+    def test_images(self):
+        """Test that images are links marked as images, with or without alt text."""
+        events = scan("![](a.png) ![Chart](b.png) [](c.md)\n")
+
+        assert events == [
+            Link(1, 2, "", "a.png", image=True),
+            Link(1, 13, "Chart", "b.png", image=True),
+            Link(1, 28, "", "c.md"),
+        ]
+
+    def test_indented_fence(self):
+        """Test that fences inside list items are recognized."""
+        events = scan("- item\n\n  ```\n  # inside\n  ```\n")
+
+        assert [type(event) for event in events] == [Fence, Fence]
+
+    def test_carriage_returns(self):
+        """Test that CRLF line endings do not leak into events."""
+        events = scan("# Title\r\n```\r\n# x\r\n```\r\n")
+
+        assert events == [Header(1, 1, "Title"), Fence(2, "```", True, ""), Fence(4, "```", False, "")]
+
+    def test_links_in_headers(self):
+        """Test that links inside heading text are reported."""
+        events = scan("## See [guide](guide.md)\n")
+
+        assert events == [Header(1, 2, "See [guide](guide.md)"), Link(1, 8, "guide", "guide.md")]
+
+    def test_without_links(self):
+        """Test that only headings and fences are reported when links are not wanted."""
+        events = list(scan_markdown("## See [guide](guide.md)\n[a](b.md)\n```\n# x\n```\n# End\n", links=False))
+
+        assert events == [
+            Header(1, 2, "See [guide](guide.md)"),
+            Fence(3, "```", True, ""),
+            Fence(5, "```", False, ""),
+            Header(6, 1, "End"),
+        ]
+
+    def test_unclosed_fence_swallows_rest(self):
+        """Test that an unclosed fence hides everything after it."""
+        events = scan("# Title\n```\n# x\n[a](b.md)\n")
+
+        assert events == [Header(1, 1, "Title"), Fence(2, "```", True, "")]
+
+
+class TestMarkdownScanner:
+    """Tests for MarkdownScanner class."""
+
+    def test_chunks_match_whole_document(self):
+        """Test that feeding line-aligned chunks gives the same events."""
+        text = "# Title\n\n```\n# x\n```\n\n## Next\n[a](b.md)\n"
+        lines = text.splitlines(keepends=True)
+        scanner = MarkdownScanner()
+
+        events = []
+        for start in range(0, len(lines), 2):
+            events.extend(scanner.feed("".join(lines[start : start + 2])))
+
+        assert events == scan(text)
+        assert scanner.line == 9
+        assert not scanner.in_fence
+
+    def test_fence_state_carries_over(self):
+        """Test that an open fence stays open across chunks."""
+        scanner = MarkdownScanner()
+
+        first = list(scanner.feed("```\n"))
+        second = list(scanner.feed("# inside\n"))
+
+        assert first == [Fence(1, "```", True, "")]
+        assert second == []
+        assert scanner.in_fence
@@ -0,0 +1,173 @@
+"""Tests for the full-text search index."""
+
+import json
+import os
+import sys
+from unittest.mock import patch
+
+import pytest
+
+from src.cli import main
+from src.search import IndexWriter, SearchIndex, parse_query
+
+
+@pytest.fixture
+def docs(tmp_path):
+    """Create a small tree of documents."""
+    (tmp_path / "models.md").write_text(
+        "# Models\n\nLanguage models predict the next token.\n\n"
+        "## Context window\n\nThe context window limits how many tokens a model sees.\n\n"
+        "## Cost\n\nCost grows with tokens: window size and model size both matter.\n"
+    )
+    (tmp_path / "guide").mkdir()
+    (tmp_path / "guide" / "retrieval.md").write_text(
+        "# Retrieval\n\nRetrieval finds documents for the context.\n\n"
+        "## Vector index\n\nA vector index stores embeddings; the index is searched by similarity.\n"
+    )
+    return tmp_path
+
+
+def files(root):
+    """Return every markdown file under a directory."""
+    return sorted(root.rglob("*.md"))
+
+
+def build(root, rebuild=False):
+    """Update the index of a directory and return what changed."""
+    return IndexWriter(root, root / "search.idx").update(files(root), rebuild=rebuild)
+
+
+def search(root, query, limit=10):
+    """Return the path, line and title of each hit of a query."""
+    with SearchIndex(root / "search.idx") as index:
+        return [(hit.path, hit.line, hit.title) for hit in index.search(query, limit)]
+
+
+class TestParseQuery:
+    """Tests for parse_query function."""
+
+    def test_words_and_phrases(self):
+        """Test that quoted phrases are separated from words and both are normalized."""
+        assert parse_query('Vector "Context  Window" cost, ""') == (["vector", "cost"], [["context", "window"]])
+
+
+class TestSearchIndex:
+    """Tests for SearchIndex class."""
+
+    def test_ranking(self, docs):
+        """Test that sections with more and rarer matching words rank first."""
+        build(docs)
+
+        assert search(docs, "index")[0] == ("guide/retrieval.md", 5, "Vector index")
+        assert search(docs, "window cost", limit=2) == [
+            ("models.md", 9, "Cost"),
+            ("models.md", 5, "Context window"),
+        ]
+        assert search(docs, "unknown") == []
+
+    def test_phrase(self, docs):
+        """Test that phrases must appear word for word."""
+        build(docs)
+
+        assert search(docs, '"context window"') == [("models.md", 5, "Context window")]
+        assert search(docs, '"window context"') == []
+        assert search(docs, '"vector index" tokens') == [("guide/retrieval.md", 5, "Vector index")]
+        assert search(docs, '"vector unknown"') == []
+
+    def test_not_an_index(self, tmp_path):
+        """Test that other files are rejected."""
+        (tmp_path / "search.idx").write_bytes(b"not an index at all, but long enough to have a header" * 4)
+
+        with pytest.raises(ValueError):
+            SearchIndex(tmp_path / "search.idx")
+
+
+class TestIndexWriter:
+    """Tests for IndexWriter class."""
+
+    def test_unchanged(self, docs):
+        """Test that an update without changes leaves the index alone."""
+        build(docs)
+        index_path = docs / "search.idx"
+        before = index_path.stat().st_mtime_ns
+
+        stats = build(docs)
+
+        assert (stats.unchanged, stats.sections, stats.written) == (2, 5, False)
+        assert index_path.stat().st_mtime_ns == before
+
+    def test_touched(self, docs):
+        """Test that a file with a new mtime but the same content is not analyzed again."""
+        build(docs)
+        os.utime(docs / "models.md", ns=(0, 0))
+
+        stats = build(docs)
+
+        assert (stats.changed, stats.unchanged, stats.sections) == (0, 2, 5)
+        with SearchIndex(docs / "search.idx") as index:
+            assert index.meta()["files"]["models.md"]["mtime_ns"] == 0
+
+    def test_incremental_matches_rebuild(self, docs):
+        """Test that changed, added and removed files are searched like in a fresh index."""
+        build(docs)
+        (docs / "models.md").write_text("# Models\n\n## Context window\n\nThe window of a model is its context.\n")
+        (docs / "guide" / "retrieval.md").unlink()
+        (docs / "agents.md").write_text("# Agents\n\nAgents call tools and read the context window.\n")
+
+        stats = build(docs)
+
+        assert (stats.added, stats.changed, stats.removed, stats.unchanged) == (1, 1, 1, 0)
+        queries = ["context window", '"context window"', "index", "tools model", "cost"]
+        incremental = [search(docs, query) for query in queries]
+        build(docs, rebuild=True)
+        assert incremental == [search(docs, query) for query in queries]
+        assert incremental[0][0] == ("models.md", 3, "Context window")
+        assert incremental[2] == incremental[4] == []
+
+    def test_compaction(self, docs):
+        """Test that an index where most section ids are unused is rebuilt."""
+        build(docs)
+        for round_ in range(2):
+            (docs / "models.md").write_text(f"# Models\n\nRound {round_}: models predict tokens.\n")
+            stats = build(docs)
+
+        assert (stats.changed, stats.sections, stats.written) == (1, 3, True)
+
+        with SearchIndex(docs / "search.idx") as index:
+            assert (index.header.sections, index.header.live) == (3, 3)
+        assert search(docs, "round") == [("models.md", 1, "Models")]
+
+
+class TestSearchCommands:
+    """Tests for the index and search commands."""
+
+    def run(self, *argv):
+        """Run the CLI with the given arguments and return its exit code."""
+        with patch.object(sys, "argv", ["cli.py", *argv]):
+            return main()
+
+    def test_json_results(self, docs, capsys):
+        """Test that the index command builds the index the search command reads."""
+        assert self.run("index", str(docs)) == 0
+        assert (docs / ".ai-fundamentals-cache" / "search.idx").exists()
+
+        assert self.run("search", "--root", str(docs), "--format", "json", "--limit", "1", "tokens") == 0
+
+        hits = json.loads(capsys.readouterr().out)["hits"]
+        assert [(hit["path"], hit["line"], hit["title"]) for hit in hits] == [("models.md", 5, "Context window")]
+        assert hits[0]["score"] > 0
+
+    def test_text_results(self, docs, capsys):
+        """Test that hits are listed with their location and that no hits fail."""
+        self.run("index", str(docs))
+        capsys.readouterr()
+
+        assert self.run("search", "--root", str(docs), '"vector index"') == 0
+        assert "guide/retrieval.md:5 (Vector index)" in capsys.readouterr().out
+        assert self.run("search", "--root", str(docs), "unknown") == 1
+        assert "No matching sections" in capsys.readouterr().out
+
+    def test_missing_index(self, tmp_path, caplog):
+        """Test that searching a tree that was never indexed fails with an error."""
+        assert self.run("search", "--root", str(tmp_path), "tokens") == 1
+        assert "run the index command first" in caplog.text
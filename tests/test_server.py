@@ -0,0 +1,205 @@
+"""Tests for the language server."""
+
+import io
+import json
+
+import pytest
+
+from src.diagnostics import BROKEN_LINK, Diagnostic
+from src.server import (
+    METHOD_NOT_FOUND,
+    SERVER_NOT_INITIALIZED,
+    Connection,
+    LanguageServer,
+    apply_change,
+    lsp_diagnostic,
+    uri_to_path,
+)
+from src.utils import LinkChecker
+
+
+def frame(*messages):
+    """Encode messages the way a client sends them."""
+    data = b""
+    for message in messages:
+        body = json.dumps({"jsonrpc": "2.0", **message}).encode()
+        data += b"Content-Length: %d\r\n\r\n" % len(body) + body
+    return data
+
+
+def run(root, *messages):
+    """Run a server on the given messages and return what it wrote."""
+    output = io.BytesIO()
+    server = LanguageServer(Connection(io.BytesIO(frame(*messages)), output), root, LinkChecker)
+    exit_code = server.serve()
+    output.seek(0)
+    replies = []
+    while True:
+        reply = Connection(output, io.BytesIO()).read_message()
+        if reply is None:
+            return exit_code, replies
+        replies.append(reply)
+
+
+def published(replies):
+    """Return the diagnostic codes of each publication, in order."""
+    return [
+        (reply["params"]["uri"], [diagnostic["code"] for diagnostic in reply["params"]["diagnostics"]])
+        for reply in replies
+        if reply.get("method") == "textDocument/publishDiagnostics"
+    ]
+
+
+def start(root):
+    """Return the messages that initialize a server for a root."""
+    return (
+        {"id": 1, "method": "initialize", "params": {"rootUri": root.as_uri()}},
+        {"method": "initialized", "params": {}},
+    )
+
+
+def stop():
+    """Return the messages that shut a server down."""
+    return ({"id": 99, "method": "shutdown"}, {"method": "exit"})
+
+
+def open_document(path, text):
+    """Return a didOpen notification."""
+    document = {"uri": path.as_uri(), "languageId": "markdown", "version": 1, "text": text}
+    return {"method": "textDocument/didOpen", "params": {"textDocument": document}}
+
+
+def change_document(path, text, version=2):
+    """Return a didChange notification replacing the whole text."""
+    return {
+        "method": "textDocument/didChange",
+        "params": {"textDocument": {"uri": path.as_uri(), "version": version}, "contentChanges": [{"text": text}]},
+    }
+
+
+@pytest.fixture
+def root(tmp_path):
+    """Return a repository root with two linked documents."""
+    root = tmp_path.resolve()
+    (root / "a.md").write_text("# A\n\n## Setup\n")
+    (root / "b.md").write_text("# B\n\nSee [setup](a.md#setup).\n")
+    return root
+
+
+class TestConnection:
+    """Tests for Connection class."""
+
+    def test_round_trip(self):
+        """Test that written messages are read back with their framing."""
+        stream = io.BytesIO()
+        Connection(io.BytesIO(), stream).write_message({"id": 1, "result": {"text": "héllo"}})
+        stream.seek(0)
+
+        message = Connection(stream, io.BytesIO()).read_message()
+
+        assert message == {"jsonrpc": "2.0", "id": 1, "result": {"text": "héllo"}}
+
+    def test_missing_length(self):
+        """Test that a message without Content-Length is rejected."""
+        with pytest.raises(ValueError, match="Content-Length"):
+            Connection(io.BytesIO(b"Content-Type: x\r\n\r\n{}"), io.BytesIO()).read_message()
+
+
+class TestLanguageServer:
+    """Tests for LanguageServer class."""
+
+    def test_lifecycle(self, root):
+        """Test initialization, unknown requests and a clean shutdown."""
+        early = {"id": 0, "method": "shutdown"}
+        exit_code, replies = run(root, early, *start(root), {"id": 2, "method": "nope"}, *stop())
+
+        assert exit_code == 0
+        assert replies[0]["error"]["code"] == SERVER_NOT_INITIALIZED
+        assert replies[1]["result"]["capabilities"]["textDocumentSync"]["change"] == 1
+        assert replies[2]["error"]["code"] == METHOD_NOT_FOUND
+        assert replies[3] == {"jsonrpc": "2.0", "id": 99, "result": None}
+
+    def test_exit_without_shutdown(self, root):
+        """Test that exiting without a shutdown request is an error."""
+        assert run(root, *start(root), {"method": "exit"})[0] == 1
+
+    def test_unsaved_buffer_is_validated(self, root):
+        """Test that buffer contents are checked without being written."""
+        doc = root / "a.md"
+        exit_code, replies = run(root, *start(root), open_document(doc, "No title\n\n[x](missing.md)\n"), *stop())
+
+        diagnostics = [reply for reply in replies if reply.get("method")][0]["params"]["diagnostics"]
+        assert [diagnostic["code"] for diagnostic in diagnostics] == ["missing-h1", "broken-link"]
+        assert diagnostics[1]["range"]["start"] == {"line": 2, "character": 0}
+        assert diagnostics[1]["source"] == "ai-fundamentals"
+        assert doc.read_text() == "# A\n\n## Setup\n"
+
+    def test_anchor_change_updates_other_files(self, root):
+        """Test that renaming a heading in a buffer rechecks links to it."""
+        doc = root / "a.md"
+        messages = [
+            open_document(doc, "# A\n\n## Setup\n"),
+            change_document(doc, "# A\n\n## Installation\n"),
+            change_document(doc, "# A\n\n## Setup\n", version=3),
+        ]
+
+        _, replies = run(root, *start(root), *messages, *stop())
+
+        other = (root / "b.md").as_uri()
+        assert published(replies) == [(other, ["broken-anchor"]), (other, [])]
+
+    def test_close_reverts_to_disk(self, root):
+        """Test that closing a document drops its unsaved errors."""
+        doc = root / "a.md"
+        closing = {"method": "textDocument/didClose", "params": {"textDocument": {"uri": doc.as_uri()}}}
+
+        _, replies = run(root, *start(root), open_document(doc, "No title\n"), closing, *stop())
+
+        other = (root / "b.md").as_uri()
+        assert published(replies) == [
+            (doc.as_uri(), ["missing-h1"]),
+            (other, ["broken-anchor"]),
+            (doc.as_uri(), []),
+            (other, []),
+        ]
+
+    def test_initial_results_are_published(self, root):
+        """Test that problems found by the startup scan are published."""
+        (root / "c.md").write_text("[x](gone.md)\n")
+
+        _, replies = run(root, *start(root), *stop())
+
+        assert published(replies) == [((root / "c.md").as_uri(), ["missing-h1", "broken-link"])]
+
+
+class TestApplyChange:
+    """Tests for apply_change function."""
+
+    def test_range_change(self):
+        """Test that ranged edits count characters in UTF-16 code units."""
+        change = {"range": {"start": {"line": 1, "character": 3}, "end": {"line": 1, "character": 4}}, "text": "b"}
+
+        assert apply_change("# T\n😀 a!\n", change) == "# T\n😀 b!\n"
+        assert apply_change("old", {"text": "new"}) == "new"
+
+
+class TestUriToPath:
+    """Tests for uri_to_path function."""
+
+    def test_round_trip(self, tmp_path):
+        """Test that names with spaces, percent signs and non-ASCII characters survive a round trip."""
+        for name in ("a b.md", "a%20b.md", "100%.md", "日本.md"):
+            path = tmp_path / name
+
+            assert uri_to_path(path.as_uri()) == path
+
+
+class TestLspDiagnostic:
+    """Tests for lsp_diagnostic function."""
+
+    def test_character_in_utf16_units(self, tmp_path):
+        """Test that columns after astral characters are converted to UTF-16 code units."""
+        error = Diagnostic(tmp_path / "a.md", BROKEN_LINK, "Broken link", 2, 4)
+
+        assert lsp_diagnostic(error, "# T\n😀 é[x](y.md)\n")["range"]["start"] == {"line": 1, "character": 4}
+        assert lsp_diagnostic(error)["range"]["start"] == {"line": 1, "character": 3}
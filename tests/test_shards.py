@@ -0,0 +1,178 @@
+"""Tests for sharded validation and merging."""
+
+import json
+import logging
+import sys
+from unittest.mock import patch
+
+import pytest
+
+from src.cli import main
+from src.diagnostics import Diagnostic
+from src.shards import ShardPlan, ShardResult, merge_results, shard_hash
+
+
+def other_shard_name(name, count):
+    """Return a file name that hashes to a different shard than name."""
+    index = 0
+    while shard_hash(f"l{index}.md") % count == shard_hash(name) % count:
+        index += 1
+    return f"l{index}.md"
+
+
+def run(*argv):
+    """Run the CLI with the given arguments and return its exit code."""
+    with patch.object(sys, "argv", ["cli.py", *argv]):
+        return main()
+
+
+@pytest.fixture
+def tree(tmp_path):
+    """Create a tree whose cross-file links span two shards."""
+    root = tmp_path / "docs"
+    root.mkdir()
+    (root / "target.md").write_text("# Target\n\n## Setup\n")
+    linker = other_shard_name("target.md", 2)
+    (root / linker).write_text("# Linker\n\n[ok](target.md#setup) [bad](target.md#gone) [file](nope.md)\n")
+    for index in range(6):
+        (root / f"page{index}.md").write_text(f"# Page {index}\n\n[t](target.md)\n")
+    (root / "untitled.md").write_text("No title\n")
+    return root
+
+
+class TestShardPlan:
+    """Tests for ShardPlan class."""
+
+    def test_partition(self, tmp_path):
+        """Test that shards are disjoint, cover every file and ignore other files."""
+        files = [tmp_path / f"doc{index}.md" for index in range(50)]
+
+        plan = ShardPlan(tmp_path, files, 3)
+        shards = [plan.files(index) for index in (1, 2, 3)]
+
+        assert sorted(path for shard in shards for path in shard) == sorted(files)
+        assert all(shards)
+        smaller = ShardPlan(tmp_path, files[:-1], 3)
+        assert all(set(smaller.files(index)) <= set(shards[index - 1]) for index in (1, 2, 3))
+        assert smaller.digest != plan.digest
+        assert ShardPlan(tmp_path, reversed(files), 3).digest == plan.digest
+
+    def test_balanced_by_timings(self, tmp_path):
+        """Test that slow files are spread out and unknown files count as average."""
+        files = [tmp_path / name for name in ("a.md", "b.md", "c.md", "d.md", "new.md")]
+        timings = {"a.md": 4.0, "b.md": 4.0, "c.md": 1.0, "d.md": 1.0}
+
+        plan = ShardPlan(tmp_path, files, 2, timings)
+
+        assert [[path.name for path in plan.files(index)] for index in (1, 2)] == [
+            ["a.md", "new.md"],
+            ["b.md", "c.md", "d.md"],
+        ]
+
+
+class TestMergeResults:
+    """Tests for merge_results function."""
+
+    def test_grouped_by_file(self, tmp_path):
+        """Test that diagnostics are grouped by file in the order each shard found them."""
+        first = Diagnostic(tmp_path / "b.md", "missing-h1", "Missing H1 header")
+        second = Diagnostic(tmp_path / "b.md", "broken-anchor", "Broken anchor", 3)
+        other = Diagnostic(tmp_path / "a.md", "broken-link", "Broken link", 2)
+        results = [ShardResult(2, 2, "r", "p", [first, second]), ShardResult(1, 2, "r", "p", [other])]
+
+        assert merge_results(results) == [other, first, second]
+
+    @pytest.mark.parametrize(
+        "results, message",
+        [
+            ([ShardResult(1, 2, "r", "p")], r"missing \[2\]"),
+            ([ShardResult(1, 2, "r", "p"), ShardResult(1, 2, "r", "p")], r"repeated \[1\]"),
+            ([ShardResult(1, 2, "r", "p"), ShardResult(2, 2, "other", "p")], "different rules"),
+            ([ShardResult(1, 2, "r", "p"), ShardResult(2, 2, "r", "other")], "different tree"),
+            ([ShardResult(1, 2, "r", "p"), ShardResult(2, 3, "r", "p")], "not 2"),
+        ],
+    )
+    def test_inconsistent_shards(self, results, message):
+        """Test that incomplete or mismatched sets of shards are rejected."""
+        with pytest.raises(ValueError, match=message):
+            merge_results(results)
+
+
+class TestShardCommands:
+    """Tests for validate --shard and the merge command."""
+
+    def test_merged_shards_match_unsharded_run(self, tree, tmp_path, capsys):
+        """Test that merging every shard reports exactly what one run reports."""
+        assert run("validate", "--no-cache", "-j", "1", str(tree)) == 1
+        expected = capsys.readouterr().out
+
+        outputs = []
+        for index in (1, 2):
+            output = tmp_path / f"shard{index}.json"
+            outputs.append(str(output))
+            run("validate", "--no-cache", "-j", "1", "--shard", f"{index}/2", "--shard-output", str(output), str(tree))
+            capsys.readouterr()
+
+        assert run("merge", "--root", str(tree), *outputs) == 1
+        assert capsys.readouterr().out == expected
+        assert "target.md#gone" in expected
+
+    def test_cross_shard_anchor(self, tree, tmp_path):
+        """Test that a link into another shard's headings is checked against them."""
+        linker = other_shard_name("target.md", 2)
+        index = 1 if ShardPlan(tree, [tree / linker], 2).files(1) else 2
+        output = tmp_path / "shard.json"
+
+        run("validate", "--no-cache", "--shard", f"{index}/2", "--shard-output", str(output), str(tree))
+
+        data = json.loads(output.read_text())
+        anchors = [entry for entry in data["diagnostics"] if entry[3] == "broken-anchor"]
+        assert [entry[0] for entry in anchors] == [linker]
+        assert "#gone" in anchors[0][4]
+        assert linker in data["timings"]
+        assert "target.md" not in data["timings"]
+
+    def test_timings_balance_next_run(self, tree, tmp_path, caplog):
+        """Test that a previous run's shard results can balance the next run."""
+        previous = tmp_path / "previous.json"
+        timings = {path.name: 1.0 for path in tree.iterdir()}
+        timings["target.md"] = 100.0
+        ShardResult(1, 1, "r", "p", timings=timings).write(previous, tree)
+        output = tmp_path / "shard.json"
+
+        arguments = ["--shard", "1/3", "--shard-timings", str(previous), "--shard-output", str(output)]
+
+        with caplog.at_level(logging.INFO):
+            run("validate", "--no-cache", *arguments, str(tree))
+
+        assert "Shard 1 of 3: 1 of 9 files" in caplog.text
+        assert list(json.loads(output.read_text())["timings"]) == ["target.md"]
+
+    def test_merge_ndjson(self, tree, tmp_path, capsys):
+        """Test that merged results can be written in machine-readable formats."""
+        output = tmp_path / "shard.json"
+        run("validate", "--no-cache", "--shard", "1/1", "--shard-output", str(output), str(tree))
+        capsys.readouterr()
+
+        assert run("merge", "--root", str(tree), "--format", "ndjson", str(output)) == 1
+
+        records = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+        assert {record["rule"] for record in records} == {"broken-anchor", "broken-link", "missing-h1"}
+
+    def test_shard_rejects_changed_files(self, tree, caplog):
+        """Test that --shard cannot be combined with --staged."""
+        assert run("validate", "--shard", "1/2", "--staged", str(tree)) == 1
+        assert "--shard requires a directory" in caplog.text
+
+    def test_invalid_shard(self, tree):
+        """Test that shard numbers outside 1..N are rejected."""
+        with pytest.raises(SystemExit):
+            run("validate", "--shard", "3/2", str(tree))
+
+    def test_merge_unreadable(self, tmp_path, caplog):
+        """Test that a file that is not a shard result fails the merge."""
+        bogus = tmp_path / "bogus.json"
+        bogus.write_text("{}")
+
+        assert run("merge", str(bogus)) == 1
+        assert "not a shard result" in caplog.text
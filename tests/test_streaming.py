@@ -0,0 +1,169 @@
+"""Tests for bounded-memory validation of large files."""
+
+import io
+import tracemalloc
+
+import pytest
+
+from src import streaming
+from src.profiling import Profiler
+from src.rules import LINE_LENGTH, RuleSet
+from src.streaming import iter_line_chunks, iter_stream_chunks, read_chunks
+from src.utils import MarkdownValidator, file_digest
+
+DOCUMENT = """# Report
+
+See [later](#results), [missing](#nowhere) and [file](missing.md).
+
+## Results
+
+```python
+# not a heading
+[not a link](x.md)
+```
+
+#### Skipped level
+
+# Second title
+
+| a | b |
+|---|---|
+| [ok](#report) | [bad](#gone) |
+
+```
+never closed
+"""
+
+
+@pytest.fixture
+def small_chunks(monkeypatch):
+    """Make the streaming path read a few dozen bytes at a time."""
+    monkeypatch.setattr(streaming, "CHUNK_SIZE", 32)
+
+
+def outcome(result):
+    """Return everything a result records, for comparison."""
+    return (
+        [repr(error) for error in result.errors],
+        result.dependencies,
+        result.digest,
+        result.anchors,
+        result.anchor_refs,
+        result.external_links,
+    )
+
+
+class TestIterLineChunks:
+    """Tests for iter_line_chunks function."""
+
+    def test_chunks_end_on_lines(self, tmp_path):
+        """Test that chunks cover the file and split only after newlines."""
+        data = b"".join(b"line %d\n" % index for index in range(100)) + b"no newline"
+        file_path = tmp_path / "a.md"
+        file_path.write_bytes(data)
+
+        chunks = list(iter_line_chunks(file_path, chunk_size=20))
+
+        assert b"".join(chunk for _, chunk in chunks) == data
+        assert all(chunk.endswith(b"\n") for _, chunk in chunks[:-1])
+        assert all(data[offset:].startswith(chunk) for offset, chunk in chunks)
+        assert len(chunks) > 10
+
+    def test_long_line_is_one_chunk(self, tmp_path):
+        """Test that a line longer than the chunk size is not split."""
+        file_path = tmp_path / "a.md"
+        file_path.write_bytes(b"x" * 100 + b"\nend\n")
+
+        assert [chunk for _, chunk in iter_line_chunks(file_path, chunk_size=10)] == [b"x" * 100 + b"\n", b"end\n"]
+
+    def test_empty_and_small_files(self, tmp_path):
+        """Test that empty files yield nothing and small files are read whole."""
+        empty = tmp_path / "empty.md"
+        empty.write_bytes(b"")
+        small = tmp_path / "small.md"
+        small.write_bytes(b"a\nb\n")
+
+        assert list(iter_line_chunks(empty)) == []
+        assert list(read_chunks(small)) == [(0, b"a\nb\n")]
+        assert list(read_chunks(small, threshold=0)) == [(0, b"a\nb\n")]
+
+    def test_file_digest(self, tmp_path):
+        """Test that hashing in pieces matches hashing the whole content."""
+        file_path = tmp_path / "a.md"
+        file_path.write_text(DOCUMENT * 3000)
+
+        assert file_digest(file_path) == MarkdownValidator(tmp_path).check_file(file_path).digest
+
+
+class TestIterStreamChunks:
+    """Tests for iter_stream_chunks function."""
+
+    def test_chunks_end_on_lines(self):
+        """Test that a stream is split after newlines with offsets into it."""
+        data = b"".join(b"line %d\n" % index for index in range(100)) + b"x" * 50 + b"\nno newline"
+
+        chunks = list(iter_stream_chunks(io.BytesIO(data), chunk_size=20))
+
+        assert b"".join(chunk for _, chunk in chunks) == data
+        assert all(chunk.endswith(b"\n") for _, chunk in chunks[:-1])
+        assert all(data[offset:].startswith(chunk) for offset, chunk in chunks)
+        assert b"x" * 50 + b"\n" in [chunk[-51:] for _, chunk in chunks]
+
+
+class TestStreamedValidation:
+    """Tests for validating files above the streaming threshold."""
+
+    def test_same_result_as_whole_file(self, tmp_path, small_chunks):
+        """Test that chunked validation finds exactly what whole-file validation finds."""
+        (tmp_path / "other.md").write_text("# Other\n")
+        file_path = tmp_path / "doc.md"
+        file_path.write_text(DOCUMENT + "See [other](other.md#other) and [web](https://example.com).\n")
+        rules = RuleSet.select(([LINE_LENGTH], ()), options={LINE_LENGTH: {"max": 20}})
+
+        whole = MarkdownValidator(tmp_path, rules=rules).check_file(file_path)
+        streamed = MarkdownValidator(tmp_path, rules=rules, stream_threshold=0).check_file(file_path)
+
+        assert outcome(streamed) == outcome(whole)
+        assert {error.rule for error in whole.errors} >= {"broken-anchor", "unclosed-fence", "line-length"}
+
+    def test_encoding_error_position(self, tmp_path, small_chunks):
+        """Test that invalid UTF-8 deep in the file is located by its byte offset."""
+        file_path = tmp_path / "doc.md"
+        file_path.write_bytes(DOCUMENT.encode() * 3 + b"ok \xe2\x28\xa1 bad\n" + DOCUMENT.encode())
+
+        whole = MarkdownValidator(tmp_path).check_file(file_path)
+        streamed = MarkdownValidator(tmp_path, stream_threshold=0).check_file(file_path)
+
+        assert outcome(streamed) == outcome(whole)
+        assert streamed.errors[0].rule == "encoding"
+        assert f"position {len(DOCUMENT.encode()) * 3 + 3}" in streamed.errors[0].message
+
+    def test_profiled(self, tmp_path, small_chunks):
+        """Test that streamed files are timed per rule and their bytes counted."""
+        file_path = tmp_path / "doc.md"
+        file_path.write_text(DOCUMENT)
+        profiler = Profiler()
+
+        MarkdownValidator(tmp_path, profiler=profiler, stream_threshold=0).check_file(file_path)
+
+        assert profiler.counters["bytes_read"] == file_path.stat().st_size
+        assert profiler.phases["rule.links"].calls > 2
+
+    def test_memory_does_not_grow_with_size(self, tmp_path, monkeypatch):
+        """Test that peak allocations stay near the chunk size for a large file."""
+        monkeypatch.setattr(streaming, "CHUNK_SIZE", 16 * 1024)
+        line = "score " * 50 + "[trace](#top)\n"
+        file_path = tmp_path / "report.md"
+        file_path.write_text("# Top\n\n" + line * 8000)
+        validator = MarkdownValidator(tmp_path, stream_threshold=0)
+
+        tracemalloc.start()
+        try:
+            result = validator.check_file(file_path)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+        assert result.errors == []
+        assert file_path.stat().st_size > 2 * 1024 * 1024
+        assert peak < 512 * 1024
@@ -0,0 +1,204 @@
+"""Tests for token counting."""
+
+import json
+import pickle
+import sys
+from unittest.mock import patch
+
+import pytest
+
+from src.cli import main
+from src.tokens import (
+    FileTokens,
+    SectionTokens,
+    TokenCache,
+    TokenCounter,
+    Tokenizer,
+    count_sections,
+    over_budget,
+    train_merges,
+)
+
+DOCUMENT = (
+    "Intro text, it's short.\n\n"
+    "# Tokens\n\n"
+    "Tokens_count 12345 tokens!\t\tTabs  and   spaces \n"
+    "  - item one\r\n"
+    "```\n# not a heading\n```\n\n"
+    "## Cost\n\n"
+    "Über naïve café — 東京\n"
+)
+
+
+@pytest.fixture(scope="module")
+def tokenizer():
+    """Load the bundled tokenizer once."""
+    return Tokenizer.load()
+
+
+class TestTokenizer:
+    """Tests for Tokenizer class."""
+
+    def test_count_matches_encode(self, tokenizer):
+        """Test that the fast count agrees with the tokens, whatever the whitespace."""
+        for text in (DOCUMENT, "", " ", "\n", "a", "  lead", "trail  ", "x \n y", " nbsp sep"):
+            assert tokenizer.count(text) == len(tokenizer.encode(text)), repr(text)
+
+    def test_encode_merges_by_rank(self):
+        """Test that bytes merge lowest rank first and unknown text falls back to bytes."""
+        tokenizer = Tokenizer([("Ġ", "t"), ("h", "e"), ("Ġt", "he")])
+
+        assert tokenizer.encode("the then") == ["Ġthe", "Ġthe", "n"]
+        assert tokenizer.encode("é") == ["Ġ", "Ã", "©"]
+
+    def test_load_merges_file(self, tmp_path):
+        """Test that a GPT-2 merges.txt is read and a malformed one rejected."""
+        path = tmp_path / "merges.txt"
+        path.write_text("#version: 0.2\nĠ t\nh e\n\n", encoding="utf-8")
+
+        assert Tokenizer.load(path).ranks == {("Ġ", "t"): 0, ("h", "e"): 1}
+
+        path.write_text("a b c\n", encoding="utf-8")
+        with pytest.raises(ValueError, match="expected two symbols"):
+            Tokenizer.load(path)
+
+    def test_pickled_without_memos(self, tokenizer):
+        """Test that a tokenizer shipped to a worker leaves its memos behind and counts the same."""
+        tokenizer.count(DOCUMENT)
+
+        copy = pickle.loads(pickle.dumps(tokenizer))
+
+        assert not copy._chunks and not copy._pieces
+        assert copy.count(DOCUMENT) == tokenizer.count(DOCUMENT)
+        assert copy.digest == tokenizer.digest
+
+
+class TestTrainMerges:
+    """Tests for train_merges function."""
+
+    def test_most_frequent_pair_first(self):
+        """Test that the commonest pair is merged first and rare pairs are not merged."""
+        merges = train_merges(["low low low lower"], 10)
+
+        assert merges[0] == ("Ġ", "l")
+        assert ("e", "r") not in merges
+        assert Tokenizer(merges).encode("low") == ["Ġlow"]
+
+
+class TestCountSections:
+    """Tests for count_sections function."""
+
+    def test_sections_add_up(self, tokenizer):
+        """Test that headings in fences do not split and the sections sum to the document."""
+        sections = count_sections(tokenizer, DOCUMENT)
+
+        assert [(section.line, section.title) for section in sections] == [(1, ""), (3, "Tokens"), (11, "Cost")]
+        assert sum(section.tokens for section in sections) == tokenizer.count(DOCUMENT)
+
+    def test_no_empty_preamble(self, tokenizer):
+        """Test that a document starting with a heading has no untitled section."""
+        assert [section.title for section in count_sections(tokenizer, "# A\n\ntext\n")] == ["A"]
+
+
+class TestTokenCounter:
+    """Tests for TokenCounter class."""
+
+    def make_files(self, root, count):
+        """Create markdown files, two of each content, and return them sorted."""
+        files = []
+        for index in range(count):
+            file_path = root / f"doc{index:03}.md"
+            file_path.write_text(f"# Doc {index // 2}\n\n" + "words and more words\n" * (index // 2 + 1))
+            files.append(file_path)
+        return files
+
+    def test_parallel_and_cached_results_match(self, tmp_path, tokenizer):
+        """Test that worker processes and the cache give the serial counts, and copies share entries."""
+        files = self.make_files(tmp_path, 40)
+        expected = TokenCounter(tokenizer).count_files(files)
+        cache = TokenCache(tmp_path / "tokens.json", {"merges": tokenizer.digest})
+
+        counter = TokenCounter(tokenizer, cache)
+        assert counter.count_files(files, jobs=2) == expected
+        assert cache.misses == 40 and cache.hits == 0
+        cache.prune(counter.digests)
+        cache.save()
+
+        cache = TokenCache(tmp_path / "tokens.json", {"merges": tokenizer.digest})
+        counter = TokenCounter(tokenizer, cache)
+        assert counter.count_files(files) == expected
+        assert cache.hits == 40 and counter.bytes_counted == 0
+        assert len(cache.known()) == 20
+
+    def test_other_merges_discard_cache(self, tmp_path, tokenizer):
+        """Test that counts made with another merge table are not reused."""
+        cache = TokenCache(tmp_path / "tokens.json", {"merges": tokenizer.digest})
+        cache.store("digest", [SectionTokens(1, "A", 3)])
+        cache.save()
+
+        assert not TokenCache(tmp_path / "tokens.json", {"merges": "other"}).known()
+
+    def test_unreadable_file_left_out(self, tmp_path, tokenizer, caplog):
+        """Test that a file that cannot be read is reported and skipped."""
+        files = self.make_files(tmp_path, 1)
+
+        results = TokenCounter(tokenizer).count_files([tmp_path / "missing.md", *files])
+
+        assert [result.path for result in results] == files
+        assert "Cannot read" in caplog.text
+
+
+class TestOverBudget:
+    """Tests for over_budget function."""
+
+    def test_largest_first(self, tmp_path):
+        """Test that only sections above the budget are reported, largest first."""
+        results = [
+            FileTokens(tmp_path / "a.md", [SectionTokens(1, "A", 50), SectionTokens(5, "B", 200)]),
+            FileTokens(tmp_path / "b.md", [SectionTokens(1, "C", 300), SectionTokens(9, "D", 100)]),
+        ]
+
+        found = over_budget(results, 100)
+
+        assert [(path.name, section.title) for path, section in found] == [("b.md", "C"), ("a.md", "B")]
+
+
+class TestTokensCommand:
+    """Tests for the tokens command."""
+
+    def run(self, *argv):
+        """Run the CLI with the given arguments and return its exit code."""
+        with patch.object(sys, "argv", ["cli.py", *argv]):
+            return main()
+
+    def test_json_report(self, tmp_path, capsys):
+        """Test that files, sections, cost and sections over budget are reported."""
+        (tmp_path / "short.md").write_text("# Short\n\nA few words.\n")
+        (tmp_path / "long.md").write_text("# Long\n\n## Body\n\n" + "many words in a long section\n" * 50)
+        (tmp_path / "pyproject.toml").write_text("[tool.ai-fundamentals.tokens]\nbudget = 100\nprices = {in = 2.0}\n")
+
+        assert self.run("tokens", "--format", "json", "--price", "out=10", str(tmp_path)) == 0
+
+        data = json.loads(capsys.readouterr().out)
+        assert [entry["path"] for entry in data["files"]] == ["long.md", "short.md"]
+        total = data["total"]["tokens"]
+        assert total == sum(entry["tokens"] for entry in data["files"])
+        assert data["total"]["cost"] == {"in": pytest.approx(total * 2e-6), "out": pytest.approx(total * 1e-5)}
+        assert [(entry["path"], entry["title"]) for entry in data["over_budget"]] == [("long.md", "Body")]
+        assert (tmp_path / ".ai-fundamentals-cache" / "tokens.json").exists()
+
+    def test_text_report(self, tmp_path, capsys):
+        """Test that the text report lists sections on request and the budget option wins."""
+        (tmp_path / "doc.md").write_text("# Doc\n\n## Part\n\n" + "text " * 40 + "\n")
+
+        assert self.run("tokens", "--sections", "--budget", "10", "--no-cache", str(tmp_path)) == 0
+
+        output = capsys.readouterr().out
+        assert "line 3 (Part)" in output
+        assert "1 section(s) over the budget of 10 tokens:" in output
+        assert "doc.md:3 (Part)" in output
+
+    def test_bad_merges(self, tmp_path, caplog):
+        """Test that an unreadable merge table fails with an error."""
+        assert self.run("tokens", "--merges", str(tmp_path / "missing.txt"), str(tmp_path)) == 1
+        assert "Cannot read merge table" in caplog.text
@@ -1,6 +1,6 @@
 """Tests for utility functions."""
 
-from src.utils import LinkChecker, MarkdownValidator
+from src.utils import LinkChecker, MarkdownValidator, make_batches
 
 
 class TestMarkdownValidator:
@@ -101,6 +101,45 @@ class TestMarkdownValidator:
         link_errors = [e for e in errors if "Broken link" in e]
         assert len(link_errors) == 0
 
+    def test_broken_same_file_anchor(self, tmp_path):
+        """Test detection of links to missing headings in the same file."""
+        file_path = tmp_path / "test.md"
+        file_path.write_text("# Title\n\n## Usage\n\n[ok](#usage) [bad](#install)\n")
+
+        validator = MarkdownValidator(tmp_path)
+        errors = validator.validate_file(file_path)
+        assert errors == [f"{file_path}:5: Broken anchor in link to #install"]
+
+    def test_cross_file_anchor(self, tmp_path):
+        """Test validation of fragments in links to other files."""
+        (tmp_path / "target.md").write_text("# Target\n\n## Setup\n\n## Setup\n")
+        file_path = tmp_path / "test.md"
+        file_path.write_text("# Title\n\n[a](target.md#setup-1) [b](target.md#setup-2)\n")
+
+        validator = MarkdownValidator(tmp_path)
+        errors = validator.validate_file(file_path)
+        assert errors == [f"{file_path}:3: Broken anchor in link to target.md#setup-2"]
+
+    def test_link_title_and_escapes(self, tmp_path):
+        """Test that link titles, queries and percent-escapes are handled."""
+        (tmp_path / "my file.md").write_text("# Target\n")
+        file_path = tmp_path / "test.md"
+        file_path.write_text('# Title\n\n[a](my%20file.md "Title") [b](<my file.md>) [c](my%20file.md?x=1)\n')
+
+        validator = MarkdownValidator(tmp_path)
+        errors = validator.validate_file(file_path)
+        assert len(errors) == 0
+
+    def test_fragment_on_non_markdown_target_ignored(self, tmp_path):
+        """Test that fragments into non-markdown files are not checked."""
+        (tmp_path / "script.py").write_text("print('hi')\n")
+        file_path = tmp_path / "test.md"
+        file_path.write_text("# Title\n\n[a](script.py#L1)\n")
+
+        validator = MarkdownValidator(tmp_path)
+        errors = validator.validate_file(file_path)
+        assert len(errors) == 0
+
     def test_unclosed_code_fence(self, tmp_path):
         """Test detection of unclosed code fences."""
         file_path = tmp_path / "test.md"
@@ -120,6 +159,24 @@ class TestMarkdownValidator:
         fence_errors = [e for e in errors if "code fence" in e]
         assert len(fence_errors) == 0
 
+    def test_comments_in_code_fence_are_not_headers(self, tmp_path):
+        """Test that shell comments inside fences are not counted as H1s."""
+        file_path = tmp_path / "test.md"
+        file_path.write_text("# Title\n\n```bash\n# install\npip install x\n```\n")
+
+        validator = MarkdownValidator(tmp_path)
+        errors = validator.validate_file(file_path)
+        assert len(errors) == 0
+
+    def test_links_in_code_are_not_checked(self, tmp_path):
+        """Test that links inside fences and code spans are ignored."""
+        file_path = tmp_path / "test.md"
+        file_path.write_text("# Title\n\n`[a](missing.md)`\n\n```\n[b](missing.md)\n```\n")
+
+        validator = MarkdownValidator(tmp_path)
+        errors = validator.validate_file(file_path)
+        assert len(errors) == 0
+
     def test_encoding_error(self, tmp_path):
         """Test handling of encoding errors."""
         file_path = tmp_path / "test.md"
@@ -171,3 +228,36 @@ class TestLinkChecker:
 
         assert len(results) == 1
         assert tmp_path / "file1.md" in results
+
+    def test_check_all_links_parallel_matches_serial(self, tmp_path):
+        """Test that parallel validation returns the same results as serial."""
+        for index in range(40):
+            target = "missing.md" if index % 3 == 0 else f"file{index + 1}.md"
+            (tmp_path / f"file{index}.md").write_text(f"# File {index}\n\n[Link]({target})\n")
+
+        serial = LinkChecker(tmp_path).check_all_links()
+        parallel = LinkChecker(tmp_path).check_all_links(jobs=2)
+
+        assert list(parallel.items()) == list(serial.items())
+        assert len(parallel) == 14
+
+    def test_check_all_links_cross_file_anchors(self, tmp_path):
+        """Test that cross-file anchors are checked against the slug index."""
+        (tmp_path / "a.md").write_text("# A\n\n## Details\n\n[b](sub/b.md#overview) [bad](sub/b.md#nope)\n")
+        (tmp_path / "sub").mkdir()
+        (tmp_path / "sub" / "b.md").write_text("# B\n\n## Overview\n\n[a](../a.md#details)\n")
+
+        checker = LinkChecker(tmp_path)
+        results = checker.check_all_links()
+
+        assert results == {tmp_path / "a.md": [f"{tmp_path / 'a.md'}:5: Broken anchor in link to sub/b.md#nope"]}
+        assert len(checker.slug_index) == 2
+
+    def test_make_batches_preserves_order(self, tmp_path):
+        """Test that batching keeps every file in its original order."""
+        files = [tmp_path / f"file{index}.md" for index in range(100)]
+
+        batches = make_batches(files, jobs=3)
+
+        assert [path for batch in batches for path in batch] == files
+        assert len(batches) > 3
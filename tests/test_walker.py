@@ -0,0 +1,178 @@
+"""Tests for the pruning, ignore-aware directory walker."""
+
+import argparse
+
+from src.cli import validate_command
+from src.path_index import PathIndex
+from src.utils import LinkChecker
+from src.walker import Walker, compile_pattern, is_ignored
+
+
+def ignored(patterns, rel_path, is_dir=False):
+    """Apply root-level patterns to a path."""
+    rules = tuple(compile_pattern(pattern) for pattern in patterns)
+    return is_ignored(rules, rel_path, is_dir)
+
+
+def make_tree(root):
+    """Create a tree with vendored, generated and ignored content."""
+    for rel_path in [
+        "README.md",
+        "docs/guide.md",
+        "docs/debug.log",
+        "node_modules/pkg/README.md",
+        "build/out.md",
+        "src/build/notes.md",
+        "tmp/scratch.md",
+        "docs/keep.md",
+        "docs/drafts/wip.md",
+    ]:
+        path = root / rel_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text("# Title\n")
+    (root / ".gitignore").write_text("*.log\n/build\ntmp/\n")
+    (root / "docs" / ".gitignore").write_text("*.md\n!keep.md\n!guide.md\n")
+
+
+class TestPatterns:
+    """Tests for .gitignore pattern matching."""
+
+    def test_unanchored_patterns_match_at_any_depth(self):
+        """Test that patterns without a slash match names anywhere."""
+        assert ignored(["*.log"], "a/b/debug.log")
+        assert not ignored(["*.log"], "a/b/debug.md")
+
+    def test_anchored_patterns(self):
+        """Test that a leading or embedded slash anchors the pattern to its directory."""
+        assert ignored(["/build"], "build", is_dir=True)
+        assert not ignored(["/build"], "src/build", is_dir=True)
+        assert ignored(["docs/*.md"], "docs/a.md")
+        assert not ignored(["docs/*.md"], "docs/sub/a.md")
+
+    def test_directory_only_patterns(self):
+        """Test that a trailing slash only matches directories."""
+        assert ignored(["tmp/"], "tmp", is_dir=True)
+        assert not ignored(["tmp/"], "tmp")
+
+    def test_double_star(self):
+        """Test that ** matches any number of directories."""
+        assert ignored(["**/gen"], "gen", is_dir=True)
+        assert ignored(["**/gen"], "a/b/gen", is_dir=True)
+        assert ignored(["docs/**/*.md"], "docs/a/b/c.md")
+
+    def test_negation_last_match_wins(self):
+        """Test that a later ! pattern re-includes a path."""
+        assert not ignored(["*.md", "!keep.md"], "keep.md")
+        assert ignored(["!keep.md", "*.md"], "keep.md")
+
+    def test_comments_and_blank_lines(self):
+        """Test that comments and blank lines compile to nothing."""
+        assert compile_pattern("# comment") is None
+        assert compile_pattern("   ") is None
+
+
+class TestWalker:
+    """Tests for Walker class."""
+
+    def test_prunes_and_honors_gitignore(self, tmp_path):
+        """Test that excluded directories are pruned and ignored markdown is skipped."""
+        make_tree(tmp_path)
+
+        result = Walker(tmp_path).walk()
+
+        assert sorted(result.markdown) == ["README.md", "docs/guide.md", "docs/keep.md", "src/build/notes.md"]
+        assert result.pruned == {"node_modules", "build", "tmp"}
+        assert "node_modules/pkg" not in result.dirs
+        assert "docs/drafts/wip.md" in result.files
+
+    def test_exclude_patterns(self, tmp_path):
+        """Test that extra exclude patterns override .gitignore negations."""
+        make_tree(tmp_path)
+
+        result = Walker(tmp_path, exclude=["docs/keep.md", "src/"]).walk()
+
+        assert sorted(result.markdown) == ["README.md", "docs/guide.md"]
+        assert "src" in result.pruned
+
+    def test_gitignore_can_be_disabled(self, tmp_path):
+        """Test that only default excludes apply without .gitignore support."""
+        make_tree(tmp_path)
+
+        result = Walker(tmp_path, gitignore=False).walk()
+
+        assert result.pruned == {"node_modules"}
+        assert "tmp/scratch.md" in result.markdown
+
+    def test_parallel_walk_matches_serial(self, tmp_path):
+        """Test that walking on several threads finds the same paths."""
+        make_tree(tmp_path)
+        for index in range(20):
+            (tmp_path / "many" / f"d{index}").mkdir(parents=True)
+            (tmp_path / "many" / f"d{index}" / "page.md").write_text("# Page\n")
+
+        serial = Walker(tmp_path).walk()
+        parallel = Walker(tmp_path, jobs=4).walk()
+
+        for name in ("files", "dirs", "pruned", "markdown"):
+            assert getattr(parallel, name) == getattr(serial, name)
+
+    def test_is_excluded(self, tmp_path):
+        """Test single-path checks against names, patterns and nested rules."""
+        make_tree(tmp_path)
+        walker = Walker(tmp_path)
+
+        assert walker.is_excluded("node_modules", True)
+        assert walker.is_excluded("docs/new.md", False)
+        assert not walker.is_excluded("docs/keep.md", False)
+
+
+class TestIndexIntegration:
+    """Tests for pruning in the path index and link checker."""
+
+    def test_links_into_pruned_directories_resolve(self, tmp_path):
+        """Test that paths inside pruned directories still exist via the filesystem."""
+        make_tree(tmp_path)
+
+        index = PathIndex.build(tmp_path)
+
+        assert index.exists(str(tmp_path / "node_modules" / "pkg" / "README.md"))
+        assert not index.exists(str(tmp_path / "node_modules" / "pkg" / "missing.md"))
+        assert index.exists(str(tmp_path / "docs" / "drafts" / "wip.md"))
+
+    def test_update_honors_rules(self, tmp_path):
+        """Test that files created later are classified by the same rules."""
+        make_tree(tmp_path)
+        index = PathIndex.build(tmp_path)
+        (tmp_path / "docs" / "new.md").write_text("# New\n")
+        (tmp_path / "node_modules" / "other.md").write_text("# Other\n")
+        (tmp_path / "extra").mkdir()
+        (tmp_path / "extra" / "page.md").write_text("# Page\n")
+
+        assert index.update(tmp_path / "docs" / "new.md")
+        assert not index.update(tmp_path / "node_modules" / "other.md")
+        assert index.update(tmp_path / "extra")
+
+        assert not index.is_markdown(tmp_path / "docs" / "new.md")
+        assert index.is_markdown(tmp_path / "extra" / "page.md")
+        assert "node_modules/other.md" not in index.files
+
+    def test_link_checker_skips_excluded_files(self, tmp_path):
+        """Test that broken files in excluded directories are not reported."""
+        make_tree(tmp_path)
+        (tmp_path / "node_modules" / "pkg" / "README.md").write_text("no title\n")
+        (tmp_path / "tmp" / "scratch.md").write_text("no title\n")
+        (tmp_path / "vendor").mkdir()
+        (tmp_path / "vendor" / "lib.md").write_text("no title\n")
+        (tmp_path / "README.md").write_text("# Readme\n\n[dep](node_modules/pkg/README.md)\n")
+
+        results = LinkChecker(tmp_path, exclude=["vendor/"]).check_all_links()
+
+        assert results == {}
+
+    def test_cli_exclude(self, tmp_path):
+        """Test that --exclude leaves matching files out of validation."""
+        (tmp_path / "a.md").write_text("# A\n")
+        (tmp_path / "b.md").write_text("no title\n")
+        args = argparse.Namespace(path=str(tmp_path), jobs=1, no_cache=True, exclude=["b.md"])
+
+        assert validate_command(args) == 0
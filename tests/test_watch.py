@@ -0,0 +1,199 @@
+"""Tests for incremental revalidation and watch mode."""
+
+import queue
+import threading
+
+import pytest
+
+from src.utils import LinkChecker, MarkdownValidator
+from src.watch import InotifyWatcher, PollingWatcher, watch
+
+
+def checked(root):
+    """Return a link checker that has checked the whole tree."""
+    checker = LinkChecker(root)
+    checker.check_all_links()
+    return checker
+
+
+def as_text(changes):
+    """Convert diagnostics per file to their string form."""
+    return {path: [str(diagnostic) for diagnostic in diagnostics] for path, diagnostics in changes.items()}
+
+
+def inotify_watcher(root):
+    """Return an inotify watcher, skipping the test where inotify is unavailable."""
+    try:
+        return InotifyWatcher(root)
+    except OSError as e:
+        pytest.skip(f"inotify unavailable: {e}")
+
+
+class TestLinkCheckerRefresh:
+    """Tests for LinkChecker.refresh method."""
+
+    def test_modified_file_is_revalidated(self, tmp_path):
+        """Test that an edit introducing an error is reported."""
+        file_path = tmp_path / "a.md"
+        file_path.write_text("# A\n")
+        checker = checked(tmp_path)
+
+        file_path.write_text("No title\n")
+        changes = checker.refresh([file_path])
+
+        assert as_text(changes) == {file_path: [f"{file_path}: Missing H1 title"]}
+        assert checker.results == changes
+
+    def test_created_target_fixes_dependents(self, tmp_path):
+        """Test that creating a link target clears broken links to it."""
+        (tmp_path / "a.md").write_text("# A\n\n[b](b.md)\n")
+        checker = checked(tmp_path)
+        assert tmp_path / "a.md" in checker.results
+
+        (tmp_path / "b.md").write_text("# B\n")
+        changes = checker.refresh([tmp_path / "b.md"])
+
+        assert changes == {tmp_path / "a.md": []}
+        assert checker.results == {}
+        assert tmp_path / "b.md" in checker.all_files
+
+    def test_deleted_target_breaks_dependents(self, tmp_path):
+        """Test that deleting a link target reports links to it."""
+        (tmp_path / "a.md").write_text("# A\n\n[image](image.png)\n")
+        (tmp_path / "image.png").write_bytes(b"png")
+        checker = checked(tmp_path)
+
+        (tmp_path / "image.png").unlink()
+        changes = checker.refresh([tmp_path / "image.png"])
+
+        assert as_text(changes) == {tmp_path / "a.md": [f"{tmp_path / 'a.md'}:3: Broken link to image.png"]}
+
+    def test_renamed_heading_breaks_anchor_links(self, tmp_path):
+        """Test that files linking to a removed heading are reported."""
+        (tmp_path / "a.md").write_text("# A\n\n[usage](b.md#usage)\n")
+        (tmp_path / "b.md").write_text("# B\n\n## Usage\n")
+        checker = checked(tmp_path)
+
+        (tmp_path / "b.md").write_text("# B\n\n## Install\n")
+        changes = checker.refresh([tmp_path / "b.md"])
+
+        assert as_text(changes) == {tmp_path / "a.md": [f"{tmp_path / 'a.md'}:3: Broken anchor in link to b.md#usage"]}
+
+    def test_deleted_file_is_forgotten(self, tmp_path):
+        """Test that a deleted file drops out of the results."""
+        (tmp_path / "a.md").write_text("no title\n")
+        checker = checked(tmp_path)
+
+        (tmp_path / "a.md").unlink()
+        changes = checker.refresh([tmp_path / "a.md"])
+
+        assert changes == {tmp_path / "a.md": []}
+        assert checker.results == {}
+        assert tmp_path / "a.md" not in checker.all_files
+
+    def test_created_directory_is_scanned(self, tmp_path):
+        """Test that markdown files in a new directory are validated."""
+        (tmp_path / "a.md").write_text("# A\n")
+        checker = checked(tmp_path)
+
+        (tmp_path / "docs").mkdir()
+        (tmp_path / "docs" / "b.md").write_text("no title\n")
+        changes = checker.refresh([tmp_path / "docs"])
+
+        assert list(changes) == [tmp_path / "docs" / "b.md"]
+
+    def test_only_affected_files_are_read(self, tmp_path, monkeypatch):
+        """Test that unrelated files keep their previous results."""
+        for index in range(20):
+            (tmp_path / f"file{index}.md").write_text(f"# File {index}\n")
+        (tmp_path / "linker.md").write_text("# Linker\n\n[b](file3.md)\n")
+        checker = checked(tmp_path)
+
+        read = []
+        original = MarkdownValidator.check_file
+        monkeypatch.setattr(
+            MarkdownValidator, "check_file", lambda self, path: read.append(path) or original(self, path)
+        )
+        (tmp_path / "file3.md").unlink()
+        checker.refresh([tmp_path / "file3.md"])
+
+        assert read == [tmp_path / "linker.md"]
+
+    def test_refresh_requires_full_run(self, tmp_path):
+        """Test that refreshing before a full check is rejected."""
+        with pytest.raises(RuntimeError):
+            LinkChecker(tmp_path).refresh([tmp_path / "a.md"])
+
+
+class TestWatchers:
+    """Tests for InotifyWatcher and PollingWatcher classes."""
+
+    def test_polling_reports_changes(self, tmp_path):
+        """Test that polling finds modified, created and deleted paths."""
+        (tmp_path / "a.md").write_text("# A\n")
+        (tmp_path / "b.md").write_text("# B\n")
+        watcher = PollingWatcher(tmp_path, interval=0)
+
+        (tmp_path / "a.md").write_text("# A changed\n")
+        (tmp_path / "b.md").unlink()
+        (tmp_path / "c.md").write_text("# C\n")
+
+        assert watcher.poll(1) == {tmp_path / "a.md", tmp_path / "b.md", tmp_path / "c.md"}
+        assert watcher.poll(1) == set()
+
+    def test_inotify_reports_changes(self, tmp_path):
+        """Test that inotify reports writes, including in new directories."""
+        (tmp_path / "a.md").write_text("# A\n")
+        watcher = inotify_watcher(tmp_path)
+        try:
+            (tmp_path / "a.md").write_text("# A changed\n")
+            (tmp_path / "docs").mkdir()
+            (tmp_path / "docs" / "b.md").write_text("# B\n")
+
+            changed = set()
+            while True:
+                more = watcher.poll(0.2)
+                if not more:
+                    break
+                changed |= more
+        finally:
+            watcher.close()
+
+        assert {tmp_path / "a.md", tmp_path / "docs", tmp_path / "docs" / "b.md"} <= changed
+
+    def test_ignored_directories_are_not_reported(self, tmp_path):
+        """Test that writes to the cache and .git directories are ignored."""
+        (tmp_path / ".git").mkdir()
+        watcher = inotify_watcher(tmp_path)
+        try:
+            (tmp_path / ".git" / "index").write_bytes(b"index")
+            assert watcher.poll(0.2) == set()
+        finally:
+            watcher.close()
+
+
+class TestWatch:
+    """Tests for watch function."""
+
+    def test_change_is_reported(self, tmp_path):
+        """Test that the watch loop rechecks a saved file."""
+        file_path = tmp_path / "a.md"
+        file_path.write_text("# A\n")
+        checker = checked(tmp_path)
+        reports = queue.Queue()
+        stop = threading.Event()
+        watcher = PollingWatcher(tmp_path, interval=0.01)
+        thread = threading.Thread(
+            target=watch,
+            args=(checker, watcher, lambda changes, elapsed: reports.put(changes)),
+            kwargs={"debounce": 0.01, "stop": stop, "idle_timeout": 0.01},
+        )
+        thread.start()
+        try:
+            file_path.write_text("No title\n")
+            changes = reports.get(timeout=5)
+        finally:
+            stop.set()
+            thread.join()
+
+        assert as_text(changes) == {file_path: [f"{file_path}: Missing H1 title"]}